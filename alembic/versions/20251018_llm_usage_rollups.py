@@ -0,0 +1,83 @@
+"""llm_usage_logs rollups (hourly/daily) + BRIN en created_at
+
+Revision ID: llm_usage_rollups
+Revises: bab86b458517
+Create Date: 2025-10-18 10:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'llm_usage_rollups'
+down_revision: Union[str, None] = 'bab86b458517'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+NULL_UUID = '00000000-0000-0000-0000-000000000000'
+
+
+def _create_rollup_table(name: str) -> None:
+    op.create_table(
+        name,
+        sa.Column('bucket_start', sa.TIMESTAMP(timezone=True), nullable=False),
+        sa.Column('user_id', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('provider_id', postgresql.UUID(as_uuid=True), nullable=False, server_default=sa.text(f"'{NULL_UUID}'::uuid")),
+        sa.Column('model_id', postgresql.UUID(as_uuid=True), nullable=False, server_default=sa.text(f"'{NULL_UUID}'::uuid")),
+        sa.Column('request_count', sa.BigInteger(), nullable=False, server_default='0'),
+        sa.Column('success_count', sa.BigInteger(), nullable=False, server_default='0'),
+        sa.Column('error_count', sa.BigInteger(), nullable=False, server_default='0'),
+        sa.Column('input_tokens', sa.BigInteger(), nullable=False, server_default='0'),
+        sa.Column('output_tokens', sa.BigInteger(), nullable=False, server_default='0'),
+        sa.Column('total_cost', sa.DECIMAL(precision=16, scale=6), nullable=False, server_default='0'),
+        sa.Column('response_time_ms_sum', sa.BigInteger(), nullable=False, server_default='0'),
+        sa.Column('response_time_count', sa.BigInteger(), nullable=False, server_default='0'),
+        sa.PrimaryKeyConstraint('bucket_start', 'user_id', 'provider_id', 'model_id'),
+    )
+    # Consultas por usuario y rango de tiempo
+    op.create_index(f'ix_{name}_user_bucket', name, ['user_id', 'bucket_start'])
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    _create_rollup_table('llm_usage_rollup_hourly')
+    _create_rollup_table('llm_usage_rollup_daily')
+
+    op.create_table(
+        'llm_usage_rollup_state',
+        sa.Column('name', sa.String(length=50), nullable=False),
+        sa.Column('rolled_until', sa.TIMESTAMP(timezone=True), nullable=False),
+        sa.Column('updated_at', sa.TIMESTAMP(timezone=True), server_default=sa.text('now()'), nullable=False),
+        sa.PrimaryKeyConstraint('name'),
+    )
+    # Watermark inicial: la hora del log más antiguo; el job hace el backfill por ventanas
+    op.execute("""
+        INSERT INTO llm_usage_rollup_state (name, rolled_until)
+        SELECT 'llm_usage', COALESCE(date_trunc('hour', MIN(created_at)), date_trunc('hour', now()))
+        FROM llm_usage_logs
+    """)
+
+    # BRIN sobre created_at: llm_usage_logs es append-only y se consulta por rangos
+    with op.get_context().autocommit_block():
+        op.execute("SET statement_timeout = 0;")
+        op.execute("""
+        CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_llm_usage_logs_created_at_brin
+          ON llm_usage_logs
+          USING brin (created_at)
+          WITH (pages_per_range = 32);
+        """)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.get_context().autocommit_block():
+        op.execute("DROP INDEX CONCURRENTLY IF EXISTS ix_llm_usage_logs_created_at_brin;")
+    op.drop_table('llm_usage_rollup_state')
+    op.drop_index('ix_llm_usage_rollup_daily_user_bucket', table_name='llm_usage_rollup_daily')
+    op.drop_table('llm_usage_rollup_daily')
+    op.drop_index('ix_llm_usage_rollup_hourly_user_bucket', table_name='llm_usage_rollup_hourly')
+    op.drop_table('llm_usage_rollup_hourly')
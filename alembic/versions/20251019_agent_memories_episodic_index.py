@@ -0,0 +1,33 @@
+"""agent_memories: índice (agent_id, kind, created_at) para memoria episódica
+
+Revision ID: agent_memories_episodic_idx
+Revises: llm_usage_rollups
+Create Date: 2025-10-19 10:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'agent_memories_episodic_idx'
+down_revision: Union[str, None] = 'llm_usage_rollups'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    with op.get_context().autocommit_block():
+        op.execute("SET statement_timeout = 0;")
+        op.execute("""
+        CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_agent_memories_agent_kind_created
+          ON agent_memories (agent_id, kind, created_at DESC);
+        """)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.get_context().autocommit_block():
+        op.execute("DROP INDEX CONCURRENTLY IF EXISTS ix_agent_memories_agent_kind_created;")
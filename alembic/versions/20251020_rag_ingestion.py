@@ -0,0 +1,73 @@
+"""rag_documents + rag_chunks (pgvector HNSW) para la ingesta RAG de agentes
+
+Revision ID: rag_ingestion
+Revises: agent_memories_episodic_idx
+Create Date: 2025-10-20 10:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+from pgvector.sqlalchemy import Vector
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'rag_ingestion'
+down_revision: Union[str, None] = 'agent_memories_episodic_idx'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        'rag_documents',
+        sa.Column('agent_id', postgresql.UUID(as_uuid=True), nullable=False),
+        sa.Column('document_id', sa.String(length=255), nullable=False),
+        sa.Column('source', sa.Text(), nullable=True),
+        sa.Column('content_hash', sa.String(length=64), nullable=False),
+        sa.Column('status', sa.String(length=20), nullable=False, server_default='pending'),
+        sa.Column('chunk_count', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('error', sa.Text(), nullable=True),
+        sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=False),
+        sa.Column('updated_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=False),
+        sa.ForeignKeyConstraint(['agent_id'], ['ai_agents.agent_id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('agent_id', 'document_id'),
+    )
+
+    op.create_table(
+        'rag_chunks',
+        sa.Column('id', sa.BigInteger(), autoincrement=True, nullable=False),
+        sa.Column('agent_id', postgresql.UUID(as_uuid=True), nullable=False),
+        sa.Column('document_id', sa.String(length=255), nullable=False),
+        sa.Column('chunk_index', sa.Integer(), nullable=False),
+        sa.Column('content', sa.Text(), nullable=False),
+        sa.Column('content_hash', sa.String(length=64), nullable=False),
+        sa.Column('embedding_model', sa.String(length=100), nullable=False),
+        sa.Column('embedding', Vector(1536), nullable=False),
+        sa.Column('metadatas', postgresql.JSONB(astext_type=sa.Text()), server_default=sa.text("'{}'"), nullable=False),
+        sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=False),
+        sa.ForeignKeyConstraint(['agent_id'], ['ai_agents.agent_id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('agent_id', 'document_id', 'content_hash', name='uq_rag_chunks_agent_doc_hash'),
+    )
+    op.create_index('ix_rag_chunks_agent_id', 'rag_chunks', ['agent_id'])
+    op.create_index('ix_rag_chunks_agent_hash', 'rag_chunks', ['agent_id', 'content_hash'])
+    # HNSW: sin fase de entrenamiento (a diferencia de ivfflat), apto para tablas que crecen
+    op.execute("""
+    CREATE INDEX IF NOT EXISTS ix_rag_chunks_embedding_hnsw
+      ON rag_chunks
+      USING hnsw (embedding vector_cosine_ops)
+      WITH (m = 16, ef_construction = 64);
+    """)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.execute("DROP INDEX IF EXISTS ix_rag_chunks_embedding_hnsw;")
+    op.drop_index('ix_rag_chunks_agent_hash', table_name='rag_chunks')
+    op.drop_index('ix_rag_chunks_agent_id', table_name='rag_chunks')
+    op.drop_table('rag_chunks')
+    op.drop_table('rag_documents')
@@ -0,0 +1,34 @@
+"""agent_memories: índice GIN full-text para búsqueda híbrida
+
+Revision ID: agent_memories_fts
+Revises: rag_ingestion
+Create Date: 2025-10-21 10:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'agent_memories_fts'
+down_revision: Union[str, None] = 'rag_ingestion'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    with op.get_context().autocommit_block():
+        op.execute("SET statement_timeout = 0;")
+        op.execute("""
+        CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_agent_memories_content_fts
+          ON agent_memories
+          USING gin (to_tsvector('simple', content));
+        """)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.get_context().autocommit_block():
+        op.execute("DROP INDEX CONCURRENTLY IF EXISTS ix_agent_memories_content_fts;")
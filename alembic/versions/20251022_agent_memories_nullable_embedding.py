@@ -0,0 +1,38 @@
+"""agent_memories: embedding nullable (episodios sin embedding si el proveedor falla)
+
+Revision ID: agent_memories_nullable_embedding
+Revises: agent_memories_fts
+Create Date: 2025-10-22 10:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'agent_memories_nullable_embedding'
+down_revision: Union[str, None] = 'agent_memories_fts'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.alter_column('agent_memories', 'embedding', nullable=True)
+    # Los vectores cero guardados antes de este cambio eran fallos del proveedor
+    op.execute("""
+    UPDATE agent_memories
+       SET embedding = NULL
+     WHERE vector_norm(embedding) = 0;
+    """)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.execute("""
+    UPDATE agent_memories
+       SET embedding = array_fill(0, ARRAY[1536])::vector
+     WHERE embedding IS NULL;
+    """)
+    op.alter_column('agent_memories', 'embedding', nullable=False)
@@ -0,0 +1,43 @@
+"""rag_chunks: unique por (agent_id, document_id, chunk_index) en lugar de content_hash
+
+Revision ID: rag_chunks_unique_chunk_index
+Revises: agent_memories_nullable_embedding
+Create Date: 2025-10-23 10:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'rag_chunks_unique_chunk_index'
+down_revision: Union[str, None] = 'agent_memories_nullable_embedding'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # La unique por hash descartaba chunks idénticos repetidos dentro de un documento
+    op.drop_constraint('uq_rag_chunks_agent_doc_hash', 'rag_chunks', type_='unique')
+    op.create_unique_constraint(
+        'uq_rag_chunks_agent_doc_chunk', 'rag_chunks', ['agent_id', 'document_id', 'chunk_index']
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_constraint('uq_rag_chunks_agent_doc_chunk', 'rag_chunks', type_='unique')
+    # Vuelve a la unique por hash: se conserva el primer chunk de cada hash repetido
+    op.execute("""
+    DELETE FROM rag_chunks a
+     USING rag_chunks b
+     WHERE a.agent_id = b.agent_id
+       AND a.document_id = b.document_id
+       AND a.content_hash = b.content_hash
+       AND a.chunk_index > b.chunk_index;
+    """)
+    op.create_unique_constraint(
+        'uq_rag_chunks_agent_doc_hash', 'rag_chunks', ['agent_id', 'document_id', 'content_hash']
+    )
@@ -8,14 +8,23 @@ import inspect
 import time
 import json
 import hashlib
-from typing import Dict, Any, List, Optional, Callable, Union, Tuple
+from typing import Dict, Any, List, Optional, Callable, Set, Union, Tuple
 from dataclasses import dataclass, asdict
 from enum import Enum
 import importlib.util
 import tempfile
 import os
-import redis
 import logging
+import multiprocessing
+import threading
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from dataclasses import replace
+
+import redis.asyncio as redis
+
+from app.core.config import settings
 
 logger = logging.getLogger(__name__)
 
@@ -93,9 +102,14 @@ class HandlerValidator:
         'utils': ['validators', 'python-dotenv', 'pyyaml']
     }
     
+    # Subir al cambiar cualquier regla: invalida los veredictos cacheados (memoria y Redis)
+    RULESET_VERSION = "2025.10.1"
+
+    # Cache L1 compartida por todas las instancias del proceso
+    _report_cache: "OrderedDict[str, HandlerValidationReport]" = OrderedDict()
+
     def __init__(self, redis_url: str = None):
         self.redis = redis.from_url(redis_url) if redis_url else None
-        self.validation_cache = {}
         
     async def validate_handler(
         self,
@@ -105,16 +119,34 @@ class HandlerValidator:
     ) -> HandlerValidationReport:
         """
         Perform comprehensive validation of a handler
+        Cached by content: a known handler is a hash lookup, not a full parse
         """
-        start_time = time.time()
-        
-        # Calculate handler hash for caching
-        handler_hash = hashlib.sha256(handler_code.encode()).hexdigest()
-        
+        handler_code = normalize_source(handler_code)
+        handler_hash = source_hash(handler_code)
+        cache_key = self._cache_key(handler_hash, validation_level)
+
         # Check cache
-        cached_result = await self._get_cached_validation(handler_hash)
+        cached_result = await self._get_cached_validation(cache_key)
         if cached_result:
-            return cached_result
+            return replace(cached_result, handler_name=handler_name)
+
+        report = await self._analyze_in_pool(handler_code, handler_name, validation_level)
+
+        # Cache the result
+        await self._cache_validation_result(cache_key, report)
+
+        return report
+
+    def analyze(
+        self,
+        handler_code: str,
+        handler_name: str,
+        validation_level: ValidationLevel = ValidationLevel.STANDARD
+    ) -> HandlerValidationReport:
+        """Análisis AST + seguridad síncrono y sin cache (CPU puro, apto para process pool)"""
+        start_time = time.time()
+        handler_code = normalize_source(handler_code)
+        handler_hash = source_hash(handler_code)
         
         issues = []
         
@@ -132,10 +164,10 @@ class HandlerValidator:
             return self._create_failed_report(handler_name, validation_level, issues, handler_hash, start_time)
         
         # Perform validation checks
-        await self._validate_security(tree, handler_code, issues, validation_level)
-        await self._validate_performance(tree, handler_code, issues, validation_level)
-        await self._validate_correctness(tree, handler_code, issues, validation_level)
-        await self._validate_style(tree, handler_code, issues, validation_level)
+        self._validate_security(tree, handler_code, issues, validation_level)
+        self._validate_performance(tree, handler_code, issues, validation_level)
+        self._validate_correctness(tree, handler_code, issues, validation_level)
+        self._validate_style(tree, handler_code, issues, validation_level)
         
         # Calculate scores
         security_score = self._calculate_security_score(issues)
@@ -146,7 +178,7 @@ class HandlerValidator:
         overall_result = self._determine_overall_result(issues, validation_level)
         
         # Create report
-        report = HandlerValidationReport(
+        return HandlerValidationReport(
             handler_name=handler_name,
             validation_level=validation_level,
             overall_result=overall_result,
@@ -158,11 +190,25 @@ class HandlerValidator:
             timestamp=time.time(),
             handler_hash=handler_hash
         )
-        
-        # Cache the result
-        await self._cache_validation_result(handler_hash, report)
-        
-        return report
+
+    async def _analyze_in_pool(
+        self,
+        handler_code: str,
+        handler_name: str,
+        validation_level: ValidationLevel
+    ) -> HandlerValidationReport:
+        """Cache miss: el AST walk va al process pool para no bloquear el event loop"""
+        pool = _get_analysis_pool()
+        if pool is not None:
+            try:
+                loop = asyncio.get_running_loop()
+                return await loop.run_in_executor(
+                    pool, _analyze_handler, handler_code, handler_name, validation_level.value
+                )
+            except BrokenProcessPool as e:
+                logger.warning(f"Validation process pool broken, analyzing in thread: {e}")
+                _reset_analysis_pool()
+        return await asyncio.to_thread(self.analyze, handler_code, handler_name, validation_level)
     
     async def validate_handler_execution(
         self,
@@ -227,30 +273,47 @@ class HandlerValidator:
     ) -> Dict[str, HandlerValidationReport]:
         """
         Validate multiple handlers in batch
+        Un solo MGET para la cache; los misses (únicos por contenido) en paralelo en el pool
         """
         results = {}
         
-        # Create validation tasks
-        tasks = []
-        for name, code in handlers.items():
-            task = self.validate_handler(code, name, validation_level)
-            tasks.append((name, task))
-        
-        # Execute validations concurrently
-        for name, task in tasks:
-            try:
-                results[name] = await task
-            except Exception as e:
-                logger.error(f"Validation failed for handler {name}: {e}")
+        sources = {name: normalize_source(code) for name, code in handlers.items()}
+        keys = {name: self._cache_key(source_hash(code), validation_level) for name, code in sources.items()}
+        cached = await self._get_cached_validations(set(keys.values()))
+
+        # Un análisis por contenido distinto, aunque varios handlers compartan código
+        pending: Dict[str, Tuple[str, str]] = {}
+        for name, key in keys.items():
+            if key not in cached and key not in pending:
+                pending[key] = (name, sources[name])
+
+        analyses = await asyncio.gather(
+            *(self._analyze_in_pool(code, name, validation_level) for name, code in pending.values()),
+            return_exceptions=True
+        )
+        fresh = {}
+        for key, analysis in zip(pending.keys(), analyses):
+            if isinstance(analysis, HandlerValidationReport):
+                fresh[key] = analysis
+            else:
+                logger.error(f"Validation failed for handler {pending[key][0]}: {analysis}")
+        await self._cache_validation_results(fresh)
+        cached.update(fresh)
+
+        for name, key in keys.items():
+            report = cached.get(key)
+            if report is not None:
+                results[name] = replace(report, handler_name=name)
+            else:
                 results[name] = self._create_failed_report(
-                    name, validation_level, 
-                    [ValidationIssue("error", "system", f"Validation system error: {e}")],
+                    name, validation_level,
+                    [ValidationIssue("error", "system", "Validation system error")],
                     "unknown", time.time()
                 )
         
         return results
     
-    async def _validate_security(
+    def _validate_security(
         self, 
         tree: ast.AST, 
         code: str, 
@@ -274,9 +337,9 @@ class HandlerValidator:
         for node in ast.walk(tree):
             if isinstance(node, ast.Import):
                 for alias in node.names:
-                    await self._validate_import(alias.name, issues, level)
+                    self._validate_import(alias.name, issues, level)
             elif isinstance(node, ast.ImportFrom):
-                await self._validate_import(node.module, issues, level)
+                self._validate_import(node.module, issues, level)
         
         # Check for hardcoded secrets
         secret_patterns = ['password', 'token', 'key', 'secret', 'api_key']
@@ -289,7 +352,7 @@ class HandlerValidator:
                     suggestion="Use environment variables or secure credential storage"
                 ))
     
-    async def _validate_import(self, module_name: str, issues: List[ValidationIssue], level: ValidationLevel):
+    def _validate_import(self, module_name: str, issues: List[ValidationIssue], level: ValidationLevel):
         """Validate individual import"""
         if not module_name:
             return
@@ -309,7 +372,7 @@ class HandlerValidator:
                 suggestion="Only use pre-approved modules for security"
             ))
     
-    async def _validate_performance(
+    def _validate_performance(
         self, 
         tree: ast.AST, 
         code: str, 
@@ -347,7 +410,7 @@ class HandlerValidator:
                         suggestion="Consider breaking down complex functions"
                     ))
     
-    async def _validate_correctness(
+    def _validate_correctness(
         self, 
         tree: ast.AST, 
         code: str, 
@@ -398,7 +461,7 @@ class HandlerValidator:
                 suggestion="Add try-catch blocks for robust error handling"
             ))
     
-    async def _validate_style(
+    def _validate_style(
         self, 
         tree: ast.AST, 
         code: str, 
@@ -521,27 +584,127 @@ class HandlerValidator:
             handler_hash=handler_hash
         )
     
-    async def _get_cached_validation(self, handler_hash: str) -> Optional[HandlerValidationReport]:
+    def _cache_key(self, handler_hash: str, validation_level: ValidationLevel) -> str:
+        # El veredicto depende del contenido, del nivel y de la versión de las reglas
+        return f"handler_validation:{self.RULESET_VERSION}:{validation_level.value}:{handler_hash}"
+
+    @classmethod
+    def _remember(cls, cache_key: str, report: HandlerValidationReport) -> None:
+        cls._report_cache[cache_key] = report
+        cls._report_cache.move_to_end(cache_key)
+        while len(cls._report_cache) > settings.HANDLER_VALIDATION_CACHE_SIZE:
+            cls._report_cache.popitem(last=False)
+
+    async def _get_cached_validation(self, cache_key: str) -> Optional[HandlerValidationReport]:
         """Get cached validation result"""
-        if not self.redis:
-            return None
-        
-        cache_key = f"handler_validation:{handler_hash}"
-        cached_data = await self.redis.get(cache_key)
-        
-        if cached_data:
-            data = json.loads(cached_data)
-            return HandlerValidationReport(**data)
-        
-        return None
-    
-    async def _cache_validation_result(self, handler_hash: str, report: HandlerValidationReport):
+        return (await self._get_cached_validations({cache_key})).get(cache_key)
+
+    async def _get_cached_validations(self, cache_keys: Set[str]) -> Dict[str, HandlerValidationReport]:
+        """L1 en proceso y luego un único MGET a Redis para lo que falte"""
+        found = {}
+        for key in cache_keys:
+            report = self._report_cache.get(key)
+            if report is not None:
+                self._report_cache.move_to_end(key)
+                found[key] = report
+
+        missing = [key for key in cache_keys if key not in found]
+        if not self.redis or not missing:
+            return found
+
+        try:
+            values = await self.redis.mget(missing)
+        except Exception as e:
+            logger.warning(f"Validation cache read failed: {e}")
+            return found
+
+        for key, cached_data in zip(missing, values):
+            if cached_data:
+                try:
+                    report = report_from_dict(json.loads(cached_data))
+                except (ValueError, KeyError, TypeError) as e:
+                    logger.debug(f"Discarding unreadable cached validation {key}: {e}")
+                    continue
+                self._remember(key, report)
+                found[key] = report
+        return found
+
+    async def _cache_validation_result(self, cache_key: str, report: HandlerValidationReport):
         """Cache validation result"""
+        await self._cache_validation_results({cache_key: report})
+
+    async def _cache_validation_results(self, reports: Dict[str, HandlerValidationReport]):
+        if not reports:
+            return
+        for key, report in reports.items():
+            self._remember(key, report)
         if not self.redis:
             return
-        
-        cache_key = f"handler_validation:{handler_hash}"
-        cache_data = json.dumps(asdict(report), default=str)
-        
-        # Cache for 24 hours
-        await self.redis.setex(cache_key, 86400, cache_data)
\ No newline at end of file
+
+        try:
+            async with self.redis.pipeline(transaction=False) as pipe:
+                for key, report in reports.items():
+                    pipe.setex(key, settings.HANDLER_VALIDATION_CACHE_TTL, json.dumps(report_to_dict(report)))
+                await pipe.execute()
+        except Exception as e:
+            logger.warning(f"Validation cache write failed: {e}")
+
+
+def normalize_source(code: str) -> str:
+    """Misma forma canónica para el hash y el análisis: EOL LF, sin espacios finales"""
+    lines = code.replace("\r\n", "\n").replace("\r", "\n").split("\n")
+    return "\n".join(line.rstrip() for line in lines).strip("\n") + "\n"
+
+
+def source_hash(normalized_code: str) -> str:
+    return hashlib.sha256(normalized_code.encode("utf-8")).hexdigest()
+
+
+def report_to_dict(report: HandlerValidationReport) -> Dict[str, Any]:
+    data = asdict(report)
+    data["validation_level"] = report.validation_level.value
+    data["overall_result"] = report.overall_result.value
+    return data
+
+
+def report_from_dict(data: Dict[str, Any]) -> HandlerValidationReport:
+    data = dict(data)
+    data["validation_level"] = ValidationLevel(data["validation_level"])
+    data["overall_result"] = ValidationResult(data["overall_result"])
+    data["issues"] = [ValidationIssue(**issue) for issue in data.get("issues") or []]
+    return HandlerValidationReport(**data)
+
+
+def _analyze_handler(handler_code: str, handler_name: str, validation_level: str) -> HandlerValidationReport:
+    """Punto de entrada del process pool (función de módulo: picklable)"""
+    return HandlerValidator().analyze(handler_code, handler_name, ValidationLevel(validation_level))
+
+
+_analysis_pool: Optional[ProcessPoolExecutor] = None
+_analysis_pool_lock = threading.Lock()
+
+
+def _get_analysis_pool() -> Optional[ProcessPoolExecutor]:
+    global _analysis_pool
+    if settings.HANDLER_VALIDATION_WORKERS <= 0:
+        return None
+    with _analysis_pool_lock:
+        if _analysis_pool is None:
+            method = "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+            _analysis_pool = ProcessPoolExecutor(
+                max_workers=settings.HANDLER_VALIDATION_WORKERS,
+                mp_context=multiprocessing.get_context(method),
+            )
+        return _analysis_pool
+
+
+def _reset_analysis_pool() -> None:
+    global _analysis_pool
+    with _analysis_pool_lock:
+        pool, _analysis_pool = _analysis_pool, None
+    if pool is not None:
+        pool.shutdown(wait=False, cancel_futures=True)
+
+
+def shutdown_validation_pool() -> None:
+    _reset_analysis_pool()
@@ -1,6 +1,9 @@
 """
 Emergency Kill Switch System for AI Agent Operations
 Provides immediate shutdown capabilities with multiple trigger mechanisms
+
+El estado (global / bloqueado / suspendido) se replica en memoria y se
+invalida por pub/sub: el chequeo del hot path es una lectura local.
 """
 import asyncio
 import time
@@ -9,10 +12,10 @@ import logging
 from typing import Dict, Any, List, Optional, Callable
 from dataclasses import dataclass, asdict
 from enum import Enum
-import redis
 import signal
 import os
-from concurrent.futures import ThreadPoolExecutor
+
+from app.core.cache import get_shared_redis
 
 logger = logging.getLogger(__name__)
 
@@ -77,14 +80,25 @@ class EmergencyKillSwitch:
     Emergency kill switch system for AI agent operations
     Provides multiple trigger mechanisms and immediate shutdown capabilities
     """
+
+    STATE_CHANNEL = "kill_switch:state"
+    GLOBAL_KEY = "kill_switch:global_shutdown"
+    BLOCKED_PREFIX = "kill_switch:blocked:"
+    SUSPENDED_PREFIX = "kill_switch:suspended:"
     
     def __init__(self, redis_url: str):
-        self.redis = redis.from_url(redis_url)
+        self.redis = get_shared_redis(redis_url)
         self.active_agents: Dict[str, Dict[str, Any]] = {}
         self.shutdown_callbacks: List[Callable] = []
-        self.notification_executor = ThreadPoolExecutor(max_workers=2)
         self._monitoring_task = None
+        self._listener_task = None
         self._is_monitoring = False
+
+        # Réplica local del estado: valor = instante (time.time) en que expira
+        self._global_until = 0.0
+        self._blocked_until: Dict[str, float] = {}
+        self._suspended_until: Dict[str, float] = {}
+        self._pending_notifications = set()
         
     async def start_monitoring(self):
         """Start continuous monitoring for kill switch triggers"""
@@ -92,16 +106,89 @@ class EmergencyKillSwitch:
             return
             
         self._is_monitoring = True
+        await self.refresh_state()
+        self._listener_task = asyncio.create_task(self._listen_state_changes())
         self._monitoring_task = asyncio.create_task(self._monitor_threats())
         logger.info("Kill switch monitoring started")
     
     async def stop_monitoring(self):
         """Stop monitoring"""
         self._is_monitoring = False
-        if self._monitoring_task:
-            self._monitoring_task.cancel()
-        self.notification_executor.shutdown(wait=False)
+        for task in (self._monitoring_task, self._listener_task):
+            if task:
+                task.cancel()
         logger.info("Kill switch monitoring stopped")
+
+    def is_agent_allowed(self, agent_id: str) -> bool:
+        """Hot path: solo lectura de memoria (la réplica se mantiene por pub/sub)"""
+        now = time.time()
+        if self._global_until > now:
+            return False
+        return self._blocked_until.get(agent_id, 0.0) <= now and self._suspended_until.get(agent_id, 0.0) <= now
+
+    async def refresh_state(self):
+        """Carga completa del estado desde Redis (arranque y reconexión del listener)"""
+        now = time.time()
+        global_ttl = await self.redis.ttl(self.GLOBAL_KEY)
+        self._global_until = now + global_ttl if global_ttl and global_ttl > 0 else 0.0
+
+        blocked: Dict[str, float] = {}
+        suspended: Dict[str, float] = {}
+        for prefix, target in ((self.BLOCKED_PREFIX, blocked), (self.SUSPENDED_PREFIX, suspended)):
+            keys = [key async for key in self.redis.scan_iter(match=f"{prefix}*", count=500)]
+            if not keys:
+                continue
+            async with self.redis.pipeline(transaction=False) as pipe:
+                for key in keys:
+                    pipe.ttl(key)
+                ttls = await pipe.execute()
+            for key, ttl in zip(keys, ttls):
+                if ttl and ttl > 0:
+                    target[key[len(prefix):]] = now + ttl
+        self._blocked_until = blocked
+        self._suspended_until = suspended
+
+    def _apply_state_change(self, change: Dict[str, Any]):
+        until = time.time() + float(change.get("ttl", 0))
+        kind = change.get("kind")
+        agent_id = change.get("agent_id")
+        if kind == "global":
+            self._global_until = until
+        elif kind == "blocked" and agent_id:
+            self._blocked_until[agent_id] = until
+        elif kind == "suspended" and agent_id:
+            self._suspended_until[agent_id] = until
+
+    async def _publish_state_change(self, key: str, kind: str, ttl: int, agent_id: Optional[str] = None):
+        """SETEX + PUBLISH en un round-trip; la réplica local se actualiza sin esperar el eco"""
+        change = {"kind": kind, "agent_id": agent_id, "ttl": ttl}
+        self._apply_state_change(change)
+        async with self.redis.pipeline(transaction=True) as pipe:
+            pipe.setex(key, ttl, kind)
+            pipe.publish(self.STATE_CHANNEL, json.dumps(change))
+            await pipe.execute()
+
+    async def _listen_state_changes(self):
+        """Invalida la réplica local con los cambios publicados por cualquier proceso"""
+        while self._is_monitoring:
+            pubsub = self.redis.pubsub()
+            try:
+                await pubsub.subscribe(self.STATE_CHANNEL)
+                # Lo ocurrido mientras no estábamos suscritos
+                await self.refresh_state()
+                async for message in pubsub.listen():
+                    if message.get("type") == "message":
+                        self._apply_state_change(json.loads(message["data"]))
+            except asyncio.CancelledError:
+                break
+            except Exception as e:
+                logger.warning(f"Kill switch state listener error, resubscribing: {e}")
+                await asyncio.sleep(1)
+            finally:
+                try:
+                    await pubsub.close()
+                except Exception:
+                    pass
     
     async def register_agent(self, agent_id: str, metadata: Dict[str, Any] = None):
         """Register an agent for monitoring"""
@@ -294,7 +381,7 @@ class EmergencyKillSwitch:
                 logger.error(f"Shutdown callback failed: {e}")
         
         # Set global kill switch state
-        await self.redis.setex("kill_switch:global_shutdown", 3600, "active")
+        await self._publish_state_change(self.GLOBAL_KEY, "global", 3600)
         event.actions_taken.append("global_shutdown_activated")
     
     async def _execute_agent_shutdown(self, agent_id: str, event: KillSwitchEvent):
@@ -304,7 +391,7 @@ class EmergencyKillSwitch:
         await self._stop_agent_immediately(agent_id)
         
         # Block agent from restarting
-        await self.redis.setex(f"kill_switch:blocked:{agent_id}", 3600, "blocked")
+        await self._publish_state_change(f"{self.BLOCKED_PREFIX}{agent_id}", "blocked", 3600, agent_id)
         
         event.actions_taken.extend([
             f"stopped_agent_{agent_id}",
@@ -319,7 +406,7 @@ class EmergencyKillSwitch:
             self.active_agents[agent_id]["status"] = "suspended"
         
         # Temporary suspension
-        await self.redis.setex(f"kill_switch:suspended:{agent_id}", 1800, "suspended")  # 30 min
+        await self._publish_state_change(f"{self.SUSPENDED_PREFIX}{agent_id}", "suspended", 1800, agent_id)  # 30 min
         
         event.actions_taken.append(f"suspended_agent_{agent_id}")
     
@@ -342,13 +429,13 @@ class EmergencyKillSwitch:
         processes_key = f"agent_processes:{agent_id}"
         process_ids = await self.redis.smembers(processes_key)
         
-        for pid_bytes in process_ids:
+        for raw_pid in process_ids:
             try:
-                pid = int(pid_bytes.decode())
+                pid = int(raw_pid)
                 os.kill(pid, signal.SIGTERM)
                 logger.info(f"Sent SIGTERM to process {pid} for agent {agent_id}")
             except (ValueError, ProcessLookupError) as e:
-                logger.warning(f"Could not terminate process {pid_bytes}: {e}")
+                logger.warning(f"Could not terminate process {raw_pid}: {e}")
         
         # Clear from active agents
         if agent_id in self.active_agents:
@@ -374,27 +461,29 @@ class EmergencyKillSwitch:
         events_key = "kill_switch:events"
         
         event_data = json.dumps(asdict(event), default=str)
-        await self.redis.lpush(events_key, event_data)
-        await self.redis.ltrim(events_key, 0, 999)  # Keep last 1000 events
-        await self.redis.expire(events_key, 2592000)  # 30 days
+        async with self.redis.pipeline(transaction=False) as pipe:
+            pipe.lpush(events_key, event_data)
+            pipe.ltrim(events_key, 0, 999)  # Keep last 1000 events
+            pipe.expire(events_key, 2592000)  # 30 days
+            await pipe.execute()
     
     async def _send_notifications(self, event: KillSwitchEvent):
         """Send notifications about kill switch event"""
         config = await self._get_kill_switch_config(event.agent_id)
         
-        # Send webhook notifications
+        # Send webhook notifications (en segundo plano, sin bloquear el trigger)
         for webhook_url in config.notification_webhooks:
-            self.notification_executor.submit(
-                self._send_webhook_notification, webhook_url, event
-            )
+            task = asyncio.create_task(self._send_webhook_notification(webhook_url, event))
+            self._pending_notifications.add(task)
+            task.add_done_callback(self._pending_notifications.discard)
         
         # Log notification sent
         logger.info(f"Notifications sent for kill switch event {event.event_id}")
     
-    def _send_webhook_notification(self, webhook_url: str, event: KillSwitchEvent):
-        """Send webhook notification (sync function for thread executor)"""
+    async def _send_webhook_notification(self, webhook_url: str, event: KillSwitchEvent):
+        """Send webhook notification"""
         try:
-            import requests
+            from app.core.http_client import http_client
             
             payload = {
                 "event_type": "kill_switch_triggered",
@@ -405,7 +494,7 @@ class EmergencyKillSwitch:
                 "timestamp": event.timestamp
             }
             
-            response = requests.post(webhook_url, json=payload, timeout=10)
+            response = await http_client.post(webhook_url, json=payload, timeout=10)
             response.raise_for_status()
             
         except Exception as e:
@@ -425,11 +514,12 @@ class EmergencyKillSwitch:
     
     async def _get_performance_metrics(self, agent_id: str) -> Dict[str, float]:
         """Get performance metrics for agent"""
+        # Hash mantenido atómicamente por IntelligentRateLimiter.record_operation
         metrics_key = f"performance:{agent_id}"
-        metrics = await self.redis.get(metrics_key)
+        metrics = await self.redis.hgetall(metrics_key)
         
         if metrics:
-            return json.loads(metrics)
+            return {field: float(value) for field, value in metrics.items()}
         
         return {"success_rate": 1.0, "avg_response_time": 0.0}
     
@@ -0,0 +1,196 @@
+"""
+Intelligent Rate Limiter for AI Agent Operations
+Per-agent request, cost and concurrency limits on redis.asyncio
+
+Todos los contadores se actualizan con scripts Lua: comprobar y consumir es
+una sola operación atómica en Redis (sin get-then-set ni carreras entre
+procesos) y un único round-trip por chequeo.
+"""
+import logging
+import time
+import uuid
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional
+
+from app.core.cache import get_shared_redis
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+class RateLimitExceededError(Exception):
+    """Raised when an agent exceeds one of its limits"""
+
+
+@dataclass
+class RateLimits:
+    """Per-agent limits (defaults from settings)"""
+    per_minute: int = settings.DEFAULT_RATE_LIMIT_PER_MINUTE
+    per_hour: int = settings.DEFAULT_RATE_LIMIT_PER_HOUR
+    cost_per_day: float = settings.DEFAULT_COST_LIMIT_PER_DAY
+    concurrent: int = settings.DEFAULT_CONCURRENT_LIMIT
+
+
+# KEYS: minute, hour, day_cost
+# ARGV: per_minute, per_hour, cost_per_day, operation_cost
+# → {allowed(0/1), minute_count, hour_count, day_cost}
+_CHECK_AND_CONSUME = """
+local minute = tonumber(redis.call('GET', KEYS[1]) or '0')
+local hour = tonumber(redis.call('GET', KEYS[2]) or '0')
+local cost = tonumber(redis.call('GET', KEYS[3]) or '0')
+if minute >= tonumber(ARGV[1]) or hour >= tonumber(ARGV[2])
+   or cost + tonumber(ARGV[4]) > tonumber(ARGV[3]) then
+  return {0, minute, hour, tostring(cost)}
+end
+minute = redis.call('INCR', KEYS[1])
+if minute == 1 then redis.call('EXPIRE', KEYS[1], 120) end
+hour = redis.call('INCR', KEYS[2])
+if hour == 1 then redis.call('EXPIRE', KEYS[2], 7200) end
+return {1, minute, hour, tostring(cost)}
+"""
+
+# KEYS: slots zset; ARGV: now, lease_seconds, limit, slot_id → 1 adquirido / 0 lleno
+_ACQUIRE_SLOT = """
+redis.call('ZREMRANGEBYSCORE', KEYS[1], '-inf', tonumber(ARGV[1]) - tonumber(ARGV[2]))
+if redis.call('ZCARD', KEYS[1]) >= tonumber(ARGV[3]) then
+  return 0
+end
+redis.call('ZADD', KEYS[1], ARGV[1], ARGV[4])
+redis.call('EXPIRE', KEYS[1], tonumber(ARGV[2]))
+return 1
+"""
+
+# KEYS: day_cost, hour_cost, performance hash
+# ARGV: cost, success(0/1), response_time, alpha
+_RECORD_OPERATION = """
+redis.call('INCRBYFLOAT', KEYS[1], ARGV[1])
+redis.call('EXPIRE', KEYS[1], 172800)
+redis.call('INCRBYFLOAT', KEYS[2], ARGV[1])
+redis.call('EXPIRE', KEYS[2], 7200)
+local alpha = tonumber(ARGV[4])
+local rate = tonumber(redis.call('HGET', KEYS[3], 'success_rate') or '1')
+local avg = tonumber(redis.call('HGET', KEYS[3], 'avg_response_time') or ARGV[3])
+rate = rate * (1 - alpha) + tonumber(ARGV[2]) * alpha
+avg = avg * (1 - alpha) + tonumber(ARGV[3]) * alpha
+redis.call('HSET', KEYS[3], 'success_rate', tostring(rate), 'avg_response_time', tostring(avg))
+redis.call('HINCRBY', KEYS[3], 'operations', 1)
+redis.call('EXPIRE', KEYS[3], 86400)
+return tostring(rate)
+"""
+
+
+class IntelligentRateLimiter:
+    """
+    Rate limiter por agente: peticiones por minuto/hora, costo diario y
+    slots concurrentes (zset con lease para que un proceso caído no deje
+    slots ocupados para siempre).
+    """
+
+    SLOT_LEASE_SECONDS = 600
+    SUCCESS_RATE_ALPHA = 0.1
+
+    def __init__(self, redis_url: str, limits: Optional[RateLimits] = None):
+        self.redis = get_shared_redis(redis_url)
+        self.default_limits = limits or RateLimits()
+        self._agent_limits: Dict[str, RateLimits] = {}
+        # register_script: EVALSHA con fallback automático a EVAL
+        self._check_and_consume = self.redis.register_script(_CHECK_AND_CONSUME)
+        self._acquire_slot = self.redis.register_script(_ACQUIRE_SLOT)
+        self._record_operation = self.redis.register_script(_RECORD_OPERATION)
+
+    def set_agent_limits(self, agent_id: str, limits: RateLimits):
+        self._agent_limits[agent_id] = limits
+
+    def _limits(self, agent_id: str) -> RateLimits:
+        return self._agent_limits.get(agent_id, self.default_limits)
+
+    @staticmethod
+    def _keys(agent_id: str, now: float) -> Dict[str, str]:
+        return {
+            "minute": f"rate:{agent_id}:m:{int(now // 60)}",
+            "hour": f"rate:{agent_id}:h:{int(now // 3600)}",
+            "day_cost": f"cost:{agent_id}:d:{int(now // 86400)}",
+            # Leída por EmergencyKillSwitch.check_auto_triggers
+            "hour_cost": f"cost:{agent_id}:{int(now // 3600)}",
+            "slots": f"rate:{agent_id}:slots",
+            "performance": f"performance:{agent_id}",
+        }
+
+    async def check_limits(
+        self,
+        agent_id: str,
+        operation_cost: float = 0.0,
+        estimated_tokens: int = 0
+    ) -> Dict[str, Any]:
+        """
+        Comprueba y consume una petición de forma atómica.
+        El costo solo se comprueba aquí; se acumula en record_operation.
+        """
+        if not settings.SECURITY_RATE_LIMIT_ENABLED:
+            return {"allowed": True, "violations": []}
+
+        limits = self._limits(agent_id)
+        keys = self._keys(agent_id, time.time())
+        allowed, minute_count, hour_count, day_cost = await self._check_and_consume(
+            keys=[keys["minute"], keys["hour"], keys["day_cost"]],
+            args=[limits.per_minute, limits.per_hour, limits.cost_per_day, operation_cost],
+        )
+        day_cost = float(day_cost)
+
+        violations: List[str] = []
+        if not allowed:
+            if int(minute_count) >= limits.per_minute:
+                violations.append(f"per_minute limit {limits.per_minute}")
+            if int(hour_count) >= limits.per_hour:
+                violations.append(f"per_hour limit {limits.per_hour}")
+            if day_cost + operation_cost > limits.cost_per_day:
+                violations.append(f"daily cost limit ${limits.cost_per_day:.2f}")
+
+        return {
+            "allowed": bool(allowed),
+            "violations": violations,
+            "usage": {
+                "minute": int(minute_count),
+                "hour": int(hour_count),
+                "day_cost": day_cost,
+                "estimated_tokens": estimated_tokens,
+            },
+        }
+
+    async def acquire_concurrent_slot(self, agent_id: str) -> str:
+        """Reserva un slot concurrente; RateLimitExceededError si no hay"""
+        slot_id = uuid.uuid4().hex
+        if not settings.SECURITY_RATE_LIMIT_ENABLED:
+            return slot_id
+
+        limits = self._limits(agent_id)
+        acquired = await self._acquire_slot(
+            keys=[self._keys(agent_id, time.time())["slots"]],
+            args=[time.time(), self.SLOT_LEASE_SECONDS, limits.concurrent, slot_id],
+        )
+        if not acquired:
+            raise RateLimitExceededError(f"Concurrent limit {limits.concurrent} reached for agent {agent_id}")
+        return slot_id
+
+    async def release_concurrent_slot(self, agent_id: str, slot_id: str):
+        await self.redis.zrem(self._keys(agent_id, time.time())["slots"], slot_id)
+
+    async def record_operation(
+        self,
+        agent_id: str,
+        operation_cost: float = 0.0,
+        tokens_used: int = 0,
+        success: bool = True,
+        response_time: float = 0.0,
+        operation_type: str = "unknown"
+    ):
+        """Acumula costo (día y hora) y actualiza success_rate/latencia (EWMA) atómicamente"""
+        keys = self._keys(agent_id, time.time())
+        try:
+            await self._record_operation(
+                keys=[keys["day_cost"], keys["hour_cost"], keys["performance"]],
+                args=[operation_cost, 1 if success else 0, response_time, self.SUCCESS_RATE_ALPHA],
+            )
+        except Exception as e:
+            # Registrar métricas nunca debe tumbar la ejecución
+            logger.warning(f"Could not record operation {operation_type} for {agent_id}: {e}")
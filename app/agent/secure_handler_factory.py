@@ -5,6 +5,8 @@ Central system that coordinates all security components for safe handler executi
 import asyncio
 import time
 import uuid
+from collections import OrderedDict
+from types import CodeType
 from typing import Dict, Any, Optional, List, Callable
 from dataclasses import dataclass
 from enum import Enum
@@ -13,7 +15,7 @@ import logging
 from .security_sandbox import SecuritySandbox, SecurityLimits, execute_in_sandbox
 from .rate_limiter import IntelligentRateLimiter, RateLimitExceededError
 from .kill_switch import EmergencyKillSwitch, ThreatLevel, KillSwitchTrigger
-from .handler_validator import HandlerValidator, ValidationLevel, ValidationResult
+from .handler_validator import HandlerValidator, ValidationLevel, ValidationResult, normalize_source
 from .security_monitor import SecurityMonitor, AgentMetrics, AlertSeverity, MetricType
 
 logger = logging.getLogger(__name__)
@@ -63,6 +65,11 @@ class SecureHandlerFactory:
     Central orchestrator for secure handler execution
     Integrates sandbox, rate limiter, kill switch, validator, and monitor
     """
+
+    # Bytecode por hash de contenido (el mismo que usa el validador): un handler
+    # conocido no se vuelve a parsear ni compilar
+    _compiled_handlers: "OrderedDict[str, CodeType]" = OrderedDict()
+    _MAX_COMPILED_HANDLERS = 512
     
     def __init__(self, redis_url: str):
         # Initialize all security components
@@ -134,6 +141,12 @@ class SecureHandlerFactory:
         )
         
         try:
+            # Kill switch: lectura local de la réplica (pub/sub), sin round-trip
+            if not self.kill_switch.is_agent_allowed(request.agent_id):
+                execution_result.status = ExecutionStatus.BLOCKED
+                execution_result.error = f"Agent {request.agent_id} is blocked by the kill switch"
+                return execution_result
+
             # Register with kill switch
             await self.kill_switch.register_agent(
                 request.agent_id, 
@@ -202,7 +215,8 @@ class SecureHandlerFactory:
                 # Create handler function from code
                 handler_func = await self._create_handler_function(
                     request.handler_code, 
-                    request.handler_name
+                    request.handler_name,
+                    validation_report.handler_hash
                 )
                 
                 # Execute in sandbox
@@ -357,7 +371,9 @@ class SecureHandlerFactory:
         
         return cancelled
     
-    async def _create_handler_function(self, handler_code: str, handler_name: str) -> Callable:
+    async def _create_handler_function(
+        self, handler_code: str, handler_name: str, handler_hash: Optional[str] = None
+    ) -> Callable:
         """Create executable function from handler code"""
         # This is a simplified implementation
         # In production, you'd want more sophisticated code compilation and sandboxing
@@ -376,7 +392,7 @@ class SecureHandlerFactory:
         }
         
         # Execute the handler code to define the function
-        exec(handler_code, safe_globals)
+        exec(self._compile_handler(handler_code, handler_name, handler_hash), safe_globals)
         
         # Find the handler function (assuming it's a class with execute method)
         handler_class = None
@@ -392,6 +408,21 @@ class SecureHandlerFactory:
         handler_instance = handler_class({})  # Empty creds for now
         return handler_instance.execute
     
+    @classmethod
+    def _compile_handler(cls, handler_code: str, handler_name: str, handler_hash: Optional[str]) -> CodeType:
+        """Reutiliza el bytecode si el validador ya vio este contenido"""
+        code_obj = cls._compiled_handlers.get(handler_hash) if handler_hash else None
+        if code_obj is not None:
+            cls._compiled_handlers.move_to_end(handler_hash)
+            return code_obj
+
+        code_obj = compile(normalize_source(handler_code), f"<handler:{handler_name}>", "exec")
+        if handler_hash:
+            cls._compiled_handlers[handler_hash] = code_obj
+            while len(cls._compiled_handlers) > cls._MAX_COMPILED_HANDLERS:
+                cls._compiled_handlers.popitem(last=False)
+        return code_obj
+    
     async def _cancel_execution(self, request_id: str, reason: str) -> bool:
         """Cancel an active execution"""
         if request_id not in self.active_executions:
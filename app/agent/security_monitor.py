@@ -0,0 +1,157 @@
+"""
+Security Monitor for AI Agent Operations
+Agent metrics and security alerts on the shared redis.asyncio pool
+
+- Métricas por agente: un JSON por agente con TTL (una escritura por ejecución)
+- Alertas: lista acotada + pub/sub para que otros procesos reaccionen sin polling
+- Cada operación es un único round-trip (pipelines)
+"""
+import json
+import logging
+import time
+import uuid
+from dataclasses import asdict, dataclass, field
+from enum import Enum
+from typing import Any, Dict, List, Optional
+
+from app.core.cache import get_shared_redis
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+class AlertSeverity(Enum):
+    """Alert severity levels"""
+    INFO = "info"
+    WARNING = "warning"
+    CRITICAL = "critical"
+
+
+class MetricType(Enum):
+    """Monitored metric types"""
+    EXECUTIONS = "executions"
+    ERROR_RATE = "error_rate"
+    RESPONSE_TIME = "response_time"
+    MEMORY_USAGE = "memory_usage"
+    COST = "cost"
+    SECURITY_VIOLATIONS = "security_violations"
+
+
+@dataclass
+class AgentMetrics:
+    """Rolling metrics for one agent"""
+    agent_id: str
+    timestamp: float
+    executions_per_minute: int = 0
+    error_rate: float = 0.0
+    avg_response_time: float = 0.0
+    memory_usage_mb: float = 0.0
+    cost_per_hour: float = 0.0
+    security_violations: int = 0
+    last_activity: float = 0.0
+
+
+@dataclass
+class SecurityAlert:
+    """Security alert record"""
+    alert_id: str
+    agent_id: str
+    severity: AlertSeverity
+    metric_type: MetricType
+    message: str
+    value: float
+    threshold: float
+    timestamp: float = field(default_factory=time.time)
+
+
+class SecurityMonitor:
+    """
+    Monitor de métricas y alertas por agente.
+    No tiene bucles propios: las lecturas y escrituras ocurren en el camino de
+    cada ejecución y las alertas se difunden por pub/sub.
+    """
+
+    METRICS_PREFIX = "security_monitor:metrics:"
+    ALERTS_KEY = "security_monitor:alerts"
+    ALERTS_CHANNEL = "security_monitor:alerts:channel"
+    METRICS_TTL_SECONDS = 86400
+    MAX_ALERTS = 1000
+
+    def __init__(self, redis_url: str):
+        self.redis = get_shared_redis(redis_url)
+        self.enabled = settings.SECURITY_MONITOR_ENABLED
+        self._is_monitoring = False
+
+    async def start_monitoring(self):
+        self._is_monitoring = self.enabled
+        logger.info(f"Security monitor {'started' if self._is_monitoring else 'disabled'}")
+
+    async def stop_monitoring(self):
+        self._is_monitoring = False
+        logger.info("Security monitor stopped")
+
+    async def get_agent_metrics(self, agent_id: str) -> Optional[AgentMetrics]:
+        data = await self.redis.get(f"{self.METRICS_PREFIX}{agent_id}")
+        if not data:
+            return None
+        try:
+            return AgentMetrics(**json.loads(data))
+        except (TypeError, ValueError) as e:
+            logger.debug(f"Discarding unreadable metrics for {agent_id}: {e}")
+            return None
+
+    async def record_agent_metrics(self, agent_id: str, metrics: AgentMetrics):
+        if not self.enabled:
+            return
+        metrics.timestamp = time.time()
+        await self.redis.set(
+            f"{self.METRICS_PREFIX}{agent_id}",
+            json.dumps(asdict(metrics)),
+            ex=self.METRICS_TTL_SECONDS,
+        )
+
+    async def create_alert(
+        self,
+        agent_id: str,
+        severity: AlertSeverity,
+        metric_type: MetricType,
+        message: str,
+        value: float,
+        threshold: float
+    ) -> SecurityAlert:
+        alert = SecurityAlert(
+            alert_id=f"alert_{uuid.uuid4().hex[:12]}",
+            agent_id=agent_id,
+            severity=severity,
+            metric_type=metric_type,
+            message=message,
+            value=value,
+            threshold=threshold,
+        )
+        payload = json.dumps({**asdict(alert), "severity": severity.value, "metric_type": metric_type.value})
+
+        if self.enabled:
+            async with self.redis.pipeline(transaction=False) as pipe:
+                pipe.lpush(self.ALERTS_KEY, payload)
+                pipe.ltrim(self.ALERTS_KEY, 0, self.MAX_ALERTS - 1)
+                pipe.publish(self.ALERTS_CHANNEL, payload)
+                await pipe.execute()
+
+        log = logger.critical if severity == AlertSeverity.CRITICAL else logger.warning
+        log(f"Security alert [{severity.value}] {agent_id}: {message}")
+        return alert
+
+    async def get_recent_alerts(self, limit: int = 20) -> List[Dict[str, Any]]:
+        return [json.loads(item) for item in await self.redis.lrange(self.ALERTS_KEY, 0, limit - 1)]
+
+    async def get_dashboard_data(self) -> Dict[str, Any]:
+        alerts = await self.get_recent_alerts(100)
+        by_severity: Dict[str, int] = {}
+        for alert in alerts:
+            by_severity[alert.get("severity", "unknown")] = by_severity.get(alert.get("severity", "unknown"), 0) + 1
+        return {
+            "monitoring_enabled": self._is_monitoring,
+            "recent_alerts": alerts[:10],
+            "alerts_by_severity": by_severity,
+            "last_24h_alerts": len([a for a in alerts if time.time() - a.get("timestamp", 0) < 86400]),
+        }
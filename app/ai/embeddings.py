@@ -2,16 +2,26 @@
 """
 Embedding service for agent memory system
 Provides unified interface for text embeddings with multiple provider support
+
+Two-level cache keyed by (model, sha256(text)):
+- L1: per-process LRU of compact float32 arrays
+- L2: shared Redis store (raw float32 bytes), so a text is embedded once per cluster
+Concurrent requests for the same text share one in-flight future, and
+single-text calls are micro-batched into one provider request.
 """
 import asyncio
+import hashlib
 import logging
-from typing import List, Optional, Dict, Any
+import time
+from array import array
+from collections import OrderedDict
 from enum import Enum
-import hashlib
-import json
+from typing import Any, Dict, List, Optional, Sequence, Tuple
 
 from openai import AsyncOpenAI
+from app.ai.llm_clients.client_pool import build_http_client, llm_client_pool
 from app.core.config import settings
+from app.core.telemetry import stage_timer
 
 logger = logging.getLogger(__name__)
 
@@ -20,67 +30,172 @@ class EmbeddingProvider(Enum):
     OPENAI = "openai"
     # Future: ANTHROPIC = "anthropic", HUGGINGFACE = "huggingface"
 
+
+def embedding_cache_key(text: str, model: str) -> str:
+    """Stable cache key shared by L1 and L2: model + sha256 of the text"""
+    return f"{model}:{hashlib.sha256(text.encode('utf-8')).hexdigest()}"
+
+
 class EmbeddingCache:
-    """Simple in-memory cache for embeddings"""
-    
+    """In-process LRU cache of float32 embeddings (array('f') = 4 bytes/dim)"""
+
     def __init__(self, max_size: int = 1000):
-        self.cache: Dict[str, List[float]] = {}
-        self.max_size = max_size
-    
+        self.cache: "OrderedDict[str, array]" = OrderedDict()
+        self.max_size = max(1, max_size)
+
     def _get_key(self, text: str, model: str) -> str:
         """Generate cache key from text and model"""
-        content = f"{model}:{text}"
-        return hashlib.md5(content.encode()).hexdigest()
-    
+        return embedding_cache_key(text, model)
+
     def get(self, text: str, model: str) -> Optional[List[float]]:
         """Get embedding from cache"""
-        key = self._get_key(text, model)
-        return self.cache.get(key)
-    
-    def set(self, text: str, model: str, embedding: List[float]) -> None:
+        vector = self.get_by_key(self._get_key(text, model))
+        return vector.tolist() if vector is not None else None
+
+    def set(self, text: str, model: str, embedding: Sequence[float]) -> None:
         """Store embedding in cache with size management"""
-        if len(self.cache) >= self.max_size:
-            # Remove oldest entry (simple FIFO)
-            oldest_key = next(iter(self.cache))
-            del self.cache[oldest_key]
-        
-        key = self._get_key(text, model)
-        self.cache[key] = embedding
-    
+        self.set_by_key(self._get_key(text, model), array("f", embedding))
+
+    def get_by_key(self, key: str) -> Optional[array]:
+        vector = self.cache.get(key)
+        if vector is not None:
+            self.cache.move_to_end(key)
+        return vector
+
+    def set_by_key(self, key: str, vector: array) -> None:
+        self.cache[key] = vector
+        self.cache.move_to_end(key)
+        while len(self.cache) > self.max_size:
+            # Remove least recently used entry
+            self.cache.popitem(last=False)
+
     def clear(self) -> None:
         """Clear all cached embeddings"""
         self.cache.clear()
-    
+
     def size(self) -> int:
         """Get current cache size"""
         return len(self.cache)
 
+
+class RedisEmbeddingStore:
+    """
+    Shared L2 cache: key emb:{model}:{sha256} → raw float32 bytes.
+    Any Redis error disables the store for a short cooldown instead of
+    failing the embedding request.
+    """
+
+    KEY_PREFIX = "emb:"
+    RETRY_AFTER_SECONDS = 60.0
+
+    def __init__(self, redis_url: str, ttl_seconds: int):
+        self.redis_url = redis_url
+        self.ttl_seconds = ttl_seconds
+        self._redis = None
+        self._disabled_until = 0.0
+
+    def _client(self):
+        if time.monotonic() < self._disabled_until:
+            return None
+        if self._redis is None:
+            try:
+                import redis.asyncio as redis
+                self._redis = redis.from_url(self.redis_url, health_check_interval=30)
+            except Exception as e:
+                self._disable(e)
+                return None
+        return self._redis
+
+    def _disable(self, error: Exception) -> None:
+        logger.warning(f"Embedding L2 cache unavailable, retrying in {self.RETRY_AFTER_SECONDS:.0f}s: {error}")
+        self._disabled_until = time.monotonic() + self.RETRY_AFTER_SECONDS
+
+    async def get_many(self, keys: List[str]) -> Dict[str, array]:
+        client = self._client()
+        if client is None or not keys:
+            return {}
+        try:
+            values = await client.mget([self.KEY_PREFIX + key for key in keys])
+        except Exception as e:
+            self._disable(e)
+            return {}
+        found = {}
+        for key, raw in zip(keys, values):
+            if raw:
+                vector = array("f")
+                vector.frombytes(raw)
+                found[key] = vector
+        return found
+
+    async def set_many(self, items: Dict[str, array]) -> None:
+        client = self._client()
+        if client is None or not items:
+            return
+        try:
+            async with client.pipeline(transaction=False) as pipe:
+                for key, vector in items.items():
+                    pipe.set(self.KEY_PREFIX + key, vector.tobytes(), ex=self.ttl_seconds)
+                await pipe.execute()
+        except Exception as e:
+            self._disable(e)
+
+
 class EmbeddingService:
     """
     Unified embedding service for agent memory system
     """
-    
+
     def __init__(
         self,
         provider: EmbeddingProvider = EmbeddingProvider.OPENAI,
         api_key: Optional[str] = None,
         model: Optional[str] = None,
         cache_enabled: bool = True,
-        cache_size: int = 1000
+        cache_size: int = 1000,
+        shared_store: Optional[RedisEmbeddingStore] = None,
+        batch_window_ms: float = 5.0,
+        max_batch_size: int = 256,
     ):
         self.provider = provider
         self.cache_enabled = cache_enabled
         self.cache = EmbeddingCache(cache_size) if cache_enabled else None
-        
+        self.shared_store = shared_store if cache_enabled else None
+        self.batch_window = max(0.0, batch_window_ms) / 1000.0
+        self.max_batch_size = max(1, max_batch_size)
+
         # Provider-specific initialization
         if provider == EmbeddingProvider.OPENAI:
             self.api_key = api_key or settings.LLM_API_KEY
             self.model = model or "text-embedding-3-small"
-            self.client = AsyncOpenAI(api_key=self.api_key)
+            # SDK compartido con los clientes LLM: reutiliza el pool HTTP
+            self.client = llm_client_pool.get_or_create(
+                "openai-embeddings",
+                self.api_key,
+                None,
+                lambda: AsyncOpenAI(api_key=self.api_key, http_client=build_http_client()),
+            )
             self.dimensions = 1536  # text-embedding-3-small dimensions
         else:
             raise ValueError(f"Unsupported embedding provider: {provider}")
-    
+
+        # In-flight coalescing + micro-batching (bound to the running loop)
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._inflight: Dict[str, asyncio.Future] = {}
+        self._pending: List[Tuple[str, str]] = []
+        self._flush_task: Optional[asyncio.Task] = None
+        self._background: set = set()
+
+        self._stats: Dict[str, float] = {
+            "l1_hits": 0,
+            "l2_hits": 0,
+            "misses": 0,
+            "coalesced": 0,
+            "provider_requests": 0,
+            "provider_texts": 0,
+            "provider_errors": 0,
+            "provider_latency_ms_total": 0.0,
+        }
+
     async def get_embedding(self, text: str) -> List[float]:
         """
         Get embedding for a single text
@@ -89,29 +204,8 @@ class EmbeddingService:
         if not text or not text.strip():
             logger.warning("Empty text provided for embedding")
             return [0.0] * self.dimensions
-        
-        # Check cache first
-        if self.cache_enabled and self.cache:
-            cached = self.cache.get(text, self.model)
-            if cached is not None:
-                logger.debug(f"Cache hit for embedding: {text[:50]}...")
-                return cached
-        
-        try:
-            embedding = await self._get_embedding_from_provider(text)
-            
-            # Store in cache
-            if self.cache_enabled and self.cache:
-                self.cache.set(text, self.model, embedding)
-            
-            logger.debug(f"Generated embedding for text: {text[:50]}... (dim: {len(embedding)})")
-            return embedding
-            
-        except Exception as e:
-            logger.error(f"Error generating embedding: {e}")
-            # Return zero vector as fallback
-            return [0.0] * self.dimensions
-    
+        return (await self._resolve([text]))[0]
+
     async def get_embeddings(self, texts: List[str]) -> List[List[float]]:
         """
         Get embeddings for multiple texts
@@ -119,56 +213,142 @@ class EmbeddingService:
         """
         if not texts:
             return []
-        
-        # Check cache for all texts
-        cached_results = {}
-        uncached_texts = []
-        
-        if self.cache_enabled and self.cache:
-            for i, text in enumerate(texts):
-                cached = self.cache.get(text, self.model)
-                if cached is not None:
-                    cached_results[i] = cached
-                else:
-                    uncached_texts.append((i, text))
-        else:
-            uncached_texts = list(enumerate(texts))
-        
-        # Get embeddings for uncached texts
-        if uncached_texts:
-            try:
-                batch_texts = [text for _, text in uncached_texts]
-                batch_embeddings = await self._get_embeddings_from_provider(batch_texts)
-                
-                # Store in cache and results
-                for (original_index, text), embedding in zip(uncached_texts, batch_embeddings):
-                    cached_results[original_index] = embedding
-                    if self.cache_enabled and self.cache:
-                        self.cache.set(text, self.model, embedding)
-                        
-            except Exception as e:
-                logger.error(f"Error generating batch embeddings: {e}")
-                # Fill missing embeddings with zero vectors
-                for original_index, _ in uncached_texts:
-                    cached_results[original_index] = [0.0] * self.dimensions
-        
-        # Return results in original order
-        return [cached_results[i] for i in range(len(texts))]
-    
+        return await self._resolve(texts)
+
+    async def _resolve(self, texts: Sequence[str]) -> List[List[float]]:
+        """L1 → L2 → in-flight/micro-batch, preserving input order"""
+        keys = [embedding_cache_key(text, self.model) for text in texts]
+        vectors: Dict[str, array] = {}
+
+        missing: Dict[str, str] = {}
+        for key, text in zip(keys, texts):
+            if key in vectors or key in missing or not text or not text.strip():
+                # Empty texts → zero vector without a provider round-trip
+                continue
+            cached = self.cache.get_by_key(key) if self.cache else None
+            if cached is not None:
+                self._stats["l1_hits"] += 1
+                vectors[key] = cached
+            else:
+                missing[key] = text
+
+        if missing and self.shared_store:
+            found = await self.shared_store.get_many(list(missing))
+            self._stats["l2_hits"] += len(found)
+            for key, vector in found.items():
+                vectors[key] = vector
+                del missing[key]
+                if self.cache:
+                    self.cache.set_by_key(key, vector)
+
+        if missing:
+            futures = {key: self._enqueue(key, text) for key, text in missing.items()}
+            # In-flight futures are shared: cancelling this caller must not cancel them
+            results = await asyncio.gather(*(asyncio.shield(future) for future in futures.values()))
+            vectors.update(zip(futures.keys(), results))
+
+        zero = [0.0] * self.dimensions
+        return [vectors[key].tolist() if vectors.get(key) is not None else list(zero) for key in keys]
+
+    def _bind_loop(self) -> None:
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            # Futures are loop-bound: a new loop (worker asyncio.run) starts clean
+            self._loop = loop
+            self._inflight = {}
+            self._pending = []
+            self._flush_task = None
+            self._background = set()
+
+    def _spawn(self, coro) -> asyncio.Task:
+        task = self._loop.create_task(coro)
+        # Keep a reference so the task is not garbage-collected mid-flight
+        self._background.add(task)
+        task.add_done_callback(self._background.discard)
+        return task
+
+    def _enqueue(self, key: str, text: str) -> asyncio.Future:
+        self._bind_loop()
+        future = self._inflight.get(key)
+        if future is not None:
+            self._stats["coalesced"] += 1
+            return future
+
+        self._stats["misses"] += 1
+        future = self._loop.create_future()
+        self._inflight[key] = future
+        self._pending.append((key, text))
+        if len(self._pending) >= self.max_batch_size:
+            self._spawn(self._flush())
+        elif self._flush_task is None:
+            self._flush_task = self._spawn(self._flush_after_window())
+        return future
+
+    async def _flush_after_window(self) -> None:
+        try:
+            await asyncio.sleep(self.batch_window)
+        finally:
+            self._flush_task = None
+        while self._pending:
+            await self._flush()
+
+    async def _flush(self) -> None:
+        batch = self._pending[:self.max_batch_size]
+        self._pending = self._pending[self.max_batch_size:]
+        if not batch:
+            return
+
+        embeddings: Optional[List[List[float]]] = None
+        start = time.perf_counter()
+        try:
+            with stage_timer("embeddings.provider", model=self.model, batch_size=len(batch)):
+                embeddings = await self._get_embeddings_from_provider([text for _, text in batch])
+            logger.debug(f"Generated {len(batch)} embeddings in one provider request")
+        except Exception as e:
+            self._stats["provider_errors"] += 1
+            logger.error(f"Error generating batch embeddings: {e}")
+        finally:
+            self._stats["provider_requests"] += 1
+            self._stats["provider_texts"] += len(batch)
+            self._stats["provider_latency_ms_total"] += (time.perf_counter() - start) * 1000
+            # Also on cancellation: the batch already left the queue, its waiters must not hang
+            fresh = self._settle_batch(batch, embeddings)
+
+        if fresh and self.shared_store:
+            await self.shared_store.set_many(fresh)
+
+    def _settle_batch(
+        self, batch: List[Tuple[str, str]], embeddings: Optional[List[List[float]]]
+    ) -> Dict[str, array]:
+        """Resolve the batch futures; texts without an embedding get None"""
+        fresh: Dict[str, array] = {}
+        for index, (key, _) in enumerate(batch):
+            vector = None
+            if embeddings is not None and index < len(embeddings):
+                vector = array("f", embeddings[index])
+                fresh[key] = vector
+                if self.cache:
+                    self.cache.set_by_key(key, vector)
+            # None → zero vector for the caller, never cached
+            future = self._inflight.pop(key, None)
+            if future is not None and not future.done():
+                future.set_result(vector)
+        return fresh
+
     async def _get_embedding_from_provider(self, text: str) -> List[float]:
         """Get embedding from the configured provider"""
         if self.provider == EmbeddingProvider.OPENAI:
             return await self._get_openai_embedding(text)
         else:
             raise ValueError(f"Provider {self.provider} not implemented")
-    
+
     async def _get_embeddings_from_provider(self, texts: List[str]) -> List[List[float]]:
         """Get batch embeddings from the configured provider"""
         if self.provider == EmbeddingProvider.OPENAI:
             return await self._get_openai_embeddings(texts)
         else:
             raise ValueError(f"Provider {self.provider} not implemented")
-    
+
     async def _get_openai_embedding(self, text: str) -> List[float]:
         """Get embedding from OpenAI"""
         response = await self.client.embeddings.create(
@@ -177,7 +357,7 @@ class EmbeddingService:
             encoding_format="float"
         )
         return response.data[0].embedding
-    
+
     async def _get_openai_embeddings(self, texts: List[str]) -> List[List[float]]:
         """Get batch embeddings from OpenAI"""
         response = await self.client.embeddings.create(
@@ -186,21 +366,29 @@ class EmbeddingService:
             encoding_format="float"
         )
         return [data.embedding for data in response.data]
-    
+
     def get_cache_stats(self) -> Dict[str, Any]:
-        """Get cache statistics"""
+        """Get cache statistics (hit/miss/latency counters since process start)"""
         if not self.cache_enabled or not self.cache:
-            return {"cache_enabled": False}
-        
+            return {"cache_enabled": False, **self._stats}
+
+        stats = self._stats
+        lookups = stats["l1_hits"] + stats["l2_hits"] + stats["misses"] + stats["coalesced"]
+        hits = stats["l1_hits"] + stats["l2_hits"] + stats["coalesced"]
+        requests = stats["provider_requests"]
         return {
             "cache_enabled": True,
+            "shared_cache_enabled": self.shared_store is not None,
             "cache_size": self.cache.size(),
             "max_cache_size": self.cache.max_size,
-            "cache_hit_ratio": "Not tracked"  # Could be enhanced
+            "cache_hit_ratio": round(hits / lookups, 4) if lookups else 0.0,
+            **stats,
+            "avg_provider_batch_size": round(stats["provider_texts"] / requests, 2) if requests else 0.0,
+            "avg_provider_latency_ms": round(stats["provider_latency_ms_total"] / requests, 2) if requests else 0.0,
         }
-    
+
     def clear_cache(self) -> None:
-        """Clear embedding cache"""
+        """Clear embedding cache (local L1 only; L2 entries expire by TTL)"""
         if self.cache:
             self.cache.clear()
             logger.info("Embedding cache cleared")
@@ -208,26 +396,41 @@ class EmbeddingService:
 # Global embedding service instance
 _embedding_service: Optional[EmbeddingService] = None
 
+def _shared_store() -> Optional[RedisEmbeddingStore]:
+    if not settings.EMBEDDING_REDIS_CACHE_ENABLED:
+        return None
+    return RedisEmbeddingStore(settings.REDIS_URL, settings.EMBEDDING_CACHE_TTL_SECONDS)
+
+def _service_options() -> Dict[str, Any]:
+    return {
+        "cache_enabled": settings.EMBEDDING_CACHE_ENABLED,
+        "cache_size": settings.EMBEDDING_CACHE_SIZE,
+        "shared_store": _shared_store(),
+        "batch_window_ms": settings.EMBEDDING_BATCH_WINDOW_MS,
+        "max_batch_size": settings.EMBEDDING_MAX_BATCH_SIZE,
+    }
+
+def create_embedding_service(
+    provider: EmbeddingProvider = EmbeddingProvider.OPENAI,
+    api_key: Optional[str] = None,
+    model: Optional[str] = None
+) -> EmbeddingService:
+    """New EmbeddingService wired to the configured L1/L2 cache and batching"""
+    return EmbeddingService(provider=provider, api_key=api_key, model=model, **_service_options())
+
 def get_embedding_service() -> EmbeddingService:
     """
     Get global embedding service instance
     Lazy initialization with configuration from settings
     """
     global _embedding_service
-    
+
     if _embedding_service is None:
         provider = EmbeddingProvider.OPENAI  # Default to OpenAI
-        cache_enabled = getattr(settings, 'EMBEDDING_CACHE_ENABLED', True)
-        cache_size = getattr(settings, 'EMBEDDING_CACHE_SIZE', 1000)
-        
-        _embedding_service = EmbeddingService(
-            provider=provider,
-            cache_enabled=cache_enabled,
-            cache_size=cache_size
-        )
-        
+        _embedding_service = create_embedding_service(provider)
+
         logger.info(f"Initialized embedding service: {provider.value}")
-    
+
     return _embedding_service
 
 async def get_embedding(text: str) -> List[float]:
@@ -255,13 +458,9 @@ def set_embedding_provider(
     Recreates the global service instance
     """
     global _embedding_service
-    
-    _embedding_service = EmbeddingService(
-        provider=provider,
-        api_key=api_key,
-        model=model
-    )
-    
+
+    _embedding_service = create_embedding_service(provider, api_key, model)
+
     logger.info(f"Embedding provider set to: {provider.value}")
 
 def clear_embedding_cache() -> None:
@@ -272,4 +471,4 @@ def clear_embedding_cache() -> None:
 def get_embedding_cache_stats() -> Dict[str, Any]:
     """Get embedding cache statistics"""
     service = get_embedding_service()
-    return service.get_cache_stats()
\ No newline at end of file
+    return service.get_cache_stats()
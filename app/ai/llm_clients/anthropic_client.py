@@ -8,6 +8,7 @@ from typing import Any, Dict, List
 
 from app.ai.llm_factory import LLMClientFactory
 from .protocol import LLMClientProtocol
+from .client_pool import llm_client_pool, build_http_client
 from app.exceptions.api_exceptions import WorkflowProcessingException
 from .provider_registry import LLMProvider, ModelOption, provider_registry
 from typing import List
@@ -36,7 +37,12 @@ class AnthropicClient(LLMClientProtocol):
         
         try:
             import anthropic
-            self._client = anthropic.AsyncAnthropic(api_key=api_key)
+            self._client = llm_client_pool.get_or_create(
+                "anthropic",
+                api_key,
+                None,
+                lambda: anthropic.AsyncAnthropic(api_key=api_key, http_client=build_http_client()),
+            )
         except ImportError:
             self.logger.error("anthropic package not installed")
             raise WorkflowProcessingException("Anthropic client requires 'anthropic' package")
@@ -0,0 +1,168 @@
+# app/ai/llm_clients/client_pool.py
+"""
+Registro process-wide de clientes SDK de LLM (AsyncOpenAI, AsyncAnthropic...)
+
+Cada LLMService/cliente wrapper es barato, pero el SDK que envuelve mantiene
+su propio pool HTTP: crear uno por ejecución de agente implica TCP + TLS
+nuevos en cada run. Aquí se comparten por (provider, base_url, hash(api_key))
+con expulsión LRU de los clientes inactivos.
+"""
+
+import asyncio
+import hashlib
+import logging
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+PoolKey = Tuple[str, str, str]
+
+
+def api_key_fingerprint(api_key: str) -> str:
+    """Hash corto de la API key: nunca se guarda la key en claro como clave del pool."""
+    return hashlib.sha256((api_key or "").encode("utf-8")).hexdigest()[:16]
+
+
+def build_http_client() -> Optional[Any]:
+    """
+    httpx.AsyncClient con keep-alive amplio y HTTP/2 si `h2` está instalado.
+    Devuelve None si httpx no está disponible (el SDK usa su cliente por defecto).
+    """
+    try:
+        import httpx
+    except ImportError:
+        return None
+
+    try:
+        import h2  # noqa: F401
+        http2 = True
+    except ImportError:
+        http2 = False
+
+    return httpx.AsyncClient(
+        http2=http2,
+        # Lectura larga como el default de los SDK (600s): completions del planner/agentes tardan
+        timeout=httpx.Timeout(settings.LLM_READ_TIMEOUT, connect=10.0),
+        limits=httpx.Limits(
+            max_connections=settings.LLM_CLIENT_MAX_CONNECTIONS,
+            max_keepalive_connections=settings.LLM_CLIENT_MAX_CONNECTIONS,
+            keepalive_expiry=settings.LLM_CLIENT_POOL_IDLE_SECONDS,
+        ),
+    )
+
+
+class LLMClientPool:
+    """
+    LRU de clientes SDK compartidos.
+
+    - get_or_create(): devuelve el cliente existente o lo construye con `factory`
+    - Expulsa por tamaño (LRU) y por inactividad (idle_seconds)
+    - Los expulsados se cierran tras un margen para no cortar peticiones en vuelo
+    """
+
+    def __init__(self, max_size: int, idle_seconds: float):
+        self.max_size = max(1, max_size)
+        self.idle_seconds = idle_seconds
+        self._entries: "OrderedDict[PoolKey, Tuple[Any, float]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._closing: set = set()  # Tareas de cierre diferido (referencia fuerte hasta terminar)
+        self.hits = 0
+        self.misses = 0
+
+    def get_or_create(
+        self,
+        provider: str,
+        api_key: str,
+        base_url: Optional[str],
+        factory: Callable[[], Any],
+    ) -> Any:
+        key: PoolKey = (provider, base_url or "", api_key_fingerprint(api_key))
+        now = time.monotonic()
+        evicted = []
+
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries[key] = (entry[0], now)
+                self._entries.move_to_end(key)
+                self.hits += 1
+                client = entry[0]
+            else:
+                self.misses += 1
+                client = factory()
+                self._entries[key] = (client, now)
+
+            # Inactivos primero, luego LRU por tamaño
+            for stale_key, (stale_client, last_used) in list(self._entries.items()):
+                if stale_key != key and now - last_used > self.idle_seconds:
+                    evicted.append(stale_client)
+                    del self._entries[stale_key]
+            while len(self._entries) > self.max_size:
+                _, (old_client, _) = self._entries.popitem(last=False)
+                evicted.append(old_client)
+
+        if entry is None:
+            logger.info(f"🔌 LLM client pool: nuevo cliente {provider} ({len(self._entries)}/{self.max_size})")
+        for old_client in evicted:
+            self._schedule_close(old_client)
+        return client
+
+    def _schedule_close(self, client: Any) -> None:
+        close = getattr(client, "close", None)
+        if close is None:
+            return
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            return  # Sin loop: se libera con el GC
+
+        async def _close_later():
+            # Margen = timeout de lectura (600s): una completion en vuelo con este cliente puede durar eso
+            await asyncio.sleep(max(settings.LLM_READ_TIMEOUT, settings.LLM_TIMEOUT_))
+            try:
+                result = close()
+                if asyncio.iscoroutine(result):
+                    await result
+            except Exception as e:
+                logger.debug(f"Error cerrando cliente LLM expulsado: {e}")
+
+        task = loop.create_task(_close_later())
+        self._closing.add(task)
+        task.add_done_callback(self._closing.discard)
+
+    async def aclose_all(self) -> None:
+        """Cierra todos los clientes (shutdown)."""
+        with self._lock:
+            clients = [client for client, _ in self._entries.values()]
+            self._entries.clear()
+        for client in clients:
+            close = getattr(client, "close", None)
+            if close is None:
+                continue
+            try:
+                result = close()
+                if asyncio.iscoroutine(result):
+                    await result
+            except Exception as e:
+                logger.debug(f"Error cerrando cliente LLM: {e}")
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "size": len(self._entries),
+                "max_size": self.max_size,
+                "hits": self.hits,
+                "misses": self.misses,
+                "providers": sorted({key[0] for key in self._entries}),
+            }
+
+
+llm_client_pool = LLMClientPool(
+    max_size=settings.LLM_CLIENT_POOL_MAX_SIZE,
+    idle_seconds=settings.LLM_CLIENT_POOL_IDLE_SECONDS,
+)
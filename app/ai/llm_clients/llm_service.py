@@ -7,15 +7,16 @@ import asyncio
 from typing import Any, Dict, List, Optional
 from contextvars import ContextVar
 
-from jsonschema import validate, ValidationError
+from jsonschema import ValidationError
 from redis.asyncio import Redis
 
 from app.exceptions.llm_exceptions import JSONParsingException, LLMConnectionException
 from app.exceptions.api_exceptions import WorkflowProcessingException
 from app.core.config import settings
+from app.core.telemetry import traced
 from app.ai.llm_clients.protocol import LLMClientProtocol
 from app.ai.llm_factory import LLMClientFactory
-from app.schemas.validation_schemas import LLM_RESPONSE_SCHEMA, PLAN_SCHEMA
+from app.schemas.schema_registry import LLM_RESPONSE_SCHEMA_ID, PLAN_SCHEMA_ID, validate as validate_schema
 
 # Context variables for token tracking
 _token_context: ContextVar[Optional[Dict[str, Any]]] = ContextVar('token_context', default=None)
@@ -168,6 +169,7 @@ class LLMService:
             self.logger.error(f"Error in run_with_tracking: {e}")
             raise
 
+    @traced("llm.run")
     async def run(
         self,
         system_prompt: str,
@@ -277,7 +279,7 @@ class LLMService:
         # b) Orchestrator solo plan
         elif "steps" in output and "final_output" not in output:
             try:
-                validate(instance=output, schema=PLAN_SCHEMA)
+                validate_schema(PLAN_SCHEMA_ID, output)
             except ValidationError as e:
                 logger.error("Plan schema validation failed: %s\nOutput: %.500s", e, json.dumps(output), exc_info=True)
                 raise WorkflowProcessingException(f"Plan schema validation failed: {e}")
@@ -285,7 +287,7 @@ class LLMService:
         # c) Orchestrator plan + resultado final
         elif "steps" in output and "final_output" in output:
             try:
-                validate(instance=output, schema=LLM_RESPONSE_SCHEMA)
+                validate_schema(LLM_RESPONSE_SCHEMA_ID, output)
             except ValidationError as e:
                 logger.error("Full schema validation failed: %s\nOutput: %.500s", e, json.dumps(output), exc_info=True)
                 raise WorkflowProcessingException(f"Full schema validation failed: {e}")
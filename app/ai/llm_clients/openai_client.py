@@ -9,6 +9,7 @@ from openai.types.embedding import Embedding
 from app.core.config import settings
 from app.ai.llm_factory import LLMClientFactory
 from .protocol import LLMClientProtocol
+from .client_pool import llm_client_pool, build_http_client
 from app.exceptions.api_exceptions import WorkflowProcessingException
 from .provider_registry import LLMProvider, ModelOption, provider_registry
 from typing import List
@@ -41,7 +42,13 @@ class OpenAIClient(LLMClientProtocol):
             self.logger.info("LLM_BASE_URL no definido; usando api.openai.com por defecto")
 
         try:
-            self._client = AsyncOpenAI(**client_kwargs)
+            # SDK compartido: reutiliza el pool HTTP entre ejecuciones
+            self._client = llm_client_pool.get_or_create(
+                "openai",
+                api_key,
+                client_kwargs.get("base_url"),
+                lambda: AsyncOpenAI(**client_kwargs, http_client=build_http_client()),
+            )
             self.model = model
         except Exception as e:
             self.logger.error("Error inicializando OpenAIClient: %s", e, exc_info=True)
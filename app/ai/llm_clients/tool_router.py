@@ -60,5 +60,5 @@ class ToolRouter:
 
     def is_registered(self, tool_name: str) -> bool:
         """Return True if a tool handler is registered for the given name."""
-        from app.connectors.factory import _TOOL_REGISTRY
-        return tool_name in _TOOL_REGISTRY
+        from app.connectors.factory import is_tool_registered
+        return is_tool_registered(tool_name)
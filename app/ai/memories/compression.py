@@ -0,0 +1,271 @@
+# app/ai/memories/compression.py
+"""
+Motor vectorizado de compresión de memorias
+
+- Embeddings → matriz float32 normalizada; LSH de hiperplanos aleatorios
+  (SimHash) para agrupar candidatos y similitud coseno por bloques (BLAS)
+  solo dentro de cada bucket
+- Memorias sin embedding útil (vector cero) → MinHash + bandas sobre shingles
+- Union-find sobre pares ≥ umbral → clusters → planes de merge por lotes
+
+Todo es CPU puro: el handler lo ejecuta con asyncio.to_thread para no
+bloquear el event loop.
+"""
+
+import hashlib
+import re
+from dataclasses import dataclass, field
+from typing import Any, Dict, Iterator, List, Sequence, Tuple
+
+import numpy as np
+
+_TOKEN_RE = re.compile(r"\w+", re.UNICODE)
+_MERSENNE_PRIME = np.uint64((1 << 61) - 1)
+_MAX_HASH = np.uint64((1 << 32) - 1)
+
+
+class _UnionFind:
+    def __init__(self, size: int):
+        self.parent = np.arange(size)
+
+    def find(self, item: int) -> int:
+        parent = self.parent
+        root = item
+        while parent[root] != root:
+            root = parent[root]
+        while parent[item] != root:
+            parent[item], item = root, parent[item]
+        return root
+
+    def union_pairs(self, left: np.ndarray, right: np.ndarray) -> None:
+        for a, b in zip(left.tolist(), right.tolist()):
+            root_a, root_b = self.find(a), self.find(b)
+            if root_a != root_b:
+                self.parent[max(root_a, root_b)] = min(root_a, root_b)
+
+    def labels(self) -> np.ndarray:
+        return np.array([self.find(i) for i in range(len(self.parent))])
+
+
+def normalize_rows(matrix: np.ndarray) -> np.ndarray:
+    matrix = np.asarray(matrix, dtype=np.float32)
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return matrix / norms
+
+
+def _simhash_buckets(vectors: np.ndarray, num_planes: int, rng: np.random.Generator) -> np.ndarray:
+    planes = rng.standard_normal((vectors.shape[1], num_planes)).astype(np.float32)
+    bits = (vectors @ planes) > 0
+    return bits.dot(1 << np.arange(num_planes, dtype=np.int64))
+
+
+def _similar_pairs_in_group(
+    vectors: np.ndarray, members: np.ndarray, threshold: float, block_size: int
+) -> Iterator[Tuple[np.ndarray, np.ndarray]]:
+    """
+    Aristas (i, j), i < j, con coseno ≥ threshold dentro de un bucket, por bloques.
+    Se emiten todos los pares sobre el umbral: el clustering es la clausura
+    transitiva de "similar a", no una aproximación por vecino.
+    """
+    group = vectors[members]
+    for start in range(0, len(members), block_size):
+        block = group[start:start + block_size]
+        mask = (block @ group[start:].T) >= threshold
+        mask &= np.arange(mask.shape[1])[None, :] > np.arange(mask.shape[0])[:, None]
+        rows, cols = np.nonzero(mask)
+        if rows.size:
+            yield members[rows + start], members[cols + start]
+
+
+def cluster_embeddings(
+    embeddings: np.ndarray,
+    threshold: float = 0.9,
+    num_planes: int = 12,
+    num_tables: int = 4,
+    block_size: int = 256,
+    seed: int = 0,
+) -> np.ndarray:
+    """
+    Etiquetas de cluster (raíz de union-find) para cada fila.
+    Cada tabla LSH usa hiperplanos distintos: pares similares que caen en
+    buckets diferentes en una tabla suelen coincidir en otra.
+    """
+    count = len(embeddings)
+    if count == 0:
+        return np.empty(0, dtype=np.int64)
+
+    vectors = normalize_rows(embeddings)
+    # Con pocos vectores basta un único bucket (comparación exacta por bloques)
+    num_planes = min(num_planes, max(0, int(np.log2(max(count, 1) / 64)) + 1)) if count > 64 else 0
+    uf = _UnionFind(count)
+    rng = np.random.default_rng(seed)
+
+    for _ in range(max(1, num_tables) if num_planes else 1):
+        buckets = _simhash_buckets(vectors, num_planes, rng) if num_planes else np.zeros(count, dtype=np.int64)
+        order = np.argsort(buckets, kind="stable")
+        boundaries = np.flatnonzero(np.diff(buckets[order])) + 1
+        for members in np.split(order, boundaries):
+            if len(members) < 2:
+                continue
+            for left, right in _similar_pairs_in_group(vectors, members, threshold, block_size):
+                uf.union_pairs(left, right)
+
+    return uf.labels()
+
+
+def _shingle_hashes(text: str, size: int) -> np.ndarray:
+    tokens = _TOKEN_RE.findall((text or "").lower())
+    if len(tokens) < size:
+        shingles = {" ".join(tokens)} if tokens else set()
+    else:
+        shingles = {" ".join(tokens[i:i + size]) for i in range(len(tokens) - size + 1)}
+    return np.fromiter(
+        (int.from_bytes(hashlib.blake2b(s.encode("utf-8"), digest_size=4).digest(), "little") for s in shingles),
+        dtype=np.uint64,
+        count=len(shingles),
+    )
+
+
+def minhash_signatures(texts: Sequence[str], num_perm: int = 64, shingle_size: int = 2, seed: int = 0) -> np.ndarray:
+    """Firma MinHash (num_perm) por texto; textos vacíos → fila de _MAX_HASH"""
+    rng = np.random.default_rng(seed)
+    a = rng.integers(1, int(_MERSENNE_PRIME), size=num_perm, dtype=np.uint64)
+    b = rng.integers(0, int(_MERSENNE_PRIME), size=num_perm, dtype=np.uint64)
+    signatures = np.full((len(texts), num_perm), _MAX_HASH, dtype=np.uint64)
+    for index, text in enumerate(texts):
+        hashes = _shingle_hashes(text, shingle_size)
+        if hashes.size:
+            permuted = (hashes[:, None] * a + b) % _MERSENNE_PRIME & _MAX_HASH
+            signatures[index] = permuted.min(axis=0)
+    return signatures
+
+
+def cluster_texts(texts: Sequence[str], threshold: float = 0.7, num_perm: int = 64, bands: int = 16) -> np.ndarray:
+    """Clusters por Jaccard estimada (MinHash + LSH por bandas)"""
+    count = len(texts)
+    if count == 0:
+        return np.empty(0, dtype=np.int64)
+
+    signatures = minhash_signatures(texts, num_perm)
+    rows_per_band = max(1, num_perm // bands)
+    # Clave de banda: combinación lineal (mod 2^64) de sus filas; colisiones se verifican abajo
+    weights = np.random.default_rng(1).integers(1, 1 << 62, size=rows_per_band, dtype=np.uint64)
+    uf = _UnionFind(count)
+    for band in range(bands):
+        chunk = signatures[:, band * rows_per_band:(band + 1) * rows_per_band]
+        if chunk.shape[1] == 0:
+            break
+        keys = (chunk * weights[:chunk.shape[1]]).sum(axis=1, dtype=np.uint64)
+        order = np.argsort(keys, kind="stable")
+        boundaries = np.flatnonzero(keys[order][1:] != keys[order][:-1]) + 1
+        for members in np.split(order, boundaries):
+            if len(members) < 2:
+                continue
+            # Verifica el candidato contra la Jaccard estimada antes de unir
+            agreement = (signatures[members[1:]] == signatures[members[0]]).mean(axis=1)
+            similar = members[1:][agreement >= threshold]
+            if similar.size:
+                uf.union_pairs(np.full(similar.size, members[0]), similar)
+    return uf.labels()
+
+
+@dataclass
+class MergePlan:
+    keep_id: Any
+    merge_ids: List[Any]
+    similarity_group_size: int
+    merged_content: List[str] = field(default_factory=list)
+
+
+def build_merge_plans(
+    memories: Sequence[Dict[str, Any]],
+    labels: np.ndarray,
+) -> List[MergePlan]:
+    """
+    Un plan por cluster con >1 miembros: se conserva la memoria más
+    importante (y más reciente en empate) y el resto se fusiona en ella.
+    """
+    by_label: Dict[int, List[int]] = {}
+    for index, label in enumerate(labels.tolist()):
+        by_label.setdefault(label, []).append(index)
+
+    plans = []
+    for members in by_label.values():
+        if len(members) < 2:
+            continue
+        ranked = sorted(
+            members,
+            key=lambda i: (
+                (memories[i].get("metadata") or {}).get("importance", 0.5),
+                str(memories[i].get("created_at") or ""),
+            ),
+            reverse=True,
+        )
+        keeper, merged = ranked[0], ranked[1:]
+        plans.append(MergePlan(
+            keep_id=memories[keeper]["id"],
+            merge_ids=[memories[i]["id"] for i in merged],
+            similarity_group_size=len(members),
+            merged_content=[memories[i].get("content", "") for i in merged],
+        ))
+    return plans
+
+
+def cluster_memories(
+    memories: Sequence[Dict[str, Any]],
+    embedding_threshold: float = 0.9,
+    text_threshold: float = 0.7,
+) -> np.ndarray:
+    """
+    Etiquetas para memorias con "embedding" (puede ser None/vector cero).
+    Las que tienen embedding útil se agrupan por coseno; el resto por MinHash.
+    Las etiquetas de ambos grupos no colisionan.
+    """
+    count = len(memories)
+    labels = np.arange(count)
+    with_vectors: List[int] = []
+    vectors: List[np.ndarray] = []
+    for index, memory in enumerate(memories):
+        embedding = memory.get("embedding")
+        if embedding is not None:
+            vector = np.asarray(embedding, dtype=np.float32)
+            if vector.size and np.any(vector):
+                with_vectors.append(index)
+                vectors.append(vector)
+    with_vectors_arr = np.array(with_vectors, dtype=np.int64)
+    without = np.setdiff1d(np.arange(count), with_vectors_arr, assume_unique=True)
+
+    if with_vectors:
+        labels[with_vectors_arr] = with_vectors_arr[cluster_embeddings(np.vstack(vectors), embedding_threshold)]
+    if without.size:
+        text_labels = cluster_texts([memories[i].get("content", "") for i in without], text_threshold)
+        labels[without] = without[text_labels]
+    return labels
+
+
+def iter_batches(plans: Sequence[MergePlan], batch_size: int) -> Iterator[List[MergePlan]]:
+    for start in range(0, len(plans), max(1, batch_size)):
+        yield list(plans[start:start + batch_size])
+
+
+def plan_compression(
+    memories: Sequence[Dict[str, Any]],
+    embedding_threshold: float = 0.9,
+    text_threshold: float = 0.7,
+) -> List[MergePlan]:
+    """
+    Atajo síncrono: clusters + planes (pensado para asyncio.to_thread).
+    Cada kind se agrupa por separado: nunca se fusionan memorias de kinds distintos.
+    """
+    by_kind: Dict[Any, List[Dict[str, Any]]] = {}
+    for memory in memories:
+        by_kind.setdefault(memory.get("kind"), []).append(memory)
+
+    plans: List[MergePlan] = []
+    for group in by_kind.values():
+        if len(group) < 2:
+            continue
+        labels = cluster_memories(group, embedding_threshold, text_threshold)
+        plans.extend(build_merge_plans(group, labels))
+    return plans
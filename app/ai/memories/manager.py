@@ -126,6 +126,22 @@ class MemoryManager:
         except Exception as e:
             logger.error(f"Error appending to short-term memory: {e}")
     
+    async def append_short_term_batch(self, agent_id: UUID, items: List[Dict[str, Any]]) -> None:
+        """Append several items in one backend write (falls back to one append per item)"""
+        if not self.short_term_handler or not items:
+            return
+        
+        if hasattr(self.short_term_handler, 'append_short_term_batch'):
+            try:
+                window = self.short_term_config.get("config", {}).get("window", 6)
+                await self.short_term_handler.append_short_term_batch(agent_id, items, window)
+            except Exception as e:
+                logger.error(f"Error appending batch to short-term memory: {e}")
+            return
+        
+        for item in items:
+            await self.append_short_term(agent_id, item)
+    
     async def clear_short_term(self, agent_id: UUID) -> None:
         """Clear short-term memories for agent"""
         if not self.short_term_handler:
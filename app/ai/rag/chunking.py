@@ -0,0 +1,68 @@
+# app/ai/rag/chunking.py
+"""
+Chunking recursivo por separadores con solapamiento configurable
+
+Se parte el texto por el separador más grueso que haga falta ("\n\n", "\n",
+". ", " ", y en último caso por caracteres) y luego se agrupan las piezas en
+ventanas de hasta `chunk_size` caracteres que arrastran ~`chunk_overlap`
+caracteres del chunk anterior.
+"""
+
+from typing import List, Sequence
+
+DEFAULT_SEPARATORS: Sequence[str] = ("\n\n", "\n", ". ", " ")
+
+
+def _split_pieces(text: str, chunk_size: int, separators: Sequence[str]) -> List[str]:
+    """Piezas ≤ chunk_size conservando el separador al final de cada una"""
+    if len(text) <= chunk_size:
+        return [text] if text else []
+    if not separators:
+        return [text[i:i + chunk_size] for i in range(0, len(text), chunk_size)]
+
+    separator, rest = separators[0], separators[1:]
+    if separator not in text:
+        return _split_pieces(text, chunk_size, rest)
+
+    parts = text.split(separator)
+    pieces: List[str] = []
+    for index, part in enumerate(parts):
+        piece = part + separator if index < len(parts) - 1 else part
+        if not piece:
+            continue
+        if len(piece) <= chunk_size:
+            pieces.append(piece)
+        else:
+            pieces.extend(_split_pieces(piece, chunk_size, rest))
+    return pieces
+
+
+def chunk_text(
+    text: str,
+    chunk_size: int = 1000,
+    chunk_overlap: int = 200,
+    separators: Sequence[str] = DEFAULT_SEPARATORS,
+) -> List[str]:
+    if not text or not text.strip():
+        return []
+    chunk_size = max(1, int(chunk_size))
+    chunk_overlap = max(0, min(int(chunk_overlap), chunk_size - 1))
+
+    chunks: List[str] = []
+    window: List[str] = []
+    window_len = 0
+    for piece in _split_pieces(text, chunk_size, separators):
+        if window and window_len + len(piece) > chunk_size:
+            chunk = "".join(window).strip()
+            if chunk:
+                chunks.append(chunk)
+            # Arrastra las últimas piezas que quepan en el solapamiento
+            while window and (window_len > chunk_overlap or window_len + len(piece) > chunk_size):
+                window_len -= len(window.pop(0))
+        window.append(piece)
+        window_len += len(piece)
+
+    tail = "".join(window).strip()
+    if tail and (not chunks or tail != chunks[-1]):
+        chunks.append(tail)
+    return chunks
@@ -0,0 +1,95 @@
+# app/ai/rag/embedders.py
+"""
+Embedders intercambiables para la ingesta RAG
+
+- ServiceEmbedder: EmbeddingService global (OpenAI, con su cache)
+- HashingEmbedder: feature hashing determinista, sin red (tests / offline)
+
+Nuevos backends: `register_embedder("nombre", factory)`.
+"""
+
+import hashlib
+import math
+import re
+from typing import Callable, Dict, List, Optional, Protocol
+
+from app.core.config import settings
+
+_TOKEN_RE = re.compile(r"\w+", re.UNICODE)
+
+
+class Embedder(Protocol):
+    model: str
+    dimensions: int
+
+    async def embed(self, texts: List[str]) -> List[List[float]]:
+        ...
+
+
+class ServiceEmbedder:
+    """Delegado en app.ai.embeddings.EmbeddingService.get_embeddings (batch)"""
+
+    # Un EmbeddingService por modelo distinto del global (cliente + cache propios)
+    _services: Dict[str, object] = {}
+
+    def __init__(self, model: Optional[str] = None):
+        from app.ai.embeddings import create_embedding_service, get_embedding_service
+
+        service = get_embedding_service()
+        if model and model != service.model:
+            service = ServiceEmbedder._services.get(model)
+            if service is None:
+                service = ServiceEmbedder._services[model] = create_embedding_service(model=model)
+        self._service = service
+        self.model = service.model
+        self.dimensions = service.dimensions
+
+    async def embed(self, texts: List[str]) -> List[List[float]]:
+        return await self._service.get_embeddings(texts)
+
+
+class HashingEmbedder:
+    """
+    Bolsa de tokens + bigramas proyectada con hash firmado y normalizada (L2).
+    Determinista entre procesos y máquinas: mismo texto → mismo vector.
+    """
+
+    def __init__(self, dimensions: Optional[int] = None, model: str = "local-hashing-v1"):
+        self.dimensions = dimensions or settings.EMBED_DIMS
+        self.model = model
+
+    def _embed_one(self, text: str) -> List[float]:
+        vector = [0.0] * self.dimensions
+        tokens = _TOKEN_RE.findall((text or "").lower())
+        features = tokens + [f"{a} {b}" for a, b in zip(tokens, tokens[1:])]
+        for feature in features:
+            digest = hashlib.blake2b(feature.encode("utf-8"), digest_size=8).digest()
+            bucket = int.from_bytes(digest[:4], "little") % self.dimensions
+            vector[bucket] += 1.0 if digest[4] & 1 else -1.0
+        norm = math.sqrt(sum(value * value for value in vector))
+        return [value / norm for value in vector] if norm else vector
+
+    async def embed(self, texts: List[str]) -> List[List[float]]:
+        return [self._embed_one(text) for text in texts]
+
+
+_EMBEDDERS: Dict[str, Callable[..., Embedder]] = {
+    "openai": ServiceEmbedder,
+    "service": ServiceEmbedder,
+    "local": HashingEmbedder,
+    "hashing": HashingEmbedder,
+}
+
+
+def register_embedder(name: str, factory: Callable[..., Embedder]) -> None:
+    _EMBEDDERS[name] = factory
+
+
+def get_embedder(provider: Optional[str] = None, model: Optional[str] = None) -> Embedder:
+    provider = (provider or settings.RAG_EMBEDDING_PROVIDER).lower()
+    factory = _EMBEDDERS.get(provider)
+    if factory is None:
+        raise ValueError(f"Unknown embedding provider: {provider}. Available: {sorted(_EMBEDDERS)}")
+    if factory is HashingEmbedder:
+        return HashingEmbedder()
+    return factory(model=model) if model else factory()
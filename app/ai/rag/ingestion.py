@@ -0,0 +1,228 @@
+# app/ai/rag/ingestion.py
+"""
+Pipeline de ingesta RAG en streaming
+
+documento → chunks (con solapamiento) → hash sha256 → embeddings en lote
+(reutilizando los ya calculados para el mismo hash) → INSERT multi-fila en
+rag_chunks (HNSW).
+
+- Concurrencia acotada: N workers consumen una cola de tamaño fijo, así que
+  un iterable/async-iterable grande nunca se materializa entero en memoria
+- Reanudable: rag_documents guarda hash + status por documento; un documento
+  ya `indexed` con el mismo hash se salta y uno a medias continúa donde quedó
+  (las posiciones ya escritas con el mismo hash no se reescriben)
+- Editar un documento reutiliza los embeddings de sus chunks sin cambios: los
+  chunks se actualizan por posición y solo se borran los que sobran al final
+- Cada worker usa su propia sesión: AsyncSession no admite uso concurrente
+"""
+
+import asyncio
+import hashlib
+import logging
+from dataclasses import asdict, dataclass
+from typing import Any, AsyncIterable, Callable, Dict, Iterable, List, Optional, Union
+from uuid import UUID
+
+from app.ai.rag.chunking import DEFAULT_SEPARATORS, chunk_text
+from app.ai.rag.embedders import Embedder
+from app.repositories.rag_chunk_repository import RagChunkRepository
+
+logger = logging.getLogger(__name__)
+
+Documents = Union[Iterable[Dict[str, Any]], AsyncIterable[Dict[str, Any]]]
+
+
+def content_hash(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def document_text(doc: Dict[str, Any]) -> str:
+    return str(doc.get("content") or doc.get("text") or "")
+
+
+def document_id_for(doc: Dict[str, Any]) -> str:
+    explicit = doc.get("id") or doc.get("document_id")
+    if explicit:
+        return str(explicit)[:255]
+    # Sin id explícito: estable por origen, o por contenido si tampoco hay origen
+    return content_hash(str(doc.get("source") or document_text(doc)))[:32]
+
+
+@dataclass
+class IngestionStats:
+    total_documents: int = 0
+    indexed_documents: int = 0
+    skipped_documents: int = 0
+    failed_documents: int = 0
+    total_chunks: int = 0
+    inserted_chunks: int = 0
+    deduplicated_chunks: int = 0
+    embedded_chunks: int = 0
+    total_tokens: int = 0
+
+    def to_dict(self) -> Dict[str, Any]:
+        return asdict(self)
+
+
+class RAGIngestionPipeline:
+    def __init__(
+        self,
+        embedder: Embedder,
+        session_factory: Optional[Callable[[], Any]] = None,
+        batch_size: int = 100,
+        concurrency: int = 4,
+    ):
+        if session_factory is None:
+            from app.db.database import async_session
+            session_factory = async_session
+        self.embedder = embedder
+        self.session_factory = session_factory
+        self.batch_size = max(1, batch_size)
+        self.concurrency = max(1, concurrency)
+
+    async def ingest(
+        self,
+        agent_id: UUID,
+        documents: Documents,
+        chunk_config: Optional[Dict[str, Any]] = None,
+        force: bool = False,
+    ) -> IngestionStats:
+        chunk_config = chunk_config or {}
+        stats = IngestionStats()
+        queue: asyncio.Queue = asyncio.Queue(maxsize=self.concurrency * 2)
+
+        async def worker():
+            while True:
+                doc = await queue.get()
+                try:
+                    if doc is None:
+                        return
+                    await self._ingest_document(agent_id, doc, chunk_config, force, stats)
+                finally:
+                    queue.task_done()
+
+        workers = [asyncio.create_task(worker()) for _ in range(self.concurrency)]
+        try:
+            if hasattr(documents, "__aiter__"):
+                async for doc in documents:
+                    stats.total_documents += 1
+                    await queue.put(doc)
+            else:
+                for doc in documents:
+                    stats.total_documents += 1
+                    await queue.put(doc)
+            for _ in workers:
+                await queue.put(None)
+            await asyncio.gather(*workers)
+        finally:
+            for task in workers:
+                if not task.done():
+                    task.cancel()
+
+        logger.info(f"RAG ingest agent={agent_id}: {stats.to_dict()}")
+        return stats
+
+    async def _ingest_document(
+        self,
+        agent_id: UUID,
+        doc: Dict[str, Any],
+        chunk_config: Dict[str, Any],
+        force: bool,
+        stats: IngestionStats,
+    ) -> None:
+        text = document_text(doc)
+        document_id = document_id_for(doc)
+        doc_hash = content_hash(text)
+        source = str(doc.get("source") or document_id)
+
+        try:
+            async with self.session_factory() as session:
+                repo = RagChunkRepository(session)
+                state = (await repo.get_document_states(agent_id, [document_id])).get(document_id)
+                if state and state["content_hash"] == doc_hash and state["status"] == "indexed" and not force:
+                    stats.skipped_documents += 1
+                    return
+                # Sin borrar los chunks anteriores: sus embeddings se reutilizan por hash en _ingest_batch
+                await repo.upsert_document_state(agent_id, document_id, doc_hash, "in_progress", source)
+                await session.commit()
+
+            chunks = await asyncio.to_thread(
+                chunk_text,
+                text,
+                chunk_config.get("chunk_size", 1000),
+                chunk_config.get("chunk_overlap", 200),
+                chunk_config.get("separators") or DEFAULT_SEPARATORS,
+            )
+            stats.total_chunks += len(chunks)
+            stats.total_tokens += sum(len(chunk) for chunk in chunks) // 4
+
+            base_metadata = {"source": source, **(doc.get("metadata") or {})}
+            for start in range(0, len(chunks), self.batch_size):
+                await self._ingest_batch(
+                    agent_id, document_id, chunks[start:start + self.batch_size], start, base_metadata, stats
+                )
+
+            async with self.session_factory() as session:
+                repo = RagChunkRepository(session)
+                # Una versión anterior más larga deja posiciones sobrantes
+                await repo.delete_chunks_from(agent_id, document_id, len(chunks))
+                await repo.upsert_document_state(
+                    agent_id, document_id, doc_hash, "indexed", source, chunk_count=len(chunks)
+                )
+                await session.commit()
+            stats.indexed_documents += 1
+
+        except Exception as e:
+            stats.failed_documents += 1
+            logger.error(f"RAG ingest failed for document {document_id}: {e}")
+            try:
+                async with self.session_factory() as session:
+                    await RagChunkRepository(session).upsert_document_state(
+                        agent_id, document_id, doc_hash, "failed", source, error=str(e)[:2000]
+                    )
+                    await session.commit()
+            except Exception as state_error:
+                logger.debug(f"Could not record failed state for {document_id}: {state_error}")
+
+    async def _ingest_batch(
+        self,
+        agent_id: UUID,
+        document_id: str,
+        chunks: List[str],
+        offset: int,
+        base_metadata: Dict[str, Any],
+        stats: IngestionStats,
+    ) -> None:
+        hashes = [content_hash(chunk) for chunk in chunks]
+
+        async with self.session_factory() as session:
+            repo = RagChunkRepository(session)
+            known = await repo.existing_embeddings(agent_id, hashes, self.embedder.model)
+
+            # Embeddings solo para hashes nuevos, una vez por hash dentro del lote
+            pending = {h: chunk for h, chunk in zip(hashes, chunks) if h not in known}
+            stats.deduplicated_chunks += len(chunks) - len(pending)
+            if pending:
+                vectors = await self.embedder.embed(list(pending.values()))
+                for h, vector in zip(pending.keys(), vectors):
+                    if not vector or not any(vector):
+                        # EmbeddingService devuelve vectores cero si el proveedor falla
+                        raise RuntimeError("Embedding provider returned an empty vector")
+                    known[h] = vector
+                stats.embedded_chunks += len(pending)
+
+            rows = [
+                {
+                    "agent_id": agent_id,
+                    "document_id": document_id,
+                    "chunk_index": offset + index,
+                    "content": chunk,
+                    "content_hash": h,
+                    "embedding_model": self.embedder.model,
+                    "embedding": list(known[h]),
+                    "metadatas": {**base_metadata, "chunk_index": offset + index},
+                }
+                for index, (chunk, h) in enumerate(zip(chunks, hashes))
+            ]
+            stats.inserted_chunks += await repo.upsert_chunks(rows)
+            await session.commit()
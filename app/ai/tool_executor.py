@@ -1,21 +1,33 @@
 # app/ai/tool_executor.py
 
+import re
 import time
+import asyncio
 import logging
-from typing import Any, Dict
+from typing import Any, Dict, List, Optional
 from uuid import UUID
 
 from app.ai.llm_clients.tool_router import ToolRouter
 from app.ai.memories.manager import MemoryManager
+from app.connectors.factory import is_read_only_tool
+from app.core.config import settings
 from app.exceptions import get_kyra_logger, ToolExecutionError
 
 logger = get_kyra_logger(__name__)
 
+# Referencias a resultados previos dentro de params: {{...}}, $prev, $result, $step_N
+_RESULT_REFERENCE = re.compile(r"\{\{.*?\}\}|\$(?:prev|result|step)", re.DOTALL)
+
 
 class ToolExecutor:
     """
     Ejecuta todos los pasos de herramientas que devuelve el LLM,
     actualiza memoria corta y, si existe, reinyecta resultados al LLM.
+
+    Solo corren en paralelo (hasta max_concurrency) los tools read_only y los
+    pasos con `depends_on` declarado; cualquier otro paso es secuencial: espera
+    a todos los anteriores y los siguientes esperan a él. El primer fallo
+    aborta las olas restantes.
     """
 
     def __init__(
@@ -23,13 +35,95 @@ class ToolExecutor:
         tool_router: ToolRouter,
         mem_mgr: MemoryManager,
         llm: Any,
+        max_concurrency: Optional[int] = None,
     ):
         logger.info("TOOL_EXECUTOR: Inicializando ToolExecutor")
         self.tool_router = tool_router
         self.mem_mgr = mem_mgr
         self.llm = llm
+        self.max_concurrency = max(1, max_concurrency or settings.AGENT_TOOL_CONCURRENCY)
         logger.debug("TOOL_EXECUTOR: ToolExecutor inicializado correctamente")
 
+    @staticmethod
+    def _resolve_dependencies(steps: List[Dict[str, Any]], index: int) -> Optional[List[int]]:
+        """
+        Índices de los pasos de los que depende `index` según su `depends_on`.
+        Si los pasos declaran `id`, depends_on se interpreta solo como ids; si no,
+        como índices. None si no declara dependencias o alguna no se resuelve.
+        """
+        deps = steps[index].get("depends_on")
+        if deps is None:
+            return None
+        if not isinstance(deps, list):
+            deps = [deps]
+        ids = {step["id"]: i for i, step in enumerate(steps) if step.get("id") is not None}
+        resolved = []
+        for dep in deps:
+            if ids:
+                dep_index = ids.get(dep)
+            else:
+                dep_index = dep if isinstance(dep, int) and not isinstance(dep, bool) else None
+            if dep_index is None or not 0 <= dep_index < index:
+                return None
+            resolved.append(dep_index)
+        return resolved
+
+    def _plan_waves(self, steps: List[Dict[str, Any]]) -> List[List[int]]:
+        """
+        Agrupa índices de pasos en olas; los pasos de una misma ola corren en paralelo.
+        - `depends_on` declarado → después de esas dependencias
+        - tool read_only sin referencias a resultados previos → primera ola disponible
+        - resto (escrituras, referencias {{...}}/$prev, depends_on no resoluble) →
+          ola propia, después de todos los anteriores (orden secuencial original)
+        Con max_concurrency=1 cada paso va en su propia ola.
+        """
+        wave_of: List[int] = []
+        floor = 0  # Ola mínima: nada se adelanta a un paso secuencial previo
+        for index, step in enumerate(steps):
+            deps = self._resolve_dependencies(steps, index) if self.max_concurrency > 1 else None
+            references = bool(_RESULT_REFERENCE.search(str(step.get("params", {}))))
+            if deps is not None:
+                wave = max([floor, *(wave_of[dep] + 1 for dep in deps)])
+            elif self.max_concurrency > 1 and not references and is_read_only_tool(step.get("tool") or ""):
+                wave = floor
+            else:
+                wave = max(wave_of, default=-1) + 1
+                floor = wave + 1
+            wave_of.append(wave)
+
+        waves: List[List[int]] = [[] for _ in range(max(wave_of, default=-1) + 1)]
+        for index, wave in enumerate(wave_of):
+            waves[wave].append(index)
+        return waves
+
+    async def _call_tool(
+        self,
+        semaphore: asyncio.Semaphore,
+        index: int,
+        total: int,
+        tool_name: str,
+        params: Dict[str, Any],
+        creds: Dict[str, Any],
+    ) -> Any:
+        async with semaphore:
+            logger.info(f"TOOL_EXECUTOR: Ejecutando paso {index + 1}/{total} - tool: {tool_name}")
+            logger.debug(f"TOOL_EXECUTOR: Parámetros del tool {tool_name}: {params}")
+            result = await self.tool_router.call(tool_name, params, creds)
+            logger.info(f"TOOL_EXECUTOR: Tool {tool_name} ejecutado exitosamente")
+            logger.debug(f"TOOL_EXECUTOR: Resultado del tool {tool_name}: {str(result)[:200]}")
+            return result
+
+    async def _flush_short_term(self, agent_id: UUID, items: List[Dict[str, Any]]) -> None:
+        """Una sola escritura de memoria corta por iteración (ignorar errores aquí)."""
+        if not items:
+            return
+        try:
+            logger.debug(f"TOOL_EXECUTOR: Guardando {len(items)} resultados en memoria corta para agent_id: {agent_id}")
+            await self.mem_mgr.append_short_term_batch(agent_id, items)
+            logger.debug(f"TOOL_EXECUTOR: Resultados guardados en memoria corta")
+        except Exception as e:
+            logger.warning(f"TOOL_EXECUTOR: Error guardando en memoria corta: {str(e)}")
+
     async def execute(
         self,
         agent_id: UUID,
@@ -38,55 +132,62 @@ class ToolExecutor:
     ) -> Dict[str, Any]:
         logger.info(f"TOOL_EXECUTOR: Iniciando ejecución de herramientas para agent_id: {agent_id}")
         start = time.perf_counter()
-        
+
         steps = llm_response.get("steps", [])
-        logger.info(f"TOOL_EXECUTOR: Ejecutando {len(steps)} pasos de herramientas")
-        
-        # Recorremos cada paso planificado por el LLM
-        for i, step in enumerate(steps):
-            tool_name = step.get("tool")
-            params = step.get("params", {})
-            
-            logger.info(f"TOOL_EXECUTOR: Ejecutando paso {i+1}/{len(steps)} - tool: {tool_name}")
-            logger.debug(f"TOOL_EXECUTOR: Parámetros del tool {tool_name}: {params}")
+        waves = self._plan_waves(steps)
+        logger.info(
+            f"TOOL_EXECUTOR: Ejecutando {len(steps)} pasos de herramientas en {len(waves)} olas "
+            f"(max_concurrency={self.max_concurrency})"
+        )
+
+        semaphore = asyncio.Semaphore(self.max_concurrency)
+        memory_items: List[Dict[str, Any]] = []
+
+        for wave in waves:
+            # 1) Llamadas a las herramientas independientes de esta ola
+            results = await asyncio.gather(
+                *(
+                    self._call_tool(
+                        semaphore, index, len(steps),
+                        steps[index].get("tool"), steps[index].get("params", {}), creds,
+                    )
+                    for index in wave
+                ),
+                return_exceptions=True,
+            )
+
+            # Procesar en orden de pasos para que memoria y LLM vean el mismo orden que en secuencial
+            for index, result in zip(wave, results):
+                tool_name = steps[index].get("tool")
+                params = steps[index].get("params", {})
 
-            # 1) Llamada a la herramienta
-            try:
-                logger.debug(f"TOOL_EXECUTOR: Llamando al tool_router para: {tool_name}")
-                result = await self.tool_router.call(tool_name, params, creds)
-                logger.info(f"TOOL_EXECUTOR: Tool {tool_name} ejecutado exitosamente")
-                logger.debug(f"TOOL_EXECUTOR: Resultado del tool {tool_name}: {str(result)[:200]}")
-                
-            except Exception as e:
-                logger.error(f"Error ejecutando tool {tool_name}", error=e, tool_params=params)
-                # Si falla, abortamos toda la ejecución
-                raise ToolExecutionError(tool_name, str(e), params)
-
-            # 2) Guardar en memoria corta (ignorar errores aquí)
-            try:
-                logger.debug(f"TOOL_EXECUTOR: Guardando resultado en memoria corta para agent_id: {agent_id}")
-                await self.mem_mgr.append_short_term(agent_id, {
+                if isinstance(result, BaseException):
+                    logger.error(f"Error ejecutando tool {tool_name}", error=result, tool_params=params)
+                    # Si falla, persistimos lo ya obtenido y abortamos toda la ejecución
+                    await self._flush_short_term(agent_id, memory_items)
+                    raise ToolExecutionError(tool_name, str(result), params)
+
+                # 2) Acumular para memoria corta (se escribe en lote al final)
+                memory_items.append({
                     "tool": tool_name,
                     "params": params,
                     "result": result,
                 })
-                logger.debug(f"TOOL_EXECUTOR: Resultado guardado en memoria corta")
-            except Exception as e:
-                logger.warning(f"TOOL_EXECUTOR: Error guardando en memoria corta: {str(e)}")
-                pass
-
-            # 3) Reinyectar el resultado en la respuesta del LLM (si está soportado)
-            if hasattr(self.llm, "inject_tool_result"):
-                try:
-                    logger.debug(f"TOOL_EXECUTOR: Reinyectando resultado del tool {tool_name} al LLM")
-                    llm_response = await self.llm.inject_tool_result(llm_response, result)
-                except Exception as e:
-                    logger.warning(f"TOOL_EXECUTOR: Error reinyectando resultado al LLM: {str(e)}")
-                    pass
+
+                # 3) Reinyectar el resultado en la respuesta del LLM (si está soportado)
+                if hasattr(self.llm, "inject_tool_result"):
+                    try:
+                        logger.debug(f"TOOL_EXECUTOR: Reinyectando resultado del tool {tool_name} al LLM")
+                        llm_response = await self.llm.inject_tool_result(llm_response, result)
+                    except Exception as e:
+                        logger.warning(f"TOOL_EXECUTOR: Error reinyectando resultado al LLM: {str(e)}")
+                        pass
+
+        await self._flush_short_term(agent_id, memory_items)
 
         duration_ms = int((time.perf_counter() - start) * 1000)
         logger.info(f"TOOL_EXECUTOR: Ejecución de herramientas completada en {duration_ms}ms para agent_id: {agent_id}")
-        
+
         # Opcional: podrías medir aquí el tiempo total y añadir a llm_response si te interesa
         llm_response["_tools_duration_ms"] = duration_ms
         return llm_response
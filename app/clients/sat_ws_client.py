@@ -1,5 +1,6 @@
 """Cliente sencillo para el Web Service de Descarga Masiva CFDI v1.5."""
 
+from pathlib import Path
 from typing import Any, Dict
 
 try:  # httpx might be absent in some testing environments
@@ -50,3 +51,24 @@ class SATWSClient:
             resp = await client.get(f"{self.BASE_URL}/descarga/{package_id}", headers=headers)
             resp.raise_for_status()
             return resp.content
+
+    async def stream_package(self, token: str, package_id: str, dest: Path, chunk_size: int = 1 << 16) -> int:
+        """
+        Descarga el paquete a ``dest`` por chunks, sin cargar el zip en memoria. Devuelve bytes escritos.
+        Usa el cliente compartido: las descargas concurrentes reutilizan conexiones keep-alive.
+        """
+        if httpx is None:
+            raise RuntimeError("httpx package is required")
+        from app.core.http_client import http_client
+
+        headers = {"Authorization": f"Bearer {token}"}
+        written = 0
+        async with http_client.stream(
+            "GET", f"{self.BASE_URL}/descarga/{package_id}", headers=headers, timeout=60.0
+        ) as resp:
+            resp.raise_for_status()
+            with open(dest, "wb") as fh:
+                async for chunk in resp.aiter_bytes(chunk_size):
+                    fh.write(chunk)
+                    written += len(chunk)
+        return written
@@ -1,13 +1,19 @@
 # app/connectors/factory.py
 
-from typing import Any, Dict, Type
+from typing import Any, Dict, List, Type
 from app.handlers.connector_handler import ActionHandler
 import app.handlers
+import asyncio
 import pkgutil, importlib
 import logging
+from app.core.config import settings
+from app.core.telemetry import traced
 from app.exceptions.parameter_validation import parameter_validator
 from app.exceptions.smart_parameter_handler import smart_parameter_handler
 from app.exceptions.requires_user_input_error import RequiresUserInputError
+from app.exceptions.api_exceptions import HandlerError
+from app.schemas import schema_registry
+from jsonschema import ValidationError
 from app.exceptions.logging_utils import get_kyra_logger
 
 logger = get_kyra_logger(__name__)
@@ -18,11 +24,16 @@ _TOOL_REGISTRY: Dict[str, Type[ActionHandler]] = {}
 # Registro dinámico para "nodes" (workflows)
 _NODE_REGISTRY: Dict[str, Type[ActionHandler]] = {}
 
-def register_tool(name: str, usage_mode: str | None = None):
+# Índices del manifest (key -> módulo que la registra) para import lazy
+_NODE_MODULES: Dict[str, str] = {}
+_TOOL_MODULES: Dict[str, str] = {}
+
+def register_tool(name: str, usage_mode: str | None = None, read_only: bool = False):
     """Register a tool handler under ``name``.
 
     Optionally assigns ``usage_mode`` as an attribute of the class so other
-    services can read how the tool should be used.
+    services can read how the tool should be used. ``read_only=True`` marks
+    tools without side effects, which ToolExecutor may run concurrently.
 
     Example::
 
@@ -33,6 +44,8 @@ def register_tool(name: str, usage_mode: str | None = None):
         _TOOL_REGISTRY[name] = cls
         if usage_mode is not None:
             setattr(cls, "usage_mode", usage_mode)
+        if read_only:
+            setattr(cls, "read_only", True)
         
         # Auto-registrar especificaciones de parámetros
         try:
@@ -57,7 +70,7 @@ def _get_handler_from_registry(
     Función unificada para obtener handlers de cualquier registry.
     Elimina duplicación de código entre get_tool_handler y get_node_handler.
     """
-    HandlerCls = registry.get(key)
+    HandlerCls = registry.get(key) or _load_lazy_handler(registry, key)
     if not HandlerCls:
         available_keys = list(registry.keys())
         logger.error(f"No {handler_type} handler found for '{key}'. Available: {available_keys}")
@@ -71,6 +84,45 @@ def _get_handler_from_registry(
         raise RuntimeError(f"Error creando instancia de {handler_type} handler '{key}': {e}")
 
 
+def _load_lazy_handler(
+    registry: Dict[str, Type[ActionHandler]],
+    key: str
+) -> Type[ActionHandler] | None:
+    """
+    Importa bajo demanda el módulo que registra `key` según el manifest.
+    El decorador del módulo llena el registry al importarse.
+    """
+    modules = _NODE_MODULES if registry is _NODE_REGISTRY else _TOOL_MODULES
+    module_path = modules.get(key)
+    if not module_path:
+        return None
+    importlib.import_module(module_path)
+    HandlerCls = registry.get(key)
+    if not HandlerCls:
+        logger.warning(f"Manifest stale: {module_path} did not register '{key}'")
+    return HandlerCls
+
+
+def _is_node_key(key: str) -> bool:
+    return key in _NODE_REGISTRY or key in _NODE_MODULES
+
+
+def is_tool_registered(tool_name: str) -> bool:
+    """True si existe un tool con ese nombre (cargado o pendiente de import lazy)."""
+    return tool_name in _TOOL_REGISTRY or tool_name in _TOOL_MODULES
+
+
+def is_read_only_tool(tool_name: str) -> bool:
+    """True si el tool se registró con read_only=True (importa su módulo si es lazy)."""
+    cls = _TOOL_REGISTRY.get(tool_name) or _load_lazy_handler(_TOOL_REGISTRY, tool_name)
+    return bool(cls is not None and getattr(cls, "read_only", False))
+
+
+def list_tool_names() -> List[str]:
+    """Nombres de todos los tools conocidos, sin forzar el import de sus módulos."""
+    return list(dict.fromkeys([*_TOOL_REGISTRY, *_TOOL_MODULES]))
+
+
 def get_tool_handler(
     tool_name: str,
     creds: Dict[str, Any]
@@ -90,9 +142,9 @@ async def execute_tool(
     """
     logger.debug(f"Ejecutando tool: {tool_name}", provided_params=list(params.keys()))
     
-    # Análisis inteligente de parámetros
-    if smart_parameter_handler.should_request_user_input(tool_name, params):
-        missing_info = smart_parameter_handler.get_missing_parameters_info(tool_name, params)
+    # Análisis inteligente de parámetros (validador precompilado, un solo análisis)
+    missing_info = smart_parameter_handler.check_parameters(tool_name, params)
+    if missing_info:
         logger.info(f"Tool {tool_name} requiere input del usuario",
                    missing_count=missing_info["missing_count"])
         raise RequiresUserInputError(tool_name, missing_info)
@@ -128,22 +180,23 @@ def get_node_handler(node_name: str, action_name: str, creds: Dict[str, Any]) ->
     """
     # Estrategia 1: Buscar con key construido (backward compatibility)
     constructed_key = f"{node_name}.{action_name}"
-    if constructed_key in _NODE_REGISTRY:
+    if _is_node_key(constructed_key):
         return _get_handler_from_registry(_NODE_REGISTRY, constructed_key, creds, "node")
     
     # Estrategia 2: Buscar node_name directamente (para handlers simples)
-    if node_name in _NODE_REGISTRY:
+    if _is_node_key(node_name):
         return _get_handler_from_registry(_NODE_REGISTRY, node_name, creds, "node")
     
     # Estrategia 3: Buscar action_name directamente (para handlers legacy)
-    if action_name in _NODE_REGISTRY:
+    if _is_node_key(action_name):
         return _get_handler_from_registry(_NODE_REGISTRY, action_name, creds, "node")
     
     # Si nada funciona, reportar error con información útil
-    available_keys = list(_NODE_REGISTRY.keys())
+    available_keys = list(dict.fromkeys([*_NODE_REGISTRY, *_NODE_MODULES]))
     logger.error(f"No node handler found. Tried keys: ['{constructed_key}', '{node_name}', '{action_name}']. Available: {available_keys}")
     raise RuntimeError(f"No existe node handler para '{constructed_key}'. Intenté: '{node_name}', '{action_name}'. Disponibles: {available_keys}")
 
+@traced("connector.execute_node")
 async def execute_node(
     node_name: str,
     action_name: str,
@@ -174,45 +227,115 @@ async def execute_node(
         
         fake_output = fake_data_registry.generate_fake_output(node_key, params)
         
+        # Con perfil de latencia activo (benchmarks) se espera de verdad
+        latency_ms = fake_data_registry.sample_latency_ms(node_key)
+        if latency_ms is not None:
+            await asyncio.sleep(latency_ms / 1000)
+            duration_ms = int(latency_ms)
+        else:
+            duration_ms = random.randint(50, 1000)
+        
         return {
             "status": "success",
             "output": fake_output,
-            "duration_ms": random.randint(50, 1000),
+            "duration_ms": duration_ms,
             "simulated": True
         }
     
     # Modo real: ejecutar normalmente
     # Análisis inteligente de parámetros para nodos también
-    if smart_parameter_handler.should_request_user_input(node_key, params):
-        missing_info = smart_parameter_handler.get_missing_parameters_info(node_key, params)
+    missing_info = smart_parameter_handler.check_parameters(node_key, params)
+    if missing_info:
         logger.info(f"Nodo {node_key} requiere input del usuario",
                    missing_count=missing_info["missing_count"])
         raise RequiresUserInputError(node_key, missing_info)
     
     # Si no necesita input del usuario, ejecutar normalmente
     handler = get_node_handler(node_name, action_name, creds)
+    _validate_params_schema(node_key, handler, params)
     # 🔧 FIX: Pass creds inside params, not as separate argument
     params_with_creds = {**params, "creds": creds}
     return await handler.execute(params_with_creds)
 
+def _validate_params_schema(node_key: str, handler: ActionHandler, params: Dict[str, Any]) -> None:
+    """Valida params contra el params_schema del handler (compilado una vez por proceso)"""
+    schema = getattr(handler, "params_schema", None)
+    if not schema:
+        return
+    schema_id = f"node:{node_key}"
+    # Mismo objeto ya registrado → sin rehash ni recompilación
+    schema_registry.register_schema(schema_id, schema)
+    try:
+        schema_registry.validate(schema_id, params)
+    except ValidationError as e:
+        path = ".".join(str(p) for p in e.absolute_path)
+        raise HandlerError(
+            f"Parámetros inválidos para {node_key}{f' ({path})' if path else ''}: {e.message}",
+            component=node_key,
+        )
+
 _SCANNED = False
+_FULLY_IMPORTED = False
 
 def scan_handlers() -> None:
+    """
+    Puebla los registries de handlers.
+    Con un manifest vigente solo carga el índice (imports lazy); si no existe o
+    está desactualizado, importa todos los módulos de app/handlers.
+    """
     global _SCANNED
     if _SCANNED:
         return
-    import app.handlers, pkgutil, importlib
+    if settings.HANDLER_MANIFEST_ENABLED and _load_from_manifest():
+        _SCANNED = True
+        return
+    _import_all_handlers()
+    _SCANNED = True
+
+
+def _load_from_manifest() -> bool:
+    """Carga índice + specs de parámetros desde el manifest. False si no es usable."""
+    from app.connectors.registry_manifest import load_manifest, deserialize_specs
+    
+    manifest = load_manifest()
+    if not manifest:
+        return False
+    
+    _NODE_MODULES.update({key: entry["module"] for key, entry in manifest["nodes"].items()})
+    _TOOL_MODULES.update({key: entry["module"] for key, entry in manifest["tools"].items()})
+    for key, specs in manifest["parameter_specs"].items():
+        parameter_validator.load_handler_specs(key, deserialize_specs(specs))
+    
+    # Módulos con efectos de import (triggers, memorias, schemas de BD) no pueden ser lazy
+    for module_path in manifest["eager_modules"]:
+        importlib.import_module(module_path)
+    
+    parameter_validator.compile_all()
+    logger.info(f"Handler registry loaded from manifest",
+                nodes=len(_NODE_MODULES), tools=len(_TOOL_MODULES),
+                eager_modules=len(manifest["eager_modules"]))
+    return True
+
+
+def _import_all_handlers() -> None:
+    """Importa todos los módulos de app/handlers (scan completo)."""
+    global _FULLY_IMPORTED
+    if _FULLY_IMPORTED:
+        return
     for _, module_name, _ in pkgutil.iter_modules(app.handlers.__path__):
         importlib.import_module(f"app.handlers.{module_name}")
-    _SCANNED = True
+    # Compilar specs una sola vez: execute_node/execute_tool ya no hacen reflexión
+    parameter_validator.compile_all()
+    _FULLY_IMPORTED = True
 
 
 def get_registered_handlers() -> Dict[str, Type[ActionHandler]]:
     """
     Returns all registered handlers from both tool and node registries.
     """
-    # Ensure handlers are scanned first
+    # Ensure handlers are scanned first; callers need classes, so lazy modules are imported
     scan_handlers()
+    _import_all_handlers()
     
     # Combine both registries
     all_handlers = {}
@@ -232,5 +355,8 @@ def get_registry_status() -> Dict[str, Any]:
         "nodes_registered": len(_NODE_REGISTRY),
         "tool_keys": list(_TOOL_REGISTRY.keys()),
         "node_keys": list(_NODE_REGISTRY.keys()),
-        "scanned": _SCANNED
+        "lazy_tool_keys": [key for key in _TOOL_MODULES if key not in _TOOL_REGISTRY],
+        "lazy_node_keys": [key for key in _NODE_MODULES if key not in _NODE_REGISTRY],
+        "scanned": _SCANNED,
+        "fully_imported": _FULLY_IMPORTED
     }
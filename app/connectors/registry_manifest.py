@@ -0,0 +1,279 @@
+# app/connectors/registry_manifest.py
+"""
+Handler Registry Manifest
+=========================
+
+Snapshot generado de los registries de handlers: node/tool key → módulo → clase,
+más las especificaciones de parámetros de cada handler.
+
+Con el manifest, el arranque (API, worker RQ, subproceso MCP) no necesita importar
+todos los módulos de app/handlers: factory carga el manifest y cada módulo se
+importa la primera vez que se usa uno de sus handlers.
+
+CLI:
+    python -m app.connectors.registry_manifest generate   # regenera el manifest
+    python -m app.connectors.registry_manifest check      # exit 1 si está desactualizado
+"""
+
+import hashlib
+import importlib
+import inspect
+import json
+import logging
+import pkgutil
+import sys
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Set, Tuple, Union
+
+from app.core.config import settings
+from app.exceptions.parameter_validation import ParameterSpec
+
+logger = logging.getLogger(__name__)
+
+# Versión del formato del manifest: subir si cambia la estructura
+MANIFEST_VERSION = 2
+
+HANDLERS_PACKAGE = "app.handlers"
+HANDLERS_DIR = Path(__file__).resolve().parent.parent / "handlers"
+
+_BASIC_TYPES = {t.__name__: t for t in (str, int, float, bool, list, dict, type(None))}
+
+
+def get_manifest_path() -> Path:
+    """Ruta del manifest (configurable con HANDLER_MANIFEST_PATH)"""
+    if settings.HANDLER_MANIFEST_PATH:
+        return Path(settings.HANDLER_MANIFEST_PATH)
+    return Path(__file__).resolve().parent / "handler_registry_manifest.json"
+
+
+def compute_source_fingerprint() -> str:
+    """
+    Hash del contenido de todos los .py bajo app/handlers.
+    Si cambia cualquier handler, el manifest deja de ser válido.
+    """
+    digest = hashlib.sha256(f"manifest-v{MANIFEST_VERSION}".encode())
+    for path in sorted(HANDLERS_DIR.rglob("*.py")):
+        digest.update(path.relative_to(HANDLERS_DIR).as_posix().encode())
+        digest.update(path.read_bytes())
+    return digest.hexdigest()
+
+
+# ——————————————————————————————————————————————————————————————————————————————
+# Serialización de ParameterSpec
+# ——————————————————————————————————————————————————————————————————————————————
+
+def _serialize_type(type_hint: Any) -> Union[str, Dict[str, Any]]:
+    if type_hint is Any:
+        return "Any"
+    if isinstance(type_hint, type) and type_hint.__name__ in _BASIC_TYPES:
+        return type_hint.__name__
+    if getattr(type_hint, "__origin__", None) is Union:
+        args = [_serialize_type(arg) for arg in type_hint.__args__]
+        if all(isinstance(arg, str) and arg in _BASIC_TYPES for arg in args):
+            return {"union": args}
+    # Tipos complejos no se validan en runtime: se conservan solo como referencia
+    return {"raw": repr(type_hint)}
+
+
+def _deserialize_type(data: Union[str, Dict[str, Any]]) -> Any:
+    if isinstance(data, str):
+        return _BASIC_TYPES.get(data, Any)
+    if "union" in data:
+        return Union[tuple(_BASIC_TYPES[name] for name in data["union"])]
+    return Any
+
+
+def _serialize_default(value: Any) -> Any:
+    try:
+        json.dumps(value)
+        return value
+    except (TypeError, ValueError):
+        return None
+
+
+def serialize_specs(specs: List[ParameterSpec]) -> List[Dict[str, Any]]:
+    return [
+        {
+            "name": spec.name,
+            "type": _serialize_type(spec.type_hint),
+            "required": spec.required,
+            "default": _serialize_default(spec.default_value),
+            "description": spec.description,
+        }
+        for spec in specs
+    ]
+
+
+def deserialize_specs(data: List[Dict[str, Any]]) -> List[ParameterSpec]:
+    return [
+        ParameterSpec(
+            name=item["name"],
+            type_hint=_deserialize_type(item["type"]),
+            required=item["required"],
+            default_value=item.get("default"),
+            description=item.get("description"),
+        )
+        for item in data
+    ]
+
+
+# ——————————————————————————————————————————————————————————————————————————————
+# Generación / carga
+# ——————————————————————————————————————————————————————————————————————————————
+
+def _side_registrations() -> Set[Tuple[str, str]]:
+    """
+    Entradas de los registries (fuera de node/tool) que se llenan al importar:
+    triggers, memory handlers y JSON-Schemas de BD. Un módulo que añade alguna
+    tiene que importarse siempre al arrancar.
+    """
+    from app.ai.memories.memory_factory import get_memory_registry
+    from app.handlers.trigger_registry import get_trigger_registry
+    from app.schemas.db_schema_registry import _SCHEMA_REGISTRY
+
+    entries = {("trigger", str(t)) for t in get_trigger_registry().get_all_trigger_types()}
+    entries |= {("memory", info.name) for info in get_memory_registry().list_all()}
+    entries |= {("db_schema", flavor) for flavor in _SCHEMA_REGISTRY}
+    return entries
+
+
+def build_manifest() -> Dict[str, Any]:
+    """
+    Importa todos los módulos de app/handlers (uno por uno) y registra qué
+    keys de node/tool aporta cada módulo y cuáles registran algo más al importarse.
+    """
+    from app.connectors import factory
+    from app.exceptions.parameter_validation import parameter_validator
+    import app.handlers
+
+    nodes: Dict[str, Dict[str, str]] = {}
+    tools: Dict[str, Dict[str, str]] = {}
+    eager_modules: List[str] = []
+
+    # Keys registradas antes del scan (imports transitivos): atribuir por cls.__module__
+    for registry, target in ((factory._NODE_REGISTRY, nodes), (factory._TOOL_REGISTRY, tools)):
+        for key, cls in registry.items():
+            target[key] = {"module": cls.__module__, "class": cls.__name__}
+
+    for _, module_name, _ in pkgutil.iter_modules(app.handlers.__path__):
+        module_path = f"{HANDLERS_PACKAGE}.{module_name}"
+        before_nodes = set(factory._NODE_REGISTRY)
+        before_tools = set(factory._TOOL_REGISTRY)
+        before_side = _side_registrations()
+
+        importlib.import_module(module_path)
+
+        for key in set(factory._NODE_REGISTRY) - before_nodes:
+            nodes[key] = {"module": module_path, "class": factory._NODE_REGISTRY[key].__name__}
+        for key in set(factory._TOOL_REGISTRY) - before_tools:
+            tools[key] = {"module": module_path, "class": factory._TOOL_REGISTRY[key].__name__}
+        # Módulos con efectos de import (triggers, memorias, schemas de BD) se cargan siempre al arrancar
+        if _side_registrations() - before_side:
+            eager_modules.append(module_path)
+
+    specs = {
+        key: serialize_specs(parameter_validator.get_handler_specs(key))
+        for key in sorted(set(nodes) | set(tools))
+    }
+
+    return {
+        "version": MANIFEST_VERSION,
+        "source_fingerprint": compute_source_fingerprint(),
+        "generated_at": datetime.now(timezone.utc).isoformat(),
+        "nodes": dict(sorted(nodes.items())),
+        "tools": dict(sorted(tools.items())),
+        "eager_modules": sorted(eager_modules),
+        "parameter_specs": specs,
+    }
+
+
+def write_manifest(path: Optional[Path] = None) -> Path:
+    """Genera y escribe el manifest a disco"""
+    path = path or get_manifest_path()
+    manifest = build_manifest()
+    path.write_text(json.dumps(manifest, indent=2, ensure_ascii=False, sort_keys=False) + "\n")
+    logger.info(f"Handler manifest written: {path} ({len(manifest['nodes'])} nodes, {len(manifest['tools'])} tools)")
+    return path
+
+
+def load_manifest(path: Optional[Path] = None) -> Optional[Dict[str, Any]]:
+    """
+    Carga el manifest si existe y corresponde al código actual.
+
+    Returns:
+        Dict del manifest o None si falta, es de otra versión o está desactualizado
+    """
+    path = path or get_manifest_path()
+    if not path.exists():
+        logger.info(f"Handler manifest not found at {path}")
+        return None
+
+    try:
+        manifest = json.loads(path.read_text())
+    except (OSError, ValueError) as e:
+        logger.warning(f"Handler manifest unreadable ({path}): {e}")
+        return None
+
+    if manifest.get("version") != MANIFEST_VERSION:
+        logger.warning(f"Handler manifest version mismatch: {manifest.get('version')} != {MANIFEST_VERSION}")
+        return None
+
+    if manifest.get("source_fingerprint") != compute_source_fingerprint():
+        logger.warning("Handler manifest is stale (handlers changed); run: "
+                       "python -m app.connectors.registry_manifest generate")
+        return None
+
+    return manifest
+
+
+def check_manifest(path: Optional[Path] = None) -> List[str]:
+    """
+    Compara el manifest en disco contra uno regenerado.
+
+    Returns:
+        Lista de diferencias (vacía si está al día)
+    """
+    path = path or get_manifest_path()
+    if not path.exists():
+        return [f"manifest not found: {path}"]
+
+    try:
+        on_disk = json.loads(path.read_text())
+    except ValueError as e:
+        return [f"manifest unreadable: {e}"]
+
+    fresh = build_manifest()
+    problems = []
+    for section in ("version", "source_fingerprint", "nodes", "tools", "eager_modules", "parameter_specs"):
+        if on_disk.get(section) != fresh[section]:
+            problems.append(f"section '{section}' differs from current handlers")
+    return problems
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    argv = sys.argv[1:] if argv is None else argv
+    command = argv[0] if argv else "check"
+
+    if command == "generate":
+        path = write_manifest()
+        print(f"✅ Handler manifest generated: {path}")
+        return 0
+
+    if command == "check":
+        problems = check_manifest()
+        if problems:
+            print("❌ Handler manifest is stale:")
+            for problem in problems:
+                print(f"   - {problem}")
+            print("   Run: python -m app.connectors.registry_manifest generate")
+            return 1
+        print("✅ Handler manifest is up to date")
+        return 0
+
+    print(inspect.cleandoc(__doc__ or ""))
+    return 2
+
+
+if __name__ == "__main__":
+    sys.exit(main())
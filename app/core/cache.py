@@ -9,7 +9,7 @@ Utiliza Redis como backend de almacenamiento.
 import json
 import logging
 import redis.asyncio as redis
-from typing import Any, List, Optional, Union
+from typing import Any, Dict, List, Optional, Union
 from app.core.config import settings
 
 logger = logging.getLogger(__name__)
@@ -273,4 +273,35 @@ async def close_cache_manager():
     global _cache_manager
     if _cache_manager:
         await _cache_manager.close()
-        _cache_manager = None
\ No newline at end of file
+        _cache_manager = None
+
+# Clientes redis.asyncio compartidos por URL: un pool de conexiones por proceso
+_shared_clients: Dict[str, redis.Redis] = {}
+
+
+def get_shared_redis(redis_url: Optional[str] = None) -> redis.Redis:
+    """
+    Cliente redis.asyncio (decode_responses=True) reutilizado por todos los
+    componentes que apuntan a la misma URL (kill switch, rate limiter, monitor).
+    """
+    url = redis_url or settings.REDIS_URL
+    client = _shared_clients.get(url)
+    if client is None:
+        client = _shared_clients[url] = redis.Redis.from_url(
+            url,
+            max_connections=50,
+            decode_responses=True,
+            health_check_interval=30,
+        )
+    return client
+
+
+async def close_shared_redis():
+    """Cierra los clientes compartidos."""
+    clients = list(_shared_clients.values())
+    _shared_clients.clear()
+    for client in clients:
+        try:
+            await client.close()
+        except Exception as e:
+            logger.debug(f"Error closing shared Redis client: {e}")
@@ -0,0 +1,408 @@
+"""
+Code Sandbox Pool
+=================
+
+Pool de procesos "calientes" para ejecutar el código de usuario de Code.execute.
+
+- Workers arrancados vía forkserver con pandas/numpy ya importados: un
+  reemplazo es un fork barato, no una importación en frío
+- Cada worker tiene límites rlimit (memoria RLIMIT_AS, CPU RLIMIT_CPU por tarea)
+  y su propio stdout, así que ejecuciones concurrentes no se mezclan
+- Timeout → el worker se mata (SIGKILL) y se reemplaza; un script desbocado no
+  puede quedarse quemando CPU ni bloquear el event loop
+- La espera del resultado corre en un hilo (Connection.poll), independiente del
+  event loop que llame (FastAPI o worker RQ)
+"""
+
+import builtins
+import contextlib
+import io
+import logging
+import multiprocessing
+import os
+import pickle
+import queue
+import threading
+import time
+import traceback
+import types
+from dataclasses import dataclass, field
+from typing import Any, Dict, Iterable, List, Optional, Sequence
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+try:
+    import resource
+except ImportError:  # Windows: sin rlimits, solo timeout + kill
+    resource = None
+
+# Alias con los que el código de usuario espera encontrar ciertos módulos
+_MODULE_ALIASES = {"pandas": ("pd", "pandas"), "numpy": ("np", "numpy")}
+_MAX_OUTPUT_CHARS = 1_000_000
+_PRELOADED: Dict[str, types.ModuleType] = {}
+
+
+@dataclass
+class SandboxTask:
+    code: str
+    input_data: Any
+    variables: Dict[str, Any]
+    return_variable: str
+    allowed_builtins: List[str]
+    allowed_imports: List[str]
+    timeout: float
+
+
+@dataclass
+class SandboxResult:
+    success: bool
+    result: Any = None
+    output: str = ""
+    error: str = ""
+    execution_time: float = 0.0
+    variables: Dict[str, Any] = field(default_factory=dict)
+
+
+# ----------------------------------------------------------------------
+# Lado worker (proceso hijo)
+# ----------------------------------------------------------------------
+
+def _preload(modules: Iterable[str]) -> None:
+    for name in modules:
+        try:
+            _PRELOADED[name] = __import__(name)
+        except ImportError:
+            logger.debug(f"Sandbox preload: module {name} not available")
+
+
+def _current_vm_bytes() -> int:
+    try:
+        with open("/proc/self/statm") as statm:
+            return int(statm.read().split()[0]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, AttributeError):
+        return 0
+
+
+def _apply_memory_limit(memory_mb: int) -> None:
+    if resource is None or memory_mb <= 0:
+        return
+    # Sobre lo ya mapeado por los módulos precargados: el límite es para el script
+    limit = _current_vm_bytes() + memory_mb * 1024 * 1024
+    try:
+        resource.setrlimit(resource.RLIMIT_AS, (limit, limit))
+    except (ValueError, OSError) as e:
+        logger.debug(f"Sandbox: RLIMIT_AS not applied: {e}")
+
+
+def _apply_cpu_limit(seconds: float) -> None:
+    if resource is None:
+        return
+    usage = resource.getrusage(resource.RUSAGE_SELF)
+    used = int(usage.ru_utime + usage.ru_stime)
+    soft = used + int(seconds) + 1
+    try:
+        _, hard = resource.getrlimit(resource.RLIMIT_CPU)
+        if hard != resource.RLIM_INFINITY:
+            soft = min(soft, hard)
+        # Al pasar el soft llega SIGXCPU (termina el proceso) → el pool lo reemplaza
+        resource.setrlimit(resource.RLIMIT_CPU, (soft, hard))
+    except (ValueError, OSError) as e:
+        logger.debug(f"Sandbox: RLIMIT_CPU not applied: {e}")
+
+
+def _guarded_import(allowed: frozenset):
+    def _import(name, globals=None, locals=None, fromlist=(), level=0):
+        if level != 0 or name.split(".")[0] not in allowed:
+            raise ImportError(f"Import of '{name}' is not allowed in Code.execute")
+        return __import__(name, globals, locals, fromlist, level)
+    return _import
+
+
+def _build_context(task: SandboxTask) -> Dict[str, Any]:
+    allowed_imports = frozenset(name.split(".")[0] for name in task.allowed_imports)
+    safe_builtins = {name: getattr(builtins, name) for name in task.allowed_builtins if hasattr(builtins, name)}
+    safe_builtins["__import__"] = _guarded_import(allowed_imports)
+
+    context: Dict[str, Any] = {
+        "__builtins__": safe_builtins,
+        "input_data": task.input_data,
+        "variables": dict(task.variables or {}),
+        task.return_variable: None,
+    }
+    for name in task.allowed_imports:
+        root = name.split(".")[0]
+        module = _PRELOADED.get(root)
+        if module is None:
+            try:
+                module = _PRELOADED[root] = __import__(root)
+            except ImportError:
+                continue  # Módulo no disponible, continuar
+        for alias in _MODULE_ALIASES.get(root, (root,)):
+            context[alias] = module
+    return context
+
+
+def _picklable(value: Any) -> Any:
+    try:
+        pickle.dumps(value)
+        return value
+    except Exception:
+        return repr(value)
+
+
+def _export_variables(context: Dict[str, Any]) -> Dict[str, Any]:
+    exported = {}
+    for name, value in context.items():
+        if name.startswith("__") or name in ("input_data", "variables"):
+            continue
+        if isinstance(value, (types.ModuleType, types.FunctionType, type)):
+            continue
+        exported[name] = _picklable(value)
+    return exported
+
+
+def _run_task(task: SandboxTask) -> SandboxResult:
+    start = time.perf_counter()
+    output = io.StringIO()
+    try:
+        context = _build_context(task)
+        _apply_cpu_limit(task.timeout)
+        # stdout del proceso worker: no se mezcla con otras ejecuciones
+        with contextlib.redirect_stdout(output):
+            exec(task.code, context)
+        return SandboxResult(
+            success=True,
+            result=_picklable(context.get(task.return_variable)),
+            output=output.getvalue()[:_MAX_OUTPUT_CHARS],
+            execution_time=time.perf_counter() - start,
+            variables=_export_variables(context),
+        )
+    except MemoryError:
+        return SandboxResult(
+            success=False,
+            output=output.getvalue()[:_MAX_OUTPUT_CHARS],
+            error="Execution error: memory limit exceeded",
+            execution_time=time.perf_counter() - start,
+        )
+    except BaseException as e:
+        return SandboxResult(
+            success=False,
+            output=output.getvalue()[:_MAX_OUTPUT_CHARS],
+            error=f"Execution error: {type(e).__name__}: {e}",
+            execution_time=time.perf_counter() - start,
+            variables={"traceback": traceback.format_exc(limit=5)},
+        )
+
+
+def _worker_main(conn, preload_modules: Sequence[str], memory_mb: int) -> None:
+    _preload(preload_modules)
+    _apply_memory_limit(memory_mb)
+    while True:
+        try:
+            task = conn.recv()
+        except (EOFError, OSError):
+            return
+        if task is None:
+            return
+        try:
+            conn.send(_run_task(task))
+        except Exception as e:
+            # Resultado no serializable u otro fallo de transporte
+            conn.send(SandboxResult(success=False, error=f"Execution error: {e}"))
+
+
+# ----------------------------------------------------------------------
+# Lado padre
+# ----------------------------------------------------------------------
+
+class _Worker:
+    def __init__(self, ctx, preload_modules: Sequence[str], memory_mb: int):
+        self.conn, child_conn = ctx.Pipe()
+        self.process = ctx.Process(
+            target=_worker_main,
+            args=(child_conn, list(preload_modules), memory_mb),
+            daemon=True,
+            name="code-sandbox-worker",
+        )
+        self.process.start()
+        child_conn.close()
+        self.tasks_run = 0
+
+    def kill(self) -> None:
+        with contextlib.suppress(Exception):
+            self.process.kill()
+            self.process.join(timeout=5)
+        with contextlib.suppress(Exception):
+            self.conn.close()
+
+    def stop(self) -> None:
+        with contextlib.suppress(Exception):
+            self.conn.send(None)
+            self.process.join(timeout=2)
+        if self.process.is_alive():
+            self.kill()
+        with contextlib.suppress(Exception):
+            self.conn.close()
+
+
+class CodeSandboxPool:
+    """
+    N workers persistentes. Cada ejecución toma un worker libre, le envía la
+    tarea por Pipe y espera con timeout; si vence, el worker se mata y se
+    reemplaza por otro del forkserver.
+    """
+
+    def __init__(
+        self,
+        size: int,
+        preload_modules: Sequence[str] = (),
+        memory_mb: int = 512,
+        max_tasks_per_worker: int = 200,
+        acquire_timeout: float = 60.0,
+    ):
+        self.size = max(1, size)
+        self.preload_modules = [m for m in preload_modules if m]
+        self.memory_mb = memory_mb
+        self.max_tasks_per_worker = max(1, max_tasks_per_worker)
+        self.acquire_timeout = acquire_timeout
+        self._ctx = self._make_context(self.preload_modules)
+        self._idle: "queue.Queue[_Worker]" = queue.Queue()
+        self._workers: List[_Worker] = []
+        self._lock = threading.Lock()
+        self._started = False
+        self._closed = False
+        self.stats = {"executions": 0, "timeouts": 0, "crashes": 0, "replacements": 0}
+
+    @staticmethod
+    def _make_context(preload_modules: Sequence[str]):
+        if "forkserver" in multiprocessing.get_all_start_methods():
+            ctx = multiprocessing.get_context("forkserver")
+            # Los reemplazos heredan pandas/numpy ya importados del forkserver
+            ctx.set_forkserver_preload([__name__, *preload_modules])
+            return ctx
+        return multiprocessing.get_context("spawn")
+
+    def _count(self, stat: str) -> None:
+        # run() se llama desde varios hilos (asyncio.to_thread)
+        with self._lock:
+            self.stats[stat] += 1
+
+    def _spawn(self) -> _Worker:
+        worker = _Worker(self._ctx, self.preload_modules, self.memory_mb)
+        with self._lock:
+            self._workers.append(worker)
+        return worker
+
+    def _retire(self, worker: _Worker, kill: bool) -> None:
+        if kill:
+            worker.kill()
+        else:
+            worker.stop()
+        with self._lock:
+            if worker in self._workers:
+                self._workers.remove(worker)
+        if not self._closed:
+            self._count("replacements")
+            try:
+                self._idle.put(self._spawn())
+            except Exception as e:
+                logger.error(f"Code sandbox: could not spawn replacement worker: {e}")
+
+    def start(self) -> None:
+        with self._lock:
+            if self._started:
+                return
+            self._started = True
+        for _ in range(self.size):
+            self._idle.put(self._spawn())
+        logger.info(f"Code sandbox pool started: {self.size} workers (preload={self.preload_modules})")
+
+    def run(self, task: SandboxTask) -> SandboxResult:
+        """Bloqueante: pensado para asyncio.to_thread"""
+        if self._closed:
+            raise RuntimeError("Code sandbox pool is shut down")
+        self.start()
+        try:
+            worker = self._idle.get(timeout=self.acquire_timeout)
+        except queue.Empty:
+            return SandboxResult(success=False, error="No sandbox worker available (pool saturated)")
+
+        self._count("executions")
+        # None: el worker vuelve al pool; True/False: se retira (matándolo o no)
+        retire_kill: Optional[bool] = None
+        try:
+            try:
+                worker.conn.send(task)
+            except (EOFError, OSError) as e:
+                self._count("crashes")
+                retire_kill = True
+                return SandboxResult(success=False, error=f"Execution error: sandbox worker failed ({e})")
+            except Exception as e:
+                # send() serializa antes de escribir en el pipe: el worker sigue sano
+                return SandboxResult(success=False, error=f"Execution error: input is not serializable ({e})")
+
+            if not worker.conn.poll(task.timeout):
+                self._count("timeouts")
+                retire_kill = True
+                return SandboxResult(
+                    success=False,
+                    error=f"Code execution timeout after {task.timeout} seconds",
+                    execution_time=task.timeout,
+                )
+            try:
+                result = worker.conn.recv()
+            except Exception as e:
+                # Worker muerto (SIGXCPU, OOM) o resultado ilegible
+                self._count("crashes")
+                retire_kill = True
+                return SandboxResult(success=False, error=f"Execution error: sandbox worker failed ({e})")
+
+            worker.tasks_run += 1
+            if worker.tasks_run >= self.max_tasks_per_worker:
+                # Reciclado: el código de usuario puede haber mutado módulos precargados
+                retire_kill = False
+            return result
+        except BaseException:
+            # Estado del pipe desconocido: no reutilizar el worker
+            retire_kill = True
+            raise
+        finally:
+            if retire_kill is None:
+                self._idle.put(worker)
+            else:
+                self._retire(worker, kill=retire_kill)
+
+    def shutdown(self) -> None:
+        self._closed = True
+        with self._lock:
+            workers, self._workers = list(self._workers), []
+        for worker in workers:
+            worker.stop()
+        logger.info("Code sandbox pool stopped")
+
+
+_pool: Optional[CodeSandboxPool] = None
+_pool_lock = threading.Lock()
+
+
+def get_code_sandbox_pool() -> CodeSandboxPool:
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = CodeSandboxPool(
+                size=settings.CODE_SANDBOX_POOL_SIZE,
+                preload_modules=[m.strip() for m in settings.CODE_SANDBOX_PRELOAD_MODULES.split(",")],
+                memory_mb=settings.SANDBOX_MAX_MEMORY_MB,
+                max_tasks_per_worker=settings.CODE_SANDBOX_MAX_TASKS_PER_WORKER,
+            )
+        return _pool
+
+
+def shutdown_code_sandbox_pool() -> None:
+    global _pool
+    with _pool_lock:
+        pool, _pool = _pool, None
+    if pool is not None:
+        pool.shutdown()
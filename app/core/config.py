@@ -11,6 +11,7 @@ class Settings:
     DEBUG: bool = os.getenv("DEBUG", "true").lower() in ("1", "true", "yes")
     PORT: int = int(os.getenv("PORT", 5000))
     DATABASE_URL: str = os.getenv("DATABASE_URL", "")
+    DATABASE_READ_URL: str = os.getenv("DATABASE_READ_URL", "")
 
     # LLM / OpenAI
     LLM_API_KEY: str = os.getenv("LLM_API_KEY", "")
@@ -20,6 +21,51 @@ class Settings:
     EMBED_DIMS: int = int(os.getenv("EMBED_DIMS", 1536))
     
     LLM_TIMEOUT_: float = float(os.getenv("LLM_TIMEOUT", 30.0))
+    LLM_BASE_URL: str = os.getenv("LLM_BASE_URL", "")
+    # Pool compartido de clientes SDK por (provider, base_url, hash(api_key))
+    LLM_CLIENT_POOL_MAX_SIZE: int = int(os.getenv("LLM_CLIENT_POOL_MAX_SIZE", 32))
+    LLM_CLIENT_POOL_IDLE_SECONDS: float = float(os.getenv("LLM_CLIENT_POOL_IDLE_SECONDS", 900))
+    LLM_CLIENT_MAX_CONNECTIONS: int = int(os.getenv("LLM_CLIENT_MAX_CONNECTIONS", 50))
+    # Timeout de lectura de los clientes del pool (default de los SDK OpenAI/Anthropic)
+    LLM_READ_TIMEOUT: float = float(os.getenv("LLM_READ_TIMEOUT", 600.0))
+    LLM_MODEL_INFO_CACHE_TTL: int = int(os.getenv("LLM_MODEL_INFO_CACHE_TTL", 300))
+    # Cuotas de tokens: "redis" (compartido entre réplicas) o "local"
+    TOKEN_QUOTA_BACKEND: str = os.getenv("TOKEN_QUOTA_BACKEND", "redis").lower()
+    TOKEN_USAGE_FLUSH_INTERVAL_SECONDS: float = float(os.getenv("TOKEN_USAGE_FLUSH_INTERVAL_SECONDS", 30))
+    # Rollups horarios/diarios de llm_usage_logs (analytics leen rollup + tail reciente)
+    LLM_USAGE_ROLLUPS_ENABLED: bool = os.getenv("LLM_USAGE_ROLLUPS_ENABLED", "true").lower() == "true"
+    LLM_USAGE_ROLLUP_INTERVAL_MINUTES: int = int(os.getenv("LLM_USAGE_ROLLUP_INTERVAL_MINUTES", 5))
+    # created_at = now() (inicio de la transacción): una transacción que escribe en llm_usage_logs
+    # y confirma más de LAG minutos después de empezar queda fuera de los rollups para siempre
+    LLM_USAGE_ROLLUP_LAG_MINUTES: int = int(os.getenv("LLM_USAGE_ROLLUP_LAG_MINUTES", 15))
+    LLM_USAGE_ROLLUP_MAX_WINDOW_HOURS: int = int(os.getenv("LLM_USAGE_ROLLUP_MAX_WINDOW_HOURS", 168))
+    # Memoria episódica en agent_memories (pgvector)
+    EPISODIC_MEMORY_MAX_EPISODES: int = int(os.getenv("EPISODIC_MEMORY_MAX_EPISODES", 1000))
+    EPISODIC_MEMORY_MAX_DISTANCE: float = float(os.getenv("EPISODIC_MEMORY_MAX_DISTANCE", 0.6))
+    # Compresión de memorias por clustering de embeddings
+    MEMORY_COMPRESSION_MAX_MEMORIES: int = int(os.getenv("MEMORY_COMPRESSION_MAX_MEMORIES", 50000))
+    # similarity_clustering agrupa por páginas: embeddings en memoria a la vez
+    MEMORY_COMPRESSION_PAGE_SIZE: int = int(os.getenv("MEMORY_COMPRESSION_PAGE_SIZE", 5000))
+    MEMORY_COMPRESSION_SIMILARITY_THRESHOLD: float = float(os.getenv("MEMORY_COMPRESSION_SIMILARITY_THRESHOLD", 0.9))
+    MEMORY_COMPRESSION_TEXT_THRESHOLD: float = float(os.getenv("MEMORY_COMPRESSION_TEXT_THRESHOLD", 0.7))
+    MEMORY_COMPRESSION_BATCH_SIZE: int = int(os.getenv("MEMORY_COMPRESSION_BATCH_SIZE", 500))
+    # MemorySearchHandler híbrido (léxico + vector + recencia, RRF)
+    MEMORY_SEARCH_CANDIDATE_MULTIPLIER: int = int(os.getenv("MEMORY_SEARCH_CANDIDATE_MULTIPLIER", 4))
+    MEMORY_SEARCH_RECENCY_HALF_LIFE_DAYS: float = float(os.getenv("MEMORY_SEARCH_RECENCY_HALF_LIFE_DAYS", 30))
+    # Ingesta RAG de agentes (rag_chunks, pgvector HNSW)
+    RAG_EMBEDDING_PROVIDER: str = os.getenv("RAG_EMBEDDING_PROVIDER", "openai")  # "openai" o "local" (offline)
+    RAG_EMBED_BATCH_SIZE: int = int(os.getenv("RAG_EMBED_BATCH_SIZE", 100))
+    RAG_INGEST_CONCURRENCY: int = int(os.getenv("RAG_INGEST_CONCURRENCY", 4))
+    RAG_HNSW_EF_SEARCH: int = int(os.getenv("RAG_HNSW_EF_SEARCH", 100))
+    # Caché de embeddings: L1 LRU en proceso + L2 Redis compartido, micro-batching al proveedor
+    EMBEDDING_CACHE_ENABLED: bool = os.getenv("EMBEDDING_CACHE_ENABLED", "true").lower() == "true"
+    EMBEDDING_CACHE_SIZE: int = int(os.getenv("EMBEDDING_CACHE_SIZE", 10000))
+    EMBEDDING_REDIS_CACHE_ENABLED: bool = os.getenv("EMBEDDING_REDIS_CACHE_ENABLED", "true").lower() == "true"
+    EMBEDDING_CACHE_TTL_SECONDS: int = int(os.getenv("EMBEDDING_CACHE_TTL_SECONDS", 30 * 24 * 3600))
+    EMBEDDING_BATCH_WINDOW_MS: float = float(os.getenv("EMBEDDING_BATCH_WINDOW_MS", 5))
+    EMBEDDING_MAX_BATCH_SIZE: int = int(os.getenv("EMBEDDING_MAX_BATCH_SIZE", 256))
+    # Tools read_only o con depends_on que corren en paralelo por iteración de agente (1 = secuencial)
+    AGENT_TOOL_CONCURRENCY: int = int(os.getenv("AGENT_TOOL_CONCURRENCY", 4))
 
     # OAuth
     OAUTH_CALLBACK_URL: str = os.getenv(
@@ -66,7 +112,49 @@ class Settings:
     HTTPX_MAX_KEEPALIVE: int = int(os.getenv("HTTPX_MAX_KEEPALIVE", 20))
     HTTPX_CONNECT_TIMEOUT: float = float(os.getenv("HTTPX_CONNECT_TIMEOUT", 2.0))
     HTTPX_READ_TIMEOUT: float = float(os.getenv("HTTPX_READ_TIMEOUT", 5.0))
+
+    # Webhook de bots de Telegram: cache de contexto, stream de updates y límites de envío
+    TELEGRAM_BOT_CONTEXT_TTL_SECONDS: int = int(os.getenv("TELEGRAM_BOT_CONTEXT_TTL_SECONDS", 300))
+    # agent_id inexistentes: webhooks basura no consultan la DB en cada request
+    TELEGRAM_BOT_CONTEXT_MISS_TTL_SECONDS: int = int(os.getenv("TELEGRAM_BOT_CONTEXT_MISS_TTL_SECONDS", 60))
+    TELEGRAM_UPDATES_STREAM: str = os.getenv("TELEGRAM_UPDATES_STREAM", "telegram:updates")
+    TELEGRAM_UPDATES_STREAM_MAXLEN: int = int(os.getenv("TELEGRAM_UPDATES_STREAM_MAXLEN", 100000))
+    TELEGRAM_SENDER_CONCURRENCY: int = int(os.getenv("TELEGRAM_SENDER_CONCURRENCY", 16))
+    # Límites de envío de Telegram, por bot (global) y por chat de ese bot
+    TELEGRAM_GLOBAL_MSGS_PER_SECOND: float = float(os.getenv("TELEGRAM_GLOBAL_MSGS_PER_SECOND", 30))
+    TELEGRAM_CHAT_MSGS_PER_SECOND: float = float(os.getenv("TELEGRAM_CHAT_MSGS_PER_SECOND", 1))
+    TELEGRAM_GROUP_MSGS_PER_MINUTE: float = float(os.getenv("TELEGRAM_GROUP_MSGS_PER_MINUTE", 20))
+
+    # Dedup de mensajes de chat entre workers/réplicas (claim Redis + pub/sub)
+    CHAT_DEDUP_ENABLED: bool = os.getenv("CHAT_DEDUP_ENABLED", "true").lower() == "true"
+    CHAT_DEDUP_CLAIM_TTL_MS: int = int(os.getenv("CHAT_DEDUP_CLAIM_TTL_MS", 180000))
+    CHAT_DEDUP_RESULT_TTL_MS: int = int(os.getenv("CHAT_DEDUP_RESULT_TTL_MS", 5000))
+    CHAT_DEDUP_WAIT_SECONDS: float = float(os.getenv("CHAT_DEDUP_WAIT_SECONDS", 180))
+
+    # Snapshot de auth policies por proceso (versión en Redis)
+    AUTH_POLICY_SNAPSHOT_CHECK_SECONDS: float = float(os.getenv("AUTH_POLICY_SNAPSHOT_CHECK_SECONDS", 5))
+    AUTH_POLICY_SNAPSHOT_MAX_AGE_SECONDS: float = float(os.getenv("AUTH_POLICY_SNAPSHOT_MAX_AGE_SECONDS", 600))
+
+    # Descarga masiva CFDI del SAT
+    SAT_MAX_REQUESTS_PER_DAY: int = int(os.getenv("SAT_MAX_REQUESTS_PER_DAY", 50))
+    SAT_MAX_CONCURRENT_DOWNLOADS: int = int(os.getenv("SAT_MAX_CONCURRENT_DOWNLOADS", 4))
+    SAT_POLL_MAX_RETRIES: int = int(os.getenv("SAT_POLL_MAX_RETRIES", 8))
+    SAT_POLL_MAX_INTERVAL_SECONDS: float = float(os.getenv("SAT_POLL_MAX_INTERVAL_SECONDS", 60))
+
+    # Validación JSON-Schema: "jsonschema" (Draft7Validator) o "fastjsonschema" (código generado)
+    JSON_SCHEMA_BACKEND: str = os.getenv("JSON_SCHEMA_BACKEND", "jsonschema")
+
     DB_MAX_CONCURRENT_QUERIES: int = int(os.getenv("DB_MAX_CONCURRENT_QUERIES", 20))
+
+    # Pools de SQLAlchemy (primario y réplica de lectura)
+    DB_POOL_SIZE: int = int(os.getenv("DB_POOL_SIZE", 10))
+    DB_MAX_OVERFLOW: int = int(os.getenv("DB_MAX_OVERFLOW", 20))
+    DB_READ_POOL_SIZE: int = int(os.getenv("DB_READ_POOL_SIZE", os.getenv("DB_POOL_SIZE", 10)))
+    DB_READ_MAX_OVERFLOW: int = int(os.getenv("DB_READ_MAX_OVERFLOW", os.getenv("DB_MAX_OVERFLOW", 20)))
+    DB_POOL_RECYCLE_SECONDS: int = int(os.getenv("DB_POOL_RECYCLE_SECONDS", 1800))
+    DB_POOL_PRE_PING: bool = os.getenv("DB_POOL_PRE_PING", "true").lower() == "true"
+    DB_POOL_TIMEOUT_SECONDS: float = float(os.getenv("DB_POOL_TIMEOUT_SECONDS", 30))
+    DB_STATEMENT_CACHE_SIZE: int = int(os.getenv("DB_STATEMENT_CACHE_SIZE", 100))
     MAX_CONCURRENT_REQUESTS: int = int(os.getenv("MAX_CONCURRENT_REQUESTS",10))
     LLM_CIRCUIT_BREAKER_THRESHOLD: int = int(os.getenv("LLM_CIRCUIT_BREAKER_THRESHOLD", 5))
 
@@ -74,6 +162,8 @@ class Settings:
     REDIS_URL: str = os.getenv("REDIS_URL", "redis://localhost:6379")
     CACHE_TTL_SECONDS: int = int(os.getenv("CACHE_TTL_SECONDS", 3600))
     PLAN_CACHE_TTL : int = int(os.getenv("PLAN_CACHE_TTL", 300))
+    # Worker RQ de agent_runs: jobs async concurrentes por proceso (un solo event loop)
+    AGENT_WORKER_CONCURRENCY: int = int(os.getenv("AGENT_WORKER_CONCURRENCY", 8))
     
     #schedule redis configuration
     SCHEDULER_REDIS_DB: int = int(os.getenv("SCHEDULER_REDIS_DB", 1))
@@ -99,15 +189,26 @@ class Settings:
     SANDBOX_MAX_MEMORY_MB: int = int(os.getenv("SANDBOX_MAX_MEMORY_MB", 512))
     SANDBOX_MAX_CPU_PERCENT: float = float(os.getenv("SANDBOX_MAX_CPU_PERCENT", 80.0))
     SANDBOX_MAX_NETWORK_REQUESTS: int = int(os.getenv("SANDBOX_MAX_NETWORK_REQUESTS", 10))
+    # Pool de procesos calientes para Code.execute (memoria por worker: SANDBOX_MAX_MEMORY_MB)
+    CODE_SANDBOX_POOL_SIZE: int = int(os.getenv("CODE_SANDBOX_POOL_SIZE", min(4, os.cpu_count() or 1)))
+    CODE_SANDBOX_PRELOAD_MODULES: str = os.getenv("CODE_SANDBOX_PRELOAD_MODULES", "pandas,numpy")
+    CODE_SANDBOX_MAX_TASKS_PER_WORKER: int = int(os.getenv("CODE_SANDBOX_MAX_TASKS_PER_WORKER", 200))
     
     # Handler Validation Configuration
     HANDLER_VALIDATION_LEVEL: str = os.getenv("HANDLER_VALIDATION_LEVEL", "standard")  # basic, standard, strict, paranoid
     HANDLER_VALIDATION_CACHE_TTL: int = int(os.getenv("HANDLER_VALIDATION_CACHE_TTL", 86400))  # 24 hours
+    HANDLER_VALIDATION_CACHE_SIZE: int = int(os.getenv("HANDLER_VALIDATION_CACHE_SIZE", 2048))  # Reportes en memoria por proceso
+    HANDLER_VALIDATION_WORKERS: int = int(os.getenv("HANDLER_VALIDATION_WORKERS", 2))  # 0 = analizar en hilo, sin process pool
     
     # Security Monitoring Configuration
     SECURITY_ALERT_WEBHOOK_URL: str = os.getenv("SECURITY_ALERT_WEBHOOK_URL", "")
     SECURITY_MONITOR_RETENTION_DAYS: int = int(os.getenv("SECURITY_MONITOR_RETENTION_DAYS", 7))
     SECURITY_METRICS_COLLECTION_INTERVAL: int = int(os.getenv("SECURITY_METRICS_COLLECTION_INTERVAL", 10))  # seconds
+    
+    # Handler Registry Manifest (arranque lazy de handlers)
+    # Si el manifest existe y está al día, scan_handlers() no importa todos los handlers.
+    HANDLER_MANIFEST_ENABLED: bool = os.getenv("HANDLER_MANIFEST_ENABLED", "true").lower() in ("1", "true", "yes")
+    HANDLER_MANIFEST_PATH: str = os.getenv("HANDLER_MANIFEST_PATH", "")
     # ——————————————————————————————————————————————————————————————————————————————————
     # Variables de CAG (Cache-Augmented Generation)
     # Si es True, se omite la búsqueda semántica y se utiliza el catálogo
@@ -126,6 +227,10 @@ class Settings:
         "OTEL_ENDPOINT",
         "http://otel-collector:4318/v1/traces",
     )
+    # Métricas por etapa (/metrics) y spans OTLP; desactivado = no-op
+    TELEMETRY_ENABLED: bool = os.getenv("TELEMETRY_ENABLED", "false").lower() in ("1", "true", "yes")
+    OTEL_TRACING_ENABLED: bool = os.getenv("OTEL_TRACING_ENABLED", "false").lower() in ("1", "true", "yes")
+    OTEL_SERVICE_NAME: str = os.getenv("OTEL_SERVICE_NAME", "kyra-api")
     
     #DROPBOX AUTH--------------------------------------------------------
     DROPBOX_CLIENT_ID: str = os.getenv("DROPBOX_CLIENT_ID", "")
@@ -146,6 +251,9 @@ class Settings:
     
     # Discovery Configuration
     DISCOVERY_MAX_FILES_PER_PROVIDER: int = int(os.getenv("DISCOVERY_MAX_FILES_PER_PROVIDER", "10"))
+    DISCOVERY_PROVIDER_TIMEOUT_SECONDS: float = float(os.getenv("DISCOVERY_PROVIDER_TIMEOUT_SECONDS", "8.0"))
+    DISCOVERY_CACHE_ENABLED: bool = os.getenv("DISCOVERY_CACHE_ENABLED", "true").lower() in ("1", "true", "yes")
+    DISCOVERY_CACHE_TTL_SECONDS: int = int(os.getenv("DISCOVERY_CACHE_TTL_SECONDS", "900"))
     
     # Workflow Engine Configuration
     WORKFLOW_PARALLEL_DISCOVERY: bool = os.getenv("WORKFLOW_PARALLEL_DISCOVERY", "true").lower() in ("1", "true", "yes")
@@ -0,0 +1,245 @@
+"""
+Telemetría por etapa del pipeline chat → plan → ejecución
+
+- Histogramas en formato Prometheus (sin dependencias) expuestos en /metrics
+- Spans OpenTelemetry opcionales (opentelemetry-sdk + exporter OTLP)
+- Con TELEMETRY_ENABLED=false todo es no-op: `traced` solo comprueba un flag
+
+Uso::
+
+    from app.core.telemetry import traced, stage_timer
+
+    @traced("planner.unified_planning")
+    async def unified_workflow_planning(...): ...
+
+    with stage_timer("redis.get", key_prefix="cag"):
+        ...
+"""
+
+import functools
+import inspect
+import logging
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Tuple
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+# Buckets en segundos: de consultas Redis (~1ms) a llamadas LLM (~60s)
+DEFAULT_BUCKETS: Tuple[float, ...] = (
+    0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5,
+    1.0, 2.5, 5.0, 10.0, 30.0, 60.0,
+)
+
+STAGE_METRIC_NAME = "kyra_stage_duration_seconds"
+
+
+class Histogram:
+    """
+    Histograma acumulativo con labels, compatible con el formato de texto de Prometheus.
+    Thread-safe: los listeners de SQLAlchemy corren fuera del event loop.
+    """
+
+    def __init__(self, name: str, documentation: str, label_names: Tuple[str, ...],
+                 buckets: Tuple[float, ...] = DEFAULT_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.label_names = label_names
+        self.buckets = tuple(sorted(buckets))
+        self._series: Dict[Tuple[str, ...], List[float]] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, *label_values: str) -> None:
+        with self._lock:
+            # [bucket_0 .. bucket_n, +Inf, sum]
+            series = self._series.get(label_values)
+            if series is None:
+                series = self._series[label_values] = [0.0] * (len(self.buckets) + 2)
+            for index, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series[index] += 1
+                    break
+            else:
+                series[len(self.buckets)] += 1
+            series[-1] += value
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            snapshot = {labels: list(series) for labels, series in self._series.items()}
+        for label_values, series in sorted(snapshot.items()):
+            base = ",".join(
+                f'{name}="{_escape_label(value)}"' for name, value in zip(self.label_names, label_values)
+            )
+            cumulative = 0.0
+            for bound, count in zip(self.buckets, series):
+                cumulative += count
+                lines.append(f'{self.name}_bucket{{{base},le="{bound}"}} {cumulative:g}')
+            cumulative += series[len(self.buckets)]
+            lines.append(f'{self.name}_bucket{{{base},le="+Inf"}} {cumulative:g}')
+            lines.append(f"{self.name}_sum{{{base}}} {series[-1]:.6f}")
+            lines.append(f"{self.name}_count{{{base}}} {cumulative:g}")
+        return lines
+
+
+def _escape_label(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+class _TelemetryState:
+    def __init__(self):
+        self.enabled = settings.TELEMETRY_ENABLED
+        self.tracer = None
+        self.stage_histogram = Histogram(
+            STAGE_METRIC_NAME,
+            "Duración por etapa del pipeline chat/plan/ejecución",
+            ("stage", "status"),
+        )
+
+
+_state = _TelemetryState()
+
+
+def is_enabled() -> bool:
+    return _state.enabled
+
+
+def configure_telemetry() -> None:
+    """
+    Activa métricas y, si está disponible opentelemetry-sdk, el exporter OTLP.
+    Se llama una vez en el lifespan de FastAPI; idempotente.
+    """
+    if not settings.TELEMETRY_ENABLED:
+        logger.info("📊 Telemetry disabled (TELEMETRY_ENABLED=false)")
+        return
+    _state.enabled = True
+    _instrument_db_engine()
+
+    if not settings.OTEL_TRACING_ENABLED or _state.tracer is not None:
+        return
+    try:
+        from opentelemetry import trace
+        from opentelemetry.sdk.resources import Resource
+        from opentelemetry.sdk.trace import TracerProvider
+        from opentelemetry.sdk.trace.export import BatchSpanProcessor
+        from opentelemetry.exporter.otlp.proto.http.trace_exporter import OTLPSpanExporter
+    except ImportError:
+        logger.warning("📊 opentelemetry-sdk no instalado: solo métricas Prometheus")
+        return
+
+    provider = TracerProvider(resource=Resource.create({"service.name": settings.OTEL_SERVICE_NAME}))
+    provider.add_span_processor(BatchSpanProcessor(OTLPSpanExporter(endpoint=settings.OTEL_ENDPOINT)))
+    trace.set_tracer_provider(provider)
+    _state.tracer = trace.get_tracer("kyra")
+    logger.info(f"📊 OTLP tracing enabled → {settings.OTEL_ENDPOINT}")
+
+
+def shutdown_telemetry() -> None:
+    """Vacía los spans pendientes del exporter al apagar."""
+    if _state.tracer is None:
+        return
+    try:
+        from opentelemetry import trace
+        provider = trace.get_tracer_provider()
+        if hasattr(provider, "shutdown"):
+            provider.shutdown()
+    except Exception as e:
+        logger.debug(f"Error cerrando tracer provider: {e}")
+
+
+def observe_stage(stage: str, seconds: float, status: str = "ok") -> None:
+    """Registra una duración ya medida (p.ej. desde listeners de SQLAlchemy)."""
+    if _state.enabled:
+        _state.stage_histogram.observe(seconds, stage, status)
+
+
+@contextmanager
+def stage_timer(stage: str, **attributes: Any) -> Iterator[None]:
+    """Mide un bloque como etapa: histograma + span OTel (si hay tracer)."""
+    if not _state.enabled:
+        yield
+        return
+
+    span_cm = _state.tracer.start_as_current_span(stage, attributes=attributes) if _state.tracer else None
+    span = span_cm.__enter__() if span_cm else None
+    start = time.perf_counter()
+    status = "ok"
+    try:
+        yield
+    except BaseException as e:
+        status = "error"
+        if span is not None:
+            span.record_exception(e)
+        raise
+    finally:
+        _state.stage_histogram.observe(time.perf_counter() - start, stage, status)
+        if span_cm is not None:
+            span_cm.__exit__(None, None, None)
+
+
+def traced(stage: str, **attributes: Any):
+    """
+    Decorador para funciones sync/async. Con telemetría desactivada el costo
+    es una comprobación de flag por llamada.
+    """
+    def decorator(func):
+        if inspect.iscoroutinefunction(func):
+            @functools.wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                if not _state.enabled:
+                    return await func(*args, **kwargs)
+                with stage_timer(stage, **attributes):
+                    return await func(*args, **kwargs)
+            return async_wrapper
+
+        @functools.wraps(func)
+        def sync_wrapper(*args, **kwargs):
+            if not _state.enabled:
+                return func(*args, **kwargs)
+            with stage_timer(stage, **attributes):
+                return func(*args, **kwargs)
+        return sync_wrapper
+
+    return decorator
+
+
+def render_metrics() -> str:
+    """Exposición en formato de texto de Prometheus para /metrics."""
+    return "\n".join(_state.stage_histogram.render()) + "\n"
+
+
+def _instrument_db_engine() -> None:
+    """Tiempo por consulta SQL vía eventos del engine síncrono subyacente."""
+    try:
+        from sqlalchemy import event
+        from app.db.database import get_engines
+    except ImportError:
+        return
+
+    for role, async_engine in get_engines().items():
+        _instrument_sync_engine(event, async_engine.sync_engine, "db.query" if role == "primary" else f"db.query.{role}")
+
+
+def _instrument_sync_engine(event, sync_engine, stage: str) -> None:
+    if getattr(sync_engine, "_kyra_telemetry", False):
+        return
+    sync_engine._kyra_telemetry = True
+
+    @event.listens_for(sync_engine, "before_cursor_execute")
+    def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("_kyra_query_start", []).append(time.perf_counter())
+
+    @event.listens_for(sync_engine, "after_cursor_execute")
+    def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        starts = conn.info.get("_kyra_query_start")
+        if starts:
+            observe_stage(stage, time.perf_counter() - starts.pop())
+
+    @event.listens_for(sync_engine, "handle_error")
+    def _handle_error(exception_context):
+        starts = exception_context.connection.info.get("_kyra_query_start") if exception_context.connection else None
+        if starts:
+            observe_stage(stage, time.perf_counter() - starts.pop(), "error")
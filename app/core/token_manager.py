@@ -6,6 +6,7 @@ from decimal import Decimal
 from enum import Enum
 import asyncio
 import logging
+import time
 
 logger = logging.getLogger(__name__)
 
@@ -83,6 +84,52 @@ class TokenStorage(Protocol):
         """Update user subscription usage"""
         ...
 
+@runtime_checkable
+class UsageCounter(Protocol):
+    """
+    Protocol for monthly usage counters used by quota checks.
+    Shared backends (Redis) keep checks consistent across replicas.
+    """
+    
+    async def get_usage(self, user_id: int) -> Optional[int]:
+        """Current month usage, or None if the counter is not seeded"""
+        ...
+    
+    async def add_usage(self, user_id: int, tokens: int) -> Optional[int]:
+        """Increment an existing counter; None if it is not seeded"""
+        ...
+    
+    async def seed_usage(self, user_id: int, baseline: int, delta: int = 0) -> int:
+        """Create the counter with baseline + delta if missing (otherwise add delta); returns the total"""
+        ...
+
+class LocalUsageCounter:
+    """Per-process counter (single replica / tests)"""
+    
+    def __init__(self):
+        self._usage: Dict[int, int] = {}
+    
+    async def get_usage(self, user_id: int) -> Optional[int]:
+        return self._usage.get(user_id)
+    
+    async def add_usage(self, user_id: int, tokens: int) -> Optional[int]:
+        if user_id not in self._usage:
+            return None
+        self._usage[user_id] += tokens
+        return self._usage[user_id]
+    
+    async def seed_usage(self, user_id: int, baseline: int, delta: int = 0) -> int:
+        if user_id not in self._usage:
+            self._usage[user_id] = baseline
+        self._usage[user_id] += delta
+        return self._usage[user_id]
+    
+    def clear(self, user_id: Optional[int] = None):
+        if user_id:
+            self._usage.pop(user_id, None)
+        else:
+            self._usage.clear()
+
 @runtime_checkable 
 class AlertSystem(Protocol):
     """Protocol for alert systems"""
@@ -139,21 +186,25 @@ class TokenManager:
         self, 
         storage: TokenStorage,
         alert_system: Optional[AlertSystem] = None,
-        batch_size: int = 10
+        batch_size: int = 10,
+        counter: Optional[UsageCounter] = None,
+        flush_interval_seconds: float = 30.0
     ):
         self.storage = storage
         self.alert_system = alert_system
         self.batch_size = batch_size
-        self._usage_cache: Dict[int, int] = {}  # Simple in-memory cache
+        self.counter: UsageCounter = counter or LocalUsageCounter()
+        self.flush_interval_seconds = flush_interval_seconds
         self._batch_queue: list[TokenUsage] = []
-        self._processing_batch = False
+        self._batch_lock = asyncio.Lock()
+        self._last_flush = time.monotonic()
     
     async def can_use_tokens(self, user_id: int, estimated_tokens: int) -> UsageStatus:
         """
         Fast check if user can use estimated tokens
         """
         try:
-            # Get cached or fresh usage
+            # One counter read (Redis GET) in the common case
             current_usage = await self._get_cached_usage(user_id)
             plan_config = self.PLANS[PlanType.BASIC]  # TODO: Get user's actual plan
             
@@ -188,20 +239,26 @@ class TokenManager:
         Record token usage with batching for performance
         """
         try:
-            # Add to batch queue
+            # Add to batch queue (durable write happens on flush)
             self._batch_queue.append(usage)
             
-            # Update cache immediately for fast checks
-            current = self._usage_cache.get(usage.user_id, 0)
-            self._usage_cache[usage.user_id] = current + usage.total_tokens
+            # Update shared counter immediately for fast checks
+            current_usage = await self.counter.add_usage(usage.user_id, usage.total_tokens)
+            if current_usage is None:
+                # Counter not seeded (new month / Redis restart): baseline from storage
+                baseline = await self.storage.get_monthly_usage(usage.user_id)
+                current_usage = await self.counter.seed_usage(usage.user_id, baseline, usage.total_tokens)
             
-            # Process batch if full
-            if len(self._batch_queue) >= self.batch_size:
+            # Process batch if full or stale
+            if (
+                len(self._batch_queue) >= self.batch_size
+                or time.monotonic() - self._last_flush >= self.flush_interval_seconds
+            ):
                 asyncio.create_task(self._process_batch())
             
             # Send alerts asynchronously
             if self.alert_system:
-                asyncio.create_task(self._check_alerts(usage.user_id))
+                asyncio.create_task(self._check_alerts(usage.user_id, current_usage))
             
             return True
             
@@ -211,47 +268,45 @@ class TokenManager:
     
     async def _get_cached_usage(self, user_id: int) -> int:
         """
-        Get usage from cache or storage
+        Get usage from the counter, seeding it from storage on miss
         """
-        if user_id not in self._usage_cache:
-            # Cache miss - load from storage
+        usage = await self.counter.get_usage(user_id)
+        if usage is None:
+            # Counter miss - load from storage
             usage = await self.storage.get_monthly_usage(user_id)
-            self._usage_cache[user_id] = usage
+            usage = await self.counter.seed_usage(user_id, usage)
         
-        return self._usage_cache[user_id]
+        return usage
     
     async def _process_batch(self):
         """
-        Process batch of token usage records
+        Process batch of token usage records: one multi-row insert and one
+        grouped subscription update per flush
         """
-        if self._processing_batch or not self._batch_queue:
-            return
-        
-        self._processing_batch = True
-        current_batch = self._batch_queue.copy()
-        self._batch_queue.clear()
-        
-        try:
-            # Process all records in batch
-            tasks = []
-            for usage in current_batch:
-                tasks.append(self.storage.record_usage(usage))
-                tasks.append(self.storage.update_subscription(usage.user_id, usage.total_tokens))
+        async with self._batch_lock:
+            if not self._batch_queue:
+                return
             
-            # Execute all storage operations concurrently
-            results = await asyncio.gather(*tasks, return_exceptions=True)
+            current_batch = self._batch_queue.copy()
+            self._batch_queue.clear()
+            self._last_flush = time.monotonic()
             
-            # Log any errors
-            for i, result in enumerate(results):
-                if isinstance(result, Exception):
-                    logger.error(f"Batch processing error {i}: {result}")
-                    
-        except Exception as e:
-            logger.error(f"Critical error in batch processing: {e}")
-        finally:
-            self._processing_batch = False
+            try:
+                if hasattr(self.storage, "batch_record_usage"):
+                    ok = await self.storage.batch_record_usage(current_batch)
+                    if not ok:
+                        logger.error(f"Batch processing failed for {len(current_batch)} usage records")
+                    return
+                
+                # Fallback for storages without batch support (sequential: shared session)
+                for usage in current_batch:
+                    await self.storage.record_usage(usage)
+                    await self.storage.update_subscription(usage.user_id, usage.total_tokens)
+                        
+            except Exception as e:
+                logger.error(f"Critical error in batch processing: {e}")
     
-    async def _check_alerts(self, user_id: int):
+    async def _check_alerts(self, user_id: int, current_usage: Optional[int] = None):
         """
         Check and send usage alerts
         """
@@ -259,7 +314,8 @@ class TokenManager:
             return
         
         try:
-            current_usage = await self._get_cached_usage(user_id)
+            if current_usage is None:
+                current_usage = await self._get_cached_usage(user_id)
             plan_config = self.PLANS[PlanType.BASIC]  # TODO: Get user's actual plan
             
             usage_percentage = (current_usage / plan_config.monthly_token_limit) * 100
@@ -284,13 +340,10 @@ class TokenManager:
         return self.PLANS[plan_type]
     
     async def flush_batch(self):
-        """Force process remaining batch items"""
-        if self._batch_queue:
-            await self._process_batch()
+        """Force process remaining batch items (also waits for an in-flight flush)"""
+        await self._process_batch()
     
     def clear_cache(self, user_id: Optional[int] = None):
-        """Clear usage cache"""
-        if user_id:
-            self._usage_cache.pop(user_id, None)
-        else:
-            self._usage_cache.clear()
\ No newline at end of file
+        """Clear local usage cache (shared counters expire at month rollover)"""
+        if isinstance(self.counter, LocalUsageCounter):
+            self.counter.clear(user_id)
\ No newline at end of file
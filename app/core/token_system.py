@@ -4,8 +4,9 @@ from typing import Optional, Dict, Any
 from sqlalchemy.ext.asyncio import AsyncSession
 import logging
 
-from app.core.token_manager import TokenManager
-from app.services.token_storage_service import DatabaseTokenStorage
+from app.core.config import settings
+from app.core.token_manager import TokenManager, LocalUsageCounter
+from app.services.token_storage_service import DatabaseTokenStorage, RedisUsageCounter
 from app.services.token_alert_service import (
     MultiChannelAlertSystem, 
     create_basic_alert_system,
@@ -29,8 +30,15 @@ class TokenSystemFactory:
         """
         Create optimized token manager with all components
         """
-        # Create storage
-        storage = DatabaseTokenStorage(db)
+        # Create storage (flushes use their own sessions, not the startup one)
+        from app.db.database import async_session
+        storage = DatabaseTokenStorage(db, session_factory=async_session)
+        
+        # Quota counters: Redis keeps checks consistent across replicas
+        if settings.TOKEN_QUOTA_BACKEND == "redis":
+            counter = RedisUsageCounter(settings.REDIS_URL)
+        else:
+            counter = LocalUsageCounter()
         
         # Create alert system
         if alert_config:
@@ -45,7 +53,9 @@ class TokenSystemFactory:
         return TokenManager(
             storage=storage,
             alert_system=alert_system,
-            batch_size=batch_size
+            batch_size=batch_size,
+            counter=counter,
+            flush_interval_seconds=settings.TOKEN_USAGE_FLUSH_INTERVAL_SECONDS
         )
     
     # @staticmethod
@@ -77,6 +87,21 @@ def initialize_token_system(
     
     logger.info("✅ Token system initialized")
 
+async def shutdown_token_system():
+    """
+    Flush pending usage records on shutdown
+    """
+    if _token_manager is None:
+        return
+    try:
+        await _token_manager.flush_batch()
+        close = getattr(_token_manager.counter, "close", None)
+        if close:
+            await close()
+        logger.info("✅ Token system flushed")
+    except Exception as e:
+        logger.error(f"❌ Error flushing token system: {e}")
+
 def get_token_manager() -> TokenManager:
     """Get global token manager"""
     if _token_manager is None:
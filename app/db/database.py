@@ -1,22 +1,56 @@
 import os
-from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import create_async_engine, AsyncEngine, AsyncSession
 from sqlalchemy.orm import sessionmaker, declarative_base
 from app.core.config import settings
-from typing import AsyncGenerator
-# Asume que settings.DATABASE_URL usa el esquema postgresql://
-# Para el engine asíncrono, reemplazamos por asyncpg:
-ASYNC_DATABASE_URL = (
-    settings.DATABASE_URL.replace(
-        "postgresql://", "postgresql+asyncpg://"
+from app.core.telemetry import stage_timer
+from typing import AsyncGenerator, Dict, Optional
+
+
+def _to_async_url(url: str) -> str:
+    # Asume que la URL usa el esquema postgresql://
+    # Para el engine asíncrono, reemplazamos por asyncpg:
+    return url.replace("postgresql://", "postgresql+asyncpg://")
+
+
+ASYNC_DATABASE_URL = _to_async_url(settings.DATABASE_URL)
+# Réplica de solo lectura opcional; sin ella las lecturas van al primario
+ASYNC_READ_DATABASE_URL = _to_async_url(settings.DATABASE_READ_URL) if settings.DATABASE_READ_URL else None
+
+
+def _create_engine(url: str, pool_size: int, max_overflow: int, read_only: bool = False) -> AsyncEngine:
+    connect_args: Dict = {}
+    if make_url(url).drivername == "postgresql+asyncpg":
+        # Cache de prepared statements de asyncpg (0 lo desactiva, necesario con pgbouncer en modo transaction)
+        # render_as_string: str(URL) enmascara la contraseña como ***
+        url = make_url(url).update_query_dict(
+            {"prepared_statement_cache_size": str(settings.DB_STATEMENT_CACHE_SIZE)}
+        ).render_as_string(hide_password=False)
+        connect_args["statement_cache_size"] = settings.DB_STATEMENT_CACHE_SIZE
+        if read_only:
+            # Aunque el DSN apunte al primario, esta sesión no puede escribir
+            connect_args["server_settings"] = {"default_transaction_read_only": "on"}
+
+    return create_async_engine(
+        url,
+        echo=settings.DEBUG,
+        future=True,
+        pool_size=pool_size,
+        max_overflow=max_overflow,
+        pool_recycle=settings.DB_POOL_RECYCLE_SECONDS,
+        pool_pre_ping=settings.DB_POOL_PRE_PING,
+        pool_timeout=settings.DB_POOL_TIMEOUT_SECONDS,
+        connect_args=connect_args,
     )
-)
+
 
 # Crea el engine asíncrono
-async_engine = create_async_engine(
-    ASYNC_DATABASE_URL,
-    echo=settings.DEBUG,
-    future=True,
-    
+async_engine = _create_engine(ASYNC_DATABASE_URL, settings.DB_POOL_SIZE, settings.DB_MAX_OVERFLOW)
+
+async_read_engine: Optional[AsyncEngine] = (
+    _create_engine(ASYNC_READ_DATABASE_URL, settings.DB_READ_POOL_SIZE, settings.DB_READ_MAX_OVERFLOW, read_only=True)
+    if ASYNC_READ_DATABASE_URL
+    else None
 )
 
 # Session factory asíncrona
@@ -26,15 +60,52 @@ async_session = sessionmaker(
     expire_on_commit=False,
 )
 
+# Session factory de lectura: réplica si está configurada, si no el primario
+async_read_session = sessionmaker(
+    bind=async_read_engine,
+    class_=AsyncSession,
+    expire_on_commit=False,
+) if async_read_engine is not None else async_session
+
+
 # Crea la sesión asíncrona con auto-commit
 async def get_db() -> AsyncGenerator[AsyncSession, None]:
     async with async_session() as session:
         try:
             yield session
-            await session.commit()  # ✅ Auto-commit al final del request
+            with stage_timer("db.commit"):
+                await session.commit()  # ✅ Auto-commit al final del request
         except Exception:
             await session.rollback()  # ✅ Rollback en caso de error
             raise
 
+
+async def get_read_db() -> AsyncGenerator[AsyncSession, None]:
+    """
+    Sesión para endpoints de solo lectura (listados de flows, historial de chat,
+    catálogo, analytics). Va a la réplica si DATABASE_READ_URL está configurada;
+    puede ir unos ms por detrás del primario, así que no usar para leer algo
+    recién escrito en la misma petición. Nunca hace commit.
+    """
+    async with async_read_session() as session:
+        try:
+            yield session
+        finally:
+            await session.rollback()
+
+
+def get_engines() -> Dict[str, AsyncEngine]:
+    engines = {"primary": async_engine}
+    if async_read_engine is not None:
+        engines["replica"] = async_read_engine
+    return engines
+
+
+async def dispose_engines() -> None:
+    """Cierra los pools (shutdown)"""
+    for engine in get_engines().values():
+        await engine.dispose()
+
+
 # Base para todos los modelos ORM
 Base = declarative_base()
@@ -521,6 +521,12 @@ class RefreshToken(Base):
 
 class AgentMemory(Base):
     __tablename__ = "agent_memories"
+    __table_args__ = (
+        # Ventanas temporales por agente/tipo (memoria episódica)
+        Index("ix_agent_memories_agent_kind_created", "agent_id", "kind", text("created_at DESC")),
+        # Búsqueda léxica de MemorySearchHandler (config 'simple': contenido multilingüe)
+        Index("ix_agent_memories_content_fts", text("to_tsvector('simple', content)"), postgresql_using="gin"),
+    )
 
     id = Column(
         BigInteger,
@@ -541,7 +547,8 @@ class AgentMemory(Base):
     created_at = Column(
         DateTime(timezone=True), server_default=text("now()"), nullable=False
     )
-    embedding = Column(Vector(1536), nullable=False)  # 2.9 dims=1536
+    # 2.9 dims=1536; NULL si el proveedor de embeddings falló (solo búsqueda léxica)
+    embedding = Column(Vector(1536), nullable=True)
 
     # 2.8 renombrado a singular y default {}
     metadatas = Column(JSONB, nullable=False, server_default=text("'{}'"))
@@ -554,6 +561,51 @@ class AgentMemory(Base):
     )
 
 
+class RagDocument(Base):
+    """Estado de ingesta por documento (reanudable): hash del contenido + status"""
+    __tablename__ = "rag_documents"
+
+    agent_id = Column(
+        PgUUID(as_uuid=True),
+        ForeignKey("ai_agents.agent_id", ondelete="CASCADE"),
+        primary_key=True,
+    )
+    document_id = Column(String(255), primary_key=True)
+    source = Column(Text, nullable=True)
+    content_hash = Column(String(64), nullable=False)
+    status = Column(String(20), nullable=False, default="pending")  # pending, in_progress, indexed, failed
+    chunk_count = Column(Integer, nullable=False, default=0)
+    error = Column(Text, nullable=True)
+    created_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now(), nullable=False)
+
+
+class RagChunk(Base):
+    """Chunks indexados para RAG de agentes (pgvector, índice HNSW coseno)"""
+    __tablename__ = "rag_chunks"
+    __table_args__ = (
+        # Una fila por posición: chunks idénticos repetidos en un documento se conservan
+        UniqueConstraint("agent_id", "document_id", "chunk_index", name="uq_rag_chunks_agent_doc_chunk"),
+        Index("ix_rag_chunks_agent_hash", "agent_id", "content_hash"),
+    )
+
+    id = Column(BigInteger, primary_key=True, autoincrement=True)
+    agent_id = Column(
+        PgUUID(as_uuid=True),
+        ForeignKey("ai_agents.agent_id", ondelete="CASCADE"),
+        nullable=False,
+        index=True,
+    )
+    document_id = Column(String(255), nullable=False)
+    chunk_index = Column(Integer, nullable=False)
+    content = Column(Text, nullable=False)
+    content_hash = Column(String(64), nullable=False)
+    embedding_model = Column(String(100), nullable=False)
+    embedding = Column(Vector(1536), nullable=False)
+    metadatas = Column(JSONB, nullable=False, server_default=text("'{}'"))
+    created_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
+
+
 class Trigger(Base):
     __tablename__ = "triggers"
     __table_args__ = (
@@ -833,6 +885,48 @@ class LLMUsageLog(Base):
     provider = relationship("LLMProvider", back_populates="usage_logs")
     model = relationship("LLMModel", back_populates="usage_logs")
 
+    __table_args__ = (
+        # BRIN: índice diminuto para rangos de tiempo en una tabla append-only
+        Index("ix_llm_usage_logs_created_at_brin", "created_at", postgresql_using="brin"),
+    )
+
+
+# Sentinel para claves NULL en rollups (user/provider/model desconocidos)
+ROLLUP_NULL_UUID = uuid.UUID(int=0)
+
+
+class _LLMUsageRollupMixin:
+    """Agregados aditivos por (bucket, user, provider, model)"""
+    bucket_start = Column(TIMESTAMP(timezone=True), primary_key=True)
+    user_id = Column(Integer, primary_key=True, default=0)
+    provider_id = Column(PgUUID(as_uuid=True), primary_key=True, default=ROLLUP_NULL_UUID)
+    model_id = Column(PgUUID(as_uuid=True), primary_key=True, default=ROLLUP_NULL_UUID)
+    request_count = Column(BigInteger, nullable=False, default=0)
+    success_count = Column(BigInteger, nullable=False, default=0)
+    error_count = Column(BigInteger, nullable=False, default=0)
+    input_tokens = Column(BigInteger, nullable=False, default=0)
+    output_tokens = Column(BigInteger, nullable=False, default=0)
+    total_cost = Column(DECIMAL(precision=16, scale=6), nullable=False, default=0)
+    response_time_ms_sum = Column(BigInteger, nullable=False, default=0)
+    response_time_count = Column(BigInteger, nullable=False, default=0)
+
+
+class LLMUsageRollupHourly(_LLMUsageRollupMixin, Base):
+    __tablename__ = "llm_usage_rollup_hourly"
+
+
+class LLMUsageRollupDaily(_LLMUsageRollupMixin, Base):
+    __tablename__ = "llm_usage_rollup_daily"
+
+
+class LLMUsageRollupState(Base):
+    """Watermark: llm_usage_logs con created_at < rolled_until ya están en los rollups"""
+    __tablename__ = "llm_usage_rollup_state"
+
+    name = Column(String(50), primary_key=True)
+    rolled_until = Column(TIMESTAMP(timezone=True), nullable=False)
+    updated_at = Column(TIMESTAMP(timezone=True), server_default=func.now(), onupdate=func.now(), nullable=False)
+
 
 # —————————————————————————————————————————————————————
 #  Auth Policy Models - Dynamic Auth Configuration
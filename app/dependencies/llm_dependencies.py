@@ -5,7 +5,7 @@ Dependency injection for LLM-related services and repositories
 from sqlalchemy.ext.asyncio import AsyncSession
 from fastapi import Depends
 
-from app.db.database import get_db
+from app.db.database import get_db, get_read_db
 from app.repositories.llm_provider_repository import LLMProviderRepository
 from app.repositories.llm_model_repository import LLMModelRepository
 from app.repositories.llm_usage_repository import LLMUsageRepository
@@ -29,6 +29,21 @@ def get_llm_usage_repository(db: AsyncSession = Depends(get_db)) -> LLMUsageRepo
     return LLMUsageRepository(db)
 
 
+def get_read_llm_provider_repository(db: AsyncSession = Depends(get_read_db)) -> LLMProviderRepository:
+    """Get LLM Provider Repository on the read replica"""
+    return LLMProviderRepository(db)
+
+
+def get_read_llm_model_repository(db: AsyncSession = Depends(get_read_db)) -> LLMModelRepository:
+    """Get LLM Model Repository on the read replica"""
+    return LLMModelRepository(db)
+
+
+def get_read_llm_usage_repository(db: AsyncSession = Depends(get_read_db)) -> LLMUsageRepository:
+    """Get LLM Usage Repository on the read replica (analytics)"""
+    return LLMUsageRepository(db)
+
+
 # Service Dependencies
 def get_llm_provider_service(
     provider_repo: LLMProviderRepository = Depends(get_llm_provider_repository),
@@ -43,6 +58,19 @@ def get_llm_provider_service(
     )
 
 
+def get_read_llm_provider_service(
+    provider_repo: LLMProviderRepository = Depends(get_read_llm_provider_repository),
+    model_repo: LLMModelRepository = Depends(get_read_llm_model_repository),
+    usage_repo: LLMUsageRepository = Depends(get_read_llm_usage_repository)
+) -> LLMProviderService:
+    """Get LLM Provider Service for read-only endpoints (catalog, analytics)"""
+    return LLMProviderService(
+        provider_repo=provider_repo,
+        model_repo=model_repo,
+        usage_repo=usage_repo
+    )
+
+
 def get_intelligent_llm_service(
     model_repo: LLMModelRepository = Depends(get_llm_model_repository),
     provider_repo: LLMProviderRepository = Depends(get_llm_provider_repository),
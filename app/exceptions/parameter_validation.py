@@ -3,13 +3,21 @@ Sistema de validación de parámetros para handlers en Kyra
 Valida que los parámetros enviados coincidan con los esperados por cada handler
 """
 
+import hashlib
 import inspect
-from typing import Any, Dict, List, Optional, Set, Union, Type, get_type_hints
-from dataclasses import dataclass
+from types import MappingProxyType
+from typing import Any, Dict, FrozenSet, List, Mapping, Optional, Set, Tuple, Union, Type, get_type_hints
+from dataclasses import dataclass, field
 from app.exceptions.logging_utils import get_kyra_logger, error_tracker
 
 logger = get_kyra_logger(__name__)
 
+# Versión del formato de specs compiladas: subir si cambia la semántica de validación
+PARAMETER_SPEC_ARTIFACT_VERSION = 1
+
+# Tipos que se validan con isinstance; el resto se acepta (mejor que rechazar incorrectamente)
+_CHECKED_TYPES = (str, int, float, bool, list, dict)
+
 
 @dataclass
 class ParameterSpec:
@@ -41,6 +49,66 @@ class ValidationResult:
             self.errors = []
 
 
+@dataclass(frozen=True)
+class CompiledHandlerValidator:
+    """
+    Validador precompilado e inmutable para un handler.
+    Toda la reflexión (signature, type hints, docstring) ocurre al compilar;
+    por llamada solo queda una diferencia de sets y checks isinstance.
+    """
+    handler_name: str
+    specs: Tuple[ParameterSpec, ...]
+    required: FrozenSet[str]
+    type_checks: Tuple[Tuple[str, type], ...]
+    
+    @classmethod
+    def compile(cls, handler_name: str, specs: List[ParameterSpec]) -> "CompiledHandlerValidator":
+        required = frozenset(spec.name for spec in specs if spec.required)
+        type_checks = tuple(
+            (spec.name, spec.type_hint)
+            for spec in specs
+            if spec.required and spec.type_hint in _CHECKED_TYPES
+        )
+        return cls(
+            handler_name=handler_name,
+            specs=tuple(specs),
+            required=required,
+            type_checks=type_checks
+        )
+    
+    def missing(self, params: Mapping[str, Any]) -> List[str]:
+        """Parámetros requeridos ausentes (en orden de declaración)"""
+        if not self.required:
+            return []
+        absent = self.required.difference(params.keys())
+        if not absent:
+            return []
+        return [spec.name for spec in self.specs if spec.name in absent]
+    
+    def invalid(self, params: Mapping[str, Any]) -> List[str]:
+        """Parámetros requeridos presentes con tipo incorrecto"""
+        return [
+            name for name, expected_type in self.type_checks
+            if name in params and not isinstance(params[name], expected_type)
+        ]
+    
+    def needs_user_input(self, params: Mapping[str, Any]) -> bool:
+        """Camino rápido: True si falta algo o hay tipos inválidos"""
+        if self.required and not self.required.issubset(params.keys()):
+            return True
+        for name, expected_type in self.type_checks:
+            if not isinstance(params[name], expected_type):
+                return True
+        return False
+
+
+@dataclass(frozen=True)
+class CompiledSpecArtifact:
+    """Snapshot versionado de todos los validadores compilados"""
+    version: str
+    validators: Mapping[str, CompiledHandlerValidator] = field(default_factory=dict)
+
+
 class ParameterValidationError(Exception):
     """Error específico para problemas de validación de parámetros"""
     
@@ -91,6 +159,8 @@ class ParameterValidator:
     def __init__(self):
         self._handler_specs: Dict[str, List[ParameterSpec]] = {}
         self._discovered_handlers: Set[str] = set()
+        self._compiled: Dict[str, CompiledHandlerValidator] = {}
+        self._artifact: Optional[CompiledSpecArtifact] = None
     
     def discover_handler_parameters(self, handler_class: Type, handler_name: str) -> List[ParameterSpec]:
         """
@@ -203,9 +273,22 @@ class ParameterValidator:
             specs = self.discover_handler_parameters(handler_class, handler_name)
             self._handler_specs[handler_name] = specs
             self._discovered_handlers.add(handler_name)
+            # Registro tardío: invalidar compilado previo, se recompila bajo demanda
+            self._compiled.pop(handler_name, None)
+            self._artifact = None
             
             logger.info(f"Registradas especificaciones para handler: {handler_name}")
     
+    def load_handler_specs(self, handler_name: str, specs: List[ParameterSpec]):
+        """
+        Registra specs ya calculadas (p.ej. desde el manifest de handlers) sin reflexión.
+        Un register_handler_specs posterior para el mismo handler no vuelve a inspeccionar.
+        """
+        self._handler_specs[handler_name] = specs
+        self._discovered_handlers.add(handler_name)
+        self._compiled.pop(handler_name, None)
+        self._artifact = None
+    
     def validate_parameters(self, handler_name: str, provided_params: Dict[str, Any], 
                           strict_mode: bool = False) -> ValidationResult:
         """
@@ -279,6 +362,44 @@ class ParameterValidator:
         # Por defecto, aceptar el valor (mejor que fallar)
         return True
     
+    def compile_all(self) -> CompiledSpecArtifact:
+        """
+        Compila las specs de todos los handlers registrados en validadores inmutables.
+        Se invoca desde scan_handlers(); la versión identifica el contenido del artifact.
+        """
+        compiled = {
+            name: CompiledHandlerValidator.compile(name, specs)
+            for name, specs in self._handler_specs.items()
+        }
+        self._compiled = compiled
+        self._artifact = CompiledSpecArtifact(
+            version=self._compute_artifact_version(),
+            validators=MappingProxyType(dict(compiled))
+        )
+        logger.info(f"Compiladas specs de {len(compiled)} handlers",
+                    artifact_version=self._artifact.version)
+        return self._artifact
+    
+    def get_compiled_validator(self, handler_name: str) -> Optional[CompiledHandlerValidator]:
+        """
+        Obtiene el validador compilado de un handler (compila on-demand si se registró tarde)
+        """
+        validator = self._compiled.get(handler_name)
+        if validator is None and handler_name in self._handler_specs:
+            validator = CompiledHandlerValidator.compile(handler_name, self._handler_specs[handler_name])
+            self._compiled[handler_name] = validator
+        return validator
+    
+    def _compute_artifact_version(self) -> str:
+        """Hash estable de las specs registradas + versión del formato"""
+        digest = hashlib.sha256(str(PARAMETER_SPEC_ARTIFACT_VERSION).encode())
+        for name in sorted(self._handler_specs):
+            for spec in self._handler_specs[name]:
+                digest.update(
+                    f"{name}|{spec.name}|{spec.type_hint!r}|{spec.required}|{spec.default_value!r}\n".encode()
+                )
+        return f"v{PARAMETER_SPEC_ARTIFACT_VERSION}-{digest.hexdigest()[:16]}"
+    
     def get_handler_specs(self, handler_name: str) -> List[ParameterSpec]:
         """
         Obtiene las especificaciones de parámetros para un handler
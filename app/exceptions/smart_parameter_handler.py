@@ -46,10 +46,10 @@ class SmartParameterHandler:
         self.logger.info(f"Analizando parámetros para {handler_name}")
         self.logger.debug(f"Parámetros descubiertos por Kyra", discovered=list(kyra_discovered.keys()))
         
-        # Obtener especificaciones del handler
-        handler_specs = parameter_validator.get_handler_specs(handler_name)
+        # Validador precompilado (sin reflexión por llamada)
+        validator = parameter_validator.get_compiled_validator(handler_name)
         
-        if not handler_specs:
+        if not validator or not validator.specs:
             self.logger.warning(f"No hay especificaciones para {handler_name}")
             return ParameterAnalysis(
                 handler_name=handler_name,
@@ -59,22 +59,9 @@ class SmartParameterHandler:
                 needs_user_input=False
             )
         
-        # Analizar cada parámetro requerido
-        missing_params = []
-        invalid_params = []
-        
-        for spec in handler_specs:
-            if spec.required:
-                if spec.name not in kyra_discovered:
-                    # Kyra no lo descubrió
-                    missing_params.append(spec.name)
-                    self.logger.debug(f"Parámetro faltante: {spec.name}")
-                else:
-                    # Kyra lo descubrió, verificar si es válido
-                    value = kyra_discovered[spec.name]
-                    if not self._validate_parameter_type(value, spec.type_hint):
-                        invalid_params.append(spec.name)
-                        self.logger.debug(f"Parámetro inválido: {spec.name}")
+        # Analizar parámetros requeridos: diferencia de sets + checks de tipo precompilados
+        missing_params = validator.missing(kyra_discovered)
+        invalid_params = validator.invalid(kyra_discovered)
         
         needs_input = len(missing_params) > 0 or len(invalid_params) > 0
         
@@ -82,7 +69,7 @@ class SmartParameterHandler:
         form_schema = None
         if needs_input:
             form_schema = self._generate_form_schema_for_missing(
-                handler_name, handler_specs, missing_params + invalid_params
+                handler_name, validator.specs, missing_params + invalid_params
             )
         
         analysis = ParameterAnalysis(
@@ -101,21 +88,18 @@ class SmartParameterHandler:
         
         return analysis
     
-    def _validate_parameter_type(self, value: Any, expected_type: type) -> bool:
-        """Valida si un valor tiene el tipo esperado"""
-        try:
-            if expected_type == Any:
-                return True
-            
-            # Validaciones básicas
-            if expected_type in [str, int, float, bool, list, dict]:
-                return isinstance(value, expected_type)
-            
-            # Por defecto aceptar (mejor que rechazar incorrectamente)
-            return True
-            
-        except Exception:
-            return True  # En caso de duda, aceptar
+    def check_parameters(self, handler_name: str, kyra_params: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """
+        Camino rápido para execute_node/execute_tool.
+        Retorna None si no se necesita input; si falta algo, el info de parámetros
+        faltantes calculado con un único análisis.
+        """
+        validator = parameter_validator.get_compiled_validator(handler_name)
+        if not validator or not validator.needs_user_input(kyra_params):
+            return None
+        
+        analysis = self.analyze_parameters(handler_name, kyra_params)
+        return self._build_missing_parameters_info(analysis, len(validator.required))
     
     def _generate_form_schema_for_missing(self, handler_name: str, all_specs: List, missing_param_names: List[str]) -> Dict[str, Any]:
         """
@@ -187,18 +171,25 @@ class SmartParameterHandler:
         """
         Determina si se necesita solicitar input del usuario
         """
-        analysis = self.analyze_parameters(handler_name, kyra_params)
-        return analysis.needs_user_input
+        validator = parameter_validator.get_compiled_validator(handler_name)
+        return bool(validator) and validator.needs_user_input(kyra_params)
     
     def get_missing_parameters_info(self, handler_name: str, kyra_params: Dict[str, Any]) -> Dict[str, Any]:
         """
         Obtiene información detallada sobre parámetros faltantes para mostrar al usuario
         """
         analysis = self.analyze_parameters(handler_name, kyra_params)
-        
+        validator = parameter_validator.get_compiled_validator(handler_name)
+        total_required = len(validator.required) if validator else 0
+        return self._build_missing_parameters_info(analysis, total_required)
+    
+    def _build_missing_parameters_info(self, analysis: ParameterAnalysis, total_required: int) -> Dict[str, Any]:
+        """
+        Construye el payload de parámetros faltantes a partir de un análisis ya hecho
+        """
         return {
-            "handler_name": handler_name,
-            "total_required": len(parameter_validator.get_required_parameters(handler_name)),
+            "handler_name": analysis.handler_name,
+            "total_required": total_required,
             "discovered_by_kyra": len(analysis.discovered_params),
             "missing_count": len(analysis.missing_params),
             "missing_params": analysis.missing_params,
@@ -1,10 +1,22 @@
 # app/ai/handlers/ai_agent_rag_handler.py
 
 import time
+import logging
+from contextlib import asynccontextmanager
 from typing import Dict, Any, List, Optional
 from uuid import UUID
+
+from sqlalchemy import cast, func, select, update
+from sqlalchemy.dialects.postgresql import JSONB
+
 from .connector_handler import ActionHandler
 from app.connectors.factory import register_tool, register_node
+from app.core.config import settings
+from app.ai.rag.embedders import get_embedder
+from app.ai.rag.ingestion import RAGIngestionPipeline
+from app.repositories.rag_chunk_repository import RagChunkRepository
+
+logger = logging.getLogger(__name__)
 
 
 @register_node("AIAgent.rag_system")
@@ -94,28 +106,48 @@ class AIAgentRAGHandler(ActionHandler):
                 "duration_ms": int((time.perf_counter() - start) * 1000)
             }
     
+    @asynccontextmanager
+    async def _session(self):
+        from app.db.database import async_session
+
+        async with async_session() as session:
+            yield session
+
     async def _setup_rag_system(self, params: Dict) -> Dict:
         """
         Configurar sistema RAG para un agente
         """
         agent_id = params["agent_id"]
-        rag_config = params.get("rag_config", {})
+        setup_config = self._build_rag_config(agent_id, params.get("rag_config", {}))
         
-        # Componentes necesarios para RAG
-        setup_config = {
-            # Vector DB
+        # Guardar configuración para el agente
+        await self._save_rag_config(agent_id, setup_config)
+        
+        # Inicializar vector DB collection
+        await self._initialize_vector_collection(setup_config)
+        
+        return {
+            "message": "RAG system configured successfully",
+            "config": setup_config,
+            "agent_id": str(agent_id)
+        }
+    
+    def _build_rag_config(self, agent_id: Any, rag_config: Dict) -> Dict:
+        """Configuración RAG completa con defaults"""
+        return {
+            # Vector DB (pgvector: tabla rag_chunks con índice HNSW)
             "vector_database": {
-                "provider": rag_config.get("vector_db", "qdrant"),
-                "collection_name": f"agent_{agent_id}_docs",
+                "provider": rag_config.get("vector_db", "pgvector"),
+                "collection_name": "rag_chunks",
                 "embedding_dimension": rag_config.get("embedding_dim", 1536),
                 "distance_metric": rag_config.get("distance", "cosine")
             },
             
             # Embedding Model
             "embedding_model": {
-                "provider": rag_config.get("embedding_provider", "openai"),
+                "provider": rag_config.get("embedding_provider", settings.RAG_EMBEDDING_PROVIDER),
                 "model": rag_config.get("embedding_model", "text-embedding-3-small"),
-                "batch_size": 100
+                "batch_size": rag_config.get("embedding_batch_size", settings.RAG_EMBED_BATCH_SIZE)
             },
             
             # Chunking Strategy
@@ -141,71 +173,106 @@ class AIAgentRAGHandler(ActionHandler):
                 "citation_style": rag_config.get("citations", "inline")
             }
         }
-        
-        # Guardar configuración para el agente
-        await self._save_rag_config(agent_id, setup_config)
-        
-        # Inicializar vector DB collection
-        await self._initialize_vector_collection(setup_config)
-        
-        return {
-            "message": "RAG system configured successfully",
-            "config": setup_config,
-            "agent_id": str(agent_id)
-        }
+    
+    async def _save_rag_config(self, agent_id: Any, config: Dict) -> None:
+        """Persistir la config en ai_agents.memory_schema['rag']"""
+        from app.db.models import AIAgent
+
+        async with self._session() as session:
+            await session.execute(
+                update(AIAgent)
+                .where(AIAgent.agent_id == UUID(str(agent_id)))
+                .values(
+                    memory_schema=func.coalesce(AIAgent.memory_schema, cast({}, JSONB)).op("||")(
+                        cast({"rag": config}, JSONB)
+                    )
+                )
+                .execution_options(synchronize_session=False)
+            )
+            await session.commit()
+    
+    async def _load_rag_config(self, agent_id: Any) -> Dict:
+        """Config guardada por setup, o defaults si el agente no se configuró"""
+        from app.db.models import AIAgent
+
+        async with self._session() as session:
+            result = await session.execute(
+                select(AIAgent.memory_schema).where(AIAgent.agent_id == UUID(str(agent_id)))
+            )
+            memory_schema = result.scalar_one_or_none() or {}
+
+        config = self._build_rag_config(agent_id, {})
+        for section, values in (memory_schema.get("rag") or {}).items():
+            if isinstance(values, dict) and isinstance(config.get(section), dict):
+                config[section] = {**config[section], **values}
+        return config
+    
+    async def _initialize_vector_collection(self, config: Dict) -> None:
+        """rag_chunks es compartida (filtrada por agent_id): solo se valida la dimensión"""
+        vector_db = config["vector_database"]
+        if vector_db["provider"] != "pgvector":
+            raise ValueError(f"Unsupported vector database: {vector_db['provider']}. Only pgvector is available")
+        if vector_db["embedding_dimension"] != settings.EMBED_DIMS:
+            raise ValueError(
+                f"embedding_dimension {vector_db['embedding_dimension']} does not match rag_chunks ({settings.EMBED_DIMS})"
+            )
+        get_embedder(config["embedding_model"]["provider"], config["embedding_model"]["model"])
+    
+    def _get_pipeline(self, rag_config: Dict) -> RAGIngestionPipeline:
+        embedding_config = rag_config["embedding_model"]
+        return RAGIngestionPipeline(
+            embedder=get_embedder(embedding_config["provider"], embedding_config["model"]),
+            batch_size=embedding_config.get("batch_size", settings.RAG_EMBED_BATCH_SIZE),
+            concurrency=settings.RAG_INGEST_CONCURRENCY,
+        )
     
     async def _index_documents(self, params: Dict) -> Dict:
         """
-        Indexar documentos en el sistema RAG
+        Indexar documentos en el sistema RAG (streaming, reanudable).
+        Documentos ya indexados con el mismo contenido se saltan salvo `force`.
         """
-        agent_id = params["agent_id"]
+        agent_id = UUID(str(params["agent_id"]))
         documents = params.get("documents", [])
         index_config = params.get("index_config", {})
         
         # Cargar configuración RAG del agente
         rag_config = await self._load_rag_config(agent_id)
+        chunk_config = {**rag_config["chunking"], **index_config.get("chunking", {})}
         
-        # Estadísticas de indexación
-        stats = {
-            "total_documents": len(documents),
-            "total_chunks": 0,
-            "total_tokens": 0,
-            "failed_documents": 0
-        }
-        
-        # Procesar documentos
-        for doc in documents:
-            try:
-                # 1. Chunking
-                chunks = await self._chunk_document(
-                    doc,
-                    rag_config["chunking"]
-                )
-                stats["total_chunks"] += len(chunks)
-                
-                # 2. Generate embeddings
-                embeddings = await self._generate_embeddings(
-                    [c["text"] for c in chunks],
-                    rag_config["embedding_model"]
-                )
-                
-                # 3. Store in vector DB
-                await self._store_chunks(
-                    chunks,
-                    embeddings,
-                    rag_config["vector_database"]
-                )
-                
-            except Exception as e:
-                stats["failed_documents"] += 1
-                # Log error
+        stats = await self._get_pipeline(rag_config).ingest(
+            agent_id,
+            documents,
+            chunk_config=chunk_config,
+            force=bool(index_config.get("force", False)),
+        )
         
         return {
-            "indexing_stats": stats,
-            "status": "completed",
+            "indexing_stats": stats.to_dict(),
+            "status": "completed" if not stats.failed_documents else "completed_with_errors",
             "agent_id": str(agent_id)
         }
     
+    async def _update_index(self, params: Dict) -> Dict:
+        """
+        Actualizar índice: borra `delete_document_ids` y re-ingesta `documents`
+        (solo se re-embeben los documentos cuyo contenido cambió)
+        """
+        agent_id = UUID(str(params["agent_id"]))
+        delete_ids = [str(doc_id) for doc_id in params.get("delete_document_ids", [])]
+        
+        deleted_chunks = 0
+        if delete_ids:
+            async with self._session() as session:
+                deleted_chunks = await RagChunkRepository(session).delete_documents(agent_id, delete_ids)
+                await session.commit()
+        
+        result = await self._index_documents(params) if params.get("documents") else {
+            "indexing_stats": None, "status": "completed", "agent_id": str(agent_id)
+        }
+        result["deleted_documents"] = len(delete_ids)
+        result["deleted_chunks"] = deleted_chunks
+        return result
+    
     async def _rag_query(self, params: Dict) -> Dict:
         """
         Ejecutar query RAG completo
@@ -245,7 +312,7 @@ class AIAgentRAGHandler(ActionHandler):
             "retrieved_chunks": [
                 {
                     "text": chunk["text"],
-                    "source": chunk["metadata"]["source"],
+                    "source": chunk["metadata"].get("source"),
                     "score": chunk["score"]
                 }
                 for chunk in retrieved_chunks
@@ -260,16 +327,14 @@ class AIAgentRAGHandler(ActionHandler):
         """
         Analizar performance del sistema RAG
         """
-        agent_id = params["agent_id"]
+        agent_id = UUID(str(params["agent_id"]))
+        
+        async with self._session() as session:
+            index_stats = await RagChunkRepository(session).index_stats(agent_id)
         
         # Métricas a analizar
         metrics = {
-            "index_stats": {
-                "total_documents": 0,
-                "total_chunks": 0,
-                "avg_chunk_size": 0,
-                "index_size_mb": 0
-            },
+            "index_stats": index_stats,
             "retrieval_stats": {
                 "avg_retrieval_time_ms": 0,
                 "avg_chunks_per_query": 0,
@@ -282,7 +347,7 @@ class AIAgentRAGHandler(ActionHandler):
             }
         }
         
-        # Aquí implementarías la lógica real de análisis
+        # Métricas de retrieval/calidad: pendientes de instrumentar por query
         
         return {
             "agent_id": str(agent_id),
@@ -294,15 +359,35 @@ class AIAgentRAGHandler(ActionHandler):
         }
     
     # Métodos auxiliares
-    async def _chunk_document(self, doc: Dict, config: Dict) -> List[Dict]:
-        """Implementar chunking según estrategia"""
-        # Aquí va la lógica real de chunking
-        pass
-    
-    async def _generate_embeddings(self, texts: List[str], config: Dict) -> List[List[float]]:
-        """Generar embeddings según provider"""
-        # Conectar con servicio de embeddings
-        pass
+    async def _retrieve_chunks(self, query: str, agent_id: Any, config: Dict) -> List[Dict]:
+        """Top-k + umbral de score resueltos en Postgres (HNSW coseno)"""
+        rag_config = await self._load_rag_config(agent_id)
+        embedding_config = rag_config["embedding_model"]
+        embedder = get_embedder(embedding_config["provider"], embedding_config["model"])
+        
+        query_vector = (await embedder.embed([query]))[0]
+        if not any(query_vector):
+            logger.warning("RAG retrieval: empty query embedding, skipping search")
+            return []
+        
+        top_k = int(config.get("top_k", 5))
+        async with self._session() as session:
+            rows = await RagChunkRepository(session).search(
+                UUID(str(agent_id)),
+                query_vector,
+                top_k=top_k,
+                score_threshold=config.get("score_threshold"),
+                ef_search=max(settings.RAG_HNSW_EF_SEARCH, top_k * 4),
+            )
+        
+        return [
+            {
+                "text": row["content"],
+                "metadata": {**(row["metadatas"] or {}), "document_id": row["document_id"]},
+                "score": float(row["score"]),
+            }
+            for row in rows
+        ]
     
     def _build_augmented_context(self, query: str, chunks: List[Dict], template: Optional[str]) -> str:
         """Construir contexto aumentado"""
@@ -319,7 +404,7 @@ Question: {query}
 Answer:"""
         
         context = "\n\n".join([
-            f"[Source: {c['metadata']['source']}]\n{c['text']}" 
+            f"[Source: {c['metadata'].get('source')}]\n{c['text']}" 
             for c in chunks
         ])
         
@@ -4,6 +4,7 @@ Base class for all memory handlers providing common functionality
 """
 import time
 import logging
+from contextlib import asynccontextmanager
 from typing import Dict, Any, Optional, List
 from uuid import UUID
 from abc import ABC, abstractmethod
@@ -171,6 +172,20 @@ class BaseMemoryHandler(ActionHandler, ABC):
             "timestamp": time.time()
         }
     
+    @asynccontextmanager
+    async def _memory_repository(self):
+        """AgentMemoryRepository con sesión corta; commit al salir sin errores"""
+        from app.db.database import async_session
+        from app.repositories.agent_memory_repository import AgentMemoryRepository
+
+        async with async_session() as session:
+            try:
+                yield AgentMemoryRepository(session)
+                await session.commit()
+            except Exception:
+                await session.rollback()
+                raise
+    
     async def _get_agent_context(self, agent_id: UUID) -> Dict[str, Any]:
         """
         Get agent context information for memory operations
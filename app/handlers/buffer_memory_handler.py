@@ -220,6 +220,16 @@ class BufferMemoryHandler(ActionHandler):
         """Backend compatibility method"""
         await self._append_memory(agent_id, item, window)
     
+    async def append_short_term_batch(self, agent_id: UUID, items: List[Dict[str, Any]], window: int = 6) -> None:
+        """Append several items and trim the window once"""
+        buf = BufferMemoryHandler._global_buffers.setdefault(agent_id, [])
+        now = time.time()
+        for item in items:
+            item.setdefault("timestamp", now)
+        buf.extend(items)
+        if len(buf) > window:
+            del buf[:len(buf) - window]
+    
     async def clear_short_term(self, agent_id: UUID) -> None:
         """Backend compatibility method"""
         await self._clear_memories(agent_id)
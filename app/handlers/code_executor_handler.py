@@ -20,6 +20,7 @@ from dataclasses import dataclass
 from .connector_handler import ActionHandler
 from app.connectors.factory import register_node, register_tool
 from app.exceptions.api_exceptions import HandlerError
+from app.core.code_sandbox import SandboxTask, get_code_sandbox_pool
 
 logger = logging.getLogger(__name__)
 
@@ -134,6 +135,8 @@ class CodeExecutorHandler(ActionHandler):
             execution_result = await self._execute_code_safely(
                 code, input_data, variables, return_variable, timeout
             )
+            if not execution_result.success:
+                raise HandlerError(execution_result.error)
             
             # Preparar respuesta
             result_data = execution_result.result
@@ -219,86 +222,33 @@ class CodeExecutorHandler(ActionHandler):
         return_variable: str,
         timeout: int
     ) -> CodeExecutionResult:
-        """Ejecuta el código de forma segura"""
+        """
+        Ejecuta el código en un worker del pool de procesos calientes
+        (rlimits, stdout propio, kill + reemplazo si vence el timeout)
+        """
         start_time = time.time()
         
         try:
-            # Preparar contexto de ejecución
-            execution_context = {
-                '__builtins__': {name: getattr(__builtins__, name) for name in self.allowed_builtins 
-                               if hasattr(__builtins__, name)},
-                'input_data': input_data,
-                'variables': variables.copy() if variables else {},
-                return_variable: None
-            }
-            
-            # Agregar módulos permitidos
-            for module_name in self.allowed_imports:
-                try:
-                    if module_name == 'pandas':
-                        try:
-                            import pandas as pd
-                            execution_context['pd'] = pd
-                            execution_context['pandas'] = pd
-                        except ImportError:
-                            pass
-                    elif module_name == 'numpy':
-                        try:
-                            import numpy as np
-                            execution_context['np'] = np
-                            execution_context['numpy'] = np
-                        except ImportError:
-                            pass
-                    elif module_name == 'requests':
-                        try:
-                            import requests
-                            execution_context['requests'] = requests
-                        except ImportError:
-                            pass
-                    else:
-                        execution_context[module_name] = __import__(module_name)
-                except ImportError:
-                    pass  # Módulo no disponible, continuar
-            
-            # Capturar output
-            captured_output = io.StringIO()
+            task = SandboxTask(
+                code=code,
+                input_data=input_data,
+                variables=variables.copy() if variables else {},
+                return_variable=return_variable,
+                allowed_builtins=sorted(self.allowed_builtins),
+                allowed_imports=sorted(self.allowed_imports),
+                timeout=timeout,
+            )
+            # La espera bloqueante del resultado va en un hilo; el código corre en otro proceso
+            sandbox_result = await asyncio.to_thread(get_code_sandbox_pool().run, task)
             
-            # Ejecutar con timeout
-            try:
-                with contextlib.redirect_stdout(captured_output):
-                    # Simple timeout usando asyncio
-                    await asyncio.wait_for(
-                        asyncio.get_event_loop().run_in_executor(
-                            None,
-                            self._execute_in_context,
-                            code,
-                            execution_context
-                        ),
-                        timeout=timeout
-                    )
-                
-                # Obtener resultado
-                result = execution_context.get(return_variable)
-                output = captured_output.getvalue()
-                
-                # Obtener variables finales (excluyendo las internas)
-                final_variables = {k: v for k, v in execution_context.items() 
-                                 if not k.startswith('__') and k not in ['input_data', 'variables']}
-                
-                return CodeExecutionResult(
-                    success=True,
-                    result=result,
-                    output=output,
-                    execution_time=time.time() - start_time,
-                    variables=final_variables
-                )
-                
-            except asyncio.TimeoutError:
-                return CodeExecutionResult(
-                    success=False,
-                    error=f"Code execution timeout after {timeout} seconds",
-                    execution_time=timeout
-                )
+            return CodeExecutionResult(
+                success=sandbox_result.success,
+                result=sandbox_result.result,
+                output=sandbox_result.output,
+                error=sandbox_result.error,
+                execution_time=sandbox_result.execution_time,
+                variables=sandbox_result.variables if sandbox_result.success else {}
+            )
                 
         except Exception as e:
             return CodeExecutionResult(
@@ -306,10 +256,6 @@ class CodeExecutorHandler(ActionHandler):
                 error=f"Execution error: {str(e)}",
                 execution_time=time.time() - start_time
             )
-    
-    def _execute_in_context(self, code: str, context: Dict[str, Any]):
-        """Ejecuta el código en el contexto dado"""
-        exec(code, context)
 
 
 # Función auxiliar para uso directo en workflows
@@ -1,10 +1,15 @@
 # app/ai/connector_handler.py
 
 from abc import ABC, abstractmethod
-from typing import Any, Dict
+from typing import Any, Dict, Optional
 from uuid import UUID
 
 class ActionHandler(ABC):
+    # JSON-Schema opcional de los params; execute_node lo valida vía schema_registry
+    params_schema: Optional[Dict[str, Any]] = None
+    # Sin efectos secundarios (register_tool(read_only=True)); ToolExecutor puede ejecutarlo en paralelo
+    read_only: bool = False
+
     @abstractmethod
     async def execute(
         self,
@@ -15,7 +15,7 @@ from app.handlers.connector_handler import ActionHandler
 logger = logging.getLogger(__name__)
 
 
-@register_tool("discover_user_files")
+@register_tool("discover_user_files", read_only=True)
 class DiscoverUserFilesHandler(ActionHandler):
     """
     ✅ CORREGIDO: Tool handler con dependency injection apropiada
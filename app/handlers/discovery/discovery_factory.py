@@ -106,7 +106,28 @@ class BaseDiscoveryHandler:
             Metadata del archivo
         """
         raise NotImplementedError("Subclasses must implement get_file_metadata()")
-    
+
+    async def get_change_token(self) -> Optional[str]:
+        """
+        Obtiene un token de cambios del provider (Drive startPageToken, Dropbox cursor)
+
+        Returns:
+            Token opaco o None si el provider no soporta detección de cambios
+        """
+        return None
+
+    async def has_changes_since(self, change_token: str) -> Optional[bool]:
+        """
+        Indica si hubo cambios desde que se emitió change_token
+
+        Args:
+            change_token: Token obtenido con get_change_token()
+
+        Returns:
+            True/False, o None si no se puede determinar (forzar refresh)
+        """
+        return None
+
     def _format_file_info(
         self, 
         file_id: str, 
@@ -2,6 +2,7 @@
 Dropbox Discovery Handler
 Descubre archivos en Dropbox del usuario
 """
+import asyncio
 import logging
 from typing import Dict, Any, List, Optional
 
@@ -36,8 +37,8 @@ class DropboxDiscoveryHandler(BaseDiscoveryHandler):
             if not self.dbx:
                 self.dbx = dropbox.Dropbox(self.access_token)
             
-            # Listar archivos en la raíz
-            result = self.dbx.files_list_folder("", limit=limit)
+            # Listar archivos en la raíz (en thread: el SDK de Dropbox es bloqueante)
+            result = await asyncio.to_thread(self.dbx.files_list_folder, "", limit=limit)
             
             discovered_files = []
             
@@ -71,6 +72,38 @@ class DropboxDiscoveryHandler(BaseDiscoveryHandler):
             self.logger.error(f"Error discovering Dropbox files: {e}")
             return []
     
+    async def get_change_token(self) -> Optional[str]:
+        """
+        Obtiene el cursor más reciente de la carpeta raíz
+        """
+        try:
+            import dropbox
+            
+            if not self.dbx:
+                self.dbx = dropbox.Dropbox(self.access_token)
+            
+            result = await asyncio.to_thread(self.dbx.files_list_folder_get_latest_cursor, "")
+            return result.cursor
+        except Exception as e:
+            self.logger.debug(f"Could not get Dropbox cursor: {e}")
+            return None
+    
+    async def has_changes_since(self, change_token: str) -> Optional[bool]:
+        """
+        Usa files/list_folder/continue con el cursor guardado
+        """
+        try:
+            import dropbox
+            
+            if not self.dbx:
+                self.dbx = dropbox.Dropbox(self.access_token)
+            
+            result = await asyncio.to_thread(self.dbx.files_list_folder_continue, change_token)
+            return bool(result.entries)
+        except Exception as e:
+            self.logger.debug(f"Could not check Dropbox changes: {e}")
+            return None
+    
     async def get_file_metadata(self, file_id: str) -> Dict[str, Any]:
         """
         Obtiene metadata de un archivo específico de Dropbox
@@ -2,6 +2,7 @@
 Google Drive Discovery Handler
 Descubre archivos reales en Google Drive del usuario
 """
+import asyncio
 import logging
 from typing import Dict, Any, List, Optional
 from googleapiclient.errors import HttpError
@@ -71,12 +72,13 @@ class GoogleDriveDiscoveryHandler(BaseGoogleDiscoveryHandler):
             
             query = " and ".join(query_parts)
             
-            # Buscar archivos
-            results = drive_service.files().list(
+            # Buscar archivos (en thread: el cliente de Google es bloqueante)
+            request = drive_service.files().list(
                 q=query,
                 pageSize=min(limit, 100),
                 fields="files(id,name,mimeType,size,modifiedTime,createdTime,webViewLink,thumbnailLink,parents)"
-            ).execute()
+            )
+            results = await asyncio.to_thread(request.execute)
             
             files = results.get('files', [])
             
@@ -96,6 +98,36 @@ class GoogleDriveDiscoveryHandler(BaseGoogleDiscoveryHandler):
             self.logger.error(f"Error discovering Google Drive files: {e}")
             return []
     
+    async def get_change_token(self) -> Optional[str]:
+        """
+        Obtiene startPageToken de la Changes API de Drive
+        """
+        try:
+            drive_service = await self.get_main_service()
+            request = drive_service.changes().getStartPageToken()
+            response = await asyncio.to_thread(request.execute)
+            return response.get('startPageToken')
+        except Exception as e:
+            self.logger.debug(f"Could not get Drive change token: {e}")
+            return None
+
+    async def has_changes_since(self, change_token: str) -> Optional[bool]:
+        """
+        Consulta la Changes API de Drive: basta con una página de 1 cambio
+        """
+        try:
+            drive_service = await self.get_main_service()
+            request = drive_service.changes().list(
+                pageToken=change_token,
+                pageSize=1,
+                fields="changes(fileId),newStartPageToken,nextPageToken"
+            )
+            response = await asyncio.to_thread(request.execute)
+            return bool(response.get('changes'))
+        except Exception as e:
+            self.logger.debug(f"Could not check Drive changes: {e}")
+            return None
+
     async def get_file_metadata(self, file_id: str) -> Dict[str, Any]:
         """
         Obtiene metadata detallada de un archivo
@@ -1,19 +1,22 @@
 # app/handlers/episodic_memory_handler.py
 """
 Episodic Memory Handler - Events and temporal experiences
-Refactored to work independently without legacy memory services
+Persisted in agent_memories (kind=episodic): embedding search via pgvector,
+decay and importance top-k computed in Postgres
 """
 import time
-import math
 import logging
+from contextlib import asynccontextmanager
 from typing import Dict, Any, Optional, List
 from uuid import UUID
-from datetime import datetime, timedelta
+from datetime import datetime, timedelta, timezone
 
 from .connector_handler import ActionHandler
 from app.connectors.factory import register_tool, register_node
-from app.exceptions.api_exceptions import InvalidDataException
+from app.core.config import settings
+from app.ai.embeddings import get_embedding
 from app.ai.memories.memory_factory import register_specialized_memory, MemoryCapability
+from app.repositories.agent_memory_repository import AgentMemoryRepository
 
 logger = logging.getLogger(__name__)
 
@@ -29,8 +32,8 @@ logger = logging.getLogger(__name__)
     ],
     description="Store and retrieve specific events with temporal decay and importance scoring",
     requires_credentials=False,
-    persistent=False,  # Currently in-memory
-    max_storage=1000,  # Max episodes per agent
+    persistent=True,  # agent_memories (pgvector)
+    max_storage=1000,  # Max episodes per agent (EPISODIC_MEMORY_MAX_EPISODES)
     cost_per_operation=0.002  # Slightly higher for processing
 )
 class EpisodicMemoryHandler(ActionHandler):
@@ -48,15 +51,12 @@ class EpisodicMemoryHandler(ActionHandler):
         "description": "Store and retrieve specific events with temporal decay",
         "capabilities": ["store", "retrieve", "consolidate", "search"],
         "storage_type": "episodic",
-        "persistent": False,
+        "persistent": True,
         "max_content_length": 5000
     }
     
     def __init__(self, creds: Dict[str, Any] = None):
         super().__init__(creds or {})
-        # Global episodic memory storage - shared across instances
-        if not hasattr(EpisodicMemoryHandler, '_global_episodes'):
-            EpisodicMemoryHandler._global_episodes: Dict[UUID, List[Dict[str, Any]]] = {}
 
     async def execute(
         self,
@@ -88,7 +88,8 @@ class EpisodicMemoryHandler(ActionHandler):
             elif action == "search":
                 query = params.get("query", "")
                 importance_threshold = params.get("importance_threshold", 0.3)
-                result = await self._search_episodes(agent_id, query, importance_threshold)
+                top_k = params.get("top_k", 20)
+                result = await self._search_episodes(agent_id, query, importance_threshold, top_k)
             elif action == "consolidate":
                 result = await self._consolidate_episodes(agent_id)
             else:
@@ -153,42 +154,56 @@ class EpisodicMemoryHandler(ActionHandler):
         
         return None
 
+    @asynccontextmanager
+    async def _repository(self):
+        """Sesión corta por operación: nada de estado en el proceso de la API"""
+        from app.db.database import async_session
+
+        async with async_session() as session:
+            try:
+                yield AgentMemoryRepository(session)
+                await session.commit()
+            except Exception:
+                await session.rollback()
+                raise
+
+    @staticmethod
+    def _usable_embedding(embedding: Optional[List[float]]) -> Optional[List[float]]:
+        """get_embedding devuelve un vector cero si el proveedor falla"""
+        if embedding and any(embedding):
+            return embedding
+        return None
+
     async def _store_episode(self, agent_id: UUID, event: Dict[str, Any]) -> Dict[str, Any]:
         """Store episodic memory event"""
-        if agent_id not in EpisodicMemoryHandler._global_episodes:
-            EpisodicMemoryHandler._global_episodes[agent_id] = []
-        
-        # Create episode with metadata
-        episode = {
-            "id": f"ep_{int(time.time() * 1000)}_{len(EpisodicMemoryHandler._global_episodes[agent_id])}",
-            "content": str(event.get("content", "")),
-            "timestamp": time.time(),
-            "datetime": datetime.now().isoformat(),
+        content = str(event.get("content", ""))
+        now = time.time()
+        metadatas = {
             "importance": self._calculate_importance(event),
             "emotion": event.get("emotion", "neutral"),
             "tags": self._extract_tags(event),
             "context": event.get("context", {}),
             "access_count": 0,
-            "last_accessed": time.time()
+            "timestamp": now,
+            "last_accessed": now,
         }
-        
-        # Add to memory
-        episodes = EpisodicMemoryHandler._global_episodes[agent_id]
-        episodes.append(episode)
-        
-        # Limit memory size (keep most recent + most important)
-        max_episodes = 1000
-        if len(episodes) > max_episodes:
-            # Sort by importance and recency
-            episodes.sort(key=lambda e: (e["importance"], e["timestamp"]), reverse=True)
-            EpisodicMemoryHandler._global_episodes[agent_id] = episodes[:max_episodes]
-        
+        # Sin embedding útil se guarda NULL: el episodio sigue accesible por búsqueda léxica
+        embedding = self._usable_embedding(await get_embedding(content))
+        if embedding is None:
+            logger.warning(f"Storing episode for agent {agent_id} without embedding (provider failed)")
+
+        async with self._repository() as repo:
+            episode_id = await repo.add_episode(agent_id, content, embedding, metadatas)
+            # Limit memory size (keep most important + most recent)
+            await repo.prune_episodes(agent_id, settings.EPISODIC_MEMORY_MAX_EPISODES)
+            total = await repo.count_episodes(agent_id)
+
         return {
-            "episode_id": episode["id"],
-            "stored_content": episode["content"],
-            "importance": episode["importance"],
-            "tags": episode["tags"],
-            "total_episodes": len(EpisodicMemoryHandler._global_episodes[agent_id]),
+            "episode_id": str(episode_id),
+            "stored_content": content,
+            "importance": metadatas["importance"],
+            "tags": metadatas["tags"],
+            "total_episodes": total,
             "agent_id": str(agent_id),
             "storage_type": "episodic"
         }
@@ -200,56 +215,28 @@ class EpisodicMemoryHandler(ActionHandler):
         time_window_hours: int,
         top_k: int
     ) -> Dict[str, Any]:
-        """Retrieve episodes within time window, optionally filtered by query"""
-        episodes = EpisodicMemoryHandler._global_episodes.get(agent_id, [])
-        
-        if not episodes:
-            return {
-                "episodes": [],
-                "count": 0,
-                "agent_id": str(agent_id),
-                "query": query,
-                "time_window_hours": time_window_hours
-            }
-        
-        # Filter by time window
-        now = time.time()
-        time_threshold = now - (time_window_hours * 3600)
-        recent_episodes = [ep for ep in episodes if ep["timestamp"] >= time_threshold]
-        
-        # Apply decay factor to importance
-        for episode in recent_episodes:
-            episode["current_importance"] = self._apply_decay(episode)
-        
-        # Filter by query if provided
-        if query and query.strip():
-            query_lower = query.lower()
-            filtered_episodes = []
-            for episode in recent_episodes:
-                # Simple text matching - could be enhanced with semantic search
-                content_lower = episode["content"].lower()
-                tags_lower = [tag.lower() for tag in episode["tags"]]
-                
-                if (query_lower in content_lower or 
-                    any(query_lower in tag for tag in tags_lower)):
-                    filtered_episodes.append(episode)
-            recent_episodes = filtered_episodes
-        
-        # Sort by current importance (with decay)
-        recent_episodes.sort(key=lambda e: e["current_importance"], reverse=True)
-        
-        # Limit results
-        result_episodes = recent_episodes[:top_k]
-        
-        # Update access count for retrieved episodes
-        for episode in result_episodes:
-            episode["access_count"] += 1
-            episode["last_accessed"] = now
-        
+        """Retrieve episodes within time window, optionally ranked by semantic similarity"""
+        since = datetime.now(timezone.utc) - timedelta(hours=time_window_hours)
+        query = (query or "").strip()
+        query_embedding = self._usable_embedding(await get_embedding(query)) if query else None
+
+        async with self._repository() as repo:
+            rows = await repo.top_episodes(
+                agent_id,
+                top_k=top_k,
+                since=since,
+                query_embedding=query_embedding,
+                max_distance=settings.EPISODIC_MEMORY_MAX_DISTANCE if query_embedding else None,
+                text_query=query if query and query_embedding is None else None,
+            )
+            total_in_timeframe = await repo.count_episodes(agent_id, since)
+            # Update access count for retrieved episodes
+            await repo.touch_episodes([row["id"] for row in rows], time.time())
+
         return {
-            "episodes": [self._format_episode_for_output(ep) for ep in result_episodes],
-            "count": len(result_episodes),
-            "total_in_timeframe": len(recent_episodes),
+            "episodes": [self._format_episode_for_output(row) for row in rows],
+            "count": len(rows),
+            "total_in_timeframe": total_in_timeframe,
             "agent_id": str(agent_id),
             "query": query,
             "time_window_hours": time_window_hours,
@@ -260,45 +247,32 @@ class EpisodicMemoryHandler(ActionHandler):
         self, 
         agent_id: UUID, 
         query: str,
-        importance_threshold: float
+        importance_threshold: float,
+        top_k: int = 20
     ) -> Dict[str, Any]:
-        """Search episodes by content with importance filtering"""
-        episodes = EpisodicMemoryHandler._global_episodes.get(agent_id, [])
-        
-        if not episodes or not query.strip():
+        """Search episodes by semantic similarity with importance filtering"""
+        if not query or not query.strip():
             return {
                 "episodes": [],
                 "count": 0,
                 "agent_id": str(agent_id),
                 "query": query
             }
-        
-        query_lower = query.lower()
-        matching_episodes = []
-        
-        for episode in episodes:
-            # Apply decay to get current importance
-            current_importance = self._apply_decay(episode)
-            
-            # Filter by importance threshold
-            if current_importance < importance_threshold:
-                continue
-            
-            # Search in content and tags
-            content_lower = episode["content"].lower()
-            tags_lower = [tag.lower() for tag in episode["tags"]]
-            
-            if (query_lower in content_lower or 
-                any(query_lower in tag for tag in tags_lower)):
-                episode["current_importance"] = current_importance
-                matching_episodes.append(episode)
-        
-        # Sort by current importance
-        matching_episodes.sort(key=lambda e: e["current_importance"], reverse=True)
-        
+
+        query_embedding = self._usable_embedding(await get_embedding(query))
+        async with self._repository() as repo:
+            rows = await repo.top_episodes(
+                agent_id,
+                top_k=top_k,
+                min_importance=importance_threshold,
+                query_embedding=query_embedding,
+                max_distance=settings.EPISODIC_MEMORY_MAX_DISTANCE if query_embedding else None,
+                text_query=query.strip() if query_embedding is None else None,
+            )
+
         return {
-            "episodes": [self._format_episode_for_output(ep) for ep in matching_episodes],
-            "count": len(matching_episodes),
+            "episodes": [self._format_episode_for_output(row) for row in rows],
+            "count": len(rows),
             "agent_id": str(agent_id),
             "query": query,
             "importance_threshold": importance_threshold,
@@ -306,43 +280,17 @@ class EpisodicMemoryHandler(ActionHandler):
         }
     
     async def _consolidate_episodes(self, agent_id: UUID) -> Dict[str, Any]:
-        """Consolidate old episodes by removing low-importance ones"""
-        episodes = EpisodicMemoryHandler._global_episodes.get(agent_id, [])
-        
-        if not episodes:
-            return {
-                "consolidated": 0,
-                "remaining": 0,
-                "agent_id": str(agent_id)
-            }
-        
-        original_count = len(episodes)
-        
-        # Apply decay and filter out very low importance episodes
-        current_time = time.time()
-        consolidated_episodes = []
-        
-        for episode in episodes:
-            current_importance = self._apply_decay(episode)
-            
-            # Keep episode if:
-            # 1. High current importance (>0.3)
-            # 2. Recently accessed
-            # 3. Within last 24 hours regardless of importance
-            age_hours = (current_time - episode["timestamp"]) / 3600
-            recently_accessed = (current_time - episode["last_accessed"]) < 86400  # 24h
-            
-            if (current_importance > 0.3 or 
-                recently_accessed or 
-                age_hours < 24):
-                consolidated_episodes.append(episode)
-        
-        # Update memory
-        EpisodicMemoryHandler._global_episodes[agent_id] = consolidated_episodes
-        
+        """
+        Consolidate old episodes by removing low-importance ones.
+        Keeps: current importance > 0.3, accessed or created within the last 24 hours.
+        """
+        async with self._repository() as repo:
+            original_count = await repo.count_episodes(agent_id)
+            removed = await repo.consolidate_episodes(agent_id, min_importance=0.3, keep_recent_hours=24)
+
         return {
-            "consolidated": original_count - len(consolidated_episodes),
-            "remaining": len(consolidated_episodes),
+            "consolidated": removed,
+            "remaining": original_count - removed,
             "original_count": original_count,
             "agent_id": str(agent_id),
             "storage_type": "episodic"
@@ -435,40 +383,23 @@ class EpisodicMemoryHandler(ActionHandler):
         # Remove duplicates
         return list(set(tags))
     
-    def _apply_decay(self, episode: Dict[str, Any]) -> float:
-        """Apply temporal decay to episode importance"""
-        current_time = time.time()
-        age_hours = (current_time - episode["timestamp"]) / 3600
-        base_importance = episode["importance"]
-        access_count = episode.get("access_count", 0)
-        
-        # Decay function: importance * e^(-age/decay_rate)
-        # More accessed episodes decay slower
-        decay_rate = 168 + (access_count * 24)  # Base 1 week + 1 day per access
-        
-        decay_factor = math.exp(-age_hours / decay_rate)
-        current_importance = base_importance * decay_factor
-        
-        # Boost for recently accessed episodes
-        time_since_access = current_time - episode.get("last_accessed", episode["timestamp"])
-        if time_since_access < 3600:  # Accessed within last hour
-            current_importance *= 1.2
-        
-        return min(1.0, current_importance)
-    
-    def _format_episode_for_output(self, episode: Dict[str, Any]) -> Dict[str, Any]:
-        """Format episode for API output"""
+    def _format_episode_for_output(self, row: Dict[str, Any]) -> Dict[str, Any]:
+        """Format episode row (agent_memories + current_importance) for API output"""
+        meta = row.get("metadatas") or {}
+        created_at = row["created_at"]
+        timestamp = created_at.timestamp()
+        importance = meta.get("importance", 0.5)
         return {
-            "id": episode["id"],
-            "content": episode["content"],
-            "timestamp": episode["timestamp"],
-            "datetime": episode["datetime"],
-            "importance": episode["importance"],
-            "current_importance": episode.get("current_importance", episode["importance"]),
-            "emotion": episode["emotion"],
-            "tags": episode["tags"],
-            "access_count": episode["access_count"],
-            "age_hours": (time.time() - episode["timestamp"]) / 3600
+            "id": str(row["id"]),
+            "content": row["content"],
+            "timestamp": timestamp,
+            "datetime": created_at.isoformat(),
+            "importance": importance,
+            "current_importance": float(row.get("current_importance", importance)),
+            "emotion": meta.get("emotion", "neutral"),
+            "tags": meta.get("tags", []),
+            "access_count": meta.get("access_count", 0),
+            "age_hours": (time.time() - timestamp) / 3600
         }
     
     def _create_error_response(self, error_message: str) -> Dict[str, Any]:
@@ -483,37 +414,29 @@ class EpisodicMemoryHandler(ActionHandler):
 
 # Utility functions for episodic memory
 
-def get_agent_episodes(agent_id: UUID) -> List[Dict[str, Any]]:
-    """Get all episodes for an agent"""
-    if hasattr(EpisodicMemoryHandler, '_global_episodes'):
-        return EpisodicMemoryHandler._global_episodes.get(agent_id, [])
-    return []
+async def get_agent_episodes(agent_id: UUID, limit: int = 100) -> List[Dict[str, Any]]:
+    """Get the most important episodes for an agent"""
+    from app.db.database import async_session
 
-def get_episodic_memory_stats() -> Dict[str, Any]:
+    async with async_session() as session:
+        return await AgentMemoryRepository(session).top_episodes(agent_id, top_k=limit)
+
+async def get_episodic_memory_stats() -> Dict[str, Any]:
     """Get statistics about episodic memory usage"""
-    if not hasattr(EpisodicMemoryHandler, '_global_episodes'):
-        return {"total_agents": 0, "total_episodes": 0}
-    
-    memory_data = EpisodicMemoryHandler._global_episodes
-    total_episodes = sum(len(episodes) for episodes in memory_data.values())
-    
-    return {
-        "total_agents": len(memory_data),
-        "total_episodes": total_episodes,
-        "agents_with_episodes": [str(agent_id) for agent_id in memory_data.keys()],
-        "avg_episodes_per_agent": total_episodes / len(memory_data) if memory_data else 0
-    }
+    from app.db.database import async_session
 
-def clear_all_episodic_memory() -> Dict[str, Any]:
-    """Clear all episodic memory (useful for testing)"""
-    if hasattr(EpisodicMemoryHandler, '_global_episodes'):
-        cleared_agents = len(EpisodicMemoryHandler._global_episodes)
-        cleared_episodes = sum(len(episodes) for episodes in EpisodicMemoryHandler._global_episodes.values())
-        EpisodicMemoryHandler._global_episodes.clear()
-        
-        return {
-            "cleared_agents": cleared_agents,
-            "cleared_episodes": cleared_episodes
-        }
-    
-    return {"cleared_agents": 0, "cleared_episodes": 0}
\ No newline at end of file
+    async with async_session() as session:
+        stats = await AgentMemoryRepository(session).episode_stats()
+    stats["avg_episodes_per_agent"] = (
+        stats["total_episodes"] / stats["total_agents"] if stats["total_agents"] else 0
+    )
+    return stats
+
+async def clear_agent_episodic_memory(agent_id: UUID) -> Dict[str, Any]:
+    """Clear episodic memory of one agent (useful for testing)"""
+    from app.db.database import async_session
+
+    async with async_session() as session:
+        cleared = await AgentMemoryRepository(session).delete_episodes(agent_id)
+        await session.commit()
+    return {"agent_id": str(agent_id), "cleared_episodes": cleared}
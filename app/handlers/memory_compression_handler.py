@@ -1,9 +1,12 @@
-from typing import Dict, Any, Optional, List
+from typing import AsyncIterator, Dict, Any, Optional, List
 from uuid import UUID
+from datetime import datetime, timedelta, timezone
 import asyncio
 
 from .base_memory_handler import AgentRequiredMemoryHandler
 from app.connectors.factory import register_tool, register_node
+from app.core.config import settings
+from app.ai.memories.compression import iter_batches, plan_compression
 
 @register_node("MemoryCompressionHandler")
 @register_tool("MemoryCompressionHandler")
@@ -45,7 +48,7 @@ class MemoryCompressionHandler(AgentRequiredMemoryHandler):
         if not isinstance(days_old, (int, float)) or days_old < 1:
             return "days_old must be a positive number"
         
-        max_memories = params.get("max_memories", 1000)
+        max_memories = params.get("max_memories", settings.MEMORY_COMPRESSION_MAX_MEMORIES)
         if not isinstance(max_memories, int) or max_memories < 1:
             return "max_memories must be a positive integer"
         
@@ -74,17 +77,60 @@ class MemoryCompressionHandler(AgentRequiredMemoryHandler):
         else:
             return self._create_error_response(f"Unknown action: {action}", "INVALID_ACTION")
     
+    async def _load_compressible_memories(
+        self, agent_id: UUID, days_old: float, limit: int, with_embeddings: bool = True
+    ) -> List[Dict]:
+        """Memories older than `days_old` from agent_memories (embeddings only when needed)"""
+        older_than = datetime.now(timezone.utc) - timedelta(days=days_old)
+        async with self._memory_repository() as repo:
+            return await repo.compressible_memories(agent_id, older_than, limit, with_embeddings)
+    
+    async def _iter_compressible_pages(self, agent_id: UUID, days_old: float, limit: int) -> AsyncIterator[List[Dict]]:
+        """
+        Up to `limit` compressible memories with embeddings, in pages of
+        MEMORY_COMPRESSION_PAGE_SIZE (oldest first, keyset pagination)
+        """
+        older_than = datetime.now(timezone.utc) - timedelta(days=days_old)
+        page_size = max(1, settings.MEMORY_COMPRESSION_PAGE_SIZE)
+        after = None
+        remaining = limit
+        while remaining > 0:
+            async with self._memory_repository() as repo:
+                page = await repo.compressible_memories(
+                    agent_id, older_than, min(page_size, remaining), with_embeddings=True, after=after
+                )
+            if not page:
+                return
+            yield page
+            remaining -= len(page)
+            if len(page) < page_size:
+                return
+            after = (page[-1]["created_at"], page[-1]["id"])
+    
     async def _compress_memories(self, params: Dict[str, Any], agent_id: UUID) -> Dict[str, Any]:
         """Compress memories using specified strategy"""
         try:
             strategy = params.get("compression_strategy", "importance_based")
             days_old = params.get("days_old", 30)
             dry_run = params.get("dry_run", False)
+            max_memories = params.get("max_memories", settings.MEMORY_COMPRESSION_MAX_MEMORIES)
             
-            # Get compressible memories
-            compressible_memories = await self.memory_service.get_compressible_memories(
-                agent_id=agent_id, 
-                days_old=days_old
+            if strategy == "similarity_clustering":
+                # Embeddings page by page: memory stays bounded for tens of thousands of memories
+                result = await self._compress_by_similarity_paged(agent_id, days_old, max_memories, dry_run)
+                return self._create_success_response({
+                    "action": "compress",
+                    "strategy": strategy,
+                    "memories_found": result["memories_found"],
+                    "compressed_count": result["compressed_count"],
+                    "space_saved_percent": result["space_saved_percent"],
+                    "dry_run": dry_run,
+                    "details": result["details"]
+                })
+            
+            # Get compressible memories (embeddings only needed for similarity clustering)
+            compressible_memories = await self._load_compressible_memories(
+                agent_id, days_old, max_memories, with_embeddings=False
             )
             
             if not compressible_memories:
@@ -100,8 +146,6 @@ class MemoryCompressionHandler(AgentRequiredMemoryHandler):
                 result = await self._compress_by_importance(compressible_memories, agent_id, dry_run)
             elif strategy == "temporal_decay":
                 result = await self._compress_by_temporal_decay(compressible_memories, agent_id, dry_run)
-            elif strategy == "similarity_clustering":
-                result = await self._compress_by_similarity(compressible_memories, agent_id, dry_run)
             else:
                 return self._create_error_response(f"Strategy {strategy} not implemented", "STRATEGY_ERROR")
             
@@ -123,9 +167,11 @@ class MemoryCompressionHandler(AgentRequiredMemoryHandler):
         try:
             days_old = params.get("days_old", 30)
             
-            compressible_memories = await self.memory_service.get_compressible_memories(
-                agent_id=agent_id, 
-                days_old=days_old
+            compressible_memories = await self._load_compressible_memories(
+                agent_id,
+                days_old,
+                params.get("max_memories", settings.MEMORY_COMPRESSION_MAX_MEMORIES),
+                with_embeddings=False,
             )
             
             # Analyze the memories
@@ -257,25 +303,69 @@ class MemoryCompressionHandler(AgentRequiredMemoryHandler):
             ]
         }
     
-    async def _compress_by_similarity(self, memories: List[Dict], agent_id: UUID, dry_run: bool) -> Dict[str, Any]:
-        """Compress similar memories by clustering"""
-        # This is a simplified version - in reality you'd use embeddings
-        # to find truly similar memories and merge them
-        
-        # Group by content similarity (simplified)
-        similarity_groups = self._group_similar_memories(memories)
-        
-        compressed_count = 0
-        for group in similarity_groups:
-            if len(group) > 1:
-                compressed_count += len(group) - 1  # Keep one, compress others
+    async def _compress_by_similarity_paged(
+        self, agent_id: UUID, days_old: float, max_memories: int, dry_run: bool
+    ) -> Dict[str, Any]:
+        """
+        similarity_clustering over up to `max_memories` memories, one page at a
+        time: duplicates are only detected within a page (pages are contiguous
+        in time, so near-in-time duplicates land together)
+        """
+        memories_found = compressed_count = groups = 0
+        async for page in self._iter_compressible_pages(agent_id, days_old, max_memories):
+            memories_found += len(page)
+            page_result = await self._compress_by_similarity(page, agent_id, dry_run)
+            compressed_count += page_result["compressed_count"]
+            groups += page_result["groups"]
         
+        space_saved = (compressed_count / memories_found * 100) if memories_found else 0
+        return {
+            "memories_found": memories_found,
+            "compressed_count": compressed_count,
+            "space_saved_percent": space_saved,
+            "details": [
+                f"Found {groups} similarity groups, compressed {compressed_count} duplicate memories"
+            ] if memories_found else ["No memories found for compression"]
+        }
+    
+    async def _compress_by_similarity(self, memories: List[Dict], agent_id: UUID, dry_run: bool) -> Dict[str, Any]:
+        """
+        Compress similar memories by clustering their embeddings.
+        Clustering (LSH + blocked cosine, MinHash for memories without embedding)
+        runs in a worker thread, per memory kind; merge plans are applied in batches.
+        """
+        plans = await asyncio.to_thread(
+            plan_compression,
+            memories,
+            settings.MEMORY_COMPRESSION_SIMILARITY_THRESHOLD,
+            settings.MEMORY_COMPRESSION_TEXT_THRESHOLD,
+        )
+        compressed_count = sum(len(plan.merge_ids) for plan in plans)
+
+        if not dry_run and plans:
+            by_id = {memory["id"]: memory for memory in memories}
+            async with self._memory_repository() as repo:
+                for batch in iter_batches(plans, settings.MEMORY_COMPRESSION_BATCH_SIZE):
+                    keepers = []
+                    merged_ids = []
+                    for plan in batch:
+                        metadata = dict(by_id[plan.keep_id].get("metadata") or {})
+                        metadata["merged_count"] = metadata.get("merged_count", 0) + len(plan.merge_ids)
+                        # Full content of every merged memory: nothing is lost on merge
+                        metadata["merged_contents"] = metadata.get("merged_contents", []) + plan.merged_content
+                        keepers.append({"id": plan.keep_id, "metadatas": metadata})
+                        merged_ids.extend(plan.merge_ids)
+                    await repo.merge_memories(keepers, merged_ids)
+
         space_saved = (compressed_count / len(memories) * 100) if memories else 0
         
         return {
             "compressed_count": compressed_count,
+            "groups": len(plans),
             "space_saved_percent": space_saved,
-            "details": [f"Found {len(similarity_groups)} similarity groups, compressed {compressed_count} duplicate memories"]
+            "details": [
+                f"Found {len(plans)} similarity groups, compressed {compressed_count} duplicate memories"
+            ]
         }
     
     def _get_importance_bucket(self, importance: float) -> str:
@@ -286,48 +376,3 @@ class MemoryCompressionHandler(AgentRequiredMemoryHandler):
             return "medium"
         else:
             return "high"
-    
-    def _group_similar_memories(self, memories: List[Dict]) -> List[List[Dict]]:
-        """Group similar memories (simplified implementation)"""
-        # This is a very basic implementation
-        # In reality, you'd use embeddings and clustering algorithms
-        
-        groups = []
-        used_indices = set()
-        
-        for i, memory1 in enumerate(memories):
-            if i in used_indices:
-                continue
-            
-            group = [memory1]
-            used_indices.add(i)
-            
-            content1 = memory1.get("content", "").lower()
-            
-            for j, memory2 in enumerate(memories[i+1:], i+1):
-                if j in used_indices:
-                    continue
-                
-                content2 = memory2.get("content", "").lower()
-                
-                # Simple similarity check - in reality use cosine similarity
-                if self._simple_similarity(content1, content2) > 0.7:
-                    group.append(memory2)
-                    used_indices.add(j)
-            
-            groups.append(group)
-        
-        return groups
-    
-    def _simple_similarity(self, text1: str, text2: str) -> float:
-        """Simple text similarity calculation"""
-        if not text1 or not text2:
-            return 0.0
-        
-        words1 = set(text1.split())
-        words2 = set(text2.split())
-        
-        intersection = words1.intersection(words2)
-        union = words1.union(words2)
-        
-        return len(intersection) / len(union) if union else 0.0
\ No newline at end of file
@@ -5,13 +5,15 @@ This handler allows agents to search their memory when needed, instead of automa
 """
 from typing import Dict, Any, Optional, List
 from uuid import UUID
-from datetime import datetime, timedelta
+from datetime import datetime, timedelta, timezone
 
 from .base_memory_handler import AgentRequiredMemoryHandler
 from app.connectors.factory import register_tool, register_node
+from app.core.config import settings
+from app.ai.embeddings import get_embedding
 
 @register_node("MemorySearchHandler")
-@register_tool("MemorySearchHandler")
+@register_tool("MemorySearchHandler", read_only=True)
 class MemorySearchHandler(AgentRequiredMemoryHandler):
     """
     Memory search handler - Intelligent memory retrieval
@@ -101,37 +103,34 @@ class MemorySearchHandler(AgentRequiredMemoryHandler):
         else:
             return self._create_error_response(f"Unknown strategy: {strategy}", "INVALID_STRATEGY")
     
+    async def _query_embedding(self, query: str) -> Optional[List[float]]:
+        """Embedding de la consulta; None si el proveedor falla (vector cero)"""
+        embedding = await get_embedding(query)
+        return embedding if embedding and any(embedding) else None
+    
     async def _semantic_search(self, params: Dict[str, Any], agent_id: UUID) -> Dict[str, Any]:
-        """Perform semantic search using embeddings"""
+        """Perform semantic search using embeddings (filters and top-k in SQL)"""
         try:
             query = params["query"]
             top_k = params.get("top_k", 5)
             memory_types = params.get("memory_types", None)  # Filter by memory type
             min_importance = params.get("min_importance", None)
             
-            # Perform semantic search
-            memories = await self.memory_service.retrieve_similar(
-                agent_id=agent_id,
-                query=query,
-                top_k=top_k * 2  # Get more to apply filters
-            )
-            
-            # Apply filters
-            filtered_memories = self._apply_filters(
-                memories, 
-                memory_types=memory_types,
-                min_importance=min_importance
-            )
+            query_embedding = await self._query_embedding(query)
+            if query_embedding is None:
+                return self._create_error_response("Could not embed query", "SEMANTIC_SEARCH_ERROR")
             
-            # Limit to requested count
-            final_memories = filtered_memories[:top_k]
+            async with self._memory_repository() as repo:
+                rows = await repo.semantic_search(
+                    agent_id, query_embedding, top_k,
+                    memory_types=memory_types, min_importance=min_importance,
+                )
             
             return self._create_success_response({
                 "strategy": "semantic",
                 "query": query,
-                "memories_found": len(final_memories),
-                "total_before_filters": len(memories),
-                "memories": self._format_memories_for_response(final_memories),
+                "memories_found": len(rows),
+                "memories": self._format_memories_for_response(rows),
                 "search_metadata": {
                     "semantic_similarity": True,
                     "embedding_based": True,
@@ -150,37 +149,19 @@ class MemorySearchHandler(AgentRequiredMemoryHandler):
             # Parse time parameters
             start_date, end_date = self._parse_temporal_params(params)
             
-            # Get all memories for the agent (we'll filter by time)
-            all_memories = await self.memory_service.list_memories_by_agent(
-                agent_id=agent_id,
-                limit=1000  # Get a large set to filter from
-            )
-            
-            # Filter by time range
-            filtered_memories = []
-            for memory in all_memories:
-                memory_time = getattr(memory, 'created_at', None)
-                if memory_time:
-                    if start_date <= memory_time <= end_date:
-                        filtered_memories.append({
-                            "content": memory.content,
-                            "metadata": getattr(memory, 'metadatas', {}),
-                            "created_at": memory_time.isoformat() if memory_time else None
-                        })
-            
-            # Sort by recency and limit
-            filtered_memories.sort(
-                key=lambda m: m.get("created_at", ""), 
-                reverse=True
-            )
-            final_memories = filtered_memories[:top_k]
+            async with self._memory_repository() as repo:
+                rows = await repo.list_memories(
+                    agent_id, top_k, start=start_date, end=end_date,
+                    memory_types=params.get("memory_types"),
+                    min_importance=params.get("min_importance"),
+                )
             
             return self._create_success_response({
                 "strategy": "temporal",
                 "start_date": start_date.isoformat(),
                 "end_date": end_date.isoformat(),
-                "memories_found": len(final_memories),
-                "memories": final_memories,
+                "memories_found": len(rows),
+                "memories": self._format_memories_for_response(rows),
                 "search_metadata": {
                     "temporal_range": True,
                     "chronological_order": True
@@ -191,77 +172,55 @@ class MemorySearchHandler(AgentRequiredMemoryHandler):
             return self._create_error_response(f"Temporal search failed: {str(e)}", "TEMPORAL_SEARCH_ERROR")
     
     async def _hybrid_search(self, params: Dict[str, Any], agent_id: UUID) -> Dict[str, Any]:
-        """Combine semantic and temporal search"""
+        """
+        Lexical (Postgres full-text) + vector (pgvector) candidates fused with
+        reciprocal-rank fusion and blended with recency, in a single SQL query
+        """
         try:
             query = params["query"]
             top_k = params.get("top_k", 5)
             time_weight = params.get("time_weight", 0.3)  # How much to weight recency
             semantic_weight = 1.0 - time_weight
+            memory_types = params.get("memory_types", None)
+            min_importance = params.get("min_importance", None)
             
-            # Get semantic results
-            semantic_memories = await self.memory_service.retrieve_similar(
-                agent_id=agent_id,
-                query=query,
-                top_k=top_k * 3  # Get more for hybrid scoring
-            )
-            
-            # Apply hybrid scoring
-            scored_memories = []
-            current_time = datetime.utcnow()
-            
-            for i, memory in enumerate(semantic_memories):
-                # Semantic score (based on position in results)
-                semantic_score = (len(semantic_memories) - i) / len(semantic_memories)
-                
-                # Temporal score (recency)
-                try:
-                    metadata = memory.get("metadata", {})
-                    timestamp = metadata.get("timestamp")
-                    if timestamp:
-                        if isinstance(timestamp, str):
-                            memory_time = datetime.fromisoformat(timestamp.replace('Z', '+00:00'))
-                        else:
-                            memory_time = timestamp
-                        
-                        # Calculate recency score (newer = higher score)
-                        days_old = (current_time - memory_time).days
-                        temporal_score = max(0, 1.0 - (days_old / 365))  # Score decreases over a year
-                    else:
-                        temporal_score = 0.5  # Default score for unknown timestamps
-                except:
-                    temporal_score = 0.5
-                
-                # Combined score
-                hybrid_score = (semantic_weight * semantic_score) + (time_weight * temporal_score)
-                
-                scored_memory = memory.copy()
-                scored_memory["hybrid_score"] = hybrid_score
-                scored_memory["semantic_score"] = semantic_score
-                scored_memory["temporal_score"] = temporal_score
-                
-                scored_memories.append(scored_memory)
-            
-            # Sort by hybrid score and limit
-            scored_memories.sort(key=lambda m: m["hybrid_score"], reverse=True)
-            final_memories = scored_memories[:top_k]
+            query_embedding = await self._query_embedding(query)
+            async with self._memory_repository() as repo:
+                rows = await repo.hybrid_search(
+                    agent_id,
+                    query_text=query,
+                    query_embedding=query_embedding,
+                    top_k=top_k,
+                    memory_types=memory_types,
+                    min_importance=min_importance,
+                    time_weight=time_weight,
+                    half_life_days=params.get("recency_half_life_days", settings.MEMORY_SEARCH_RECENCY_HALF_LIFE_DAYS),
+                    candidates=max(top_k * settings.MEMORY_SEARCH_CANDIDATE_MULTIPLIER, 20),
+                )
             
             return self._create_success_response({
                 "strategy": "hybrid",
                 "query": query,
-                "memories_found": len(final_memories),
-                "memories": self._format_memories_for_response(final_memories),
+                "memories_found": len(rows),
+                "memories": self._format_memories_for_response(rows),
                 "search_metadata": {
                     "hybrid_scoring": True,
+                    "fusion": "reciprocal_rank",
+                    "lexical": True,
+                    "semantic": query_embedding is not None,
                     "semantic_weight": semantic_weight,
                     "time_weight": time_weight,
+                    "filtered": bool(memory_types or min_importance is not None),
                     "scoring_details": [
                         {
                             "content_preview": m["content"][:50] + "..." if len(m["content"]) > 50 else m["content"],
-                            "hybrid_score": round(m["hybrid_score"], 3),
-                            "semantic_score": round(m["semantic_score"], 3),
-                            "temporal_score": round(m["temporal_score"], 3)
+                            "hybrid_score": round(float(m["hybrid_score"]), 3),
+                            "rrf_score": round(float(m["rrf_score"]), 5),
+                            "lexical_score": round(float(m["lexical_score"]), 3) if m["lexical_score"] is not None else None,
+                            "semantic_score": round(float(m["semantic_score"]), 3) if m["semantic_score"] is not None else None,
+                            "temporal_score": round(float(m["temporal_score"]), 3)
                         }
-                        for m in final_memories
+                        for m in rows
                     ]
                 }
             })
@@ -273,31 +232,14 @@ class MemorySearchHandler(AgentRequiredMemoryHandler):
         """Get recent memories chronologically"""
         try:
             top_k = params.get("top_k", 5)
-            memory_types = params.get("memory_types", None)
             
-            # Get recent memories
-            recent_memories = await self.memory_service.list_memories_by_agent(
-                agent_id=agent_id,
-                limit=top_k * 2  # Get more to apply filters
-            )
-            
-            # Convert to dict format and apply filters
-            memory_dicts = [
-                {
-                    "content": memory.content,
-                    "metadata": getattr(memory, 'metadatas', {}),
-                    "created_at": memory.created_at.isoformat() if memory.created_at else None
-                }
-                for memory in recent_memories
-            ]
-            
-            filtered_memories = self._apply_filters(memory_dicts, memory_types=memory_types)
-            final_memories = filtered_memories[:top_k]
+            async with self._memory_repository() as repo:
+                rows = await repo.list_memories(agent_id, top_k, memory_types=params.get("memory_types"))
             
             return self._create_success_response({
                 "strategy": "recent",
-                "memories_found": len(final_memories),
-                "memories": final_memories,
+                "memories_found": len(rows),
+                "memories": self._format_memories_for_response(rows),
                 "search_metadata": {
                     "chronological_order": True,
                     "most_recent_first": True
@@ -312,34 +254,15 @@ class MemorySearchHandler(AgentRequiredMemoryHandler):
         try:
             top_k = params.get("top_k", 5)
             min_importance = params.get("min_importance", 0.7)
-            memory_types = params.get("memory_types", None)
-            
-            # Get all memories to filter by importance
-            all_memories = await self.memory_service.list_memories_by_agent(
-                agent_id=agent_id,
-                limit=1000
-            )
             
-            # Convert to dict format and filter by importance
-            important_memories = []
-            for memory in all_memories:
-                metadata = getattr(memory, 'metadatas', {})
-                importance = metadata.get('importance', 0.5)
-                
-                if importance >= min_importance:
-                    important_memories.append({
-                        "content": memory.content,
-                        "metadata": metadata,
-                        "created_at": memory.created_at.isoformat() if memory.created_at else None,
-                        "importance": importance
-                    })
-            
-            # Apply additional filters
-            filtered_memories = self._apply_filters(important_memories, memory_types=memory_types)
-            
-            # Sort by importance and limit
-            filtered_memories.sort(key=lambda m: m.get("importance", 0), reverse=True)
-            final_memories = filtered_memories[:top_k]
+            async with self._memory_repository() as repo:
+                rows = await repo.list_memories(
+                    agent_id, top_k,
+                    memory_types=params.get("memory_types"),
+                    min_importance=min_importance,
+                    order_by="importance",
+                )
+            final_memories = self._format_memories_for_response(rows)
             
             return self._create_success_response({
                 "strategy": "importance",
@@ -362,7 +285,7 @@ class MemorySearchHandler(AgentRequiredMemoryHandler):
         end_date = params.get("end_date")
         days_back = params.get("days_back")
         
-        current_time = datetime.utcnow()
+        current_time = datetime.now(timezone.utc)
         
         if days_back:
             start_date = current_time - timedelta(days=days_back)
@@ -382,53 +305,36 @@ class MemorySearchHandler(AgentRequiredMemoryHandler):
         
         return start_date, end_date
     
-    def _apply_filters(
-        self, 
-        memories: List[Dict[str, Any]], 
-        memory_types: Optional[List[str]] = None,
-        min_importance: Optional[float] = None
-    ) -> List[Dict[str, Any]]:
-        """Apply filters to memory results"""
-        filtered = memories
-        
-        # Filter by memory types
-        if memory_types:
-            filtered = [
-                m for m in filtered 
-                if m.get("metadata", {}).get("type") in memory_types
-            ]
-        
-        # Filter by minimum importance
-        if min_importance is not None:
-            filtered = [
-                m for m in filtered 
-                if m.get("metadata", {}).get("importance", 0.5) >= min_importance
-            ]
-        
-        return filtered
-    
     def _format_memories_for_response(self, memories: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
-        """Format memories for consistent response structure"""
+        """Format agent_memories rows for consistent response structure"""
         formatted = []
         
         for memory in memories:
+            created_at = memory.get("created_at")
+            kind = memory.get("kind")
             formatted_memory = {
+                "id": memory.get("id"),
                 "content": memory.get("content", ""),
-                "metadata": memory.get("metadata", {}),
-                "created_at": memory.get("created_at"),
+                "metadata": memory.get("metadatas") or {},
+                "kind": getattr(kind, "value", kind),
+                "created_at": created_at.isoformat() if created_at else None,
             }
             
             # Add search-specific scores if present
             if "hybrid_score" in memory:
                 formatted_memory["scores"] = {
-                    "hybrid": memory["hybrid_score"],
-                    "semantic": memory.get("semantic_score"),
-                    "temporal": memory.get("temporal_score")
+                    "hybrid": float(memory["hybrid_score"]),
+                    "rrf": float(memory["rrf_score"]),
+                    "lexical": float(memory["lexical_score"]) if memory.get("lexical_score") is not None else None,
+                    "semantic": float(memory["semantic_score"]) if memory.get("semantic_score") is not None else None,
+                    "temporal": float(memory["temporal_score"])
                 }
+            elif "semantic_score" in memory:
+                formatted_memory["scores"] = {"semantic": float(memory["semantic_score"])}
             
             if "importance" in memory:
-                formatted_memory["importance"] = memory["importance"]
+                formatted_memory["importance"] = float(memory["importance"])
             
             formatted.append(formatted_memory)
         
-        return formatted
\ No newline at end of file
+        return formatted
@@ -345,6 +345,21 @@ class RedisMemoryHandler(ActionHandler):
         redis_client = await self._get_redis_client()
         await self._append_memory(redis_client, agent_id, item, window, 3600)
     
+    async def append_short_term_batch(self, agent_id: UUID, items: List[Dict[str, Any]], window: int = 6) -> None:
+        """Append several items in a single pipeline round-trip (RPUSH + LTRIM + EXPIRE)"""
+        if not items:
+            return
+        redis_client = await self._get_redis_client()
+        key = self._get_redis_key(agent_id)
+        now = time.time()
+        for item in items:
+            item.setdefault("timestamp", now)
+        pipe = redis_client.pipeline()
+        pipe.rpush(key, *(json.dumps(item, ensure_ascii=False) for item in items))
+        pipe.ltrim(key, -window, -1)
+        pipe.expire(key, 3600)
+        await pipe.execute()
+    
     async def clear_short_term(self, agent_id: UUID) -> None:
         """Backend compatibility method"""
         redis_client = await self._get_redis_client()
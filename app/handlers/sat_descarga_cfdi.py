@@ -1,19 +1,135 @@
 import asyncio
+import logging
 import os
+import random
+import shutil
 import time
 import zipfile
+import xml.etree.ElementTree as ET
 from datetime import date
 from pathlib import Path
-from typing import Any, Dict, Optional
+from typing import Any, AsyncIterator, Dict, Iterator, List, Optional
 import tempfile
 
 from app.connectors.factory import register_node
 from app.handlers.connector_handler import ActionHandler
 from app.clients.sat_ws_client import SATWSClient
+from app.core.cache import get_shared_redis
+from app.core.config import settings
 
-# Contador simple de requests por RFC/día
+logger = logging.getLogger(__name__)
+
+# Cuota de requests por RFC/día: contador atómico en Redis compartido por todos
+# los workers. REQUEST_COUNTER solo se usa si Redis no está disponible.
 REQUEST_COUNTER: Dict[str, int] = {}
-MAX_REQUESTS_PER_DAY = 50
+MAX_REQUESTS_PER_DAY = settings.SAT_MAX_REQUESTS_PER_DAY
+
+# KEYS: contador del día; ARGV: límite, ttl → usados tras consumir, -1 si no hay cupo
+_CONSUME_QUOTA = """
+local used = tonumber(redis.call('GET', KEYS[1]) or '0')
+if used >= tonumber(ARGV[1]) then
+  return -1
+end
+used = redis.call('INCR', KEYS[1])
+if used == 1 then redis.call('EXPIRE', KEYS[1], tonumber(ARGV[2])) end
+return used
+"""
+_consume_quota_script = None
+
+
+async def consume_daily_quota(rfc: str) -> bool:
+    """Consume una descarga del cupo diario del RFC; False si ya se agotó"""
+    global _consume_quota_script
+    counter_key = f"{rfc}-{date.today().isoformat()}"
+    try:
+        if _consume_quota_script is None:
+            _consume_quota_script = get_shared_redis().register_script(_CONSUME_QUOTA)
+        used = await _consume_quota_script(
+            keys=[f"sat:quota:{counter_key}"], args=[MAX_REQUESTS_PER_DAY, 2 * 86400]
+        )
+        return int(used) >= 0
+    except Exception as e:
+        logger.warning(f"SAT quota unavailable in Redis, using local counter: {e}")
+        if REQUEST_COUNTER.get(counter_key, 0) >= MAX_REQUESTS_PER_DAY:
+            return False
+        REQUEST_COUNTER[counter_key] = REQUEST_COUNTER.get(counter_key, 0) + 1
+        return True
+
+
+def _local_name(tag: str) -> str:
+    return tag.rsplit("}", 1)[-1]
+
+
+def _parse_cfdi(path: Path) -> Dict[str, Any]:
+    """Datos básicos del comprobante (CFDI 3.3/4.0); solo la ruta si el XML no es válido"""
+    cfdi: Dict[str, Any] = {"path": str(path)}
+    try:
+        root = ET.parse(path).getroot()
+    except (ET.ParseError, OSError) as e:
+        cfdi["error"] = str(e)
+        return cfdi
+    cfdi.update(
+        fecha=root.get("Fecha"),
+        total=root.get("Total"),
+        tipo=root.get("TipoDeComprobante"),
+    )
+    for element in root.iter():
+        name = _local_name(element.tag)
+        if name == "Emisor":
+            cfdi["emisor_rfc"] = element.get("Rfc")
+        elif name == "Receptor":
+            cfdi["receptor_rfc"] = element.get("Rfc")
+        elif name == "TimbreFiscalDigital":
+            cfdi["uuid"] = element.get("UUID")
+    return cfdi
+
+
+def _member_target(out_dir: Path, filename: str) -> Optional[Path]:
+    """Ruta de extracción del miembro conservando su ruta relativa; None si saldría de out_dir"""
+    root = out_dir.resolve()
+    target = (root / filename).resolve()
+    if target == root or root not in target.parents:
+        return None
+    return target
+
+
+def _extract_batch(zf: zipfile.ZipFile, members: Iterator[zipfile.ZipInfo], out_dir: Path, batch_size: int) -> List[Dict[str, Any]]:
+    batch = []
+    for info in members:
+        # Ruta relativa completa: miembros homónimos en carpetas distintas no se pisan
+        target = _member_target(out_dir, info.filename)
+        if target is None:
+            logger.warning(f"SAT package member outside extraction dir skipped: {info.filename!r}")
+            continue
+        target.parent.mkdir(parents=True, exist_ok=True)
+        with zf.open(info) as src, open(target, "wb") as dst:
+            shutil.copyfileobj(src, dst, 1 << 16)
+        batch.append(_parse_cfdi(target))
+        if len(batch) >= batch_size:
+            break
+    return batch
+
+
+async def iter_package_cfdis(zip_path: Path, out_dir: Path, batch_size: int = 64) -> AsyncIterator[Dict[str, Any]]:
+    """
+    Extrae y parsea los XML de un paquete en un hilo, por lotes, y los entrega
+    como iterador async: el event loop no se bloquea y el zip no se carga en memoria.
+    """
+    out_dir.mkdir(parents=True, exist_ok=True)
+    zf = await asyncio.to_thread(zipfile.ZipFile, zip_path)
+    try:
+        members = iter([
+            info for info in zf.infolist()
+            if not info.is_dir() and info.filename.lower().endswith(".xml")
+        ])
+        while True:
+            batch = await asyncio.to_thread(_extract_batch, zf, members, out_dir, batch_size)
+            if not batch:
+                break
+            for cfdi in batch:
+                yield cfdi
+    finally:
+        zf.close()
 
 
 @register_node("SAT.descarga_cfdi")
@@ -26,6 +142,36 @@ class SATDescargaCFDIHandler(ActionHandler):
         self.password: str = creds["password"]
         self.client = SATWSClient()
 
+    async def _wait_until_ready(self, token: str, request_id: str, params: Dict[str, Any]) -> Dict[str, Any]:
+        """Polling con backoff exponencial (con jitter) hasta que la solicitud termine"""
+        retries = params.get("poll_retries", settings.SAT_POLL_MAX_RETRIES)
+        interval = params.get("poll_interval", 1)
+        max_interval = params.get("poll_max_interval", settings.SAT_POLL_MAX_INTERVAL_SECONDS)
+        status: Dict[str, Any] = {}
+        for attempt in range(retries):
+            status = await self.client.poll_status(token, request_id)
+            if status.get("estado") == "terminado" or status.get("status") == "ready":
+                break
+            if attempt < retries - 1:
+                await asyncio.sleep(min(max_interval, interval * 2 ** attempt) * random.uniform(0.8, 1.2))
+        return status
+
+    async def _download_package(
+        self,
+        token: str,
+        package_id: str,
+        dest_dir: Path,
+        semaphore: asyncio.Semaphore,
+    ) -> List[Dict[str, Any]]:
+        pkg_zip = dest_dir / f"{package_id}.zip"
+        try:
+            async with semaphore:
+                await self.client.stream_package(token, package_id, pkg_zip)
+            # La extracción va fuera del semáforo: el slot de descarga queda libre
+            return [cfdi async for cfdi in iter_package_cfdis(pkg_zip, dest_dir / package_id)]
+        finally:
+            pkg_zip.unlink(missing_ok=True)
+
     async def execute(
         self,
         params: Dict[str, Any],
@@ -39,15 +185,13 @@ class SATDescargaCFDIHandler(ActionHandler):
         rfc = params["rfc"]
 
         # Control de cuota por RFC/día
-        counter_key = f"{rfc}-{date.today().isoformat()}"
-        if REQUEST_COUNTER.get(counter_key, 0) >= MAX_REQUESTS_PER_DAY:
+        if not await consume_daily_quota(rfc):
             return {
                 "status": "error",
                 "output": None,
                 "error": "Límite diario de descargas alcanzado",
                 "duration_ms": int((time.perf_counter() - start) * 1000),
             }
-        REQUEST_COUNTER[counter_key] = REQUEST_COUNTER.get(counter_key, 0) + 1
 
         dest_param = params.get("dest_dir")
         if dest_param:
@@ -59,27 +203,37 @@ class SATDescargaCFDIHandler(ActionHandler):
 
         token = await self.client.authenticate(self.cer, self.key, self.password)
         request_id = await self.client.request_cdfi(token, fecha_inicio, fecha_fin, tipo)
-
-        status = {}
-        for _ in range(params.get("poll_retries", 3)):
-            status = await self.client.poll_status(token, request_id)
-            if status.get("estado") == "terminado" or status.get("status") == "ready":
-                break
-            await asyncio.sleep(params.get("poll_interval", 1))
+        status = await self._wait_until_ready(token, request_id, params)
 
         paquetes = status.get("paquetes", [])
-        archivos = []
-        for pid in paquetes:
-            data = await self.client.download_package(token, pid)
-            pkg_zip = dest_dir / f"{pid}.zip"
-            pkg_zip.write_bytes(data)
-            with zipfile.ZipFile(pkg_zip) as zf:
-                zf.extractall(dest_dir / pid)
-            for fname in os.listdir(dest_dir / pid):
-                if fname.lower().endswith(".xml"):
-                    archivos.append(str(dest_dir / pid / fname))
+        semaphore = asyncio.Semaphore(params.get("max_concurrent_downloads", settings.SAT_MAX_CONCURRENT_DOWNLOADS))
+        results = await asyncio.gather(
+            *(self._download_package(token, pid, dest_dir, semaphore) for pid in paquetes),
+            return_exceptions=True,
+        )
+
+        cfdis: List[Dict[str, Any]] = []
+        failed: Dict[str, str] = {}
+        for pid, result in zip(paquetes, results):
+            if isinstance(result, BaseException):
+                logger.error(f"SAT package {pid} failed: {result}")
+                failed[pid] = str(result)
+            else:
+                cfdis.extend(result)
+
+        if paquetes and len(failed) == len(paquetes):
+            return {
+                "status": "error",
+                "output": {"failed_packages": failed},
+                "error": "No se pudo descargar ningún paquete",
+                "duration_ms": int((time.perf_counter() - start) * 1000),
+            }
         return {
             "status": "success",
-            "output": {"file_paths": archivos},
+            "output": {
+                "file_paths": [cfdi["path"] for cfdi in cfdis],
+                "cfdis": cfdis,
+                "failed_packages": failed,
+            },
             "duration_ms": int((time.perf_counter() - start) * 1000),
         }
@@ -7,6 +7,7 @@ from uuid import UUID
 from .connector_handler import ActionHandler
 from app.connectors.factory import register_tool, register_node
 from app.exceptions import requires_parameters, param
+from app.services.telegram_gateway import get_telegram_gateway
 
 @register_node("Telegram.send_message")
 @register_tool("Telegram.send_message")
@@ -36,16 +37,11 @@ class TelegramSendMessageHandler(ActionHandler):
           - message (str): texto del mensaje
         """
         start = time.perf_counter()
-        url = f"https://api.telegram.org/bot{self.bot_token}/sendMessage"
-        payload = {
-            "chat_id": params["chat_id"],
-            "text":    params["message"]
-        }
         try:
-            async with httpx.AsyncClient(timeout=10.0) as client:
-                resp = await client.post(url, json=payload)
-                resp.raise_for_status()
-                data = resp.json()
+            # Cliente keep-alive compartido + token buckets de Telegram
+            data = await get_telegram_gateway().send_message(
+                self.bot_token, params["chat_id"], params["message"]
+            )
         except httpx.HTTPError as e:
             # Error HTTP o de red
             return {
@@ -6,17 +6,17 @@ Expone las herramientas registradas como endpoints MCP.
 Solo actúa como proxy al factory - NO duplica lógica de workflow engine.
 """
 from fastmcp import FastMCP
-from app.connectors.factory import scan_handlers, _TOOL_REGISTRY, execute_tool
+from app.connectors.factory import scan_handlers, list_tool_names, execute_tool
 from app.authenticators.auth import get_credentials_for_user
 
 # Inicializar servidor MCP
 tools_server = FastMCP("KyraTools")
 
-# Escanear handlers para llenar registry
+# Escanear handlers para llenar registry (con manifest: solo índice, imports lazy)
 scan_handlers()
 
 # Crear endpoints MCP para cada tool registrada
-for tool_name in _TOOL_REGISTRY:
+for tool_name in list_tool_names():
     def make_tool_fn(name: str):
         async def tool_fn(user_id: str, params: dict) -> dict:
             """Proxy directo al factory - sin lógica duplicada"""
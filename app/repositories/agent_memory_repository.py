@@ -0,0 +1,438 @@
+# app/repositories/agent_memory_repository.py
+"""
+AgentMemoryRepository - episodios de memoria en agent_memories (pgvector)
+
+La importancia actual (decay temporal + boost por acceso reciente) se calcula
+en SQL para que el filtrado, el orden y el top-k se resuelvan en Postgres
+usando los índices (agent_id, kind, created_at) e ivfflat sobre embedding.
+"""
+import logging
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+from uuid import UUID
+
+from pgvector.sqlalchemy import Vector
+from sqlalchemy import Float, Integer, String, bindparam, case, delete, func, select, text, tuple_, update
+from sqlalchemy.dialects.postgresql import ARRAY
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.db.models import AgentMemory, MemoryKind
+
+logger = logging.getLogger(__name__)
+
+# Misma fórmula que el handler en memoria: importance * e^(-age / (168h + 24h * accesos))
+BASE_DECAY_HOURS = 168
+DECAY_HOURS_PER_ACCESS = 24
+RECENT_ACCESS_SECONDS = 3600
+RECENT_ACCESS_BOOST = 1.2
+
+# Configuración de texto del índice GIN ix_agent_memories_content_fts (multilingüe → 'simple')
+FTS_CONFIG = "simple"
+RRF_K = 60
+
+_HYBRID_SQL = """
+WITH lexical AS (
+    SELECT m.id,
+           ts_rank_cd(to_tsvector('{fts}', m.content), q.query) AS lexical_score,
+           ROW_NUMBER() OVER (ORDER BY ts_rank_cd(to_tsvector('{fts}', m.content), q.query) DESC) AS lexical_rank
+    FROM agent_memories m, websearch_to_tsquery('{fts}', :query_text) AS q(query)
+    WHERE m.agent_id = :agent_id
+      AND to_tsvector('{fts}', m.content) @@ q.query
+      {filters}
+    ORDER BY lexical_score DESC
+    LIMIT :candidates
+),
+semantic AS (
+    SELECT m.id,
+           1 - (m.embedding <=> :embedding) AS semantic_score,
+           ROW_NUMBER() OVER (ORDER BY m.embedding <=> :embedding) AS semantic_rank
+    FROM agent_memories m
+    WHERE m.agent_id = :agent_id
+      AND :use_semantic
+      AND m.embedding IS NOT NULL
+      {filters}
+    ORDER BY m.embedding <=> :embedding
+    LIMIT :candidates
+),
+fused AS (
+    SELECT COALESCE(l.id, s.id) AS id,
+           COALESCE(1.0 / (:rrf_k + l.lexical_rank), 0)
+             + COALESCE(1.0 / (:rrf_k + s.semantic_rank), 0) AS rrf_score,
+           l.lexical_score,
+           s.semantic_score
+    FROM lexical l
+    FULL OUTER JOIN semantic s ON s.id = l.id
+)
+SELECT m.id, m.content, m.metadatas, m.kind, m.created_at,
+       f.rrf_score, f.lexical_score, f.semantic_score,
+       power(0.5, extract(epoch FROM now() - m.created_at) / 86400.0 / CAST(:half_life_days AS float)) AS temporal_score,
+       (1 - CAST(:time_weight AS float)) * f.rrf_score * (:rrf_k + 1) / 2.0
+         + CAST(:time_weight AS float)
+           * power(0.5, extract(epoch FROM now() - m.created_at) / 86400.0 / CAST(:half_life_days AS float)) AS hybrid_score
+FROM fused f
+JOIN agent_memories m ON m.id = f.id
+ORDER BY hybrid_score DESC
+LIMIT :top_k
+"""
+
+_EPISODE_COLUMNS = (
+    AgentMemory.id,
+    AgentMemory.agent_id,
+    AgentMemory.content,
+    AgentMemory.metadatas,
+    AgentMemory.created_at,
+)
+
+
+def _escape_like(value: str) -> str:
+    """Escapa comodines de LIKE (`\\` como carácter de escape)"""
+    return value.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+
+def _importance():
+    return func.coalesce(AgentMemory.metadatas["importance"].astext.cast(Float), 0.5)
+
+
+def _access_count():
+    return func.coalesce(AgentMemory.metadatas["access_count"].astext.cast(Integer), 0)
+
+
+def _last_accessed():
+    return func.coalesce(
+        AgentMemory.metadatas["last_accessed"].astext.cast(Float),
+        func.extract("epoch", AgentMemory.created_at),
+    )
+
+
+def current_importance_expr():
+    """Importancia con decay, evaluada en Postgres"""
+    age_hours = func.extract("epoch", func.now() - AgentMemory.created_at) / 3600.0
+    decay_hours = BASE_DECAY_HOURS + _access_count() * DECAY_HOURS_PER_ACCESS
+    boost = case(
+        (func.extract("epoch", func.now()) - _last_accessed() < RECENT_ACCESS_SECONDS, RECENT_ACCESS_BOOST),
+        else_=1.0,
+    )
+    return func.least(1.0, _importance() * func.exp(-age_hours / decay_hours) * boost)
+
+
+class AgentMemoryRepository:
+    """
+    Acceso a agent_memories: episodios (kind=episodic) y compresión.
+    Repository hace flush; quien abre la sesión hace commit.
+    """
+
+    def __init__(self, db: AsyncSession):
+        self.db = db
+
+    def _episodic(self, agent_id: UUID) -> List[Any]:
+        return [AgentMemory.agent_id == agent_id, AgentMemory.kind == MemoryKind.episodic]
+
+    async def add_episode(
+        self,
+        agent_id: UUID,
+        content: str,
+        embedding: Optional[Sequence[float]],
+        metadatas: Dict[str, Any],
+    ) -> int:
+        result = await self.db.execute(
+            AgentMemory.__table__.insert()
+            .values(
+                agent_id=agent_id,
+                kind=MemoryKind.episodic,
+                content=content,
+                embedding=list(embedding) if embedding is not None else None,
+                metadatas=metadatas,
+            )
+            .returning(AgentMemory.id)
+        )
+        return result.scalar_one()
+
+    async def prune_episodes(self, agent_id: UUID, max_episodes: int) -> int:
+        """Conserva los `max_episodes` más importantes/recientes del agente"""
+        overflow = (
+            select(AgentMemory.id)
+            .where(*self._episodic(agent_id))
+            .order_by(_importance().desc(), AgentMemory.created_at.desc())
+            .offset(max_episodes)
+        )
+        result = await self.db.execute(
+            delete(AgentMemory).where(AgentMemory.id.in_(overflow)).execution_options(synchronize_session=False)
+        )
+        return result.rowcount or 0
+
+    async def count_episodes(self, agent_id: UUID, since: Optional[datetime] = None) -> int:
+        conditions = self._episodic(agent_id)
+        if since is not None:
+            conditions.append(AgentMemory.created_at >= since)
+        result = await self.db.execute(select(func.count(AgentMemory.id)).where(*conditions))
+        return result.scalar_one()
+
+    async def top_episodes(
+        self,
+        agent_id: UUID,
+        top_k: int,
+        since: Optional[datetime] = None,
+        min_importance: Optional[float] = None,
+        query_embedding: Optional[Sequence[float]] = None,
+        max_distance: Optional[float] = None,
+        candidate_multiplier: int = 4,
+        text_query: Optional[str] = None,
+    ) -> List[Dict[str, Any]]:
+        """
+        Top-k por importancia actual.
+        - Con `query_embedding`: primero los vecinos más cercanos (ivfflat) dentro
+          del filtro, luego se reordenan por importancia actual.
+        - Con `text_query` (sin embedding): ILIKE acotado por la ventana temporal.
+        """
+        conditions = self._episodic(agent_id)
+        if since is not None:
+            conditions.append(AgentMemory.created_at >= since)
+        if text_query:
+            conditions.append(AgentMemory.content.ilike(f"%{_escape_like(text_query)}%", escape="\\"))
+
+        importance = current_importance_expr().label("current_importance")
+
+        if query_embedding is not None:
+            distance = AgentMemory.embedding.cosine_distance(list(query_embedding)).label("distance")
+            candidates = (
+                select(*_EPISODE_COLUMNS, importance, distance)
+                .where(*conditions, AgentMemory.embedding.isnot(None))
+                .order_by(distance)
+                .limit(max(top_k, 1) * max(candidate_multiplier, 1))
+                .subquery()
+            )
+            stmt = select(candidates)
+            if max_distance is not None:
+                stmt = stmt.where(candidates.c.distance <= max_distance)
+            if min_importance is not None:
+                stmt = stmt.where(candidates.c.current_importance >= min_importance)
+            stmt = stmt.order_by(candidates.c.current_importance.desc()).limit(top_k)
+        else:
+            stmt = select(*_EPISODE_COLUMNS, importance).where(*conditions)
+            if min_importance is not None:
+                stmt = stmt.where(current_importance_expr() >= min_importance)
+            stmt = stmt.order_by(importance.desc()).limit(top_k)
+
+        result = await self.db.execute(stmt)
+        return [dict(row._mapping) for row in result]
+
+    async def touch_episodes(self, episode_ids: List[int], accessed_at: float) -> None:
+        """access_count += 1 y last_accessed en una sola sentencia"""
+        if not episode_ids:
+            return
+        await self.db.execute(
+            update(AgentMemory)
+            .where(AgentMemory.id.in_(episode_ids))
+            .values(
+                metadatas=AgentMemory.metadatas.op("||")(
+                    func.jsonb_build_object(
+                        "access_count", _access_count() + 1,
+                        "last_accessed", accessed_at,
+                    )
+                )
+            )
+            .execution_options(synchronize_session=False)
+        )
+
+    async def consolidate_episodes(
+        self,
+        agent_id: UUID,
+        min_importance: float,
+        keep_recent_hours: int = 24,
+    ) -> int:
+        """Borra episodios poco importantes, no accedidos ni creados en las últimas horas"""
+        keep_seconds = keep_recent_hours * 3600
+        now_epoch = func.extract("epoch", func.now())
+        result = await self.db.execute(
+            delete(AgentMemory)
+            .where(
+                *self._episodic(agent_id),
+                current_importance_expr() <= min_importance,
+                now_epoch - _last_accessed() >= keep_seconds,
+                now_epoch - func.extract("epoch", AgentMemory.created_at) >= keep_seconds,
+            )
+            .execution_options(synchronize_session=False)
+        )
+        return result.rowcount or 0
+
+    # ------------------------------------------------------------------
+    # Búsqueda (MemorySearchHandler): filtros y top-k en SQL
+    # ------------------------------------------------------------------
+
+    @staticmethod
+    def _search_filters(memory_types: Optional[List[str]], min_importance: Optional[float]) -> List[Any]:
+        conditions = []
+        if memory_types:
+            conditions.append(AgentMemory.metadatas["type"].astext.in_(list(memory_types)))
+        if min_importance is not None:
+            conditions.append(_importance() >= min_importance)
+        return conditions
+
+    async def semantic_search(
+        self,
+        agent_id: UUID,
+        query_embedding: Sequence[float],
+        top_k: int,
+        memory_types: Optional[List[str]] = None,
+        min_importance: Optional[float] = None,
+    ) -> List[Dict[str, Any]]:
+        distance = AgentMemory.embedding.cosine_distance(list(query_embedding))
+        result = await self.db.execute(
+            select(*_EPISODE_COLUMNS, AgentMemory.kind, (1 - distance).label("semantic_score"))
+            .where(
+                AgentMemory.agent_id == agent_id,
+                AgentMemory.embedding.isnot(None),
+                *self._search_filters(memory_types, min_importance),
+            )
+            .order_by(distance)
+            .limit(top_k)
+        )
+        return [dict(row._mapping) for row in result]
+
+    async def list_memories(
+        self,
+        agent_id: UUID,
+        top_k: int,
+        start: Optional[datetime] = None,
+        end: Optional[datetime] = None,
+        memory_types: Optional[List[str]] = None,
+        min_importance: Optional[float] = None,
+        order_by: str = "recent",
+    ) -> List[Dict[str, Any]]:
+        """Rango temporal / recientes / por importancia, con filtros y límite en SQL"""
+        conditions = [AgentMemory.agent_id == agent_id, *self._search_filters(memory_types, min_importance)]
+        if start is not None:
+            conditions.append(AgentMemory.created_at >= start)
+        if end is not None:
+            conditions.append(AgentMemory.created_at <= end)
+
+        order = (
+            (_importance().desc(), AgentMemory.created_at.desc())
+            if order_by == "importance"
+            else (AgentMemory.created_at.desc(),)
+        )
+        result = await self.db.execute(
+            select(*_EPISODE_COLUMNS, AgentMemory.kind, _importance().label("importance"))
+            .where(*conditions)
+            .order_by(*order)
+            .limit(top_k)
+        )
+        return [dict(row._mapping) for row in result]
+
+    async def hybrid_search(
+        self,
+        agent_id: UUID,
+        query_text: str,
+        query_embedding: Optional[Sequence[float]],
+        top_k: int,
+        memory_types: Optional[List[str]] = None,
+        min_importance: Optional[float] = None,
+        time_weight: float = 0.3,
+        half_life_days: float = 30.0,
+        candidates: Optional[int] = None,
+        rrf_k: int = RRF_K,
+    ) -> List[Dict[str, Any]]:
+        """
+        Una sola consulta: top-N léxico (tsvector/GIN, ts_rank_cd) + top-N
+        vectorial (pgvector), fusionados con reciprocal-rank fusion y
+        mezclados con decay temporal. Sin embedding → solo la rama léxica.
+        """
+        filters = []
+        params: Dict[str, Any] = {}
+        if memory_types:
+            filters.append("AND (m.metadatas->>'type') = ANY(:memory_types)")
+            params["memory_types"] = list(memory_types)
+        if min_importance is not None:
+            filters.append("AND COALESCE((m.metadatas->>'importance')::float, 0.5) >= CAST(:min_importance AS float)")
+            params["min_importance"] = min_importance
+
+        use_semantic = query_embedding is not None
+        stmt = text(_HYBRID_SQL.format(fts=FTS_CONFIG, filters="\n      ".join(filters))).bindparams(
+            bindparam("embedding", type_=Vector(1536)),
+            *([bindparam("memory_types", type_=ARRAY(String))] if memory_types else []),
+        )
+        params.update({
+            "agent_id": agent_id,
+            "query_text": query_text,
+            "embedding": list(query_embedding) if use_semantic else [0.0] * 1536,
+            "use_semantic": use_semantic,
+            "candidates": candidates or max(top_k * 4, 20),
+            "rrf_k": rrf_k,
+            "time_weight": time_weight,
+            "half_life_days": half_life_days,
+            "top_k": top_k,
+        })
+        result = await self.db.execute(stmt, params)
+        return [dict(row._mapping) for row in result]
+
+    async def compressible_memories(
+        self,
+        agent_id: UUID,
+        older_than: datetime,
+        limit: int,
+        with_embeddings: bool = True,
+        after: Optional[Tuple[datetime, int]] = None,
+    ) -> List[Dict[str, Any]]:
+        """
+        Memorias (cualquier kind) anteriores a `older_than`; embedding solo si
+        with_embeddings. `after` = (created_at, id) de la última fila de la
+        página anterior (keyset: estable aunque se borren filas entre páginas)
+        """
+        columns = [*_EPISODE_COLUMNS, AgentMemory.kind]
+        if with_embeddings:
+            columns.append(AgentMemory.embedding)
+        conditions = [AgentMemory.agent_id == agent_id, AgentMemory.created_at < older_than]
+        if after is not None:
+            conditions.append(tuple_(AgentMemory.created_at, AgentMemory.id) > tuple_(*after))
+        result = await self.db.execute(
+            select(*columns)
+            .where(*conditions)
+            .order_by(AgentMemory.created_at.asc(), AgentMemory.id.asc())
+            .limit(limit)
+        )
+        return [
+            {
+                "id": row.id,
+                "content": row.content,
+                "metadata": row.metadatas or {},
+                "kind": row.kind.value if hasattr(row.kind, "value") else row.kind,
+                "created_at": row.created_at,
+                "embedding": row.embedding if with_embeddings else None,
+            }
+            for row in result
+        ]
+
+    async def merge_memories(self, keepers: List[Dict[str, Any]], merged_ids: List[int]) -> int:
+        """
+        Aplica un lote de planes de merge: metadatas de las memorias conservadas
+        (bulk UPDATE por PK) y un único DELETE de las fusionadas.
+        """
+        if keepers:
+            await self.db.execute(update(AgentMemory), keepers)
+        if not merged_ids:
+            return 0
+        result = await self.db.execute(
+            delete(AgentMemory).where(AgentMemory.id.in_(merged_ids)).execution_options(synchronize_session=False)
+        )
+        return result.rowcount or 0
+
+    async def delete_episodes(self, agent_id: UUID) -> int:
+        result = await self.db.execute(
+            delete(AgentMemory).where(*self._episodic(agent_id)).execution_options(synchronize_session=False)
+        )
+        return result.rowcount or 0
+
+    async def episode_stats(self) -> Dict[str, Any]:
+        result = await self.db.execute(
+            select(
+                func.count(func.distinct(AgentMemory.agent_id)).label("total_agents"),
+                func.count(AgentMemory.id).label("total_episodes"),
+            ).where(AgentMemory.kind == MemoryKind.episodic)
+        )
+        row = result.first()
+        return {"total_agents": row.total_agents or 0, "total_episodes": row.total_episodes or 0}
+
+
+def get_agent_memory_repository(session: AsyncSession) -> AgentMemoryRepository:
+    """Factory function to create AgentMemoryRepository instance"""
+    return AgentMemoryRepository(session)
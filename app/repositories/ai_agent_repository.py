@@ -3,7 +3,8 @@
 from typing import List, Optional
 from uuid import UUID
 
-from sqlalchemy import select
+from decimal import Decimal
+from sqlalchemy import select, update, func
 from sqlalchemy.ext.asyncio import AsyncSession
 from app.db.database import get_db
 from app.db.models import AIAgent
@@ -33,6 +34,8 @@ class AIAgentRepository:
         # ✅ Repository no maneja transacciones - solo flush para obtener ID
         await self.db.flush()
         await self.db.refresh(agent)
+        # Un webhook previo pudo dejar el agent_id cacheado como inexistente
+        _invalidate_agent_caches(self.db, agent.agent_id)
         return to_ai_agent_dto(agent)
 
     async def update_agent(self, agent_id: UUID, dto: AIAgentDTO) -> Optional[AIAgentDTO]:
@@ -47,8 +50,33 @@ class AIAgentRepository:
         # ✅ Repository no maneja transacciones - solo flush
         await self.db.flush()
         await self.db.refresh(ag)
+        _invalidate_agent_caches(self.db, agent_id)
         return to_ai_agent_dto(ag)
 
+    async def increment_usage(
+        self,
+        agent_id: UUID,
+        input_tokens: int,
+        output_tokens: int,
+        cost: float,
+    ) -> bool:
+        """
+        Suma deltas de uso en un solo UPDATE atómico (total = total + :delta),
+        sin leer el agente: seguro ante ejecuciones concurrentes.
+        """
+        result = await self.db.execute(
+            update(AIAgent)
+            .where(AIAgent.agent_id == agent_id)
+            .values(
+                total_input_tokens=func.coalesce(AIAgent.total_input_tokens, 0) + input_tokens,
+                total_output_tokens=func.coalesce(AIAgent.total_output_tokens, 0) + output_tokens,
+                total_cost=func.coalesce(AIAgent.total_cost, 0) + Decimal(str(cost or 0)),
+            )
+            # fetch: refresca el AIAgent ya cargado en la sesión (analytics post-run)
+            .execution_options(synchronize_session="fetch")
+        )
+        return result.rowcount > 0
+
     async def delete_agent(self, agent_id: UUID) -> bool:
         result = await self.db.execute(
             select(AIAgent).where(AIAgent.agent_id == agent_id)
@@ -59,9 +87,16 @@ class AIAgentRepository:
         await self.db.delete(ag)
         # ✅ Repository no maneja transacciones - solo marca para delete
         await self.db.flush()
+        _invalidate_agent_caches(self.db, agent_id)
         return True
 
 
+def _invalidate_agent_caches(db: AsyncSession, agent_id: UUID) -> None:
+    # Contexto de bot de Telegram cacheado por agente (webhook), al hacer commit
+    from app.services.telegram_gateway import invalidate_bot_context_on_commit
+    invalidate_bot_context_on_commit(db, agent_id)
+
+
 # Factory function for dependency injection
 def get_ai_agent_repository(session) -> AIAgentRepository:
     """Factory function to create AIAgentRepository instance"""
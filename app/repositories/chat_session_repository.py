@@ -8,7 +8,7 @@ from sqlalchemy import select, insert, delete, update
 from sqlalchemy.ext.asyncio import AsyncSession
 from fastapi import Depends
 
-from app.db.database import get_db
+from app.db.database import get_db, get_read_db
 from app.db.models import ChatSession, ChatMessage
 
 logger = logging.getLogger(__name__)
@@ -163,3 +163,10 @@ async def get_chat_session_repository(
     db: AsyncSession = Depends(get_db),
 ) -> ChatSessionRepository:
     return ChatSessionRepository(db)
+
+
+async def get_chat_session_read_repository(
+    db: AsyncSession = Depends(get_read_db),
+) -> ChatSessionRepository:
+    """Solo lectura (historial): réplica si está configurada"""
+    return ChatSessionRepository(db)
@@ -4,7 +4,7 @@ import time
 from typing import Optional, Dict, Any, List
 from uuid import UUID
 
-from sqlalchemy import select, update, delete, insert
+from sqlalchemy import select, update, delete, insert, or_
 from sqlalchemy.ext.asyncio import AsyncSession
 from fastapi import Depends
 
@@ -76,6 +76,38 @@ class CredentialRepository:
         result["client_secret"] = client_secret
         return result
 
+    async def get_credential_presence(
+        self,
+        user_id: int,
+        service_ids: List[str],
+        chat_id: Optional[str] = None,
+    ) -> Dict[str, Dict[Optional[str], bool]]:
+        """
+        Existencia de credenciales para varios service_id en una sola query.
+        Devuelve service_id -> {chat_id (None = global): tiene access_token}.
+        No lee ni descifra tokens.
+        """
+        if not service_ids:
+            return {}
+        scope = Credential.chat_id.is_(None)
+        if chat_id:
+            scope = or_(scope, Credential.chat_id == chat_id)
+        stmt = select(
+            Credential.service_id,
+            Credential.chat_id,
+            Credential.access_token.isnot(None),
+        ).where(
+            Credential.user_id == user_id,
+            Credential.service_id.in_(service_ids),
+            scope,
+        )
+        res = await self.db.execute(stmt)
+        presence: Dict[str, Dict[Optional[str], bool]] = {}
+        for service_id, cred_chat_id, has_access_token in res.all():
+            key = str(cred_chat_id) if cred_chat_id is not None else None
+            presence.setdefault(service_id, {})[key] = bool(has_access_token)
+        return presence
+
     async def create_credential(
         self,
         data: Dict[str, Any]
@@ -4,7 +4,7 @@ from sqlalchemy import update, select, func, delete
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import joinedload
 from app.db.models import Flow, ChatSession
-from app.db.database import get_db
+from app.db.database import get_db, get_read_db
 from fastapi import Depends, HTTPException, status
 class FlowRepository:
     def __init__(self, db: AsyncSession):
@@ -215,4 +215,11 @@ class FlowRepository:
 async def get_flow_repository(
     db: AsyncSession = Depends(get_db),
 ) -> FlowRepository:
+    return FlowRepository(db)
+
+
+async def get_flow_read_repository(
+    db: AsyncSession = Depends(get_read_db),
+) -> FlowRepository:
+    """Solo lectura (listados): réplica si está configurada"""
     return FlowRepository(db)    
@@ -3,15 +3,91 @@
 Repository for LLM Usage Analytics
 Provides data access layer for the llm_usage_logs table
 """
-from typing import List, Optional, Dict, Any
+import logging
+from typing import List, Optional, Dict, Any, Tuple
 from uuid import UUID
-from datetime import datetime, timedelta
+from datetime import datetime, timedelta, timezone
 from decimal import Decimal
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, and_, func, desc, asc
+from sqlalchemy import select, and_, or_, func, desc, asc, text
 from sqlalchemy.orm import selectinload
 
-from app.db.models import LLMUsageLog, LLMProvider, LLMModel, User
+from app.core.config import settings
+from app.db.models import (
+    LLMUsageLog, LLMProvider, LLMModel, User,
+    LLMUsageRollupHourly, LLMUsageRollupDaily, LLMUsageRollupState, ROLLUP_NULL_UUID,
+)
+
+logger = logging.getLogger(__name__)
+
+ROLLUP_STATE_NAME = "llm_usage"
+
+_ROLLUP_UPSERT_SQL = """
+INSERT INTO {table} (
+    bucket_start, user_id, provider_id, model_id,
+    request_count, success_count, error_count,
+    input_tokens, output_tokens, total_cost,
+    response_time_ms_sum, response_time_count
+)
+SELECT
+    date_trunc('{grain}', created_at AT TIME ZONE 'UTC') AT TIME ZONE 'UTC',
+    COALESCE(user_id, 0),
+    COALESCE(provider_id, :null_uuid),
+    COALESCE(model_id, :null_uuid),
+    COUNT(*),
+    COUNT(*) FILTER (WHERE status = 'success'),
+    COUNT(*) FILTER (WHERE status = 'error'),
+    COALESCE(SUM(input_tokens), 0),
+    COALESCE(SUM(output_tokens), 0),
+    COALESCE(SUM(total_cost), 0),
+    COALESCE(SUM(response_time_ms), 0),
+    COUNT(response_time_ms)
+FROM llm_usage_logs
+WHERE created_at >= :from_ts AND created_at < :to_ts
+GROUP BY 1, 2, 3, 4
+ON CONFLICT (bucket_start, user_id, provider_id, model_id) DO UPDATE SET
+    request_count = {table}.request_count + EXCLUDED.request_count,
+    success_count = {table}.success_count + EXCLUDED.success_count,
+    error_count = {table}.error_count + EXCLUDED.error_count,
+    input_tokens = {table}.input_tokens + EXCLUDED.input_tokens,
+    output_tokens = {table}.output_tokens + EXCLUDED.output_tokens,
+    total_cost = {table}.total_cost + EXCLUDED.total_cost,
+    response_time_ms_sum = {table}.response_time_ms_sum + EXCLUDED.response_time_ms_sum,
+    response_time_count = {table}.response_time_count + EXCLUDED.response_time_count
+"""
+
+_AGG_FIELDS = (
+    "total_requests", "successful_requests", "failed_requests",
+    "total_input_tokens", "total_output_tokens", "total_cost",
+    "response_time_sum", "response_time_count",
+)
+
+
+def _as_utc(value: Optional[datetime]) -> Optional[datetime]:
+    """Naive = hora local del proceso (como datetime.now() en los servicios)"""
+    if value is None:
+        return None
+    if value.tzinfo is None:
+        value = value.astimezone()
+    return value.astimezone(timezone.utc)
+
+
+def _floor_hour(value: datetime) -> datetime:
+    return value.replace(minute=0, second=0, microsecond=0)
+
+
+def _ceil_hour(value: datetime) -> datetime:
+    floored = _floor_hour(value)
+    return floored if floored == value else floored + timedelta(hours=1)
+
+
+def _floor_day(value: datetime) -> datetime:
+    return value.replace(hour=0, minute=0, second=0, microsecond=0)
+
+
+def _ceil_day(value: datetime) -> datetime:
+    floored = _floor_day(value)
+    return floored if floored == value else floored + timedelta(days=1)
 
 
 class LLMUsageRepository:
@@ -55,97 +131,252 @@ class LLMUsageRepository:
         result = await self.session.execute(stmt)
         return list(result.scalars().all())
 
+    # ------------------------------------------------------------------
+    # Rollups: agregados horarios/diarios + tail sin agregar
+    # ------------------------------------------------------------------
+
+    @staticmethod
+    def _raw_agg_columns():
+        return (
+            func.count(LLMUsageLog.usage_id).label('total_requests'),
+            func.count().filter(LLMUsageLog.status == 'success').label('successful_requests'),
+            func.count().filter(LLMUsageLog.status == 'error').label('failed_requests'),
+            func.coalesce(func.sum(LLMUsageLog.input_tokens), 0).label('total_input_tokens'),
+            func.coalesce(func.sum(LLMUsageLog.output_tokens), 0).label('total_output_tokens'),
+            func.coalesce(func.sum(LLMUsageLog.total_cost), 0).label('total_cost'),
+            func.coalesce(func.sum(LLMUsageLog.response_time_ms), 0).label('response_time_sum'),
+            func.count(LLMUsageLog.response_time_ms).label('response_time_count'),
+        )
+
+    @staticmethod
+    def _rollup_agg_columns(table):
+        return (
+            func.coalesce(func.sum(table.request_count), 0).label('total_requests'),
+            func.coalesce(func.sum(table.success_count), 0).label('successful_requests'),
+            func.coalesce(func.sum(table.error_count), 0).label('failed_requests'),
+            func.coalesce(func.sum(table.input_tokens), 0).label('total_input_tokens'),
+            func.coalesce(func.sum(table.output_tokens), 0).label('total_output_tokens'),
+            func.coalesce(func.sum(table.total_cost), 0).label('total_cost'),
+            func.coalesce(func.sum(table.response_time_ms_sum), 0).label('response_time_sum'),
+            func.coalesce(func.sum(table.response_time_count), 0).label('response_time_count'),
+        )
+
+    @staticmethod
+    def _format_agg(agg: Dict[str, Any]) -> Dict[str, Any]:
+        total_requests = int(agg.get('total_requests') or 0)
+        successful = int(agg.get('successful_requests') or 0)
+        input_tokens = int(agg.get('total_input_tokens') or 0)
+        output_tokens = int(agg.get('total_output_tokens') or 0)
+        rt_count = int(agg.get('response_time_count') or 0)
+        return {
+            'total_requests': total_requests,
+            'total_input_tokens': input_tokens,
+            'total_output_tokens': output_tokens,
+            'total_tokens': input_tokens + output_tokens,
+            'total_cost': float(agg.get('total_cost') or 0),
+            'avg_response_time_ms': float(agg.get('response_time_sum') or 0) / rt_count if rt_count else 0.0,
+            'successful_requests': successful,
+            'failed_requests': int(agg.get('failed_requests') or 0),
+            'success_rate': successful / max(total_requests, 1) * 100,
+        }
+
+    @staticmethod
+    def _add_agg(target: Dict[str, Any], row) -> None:
+        for field in _AGG_FIELDS:
+            target[field] = target.get(field, 0) + (getattr(row, field) or 0)
+
+    async def get_rollup_watermark(self) -> Optional[datetime]:
+        """Logs con created_at < watermark ya están en los rollups"""
+        if not settings.LLM_USAGE_ROLLUPS_ENABLED:
+            return None
+        try:
+            result = await self.session.execute(
+                select(LLMUsageRollupState.rolled_until).where(LLMUsageRollupState.name == ROLLUP_STATE_NAME)
+            )
+            return result.scalar_one_or_none()
+        except Exception as e:
+            logger.warning(f"Rollup watermark unavailable, using raw logs: {e}")
+            return None
+
+    async def _split_range(
+        self, start_date: Optional[datetime], end_date: Optional[datetime]
+    ) -> Tuple[Optional[Tuple[Optional[datetime], datetime]], List[Any]]:
+        """
+        Divide [start, end] en un tramo de buckets horarios completos ya agregados
+        y el resto (bordes + tail posterior al watermark) a leer de llm_usage_logs.
+        Devuelve ((lo, hi) | None, condiciones raw)
+        """
+        start_utc, end_utc = _as_utc(start_date), _as_utc(end_date)
+        watermark = await self.get_rollup_watermark()
+
+        raw_base = []
+        if start_utc:
+            raw_base.append(LLMUsageLog.created_at >= start_utc)
+        if end_utc:
+            raw_base.append(LLMUsageLog.created_at <= end_utc)
+
+        if watermark is None:
+            return None, raw_base
+
+        lo = _ceil_hour(start_utc) if start_utc else None
+        hi = min(_floor_hour(end_utc), watermark) if end_utc else watermark
+        if lo is not None and lo >= hi:
+            return None, raw_base
+
+        # Fuera de [lo, hi): cabeza parcial y tail sin agregar
+        outside = [LLMUsageLog.created_at >= hi]
+        if lo is not None:
+            outside.append(LLMUsageLog.created_at < lo)
+        return (lo, hi), raw_base + [or_(*outside)]
+
+    @staticmethod
+    def _rollup_segments(bounds: Tuple[Optional[datetime], datetime]) -> List[Tuple[Any, Optional[datetime], datetime]]:
+        """
+        Reparte [lo, hi) (horas completas ya agregadas) entre días UTC completos,
+        leídos del rollup diario, y las horas sueltas de los bordes, del horario
+        """
+        lo, hi = bounds
+        day_lo = _ceil_day(lo) if lo is not None else None
+        day_hi = _floor_day(hi)
+        if day_lo is not None and day_lo >= day_hi:
+            return [(LLMUsageRollupHourly, lo, hi)]
+        segments = [(LLMUsageRollupDaily, day_lo, day_hi)]
+        if lo is not None and lo < day_lo:
+            segments.append((LLMUsageRollupHourly, lo, day_lo))
+        if day_hi < hi:
+            segments.append((LLMUsageRollupHourly, day_hi, hi))
+        return segments
+
+    @staticmethod
+    def _rollup_conditions(table, bounds: Tuple[Optional[datetime], datetime]) -> List[Any]:
+        lo, hi = bounds
+        conditions = [table.bucket_start < hi]
+        if lo is not None:
+            conditions.append(table.bucket_start >= lo)
+        return conditions
+
+    async def roll_up(self, lag_minutes: int = None, max_window_hours: int = None) -> Optional[datetime]:
+        """
+        Agrega llm_usage_logs en [watermark, hora cerrada) a los rollups y avanza
+        el watermark en la misma transacción. El FOR UPDATE serializa réplicas.
+
+        Límite conocido: created_at usa now(), la hora de INICIO de la transacción
+        que inserta el log. Un log confirmado después de que el watermark haya
+        pasado su hora no se agrega nunca (las lecturas de rango tampoco lo ven,
+        porque usan el rollup para esa hora). `lag` debe superar la transacción
+        más larga que escribe en llm_usage_logs (por defecto 15 min > LLM_READ_TIMEOUT).
+        """
+        lag = timedelta(minutes=lag_minutes if lag_minutes is not None else settings.LLM_USAGE_ROLLUP_LAG_MINUTES)
+        max_window = timedelta(hours=max_window_hours or settings.LLM_USAGE_ROLLUP_MAX_WINDOW_HOURS)
+        target = _floor_hour(datetime.now(timezone.utc) - lag)
+
+        result = await self.session.execute(
+            select(LLMUsageRollupState)
+            .where(LLMUsageRollupState.name == ROLLUP_STATE_NAME)
+            .with_for_update()
+        )
+        state = result.scalar_one_or_none()
+        if state is None:
+            oldest = (await self.session.execute(select(func.min(LLMUsageLog.created_at)))).scalar()
+            state = LLMUsageRollupState(
+                name=ROLLUP_STATE_NAME,
+                rolled_until=_floor_hour(oldest.astimezone(timezone.utc)) if oldest else target,
+            )
+            self.session.add(state)
+
+        watermark = state.rolled_until.astimezone(timezone.utc)
+        if watermark >= target:
+            return watermark
+
+        until = min(target, watermark + max_window)
+        params = {"from_ts": watermark, "to_ts": until, "null_uuid": ROLLUP_NULL_UUID}
+        for table, grain in (("llm_usage_rollup_hourly", "hour"), ("llm_usage_rollup_daily", "day")):
+            await self.session.execute(text(_ROLLUP_UPSERT_SQL.format(table=table, grain=grain)), params)
+
+        state.rolled_until = until
+        await self.session.flush()
+        return until
+
     async def get_user_usage_summary(
         self, 
         user_id: int, 
         start_date: datetime = None, 
         end_date: datetime = None
     ) -> Dict[str, Any]:
-        """Get usage summary for a user"""
-        conditions = [LLMUsageLog.user_id == user_id]
-        
-        if start_date:
-            conditions.append(LLMUsageLog.created_at >= start_date)
-        if end_date:
-            conditions.append(LLMUsageLog.created_at <= end_date)
-        
-        # Aggregate query
-        stmt = select(
-            func.count(LLMUsageLog.usage_id).label('total_requests'),
-            func.sum(LLMUsageLog.input_tokens).label('total_input_tokens'),
-            func.sum(LLMUsageLog.output_tokens).label('total_output_tokens'),
-            func.sum(LLMUsageLog.total_cost).label('total_cost'),
-            func.avg(LLMUsageLog.response_time_ms).label('avg_response_time'),
-            func.count().filter(LLMUsageLog.status == 'success').label('successful_requests'),
-            func.count().filter(LLMUsageLog.status == 'error').label('failed_requests')
-        ).where(and_(*conditions))
-        
-        result = await self.session.execute(stmt)
-        row = result.first()
-        
-        return {
-            'total_requests': row.total_requests or 0,
-            'total_input_tokens': row.total_input_tokens or 0,
-            'total_output_tokens': row.total_output_tokens or 0,
-            'total_tokens': (row.total_input_tokens or 0) + (row.total_output_tokens or 0),
-            'total_cost': float(row.total_cost or 0),
-            'avg_response_time_ms': float(row.avg_response_time or 0),
-            'successful_requests': row.successful_requests or 0,
-            'failed_requests': row.failed_requests or 0,
-            'success_rate': (row.successful_requests or 0) / max(row.total_requests or 1, 1) * 100
-        }
+        """Get usage summary for a user (daily/hourly rollups + raw tail)"""
+        bounds, raw_conditions = await self._split_range(start_date, end_date)
+        agg: Dict[str, Any] = {}
+
+        for table, lo, hi in (self._rollup_segments(bounds) if bounds is not None else []):
+            stmt = select(*self._rollup_agg_columns(table)).where(
+                and_(table.user_id == user_id, *self._rollup_conditions(table, (lo, hi)))
+            )
+            self._add_agg(agg, (await self.session.execute(stmt)).first())
+
+        stmt = select(*self._raw_agg_columns()).where(
+            and_(LLMUsageLog.user_id == user_id, *raw_conditions)
+        )
+        self._add_agg(agg, (await self.session.execute(stmt)).first())
+
+        return self._format_agg(agg)
 
     async def get_provider_usage_stats(
         self, 
         start_date: datetime = None, 
         end_date: datetime = None
     ) -> List[Dict[str, Any]]:
-        """Get usage statistics by provider"""
-        conditions = []
-        
-        if start_date:
-            conditions.append(LLMUsageLog.created_at >= start_date)
-        if end_date:
-            conditions.append(LLMUsageLog.created_at <= end_date)
-        
-        stmt = select(
+        """Get usage statistics by provider (daily/hourly rollups + raw tail)"""
+        bounds, raw_conditions = await self._split_range(start_date, end_date)
+        by_provider: Dict[Any, Dict[str, Any]] = {}
+
+        def _merge(rows):
+            for row in rows:
+                entry = by_provider.setdefault(row.provider_id, {
+                    'provider_name': row.provider_name,
+                    'provider_key': row.provider_key,
+                })
+                self._add_agg(entry, row)
+
+        provider_columns = (
+            LLMProvider.provider_id.label('provider_id'),
             LLMProvider.name.label('provider_name'),
             LLMProvider.provider_key.label('provider_key'),
-            func.count(LLMUsageLog.usage_id).label('total_requests'),
-            func.sum(LLMUsageLog.input_tokens).label('total_input_tokens'),
-            func.sum(LLMUsageLog.output_tokens).label('total_output_tokens'),
-            func.sum(LLMUsageLog.total_cost).label('total_cost'),
-            func.avg(LLMUsageLog.response_time_ms).label('avg_response_time'),
-            func.count().filter(LLMUsageLog.status == 'success').label('successful_requests')
+        )
+        provider_group = (LLMProvider.provider_id, LLMProvider.name, LLMProvider.provider_key)
+
+        for table, lo, hi in (self._rollup_segments(bounds) if bounds is not None else []):
+            stmt = select(
+                *provider_columns, *self._rollup_agg_columns(table)
+            ).select_from(
+                table
+            ).join(
+                LLMProvider, table.provider_id == LLMProvider.provider_id
+            ).where(
+                and_(*self._rollup_conditions(table, (lo, hi)))
+            ).group_by(*provider_group)
+            _merge(await self.session.execute(stmt))
+
+        stmt = select(
+            *provider_columns, *self._raw_agg_columns()
         ).select_from(
             LLMUsageLog
         ).join(
             LLMProvider, LLMUsageLog.provider_id == LLMProvider.provider_id
         ).where(
-            and_(*conditions) if conditions else True
-        ).group_by(
-            LLMProvider.provider_id, LLMProvider.name, LLMProvider.provider_key
-        ).order_by(
-            desc('total_requests')
-        )
-        
-        result = await self.session.execute(stmt)
-        
+            and_(*raw_conditions) if raw_conditions else True
+        ).group_by(*provider_group)
+        _merge(await self.session.execute(stmt))
+
         stats = []
-        for row in result:
+        for entry in by_provider.values():
+            formatted = self._format_agg(entry)
+            formatted.pop('failed_requests')
             stats.append({
-                'provider_name': row.provider_name,
-                'provider_key': row.provider_key,
-                'total_requests': row.total_requests,
-                'total_input_tokens': row.total_input_tokens or 0,
-                'total_output_tokens': row.total_output_tokens or 0,
-                'total_tokens': (row.total_input_tokens or 0) + (row.total_output_tokens or 0),
-                'total_cost': float(row.total_cost or 0),
-                'avg_response_time_ms': float(row.avg_response_time or 0),
-                'successful_requests': row.successful_requests,
-                'success_rate': row.successful_requests / max(row.total_requests, 1) * 100
+                'provider_name': entry['provider_name'],
+                'provider_key': entry['provider_key'],
+                **formatted,
             })
-        
+        stats.sort(key=lambda s: s['total_requests'], reverse=True)
         return stats
 
     async def get_model_usage_stats(
@@ -213,41 +444,53 @@ class LLMUsageRepository:
         user_id: int = None,
         days: int = 30
     ) -> List[Dict[str, Any]]:
-        """Get daily usage trends"""
-        start_date = datetime.now() - timedelta(days=days)
-        conditions = [LLMUsageLog.created_at >= start_date]
-        
+        """
+        Get daily usage trends (días UTC): días completos ya agregados desde
+        llm_usage_rollup_daily, el resto desde llm_usage_logs
+        """
+        start_utc = _floor_day(datetime.now(timezone.utc) - timedelta(days=days))
+        by_date: Dict[Any, Dict[str, Any]] = {}
+
+        raw_from = start_utc
+        watermark = await self.get_rollup_watermark()
+        if watermark is not None and _floor_day(watermark.astimezone(timezone.utc)) > start_utc:
+            raw_from = _floor_day(watermark.astimezone(timezone.utc))
+            table = LLMUsageRollupDaily
+            conditions = [table.bucket_start >= start_utc, table.bucket_start < raw_from]
+            if user_id:
+                conditions.append(table.user_id == user_id)
+            stmt = select(
+                table.bucket_start.label('bucket'), *self._rollup_agg_columns(table)
+            ).where(
+                and_(*conditions)
+            ).group_by(table.bucket_start)
+            for row in await self.session.execute(stmt):
+                self._add_agg(by_date.setdefault(row.bucket.astimezone(timezone.utc).date(), {}), row)
+
+        usage_date = func.date(func.timezone('UTC', LLMUsageLog.created_at))
+        conditions = [LLMUsageLog.created_at >= raw_from]
         if user_id:
             conditions.append(LLMUsageLog.user_id == user_id)
-        
         stmt = select(
-            func.date(LLMUsageLog.created_at).label('usage_date'),
-            func.count(LLMUsageLog.usage_id).label('total_requests'),
-            func.sum(LLMUsageLog.input_tokens).label('total_input_tokens'),
-            func.sum(LLMUsageLog.output_tokens).label('total_output_tokens'),
-            func.sum(LLMUsageLog.total_cost).label('total_cost'),
-            func.count().filter(LLMUsageLog.status == 'success').label('successful_requests')
+            usage_date.label('usage_date'), *self._raw_agg_columns()
         ).where(
             and_(*conditions)
-        ).group_by(
-            func.date(LLMUsageLog.created_at)
-        ).order_by(
-            asc('usage_date')
-        )
-        
-        result = await self.session.execute(stmt)
-        
+        ).group_by(usage_date)
+        for row in await self.session.execute(stmt):
+            self._add_agg(by_date.setdefault(row.usage_date, {}), row)
+
         trends = []
-        for row in result:
+        for day in sorted(by_date):
+            formatted = self._format_agg(by_date[day])
             trends.append({
-                'date': row.usage_date.isoformat(),
-                'total_requests': row.total_requests,
-                'total_input_tokens': row.total_input_tokens or 0,
-                'total_output_tokens': row.total_output_tokens or 0,
-                'total_tokens': (row.total_input_tokens or 0) + (row.total_output_tokens or 0),
-                'total_cost': float(row.total_cost or 0),
-                'successful_requests': row.successful_requests,
-                'success_rate': row.successful_requests / max(row.total_requests, 1) * 100
+                'date': day.isoformat(),
+                'total_requests': formatted['total_requests'],
+                'total_input_tokens': formatted['total_input_tokens'],
+                'total_output_tokens': formatted['total_output_tokens'],
+                'total_tokens': formatted['total_tokens'],
+                'total_cost': formatted['total_cost'],
+                'successful_requests': formatted['successful_requests'],
+                'success_rate': formatted['success_rate'],
             })
         
         return trends
@@ -373,6 +616,22 @@ class LLMUsageRepository:
         return logs_to_delete
 
 
+async def run_llm_usage_rollup() -> None:
+    """
+    Job periódico (APScheduler): agrega la ventana cerrada más reciente.
+    Idempotente entre réplicas gracias al lock del watermark.
+    """
+    from app.db.database import async_session
+
+    try:
+        async with async_session() as session:
+            rolled_until = await LLMUsageRepository(session).roll_up()
+            await session.commit()
+        logger.debug(f"LLM usage rollup up to {rolled_until}")
+    except Exception as e:
+        logger.error(f"LLM usage rollup failed: {e}")
+
+
 # Factory function for dependency injection
 def get_llm_usage_repository(session: AsyncSession) -> LLMUsageRepository:
     """Factory function to create LLMUsageRepository instance"""
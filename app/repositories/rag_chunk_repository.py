@@ -0,0 +1,207 @@
+# app/repositories/rag_chunk_repository.py
+"""
+RagChunkRepository - chunks RAG por agente en rag_chunks (pgvector HNSW)
+y estado de ingesta por documento en rag_documents.
+Repository hace flush; quien abre la sesión hace commit.
+"""
+import logging
+from typing import Any, Dict, Iterable, List, Optional, Sequence
+from uuid import UUID
+
+from sqlalchemy import delete, func, select, text
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.db.models import RagChunk, RagDocument
+
+logger = logging.getLogger(__name__)
+
+
+class RagChunkRepository:
+    def __init__(self, db: AsyncSession):
+        self.db = db
+
+    # ------------------------------------------------------------------
+    # Estado por documento (reanudable)
+    # ------------------------------------------------------------------
+
+    async def get_document_states(self, agent_id: UUID, document_ids: Sequence[str]) -> Dict[str, Dict[str, Any]]:
+        if not document_ids:
+            return {}
+        result = await self.db.execute(
+            select(RagDocument.document_id, RagDocument.content_hash, RagDocument.status, RagDocument.chunk_count)
+            .where(RagDocument.agent_id == agent_id, RagDocument.document_id.in_(list(document_ids)))
+        )
+        return {row.document_id: dict(row._mapping) for row in result}
+
+    async def upsert_document_state(
+        self,
+        agent_id: UUID,
+        document_id: str,
+        content_hash: str,
+        status: str,
+        source: Optional[str] = None,
+        chunk_count: int = 0,
+        error: Optional[str] = None,
+    ) -> None:
+        values = {
+            "agent_id": agent_id,
+            "document_id": document_id,
+            "content_hash": content_hash,
+            "status": status,
+            "source": source,
+            "chunk_count": chunk_count,
+            "error": error,
+        }
+        stmt = pg_insert(RagDocument).values(**values)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[RagDocument.agent_id, RagDocument.document_id],
+            set_={
+                "content_hash": stmt.excluded.content_hash,
+                "status": stmt.excluded.status,
+                "source": stmt.excluded.source,
+                "chunk_count": stmt.excluded.chunk_count,
+                "error": stmt.excluded.error,
+                "updated_at": func.now(),
+            },
+        )
+        await self.db.execute(stmt)
+
+    async def delete_chunks_from(self, agent_id: UUID, document_id: str, chunk_count: int) -> int:
+        """Borra los chunks sobrantes (chunk_index ≥ chunk_count) de una versión anterior más larga"""
+        result = await self.db.execute(
+            delete(RagChunk)
+            .where(
+                RagChunk.agent_id == agent_id,
+                RagChunk.document_id == document_id,
+                RagChunk.chunk_index >= chunk_count,
+            )
+            .execution_options(synchronize_session=False)
+        )
+        return result.rowcount or 0
+
+    async def delete_documents(self, agent_id: UUID, document_ids: Sequence[str]) -> int:
+        if not document_ids:
+            return 0
+        result = await self.db.execute(
+            delete(RagChunk)
+            .where(RagChunk.agent_id == agent_id, RagChunk.document_id.in_(list(document_ids)))
+            .execution_options(synchronize_session=False)
+        )
+        await self.db.execute(
+            delete(RagDocument)
+            .where(RagDocument.agent_id == agent_id, RagDocument.document_id.in_(list(document_ids)))
+            .execution_options(synchronize_session=False)
+        )
+        return result.rowcount or 0
+
+    # ------------------------------------------------------------------
+    # Chunks
+    # ------------------------------------------------------------------
+
+    async def existing_embeddings(
+        self, agent_id: UUID, content_hashes: Iterable[str], embedding_model: str
+    ) -> Dict[str, Any]:
+        """Embeddings ya calculados para esos hashes (cualquier documento del agente)"""
+        hashes = list(set(content_hashes))
+        if not hashes:
+            return {}
+        result = await self.db.execute(
+            select(RagChunk.content_hash, RagChunk.embedding)
+            .where(
+                RagChunk.agent_id == agent_id,
+                RagChunk.embedding_model == embedding_model,
+                RagChunk.content_hash.in_(hashes),
+            )
+            .distinct(RagChunk.content_hash)
+        )
+        return {row.content_hash: row.embedding for row in result}
+
+    async def upsert_chunks(self, rows: List[Dict[str, Any]]) -> int:
+        """
+        INSERT multi-fila por (agent_id, document_id, chunk_index). Una posición
+        ya ocupada solo se reescribe si cambió su contenido, modelo o metadatos:
+        reanudar o reindexar un documento sin cambios no toca filas ni el HNSW.
+        """
+        if not rows:
+            return 0
+        stmt = pg_insert(RagChunk).values(rows)
+        excluded = stmt.excluded
+        stmt = stmt.on_conflict_do_update(
+            constraint="uq_rag_chunks_agent_doc_chunk",
+            set_={
+                "content": excluded.content,
+                "content_hash": excluded.content_hash,
+                "embedding_model": excluded.embedding_model,
+                "embedding": excluded.embedding,
+                "metadatas": excluded.metadatas,
+            },
+            where=(
+                RagChunk.content_hash.is_distinct_from(excluded.content_hash)
+                | RagChunk.embedding_model.is_distinct_from(excluded.embedding_model)
+                | RagChunk.metadatas.is_distinct_from(excluded.metadatas)
+            ),
+        )
+        result = await self.db.execute(stmt)
+        return result.rowcount or 0
+
+    async def search(
+        self,
+        agent_id: UUID,
+        query_embedding: Sequence[float],
+        top_k: int,
+        score_threshold: Optional[float] = None,
+        ef_search: Optional[int] = None,
+    ) -> List[Dict[str, Any]]:
+        """
+        Top-k por similitud coseno resuelto en Postgres (índice HNSW).
+        score = 1 - distancia coseno; el umbral se aplica en el WHERE.
+        """
+        if ef_search:
+            # Más candidatos del HNSW para que el filtro por agente no deje el top-k corto
+            await self.db.execute(text(f"SET LOCAL hnsw.ef_search = {int(ef_search)}"))
+
+        distance = RagChunk.embedding.cosine_distance(list(query_embedding))
+        stmt = (
+            select(
+                RagChunk.id,
+                RagChunk.document_id,
+                RagChunk.chunk_index,
+                RagChunk.content,
+                RagChunk.metadatas,
+                (1 - distance).label("score"),
+            )
+            .where(RagChunk.agent_id == agent_id)
+            .order_by(distance)
+            .limit(top_k)
+        )
+        if score_threshold is not None:
+            stmt = stmt.where(distance <= 1 - score_threshold)
+
+        result = await self.db.execute(stmt)
+        return [dict(row._mapping) for row in result]
+
+    async def index_stats(self, agent_id: UUID) -> Dict[str, Any]:
+        chunks = (await self.db.execute(
+            select(
+                func.count(RagChunk.id).label("total_chunks"),
+                func.coalesce(func.avg(func.length(RagChunk.content)), 0).label("avg_chunk_size"),
+            ).where(RagChunk.agent_id == agent_id)
+        )).first()
+        documents = (await self.db.execute(
+            select(RagDocument.status, func.count().label("count"))
+            .where(RagDocument.agent_id == agent_id)
+            .group_by(RagDocument.status)
+        )).all()
+        by_status = {row.status: row.count for row in documents}
+        return {
+            "total_documents": sum(by_status.values()),
+            "documents_by_status": by_status,
+            "total_chunks": chunks.total_chunks or 0,
+            "avg_chunk_size": float(chunks.avg_chunk_size or 0),
+        }
+
+
+def get_rag_chunk_repository(session: AsyncSession) -> RagChunkRepository:
+    """Factory function to create RagChunkRepository instance"""
+    return RagChunkRepository(session)
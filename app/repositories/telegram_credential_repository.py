@@ -26,6 +26,10 @@ class TelegramCredentialRepository:
             )
         await self.db.flush()
 
+        # Al hacer commit: antes, un webhook concurrente recargaría el token viejo
+        from app.services.telegram_gateway import invalidate_bot_context_on_commit
+        invalidate_bot_context_on_commit(self.db, agent_id)
+
     async def get(self, agent_id: UUID) -> Optional[TelegramCredential]:
         res = await self.db.execute(
             select(TelegramCredential).where(TelegramCredential.agent_id == agent_id)
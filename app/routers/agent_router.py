@@ -1,19 +1,18 @@
 from datetime import datetime, timedelta, timezone
 from uuid import UUID
+import hmac
 import logging
 
-import httpx
 import jwt
 from fastapi import APIRouter, Depends, HTTPException, Request
 
 from app.core.config import settings
-from app.db.models import AIAgent
+from app.core.http_client import http_client
 from app.repositories.telegram_credential_repository import (
     TelegramCredentialRepository,
     get_telegram_repo,
 )
-from app.db.database import get_db
-from sqlalchemy.ext.asyncio import AsyncSession
+from app.services.telegram_gateway import get_telegram_gateway
 
 router = APIRouter(prefix="/api/agents", tags=["agents"])
 logger = logging.getLogger(__name__)
@@ -50,8 +49,7 @@ async def deploy_agent(
         raise HTTPException(status_code=400, detail="Unsupported channel")
 
     bot_token = req["bot_token"]
-    async with httpx.AsyncClient() as client:
-        r = await client.get(f"https://api.telegram.org/bot{bot_token}/getMe")
+    r = await http_client.get(f"https://api.telegram.org/bot{bot_token}/getMe")
     if r.status_code != 200 or not r.json().get("ok"):
         raise HTTPException(status_code=400, detail="Invalid bot token")
 
@@ -69,15 +67,16 @@ async def telegram_webhook(
     agent_id: UUID,
     secret: str,
     update: dict,
-    repo: TelegramCredentialRepository = Depends(get_telegram_repo),
-    db: AsyncSession = Depends(get_db),
 ):
-    agent = await db.get(AIAgent, agent_id)
-    if not agent or agent.webhook_secret != secret:
+    # Contexto del bot desde cache TTL: sin sesión de DB en el camino caliente
+    gateway = get_telegram_gateway()
+    context = await gateway.get_bot_context(agent_id)
+    if not context or not context.webhook_secret or not hmac.compare_digest(
+        context.webhook_secret.encode(), secret.encode()
+    ):
         raise HTTPException(status_code=403, detail="invalid secret")
 
-    cred = await repo.get(agent_id)
-    if not cred:
+    if not context.bot_token:
         raise HTTPException(status_code=404, detail="bot not deployed")
 
     message = update.get("message", {})
@@ -86,9 +85,6 @@ async def telegram_webhook(
     if not chat_id or not text:
         return {"ok": True}
 
-    async with httpx.AsyncClient() as client:
-        await client.post(
-            f"https://api.telegram.org/bot{cred.bot_token}/sendMessage",
-            json={"chat_id": chat_id, "text": text},
-        )
+    # Ack inmediato; la respuesta sale desde el consumer del stream
+    await gateway.enqueue_update(agent_id, update)
     return {"ok": True}
@@ -1,7 +1,6 @@
 # app/routers/chat_router.py
 
 import logging
-import hashlib
 import time
 import json
 from typing import List, Dict, Any
@@ -20,6 +19,7 @@ from app.mappers.chat_mapper import map_chat_response_to_dto
 from app.ai.llm_clients.llm_service import get_llm_service, LLMService
 # Orchestrator imports removed - using WorkflowEngine via ChatService
 from app.services.chat_session_service import get_chat_session_service
+from app.services.chat_dedup import get_chat_deduplicator
 from app.dependencies.llm_dependencies import get_intelligent_llm_service
 from app.services.intelligent_llm_service import IntelligentLLMService
 # Removed: workflow_context_service - refactored away
@@ -27,36 +27,6 @@ from app.services.intelligent_llm_service import IntelligentLLMService
 router = APIRouter(prefix="/api/chat", tags=["chat"])
 logger = logging.getLogger(__name__)
 
-# 🚨 CRITICAL FIX: Request deduplication cache
-_REQUEST_CACHE = {}
-_CACHE_TTL = 5  # ✅ REDUCED: 5 seconds TTL - only block rapid duplicates
-
-def _clean_expired_requests():
-    """Clean expired requests from cache"""
-    current_time = time.time()
-    expired_keys = [k for k, v in _REQUEST_CACHE.items() if current_time - v['timestamp'] > _CACHE_TTL]
-    for key in expired_keys:
-        del _REQUEST_CACHE[key]
-        
-def _get_request_hash(session_id: str, message: str, user_id: int) -> str:
-    """Generate unique hash for request deduplication"""
-    content = f"{session_id}:{message}:{user_id}"
-    return hashlib.md5(content.encode()).hexdigest()
-
-def _is_duplicate_request(session_id: str, message: str, user_id: int) -> bool:
-    """Check if this is a duplicate request within TTL window"""
-    _clean_expired_requests()
-    request_hash = _get_request_hash(session_id, message, user_id)
-    
-    if request_hash in _REQUEST_CACHE:
-        logger.info(f"🚫 API DEDUP: Blocked duplicate request - hash: {request_hash[:8]}...")
-        return True
-    
-    # Mark this request as processed
-    _REQUEST_CACHE[request_hash] = {'timestamp': time.time()}
-    logger.info(f"✅ API DEDUP: Processing new request - hash: {request_hash[:8]}...")
-    return False
-
 @router.post(
     "/enhanced",
     response_model=ChatDTO,
@@ -74,16 +44,23 @@ async def chat_enhanced_endpoint(
         # ✅ Usar factory async para producción con DI correcta
         service = await get_chat_service()
         
-        # Usar método estándar del ChatService (ya incluye enhanced capabilities)
-        resp = await service.process_chat(
-            session_id=request.session_id,
-            user_message=request.message,
-            conversation=request.conversation or [],
-            user_id=user_id,
-            db_session=db,
-            workflow_type=request.workflow_type  # ← PASAR WORKFLOW_TYPE
+        async def compute():
+            # Usar método estándar del ChatService (ya incluye enhanced capabilities)
+            resp = await service.process_chat(
+                session_id=request.session_id,
+                user_message=request.message,
+                conversation=request.conversation or [],
+                user_id=user_id,
+                db_session=db,
+                workflow_type=request.workflow_type  # ← PASAR WORKFLOW_TYPE
+            )
+            return map_chat_response_to_dto(resp).model_dump(mode="json")
+
+        # 🔁 Doble envío: un solo cálculo en todo el cluster, los duplicados reciben el mismo resultado
+        result = await get_chat_deduplicator().run(
+            user_id, request.session_id, {"route": "enhanced", **request.model_dump(mode="json")}, compute
         )
-        return map_chat_response_to_dto(resp)
+        return ChatDTO.model_validate(result)
     except InvalidDataException as e:
         raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
@@ -107,40 +84,45 @@ async def chat_endpoint(
     ✅ REFACTORED: Procesa un mensaje de usuario usando FastAPI DI.
     """
     try:
-        # 🔧 DISABLE: Removed aggressive deduplication that was blocking legitimate requests
-        # The frontend duplication issue should be fixed at the source, not masked here
+        # 🔁 Dedup a nivel de cluster: un doble envío no bloquea ni recalcula,
+        # el duplicado espera y recibe el resultado del primero (ver chat_dedup)
         
         # ✅ REFACTORED: Usar servicios inyectados via FastAPI DI
-        
-        # ✅ SIMPLIFIED: Simple session handling like backup
-        session_id = request.session_id
-        if session_id is None:
-            # Create new session automatically
-            session = await chat_session_service.create_session(user_id, "Nuevo chat")
-            session_id = session["session_id"] if isinstance(session, dict) else session.session_id
-        else:
-            # Simple validation - if session doesn't exist, create new one
-            try:
-                await chat_session_service.get_session(session_id)
-            except ValueError:
-                # Session doesn't exist, create new one
-                session = await chat_session_service.create_session(user_id, "Nuevo chat") 
+        async def compute():
+            # ✅ SIMPLIFIED: Simple session handling like backup
+            session_id = request.session_id
+            if session_id is None:
+                # Create new session automatically
+                session = await chat_session_service.create_session(user_id, "Nuevo chat")
                 session_id = session["session_id"] if isinstance(session, dict) else session.session_id
-                logger.info(f"Created replacement session {session_id}")
-        
-        resp = await chat_service.process_chat(
-            session_id=session_id,
-            user_message=request.message,
-            conversation=request.conversation or [],
-            user_id=user_id,
-            workflow_type=request.workflow_type,
-            db_session=db,
-            # 🚨 NEW: Pass OAuth system message parameters
-            oauth_completed=getattr(request, 'oauth_completed', None),
-            system_message=getattr(request, 'system_message', None),
-            continue_workflow=getattr(request, 'continue_workflow', False)
+            else:
+                # Simple validation - if session doesn't exist, create new one
+                try:
+                    await chat_session_service.get_session(session_id)
+                except ValueError:
+                    # Session doesn't exist, create new one
+                    session = await chat_session_service.create_session(user_id, "Nuevo chat") 
+                    session_id = session["session_id"] if isinstance(session, dict) else session.session_id
+                    logger.info(f"Created replacement session {session_id}")
+            
+            resp = await chat_service.process_chat(
+                session_id=session_id,
+                user_message=request.message,
+                conversation=request.conversation or [],
+                user_id=user_id,
+                workflow_type=request.workflow_type,
+                db_session=db,
+                # 🚨 NEW: Pass OAuth system message parameters
+                oauth_completed=getattr(request, 'oauth_completed', None),
+                system_message=getattr(request, 'system_message', None),
+                continue_workflow=getattr(request, 'continue_workflow', False)
+            )
+            return map_chat_response_to_dto(resp).model_dump(mode="json")
+
+        result = await get_chat_deduplicator().run(
+            user_id, request.session_id, request.model_dump(mode="json"), compute
         )
-        return map_chat_response_to_dto(resp)
+        return ChatDTO.model_validate(result)
     except InvalidDataException as e:
         # 400 en caso de datos inválidos
         raise HTTPException(status_code=400, detail=str(e))
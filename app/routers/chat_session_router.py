@@ -6,7 +6,7 @@ from fastapi import APIRouter, Depends, HTTPException
 from pydantic import BaseModel
 
 from app.core.auth import get_current_user_id
-from app.services.chat_session_service import get_chat_session_service, ChatSessionService
+from app.services.chat_session_service import get_chat_session_service, get_chat_session_read_service, ChatSessionService
 from app.services.chat_title_service import get_chat_title_service, ChatTitleService
 from app.services.chat_service_clean import get_chat_service, ChatService
 from app.services.agent_run_service import get_agent_run_service, AgentRunService
@@ -25,7 +25,7 @@ router = APIRouter(prefix="/api/chats", tags=["chats"])
 )
 async def list_sessions(
     user_id: int = Depends(get_current_user_id),
-    svc: ChatSessionService = Depends(get_chat_session_service),
+    svc: ChatSessionService = Depends(get_chat_session_read_service),
 ):
     sessions = await svc.list_sessions(user_id)
     return [ChatSessionDTO.model_validate(s) for s in sessions]
@@ -52,7 +52,7 @@ async def create_session(
 )
 async def get_session(
     session_id: UUID,
-    svc: ChatSessionService = Depends(get_chat_session_service),
+    svc: ChatSessionService = Depends(get_chat_session_read_service),
 ):
     session = await svc.get_session(session_id)
     if not session:
@@ -68,7 +68,7 @@ async def get_session(
 async def list_messages(
     session_id: UUID,
     user_id: int = Depends(get_current_user_id),
-    svc: ChatSessionService = Depends(get_chat_session_service),
+    svc: ChatSessionService = Depends(get_chat_session_read_service),
 ):
     # Asegura que sólo el dueño pueda ver su historial
     session = await svc.get_session(session_id)
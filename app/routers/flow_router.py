@@ -27,7 +27,7 @@ from app.services.workflow_runner_service import WorkflowRunnerService
 from app.services.trigger_orchestrator_service import TriggerOrchestratorService
 from app.services.trigger_orchestrator_service import get_trigger_orchestrator_service
 from app.services.flow_service import FlowService
-from app.services.flow_service import get_flow_service
+from app.services.flow_service import get_flow_service, get_flow_read_service
 # Orchestrator service removido - endpoints /planner y /flows/validate eliminados
 from app.services.flow_execution_service import FlowExecutionService
 from app.services.flow_execution_service import get_flow_execution_service
@@ -44,7 +44,7 @@ router = APIRouter(prefix="/api", tags=["flow"])
     summary="Lista los flujos del usuario autenticado",
 )
 async def list_flows(
-    flow_svc: FlowService = Depends(get_flow_service),
+    flow_svc: FlowService = Depends(get_flow_read_service),
     user_id: int = Depends(get_current_user_id),
 ) -> List[FlowSummaryDTO]:
     logger.info(f"FLOW_ROUTER: Listando flows para user_id: {user_id}")
@@ -66,7 +66,7 @@ async def list_flows(
 async def get_flow(
     flow_id: UUID,
     include_spec: bool = Query(False, alias="includeSpec"),
-    flow_svc: FlowService = Depends(get_flow_service),
+    flow_svc: FlowService = Depends(get_flow_read_service),
     user_id: int = Depends(get_current_user_id),
 ) -> FlowDetailDTO:
     try:
@@ -6,13 +6,13 @@ from fastapi import APIRouter, Depends, HTTPException, Query
 from sqlalchemy.orm import Session
 from uuid import UUID
 
-from app.db.database import get_db
+from app.db.database import get_read_db
 from app.core.auth import get_current_user_id
 from app.dtos.llm_provider_dto import LLMProviderDTO, LLMProviderWithModelsDTO
 from app.dtos.llm_model_dto import LLMModelDTO, LLMModelWithProviderDTO
 from app.dtos.llm_usage_dto import LLMUsageAnalyticsDTO
 from app.services.llm_provider_service import LLMProviderService
-from app.dependencies.llm_dependencies import get_llm_provider_service
+from app.dependencies.llm_dependencies import get_read_llm_provider_service
 
 router = APIRouter(prefix="/api/llm", tags=["llm-providers"])
 
@@ -23,8 +23,8 @@ router = APIRouter(prefix="/api/llm", tags=["llm-providers"])
 )
 async def get_providers(
     include_inactive: bool = Query(False, description="Include inactive providers"),
-    db: Session = Depends(get_db),
-    service: LLMProviderService = Depends(get_llm_provider_service)
+    db: Session = Depends(get_read_db),
+    service: LLMProviderService = Depends(get_read_llm_provider_service)
 ):
     """
     Get all LLM providers with their model counts and basic information.
@@ -45,8 +45,8 @@ async def get_providers(
 )
 async def get_provider_detail(
     provider_key: str,
-    db: Session = Depends(get_db),
-    service: LLMProviderService = Depends(get_llm_provider_service)
+    db: Session = Depends(get_read_db),
+    service: LLMProviderService = Depends(get_read_llm_provider_service)
 ):
     """
     Get detailed information about a specific provider including all its models.
@@ -70,8 +70,8 @@ async def get_provider_detail(
 async def get_provider_models(
     provider_key: str,
     include_inactive: bool = Query(False, description="Include inactive models"),
-    db: Session = Depends(get_db),
-    service: LLMProviderService = Depends(get_llm_provider_service)
+    db: Session = Depends(get_read_db),
+    service: LLMProviderService = Depends(get_read_llm_provider_service)
 ):
     """
     Get all models for a specific provider.
@@ -97,8 +97,8 @@ async def get_all_models(
     min_context_length: Optional[int] = Query(None, description="Minimum context length"),
     max_cost_per_1k_input: Optional[float] = Query(None, description="Maximum cost per 1K input tokens"),
     include_inactive: bool = Query(False, description="Include inactive models"),
-    db: Session = Depends(get_db),
-    service: LLMProviderService = Depends(get_llm_provider_service)
+    db: Session = Depends(get_read_db),
+    service: LLMProviderService = Depends(get_read_llm_provider_service)
 ):
     """
     Get all available models with advanced filtering options.
@@ -125,8 +125,8 @@ async def get_all_models(
 async def search_models(
     q: str = Query(..., description="Search query"),
     limit: int = Query(20, le=100, description="Maximum number of results"),
-    db: Session = Depends(get_db),
-    service: LLMProviderService = Depends(get_llm_provider_service)
+    db: Session = Depends(get_read_db),
+    service: LLMProviderService = Depends(get_read_llm_provider_service)
 ):
     """
     Search models by name, description, or capabilities.
@@ -143,8 +143,8 @@ async def search_models(
     summary="Check provider health status"
 )
 async def check_providers_health(
-    db: Session = Depends(get_db),
-    service: LLMProviderService = Depends(get_llm_provider_service)
+    db: Session = Depends(get_read_db),
+    service: LLMProviderService = Depends(get_read_llm_provider_service)
 ):
     """
     Check the health status of all providers by testing their endpoints.
@@ -169,8 +169,8 @@ async def check_providers_health(
 )
 async def get_model_detail(
     model_id: UUID,
-    db: Session = Depends(get_db),
-    service: LLMProviderService = Depends(get_llm_provider_service)
+    db: Session = Depends(get_read_db),
+    service: LLMProviderService = Depends(get_read_llm_provider_service)
 ):
     """
     Get detailed information about a specific model.
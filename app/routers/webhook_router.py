@@ -27,6 +27,19 @@ def build_webhook_url(path: str) -> str:
     return f"{base}{path}"
 
 
+async def run_webhook_flow(
+    flow_id: UUID,
+    user_id: int,
+    payload: Dict[str, Any],
+    runner: WorkflowRunnerService,
+    def_service: FlowDefinitionService,
+    simulate: bool = False,
+):
+    """Carga el spec del flow y lo ejecuta con el payload del webhook."""
+    spec = await def_service.get_flow_spec(flow_id)
+    return await runner.run_workflow(flow_id, spec["steps"], user_id, payload or {}, simulate=simulate)
+
+
 def register_webhook(flow_id: UUID, user_id: int, trigger_args: Dict[str, Any]):
     path = trigger_args["production_path"]
     methods = trigger_args.get("methods", ["POST"])
@@ -51,8 +64,7 @@ def register_webhook(flow_id: UUID, user_id: int, trigger_args: Dict[str, Any]):
         await repo.create_event(flow_id, path, request.method, payload, headers)
 
         async def run_flow():
-            spec = await def_service.get_flow_spec(flow_id)
-            await runner.run_workflow(flow_id, spec["steps"], user_id, payload or {}, simulate=False)
+            await run_webhook_flow(flow_id, user_id, payload, runner, def_service)
 
         if respond == "immediate":
             background_tasks.add_task(run_flow)
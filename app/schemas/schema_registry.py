@@ -0,0 +1,124 @@
+# app/schemas/schema_registry.py
+"""
+Registro de JSON-Schemas compilados
+
+- Cada schema se compila una sola vez por proceso, indexado por el hash de su
+  contenido: dos ids con el mismo schema comparten validador
+- Backend por defecto: Draft7Validator de jsonschema (check_schema al
+  registrar, nunca por llamada). Con JSON_SCHEMA_BACKEND=fastjsonschema y el
+  paquete instalado se usa la función generada por fastjsonschema
+- validate(schema_id, payload) es la única API de validación: LLMService,
+  el planner (vía LLMService) y execute_node la comparten. Siempre lanza
+  jsonschema.ValidationError, sea cual sea el backend
+"""
+
+import hashlib
+import json
+import logging
+from typing import Any, Callable, Dict, Mapping, Optional, Tuple
+
+from jsonschema import Draft7Validator, ValidationError
+from jsonschema.exceptions import best_match
+from jsonschema.validators import validator_for
+
+from app.core.config import settings
+from app.schemas.validation_schemas import LLM_RESPONSE_SCHEMA, PLAN_SCHEMA
+
+try:
+    import fastjsonschema
+except ImportError:  # opcional
+    fastjsonschema = None
+
+logger = logging.getLogger(__name__)
+
+PLAN_SCHEMA_ID = "plan"
+LLM_RESPONSE_SCHEMA_ID = "llm_response"
+
+ValidateFn = Callable[[Any], None]
+
+# hash del contenido → función de validación compilada
+_COMPILED: Dict[str, ValidateFn] = {}
+# schema_id → (hash, objeto schema registrado)
+_SCHEMA_IDS: Dict[str, Tuple[str, Mapping[str, Any]]] = {}
+
+
+def schema_hash(schema: Mapping[str, Any]) -> str:
+    canonical = json.dumps(schema, sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.sha256(canonical.encode()).hexdigest()
+
+
+def _compile_jsonschema(schema: Mapping[str, Any]) -> ValidateFn:
+    # Respeta $schema si el schema lo declara; Draft 7 por defecto
+    cls = validator_for(schema, default=Draft7Validator)
+    cls.check_schema(schema)
+    validator = cls(schema)
+
+    def _validate(payload: Any) -> None:
+        # Mismo error que jsonschema.validate (el más relevante), sin recompilar
+        error = best_match(validator.iter_errors(payload))
+        if error is not None:
+            raise error
+
+    return _validate
+
+
+def _compile_fastjsonschema(schema: Mapping[str, Any]) -> ValidateFn:
+    compiled = fastjsonschema.compile(dict(schema))
+
+    def _validate(payload: Any) -> None:
+        try:
+            compiled(payload)
+        except fastjsonschema.JsonSchemaValueException as e:
+            raise ValidationError(e.message, path=e.path[1:] if e.path else ())
+
+    return _validate
+
+
+def _compile(schema: Mapping[str, Any]) -> ValidateFn:
+    if settings.JSON_SCHEMA_BACKEND == "fastjsonschema":
+        if fastjsonschema is not None:
+            return _compile_fastjsonschema(schema)
+        logger.warning("JSON_SCHEMA_BACKEND=fastjsonschema but the package is not installed, using jsonschema")
+    return _compile_jsonschema(schema)
+
+
+def register_schema(schema_id: str, schema: Mapping[str, Any]) -> str:
+    """
+    Registra (o reemplaza) el schema bajo schema_id y lo compila si su
+    contenido no estaba ya compilado. Devuelve el hash del contenido.
+    """
+    registered = _SCHEMA_IDS.get(schema_id)
+    if registered is not None and registered[1] is schema:
+        return registered[0]
+
+    digest = schema_hash(schema)
+    if digest not in _COMPILED:
+        _COMPILED[digest] = _compile(schema)
+        logger.debug(f"Compiled JSON schema '{schema_id}' ({digest[:12]})")
+    _SCHEMA_IDS[schema_id] = (digest, schema)
+    return digest
+
+
+def is_registered(schema_id: str) -> bool:
+    return schema_id in _SCHEMA_IDS
+
+
+def get_schema(schema_id: str) -> Optional[Mapping[str, Any]]:
+    registered = _SCHEMA_IDS.get(schema_id)
+    return registered[1] if registered else None
+
+
+def validate(schema_id: str, payload: Any) -> None:
+    """Valida payload contra el schema registrado; lanza jsonschema.ValidationError"""
+    registered = _SCHEMA_IDS.get(schema_id)
+    if registered is None:
+        raise KeyError(f"No hay JSON-Schema registrado con id='{schema_id}'")
+    _COMPILED[registered[0]](payload)
+
+
+def stats() -> Dict[str, int]:
+    return {"schemas": len(_SCHEMA_IDS), "compiled": len(_COMPILED)}
+
+
+register_schema(PLAN_SCHEMA_ID, PLAN_SCHEMA)
+register_schema(LLM_RESPONSE_SCHEMA_ID, LLM_RESPONSE_SCHEMA)
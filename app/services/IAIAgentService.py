@@ -52,7 +52,8 @@ class IAIAgentService(ABC):
         agent_id: UUID, 
         input_tokens: int, 
         output_tokens: int, 
-        cost: float = None
+        cost: float = None,
+        model_id: Optional[UUID] = None
     ) -> None:
         """Track agent usage"""
         pass
@@ -1,6 +1,6 @@
 # app/services/ai_agent_service.py
 
-from typing import List, Optional, Dict, Any
+from typing import List, Optional, Dict, Any, Tuple
 from uuid import UUID
 import time
 import logging
@@ -8,6 +8,7 @@ from fastapi import Depends
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.db.database import get_db
+from app.core.config import settings
 from app.repositories.ai_agent_repository import AIAgentRepository
 from app.repositories.llm_model_repository import LLMModelRepository
 from app.repositories.llm_provider_repository import LLMProviderRepository
@@ -37,6 +38,12 @@ class AIAgentService:
     - Integration with LLM Provider system
     """
 
+    # Caché process-wide de metadata de modelos: model_key -> (ts, info)
+    _model_refs_cache: Dict[str, Tuple[float, dict]] = {}
+    _model_refs_ttl: int = settings.LLM_MODEL_INFO_CACHE_TTL
+    # Tabla de precios en memoria: model_id -> (ts, input_cost_per_1k, output_cost_per_1k)
+    _price_table: Dict[str, Tuple[float, float, float]] = {}
+
     def __init__(
         self,
         agent_repo: AIAgentRepository,
@@ -150,6 +157,11 @@ class AIAgentService:
         if not model_key:
             return {}
         
+        now = time.monotonic()
+        cached = AIAgentService._model_refs_cache.get(model_key)
+        if cached and now - cached[0] <= AIAgentService._model_refs_ttl:
+            return dict(cached[1])
+        
         model = await self.model_repo.get_by_model_key(model_key)
         if not model:
             raise InvalidDataException(f"Model '{model_key}' not found")
@@ -162,14 +174,23 @@ class AIAgentService:
         if not provider or not provider.is_active:
             raise InvalidDataException(f"Provider for model '{model_key}' is not active")
         
-        return {
+        model_refs = {
             'provider_id': provider.provider_id,
             'model_id': model.model_id,
             'provider_key': provider.provider_key,
             'model_key': model.model_key,
             'provider_name': provider.name,
-            'model_name': model.display_name
+            'model_name': model.display_name,
+            'display_name': model.display_name,
+            'context_length': model.context_length,
+            'input_cost_per_1k': float(model.input_cost_per_1k or 0),
+            'output_cost_per_1k': float(model.output_cost_per_1k or 0),
         }
+        AIAgentService._model_refs_cache[model_key] = (now, model_refs)
+        AIAgentService._price_table[str(model.model_id)] = (
+            now, model_refs['input_cost_per_1k'], model_refs['output_cost_per_1k']
+        )
+        return dict(model_refs)
 
     async def _validate_model(self, model_key: str) -> None:
         """
@@ -236,43 +257,64 @@ class AIAgentService:
         
         return result
     
+    async def _get_model_pricing(self, model_id: Optional[UUID]) -> Optional[Tuple[float, float]]:
+        """
+        Precio (input, output) por 1k tokens desde la tabla en memoria;
+        solo consulta la BD al expirar el TTL.
+        """
+        if not model_id:
+            return None
+        now = time.monotonic()
+        cached = AIAgentService._price_table.get(str(model_id))
+        if cached and now - cached[0] <= AIAgentService._model_refs_ttl:
+            return cached[1], cached[2]
+        
+        model = await self.model_repo.get_by_id(model_id)
+        if not model:
+            return None
+        pricing = (float(model.input_cost_per_1k or 0), float(model.output_cost_per_1k or 0))
+        AIAgentService._price_table[str(model_id)] = (now, *pricing)
+        return pricing
+
     async def track_agent_usage(
         self, 
         agent_id: UUID, 
         input_tokens: int, 
         output_tokens: int, 
-        cost: float = None
+        cost: float = None,
+        model_id: Optional[UUID] = None
     ) -> None:
         """
-        Track token usage and costs for an agent
+        Track token usage and costs for an agent.
+        Writes deltas with a single atomic UPDATE; call once per run with aggregated totals.
         """
-        agent = await self.agent_repo.get_agent(agent_id)
-        if not agent:
-            raise InvalidDataException(f"Agent {agent_id} not found")
-        
         # Calculate cost if not provided
         calculated_cost = cost
-        if calculated_cost is None and agent.llm_model_id:
-            model = await self.model_repo.get_by_id(agent.llm_model_id)
-            if model and model.input_cost_per_1k and model.output_cost_per_1k:
-                input_cost = (input_tokens / 1000) * float(model.input_cost_per_1k)
-                output_cost = (output_tokens / 1000) * float(model.output_cost_per_1k)
-                calculated_cost = input_cost + output_cost
-        
-        # Update agent usage statistics
-        new_total_input = (agent.total_input_tokens or 0) + input_tokens
-        new_total_output = (agent.total_output_tokens or 0) + output_tokens
-        new_total_cost = float(agent.total_cost or 0) + (calculated_cost or 0)
+        if calculated_cost is None:
+            if model_id is None:
+                agent = await self.agent_repo.get_agent(agent_id)
+                if not agent:
+                    raise InvalidDataException(f"Agent {agent_id} not found")
+                model_id = agent.llm_model_id
+            pricing = await self._get_model_pricing(model_id)
+            if pricing:
+                calculated_cost = (input_tokens / 1000) * pricing[0] + (output_tokens / 1000) * pricing[1]
         
-        # Create update DTO
-        from app.dtos.ai_agent_update_request_dto import AIAgentUpdateRequestDTO
-        update_dto = AIAgentUpdateRequestDTO(
-            total_input_tokens=new_total_input,
-            total_output_tokens=new_total_output,
-            total_cost=new_total_cost
+        updated = await self.agent_repo.increment_usage(
+            agent_id, input_tokens, output_tokens, calculated_cost or 0.0
         )
-        
-        await self.agent_repo.update_agent(agent_id, update_dto)
+        if not updated:
+            raise InvalidDataException(f"Agent {agent_id} not found")
+    
+    async def _record_run_usage(self, agent_id: UUID, run_usage: dict) -> None:
+        """Escribe el uso agregado de un run (no-op si no hubo tokens)"""
+        if run_usage['input_tokens'] or run_usage['output_tokens']:
+            await self.track_agent_usage(
+                agent_id=agent_id,
+                input_tokens=run_usage['input_tokens'],
+                output_tokens=run_usage['output_tokens'],
+                cost=run_usage['cost']
+            )
     
     async def get_agent_cost_analytics(self, agent_id: UUID) -> dict:
         """
@@ -293,6 +335,9 @@ class AIAgentService:
                     'input_cost_per_1k': float(model.input_cost_per_1k or 0),
                     'output_cost_per_1k': float(model.output_cost_per_1k or 0)
                 }
+                AIAgentService._price_table[str(agent.llm_model_id)] = (
+                    time.monotonic(), current_model_info['input_cost_per_1k'], current_model_info['output_cost_per_1k']
+                )
         
         return {
             'agent_id': str(agent_id),
@@ -326,6 +371,9 @@ class AIAgentService:
         Execute agent with model validation and usage tracking
         """
         start_time = time.time()
+        # Uso agregado del run: se escribe una sola vez, también si el run falla a mitad
+        run_usage = {'input_tokens': 0, 'output_tokens': 0, 'cost': 0.0}
+        usage_recorded = False
         
         try:
             # 1. Load and validate agent configuration
@@ -380,13 +428,10 @@ class AIAgentService:
                 token_usage = llm_response.get('_token_usage', {})
                 iteration_duration = time.time() - iteration_start
                 
-                # Track token usage directly using built-in method
-                if token_usage.get('input_tokens') or token_usage.get('output_tokens'):
-                    await self.track_agent_usage(
-                        agent_id=agent_id,
-                        input_tokens=token_usage.get('input_tokens', 0),
-                        output_tokens=token_usage.get('output_tokens', 0)
-                    )
+                # Acumular uso del run (cost ya calculado por LLMService con model_info)
+                run_usage['input_tokens'] += token_usage.get('input_tokens', 0)
+                run_usage['output_tokens'] += token_usage.get('output_tokens', 0)
+                run_usage['cost'] += token_usage.get('cost', 0.0)
                 
                 iteration_results.append({
                     'iteration': iteration + 1,
@@ -417,19 +462,15 @@ class AIAgentService:
                     "response": final_result.get("final_output", "")
                 })
             
-            # 8. Get final usage summary
+            # 8. Update agent cumulative statistics (one atomic increment per run)
+            usage_recorded = True
+            await self._record_run_usage(agent_id, run_usage)
+            
+            # 9. Get final usage summary
             usage_summary = await self.get_agent_cost_analytics(agent_id)
+            usage_summary['run_usage'] = run_usage
             execution_time = time.time() - start_time
             
-            # 9. Update agent cumulative statistics
-            if usage_summary:
-                await self.track_agent_usage(
-                    agent_id=agent_id,
-                    input_tokens=usage_summary['total_input_tokens'],
-                    output_tokens=usage_summary['total_output_tokens'],
-                    cost=usage_summary['total_cost']
-                )
-            
             # 10. Return comprehensive result
             return {
                 'status': 'success',
@@ -457,6 +498,13 @@ class AIAgentService:
             self.logger.error(f"Error executing agent {agent_id}: {e}")
             execution_time = time.time() - start_time
             
+            # Tokens de iteraciones previas al fallo ya se gastaron: registrarlos igualmente
+            if not usage_recorded:
+                try:
+                    await self._record_run_usage(agent_id, run_usage)
+                except Exception as usage_error:
+                    self.logger.error(f"Error recording partial usage for agent {agent_id}: {usage_error}")
+            
             # Session cleanup handled by garbage collection
             
             return {
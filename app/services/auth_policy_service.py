@@ -11,6 +11,7 @@ from app.db.database import get_db
 from app.repositories.auth_policy_repository import AuthPolicyRepository
 from app.exceptions.api_exceptions import WorkflowProcessingException
 from app.services.IAuthPolicyService import IAuthPolicyService
+from app.services.auth_policy_snapshot import get_auth_policy_snapshot, invalidate_auth_policy_snapshot
 
 logger = logging.getLogger(__name__)
 
@@ -39,26 +40,14 @@ class AuthPolicyService(IAuthPolicyService):
         Returns:
             Dict con configuración completa o None si no existe
         """
-        policy = await self.auth_policy_repo.get_by_auth_string(auth_string)
+        # Lookup en el snapshot de proceso (sin query por llamada)
+        policy = (await get_auth_policy_snapshot()).policy_for_auth_string(auth_string)
         
         if not policy:
             logger.debug(f"No auth policy found for: {auth_string}")
             return None
         
-        return {
-            "id": policy.id,
-            "mechanism": policy.mechanism,
-            "provider": policy.provider,
-            "service": policy.service,
-            "service_id": policy.service_id or f"{policy.provider}_{policy.service}" if policy.service else policy.provider,
-            "scopes": policy.max_scopes or [],
-            "auth_url": policy.base_auth_url,
-            "auth_config": policy.auth_config or {},
-            "display_name": policy.display_name,
-            "description": policy.description,
-            "icon_url": policy.icon_url,
-            "auth_string": policy.auth_string
-        }
+        return policy
     
     async def get_auth_policy_by_service_id(self, service_id: str) -> Optional[Dict[str, Any]]:
         """
@@ -70,26 +59,13 @@ class AuthPolicyService(IAuthPolicyService):
         Returns:
             Dict con configuración o None
         """
-        policy = await self.auth_policy_repo.get_by_service_id(service_id)
+        policy = (await get_auth_policy_snapshot()).policy_for_service_id(service_id)
         
         if not policy:
             logger.debug(f"No auth policy found for service_id: {service_id}")
             return None
         
-        return {
-            "id": policy.id,
-            "mechanism": policy.mechanism,
-            "provider": policy.provider,
-            "service": policy.service,
-            "service_id": policy.service_id or f"{policy.provider}_{policy.service}" if policy.service else policy.provider,
-            "scopes": policy.max_scopes or [],
-            "auth_url": policy.base_auth_url,
-            "auth_config": policy.auth_config or {},
-            "display_name": policy.display_name,
-            "description": policy.description,
-            "icon_url": policy.icon_url,
-            "auth_string": policy.auth_string
-        }
+        return policy
     
     async def get_auth_policy_by_provider(
         self, 
@@ -112,24 +88,7 @@ class AuthPolicyService(IAuthPolicyService):
             mechanism es requerido para evitar ambigüedad cuando un provider
             soporta múltiples mecanismos de autenticación
         """
-        policy = await self.auth_policy_repo.get_by_provider_service(provider, service, mechanism)
-        
-        if not policy:
-            return None
-        
-        return {
-            "id": policy.id,
-            "mechanism": policy.mechanism,
-            "provider": policy.provider,
-            "service": policy.service,
-            "scopes": policy.max_scopes or [],
-            "auth_url": policy.base_auth_url,
-            "auth_config": policy.auth_config or {},
-            "display_name": policy.display_name,
-            "description": policy.description,
-            "icon_url": policy.icon_url,
-            "auth_string": policy.auth_string
-        }
+        return (await get_auth_policy_snapshot()).policy_for_provider(provider, mechanism, service)
     
     # ✅ Métodos de conveniencia para casos comunes
     async def get_oauth2_policy(self, provider: str, service: str = None) -> Optional[Dict[str, Any]]:
@@ -172,45 +131,14 @@ class AuthPolicyService(IAuthPolicyService):
         Returns:
             Dict con policy + scopes requeridos o None
         """
-        from sqlalchemy import select
-        from app.db.models import Action, AuthPolicy
-        
-        # Query action with its auth_policy
-        stmt = (
-            select(Action, AuthPolicy)
-            .join(AuthPolicy, Action.auth_policy_id == AuthPolicy.id, isouter=True)
-            .where(Action.action_id == action_id)
-        )
+        # El snapshot solo contiene acciones con auth_required y policy asignada
+        requirements = (await get_auth_policy_snapshot()).action_requirements(action_id)
         
-        result = await self.db.execute(stmt)
-        row = result.first()
-        
-        if not row or not row[0].auth_required:
+        if not requirements:
             logger.debug(f"No auth requirements found for action: {action_id}")
             return None
         
-        action, policy = row
-        
-        if not policy:
-            logger.warning(f"Action {action_id} requires auth but no auth_policy found")
-            return None
-        
-        return {
-            "action_id": str(action.action_id),
-            "policy_id": policy.id,
-            "mechanism": policy.mechanism,
-            "provider": policy.provider,
-            "service": policy.service,
-            "service_id": policy.service_id or f"{policy.provider}_{policy.service}" if policy.service else policy.provider,
-            "required_scopes": action.custom_scopes or policy.max_scopes or [],
-            "max_scopes": policy.max_scopes or [],
-            "auth_url": policy.base_auth_url,
-            "auth_config": policy.auth_config or {},
-            "display_name": policy.display_name,
-            "description": policy.description,
-            "auth_string": policy.auth_string,
-            "auth_required": action.auth_required
-        }
+        return requirements
     
     async def create_auth_policy(self, policy_data: Dict[str, Any]) -> Dict[str, Any]:
         """
@@ -228,7 +156,7 @@ class AuthPolicyService(IAuthPolicyService):
             async with self.db.begin():
                 policy = await self.auth_policy_repo.create(policy_data)
                 
-                return {
+                created = {
                     "id": policy.id,
                     "auth_string": policy.auth_string,
                     "provider": policy.provider,
@@ -237,6 +165,9 @@ class AuthPolicyService(IAuthPolicyService):
                     "display_name": policy.display_name,
                     "created": True
                 }
+            
+            await invalidate_auth_policy_snapshot()
+            return created
                 
         except Exception as e:
             from app.exceptions.api_exceptions import WorkflowProcessingException
@@ -291,13 +222,16 @@ class AuthPolicyService(IAuthPolicyService):
                 if not updated_action:
                     raise WorkflowProcessingException(f"Action not found: {action_id}")
                 
-                return {
+                updated = {
                     "action_id": str(updated_action.action_id),
                     "auth_policy_id": updated_action.auth_policy_id,
                     "auth_required": updated_action.auth_required,
                     "custom_scopes": updated_action.custom_scopes,
                     "updated": True
                 }
+            
+            await invalidate_auth_policy_snapshot()
+            return updated
                 
         except Exception as e:
             from app.exceptions.api_exceptions import WorkflowProcessingException
@@ -0,0 +1,265 @@
+"""
+AuthPolicySnapshot - snapshot inmutable de políticas de auth a nivel de proceso
+
+- Todas las auth_policies + el mapeo acción → política en una sola query
+  (más el default_auth de los nodos), indexadas en memoria
+- Se reemplaza atómicamente (una sola referencia de módulo): los lectores
+  nunca ven un snapshot a medio construir
+- Cambios: quien escribe llama a invalidate_auth_policy_snapshot(), que
+  incrementa una versión en Redis; cada proceso la consulta como mucho cada
+  AUTH_POLICY_SNAPSHOT_CHECK_SECONDS y recarga si cambió (o si el snapshot
+  supera AUTH_POLICY_SNAPSHOT_MAX_AGE_SECONDS)
+"""
+import asyncio
+import logging
+import time
+from dataclasses import dataclass
+from types import MappingProxyType
+from typing import Any, Dict, Iterable, List, Mapping, Optional, Tuple
+
+from sqlalchemy import and_, select
+
+from app.core.cache import get_shared_redis
+from app.core.config import settings
+from app.db.database import async_session
+from app.db.models import Action, AuthPolicy, Node
+
+logger = logging.getLogger(__name__)
+
+VERSION_KEY = "auth_policy:snapshot:version"
+
+
+def _policy_dict(policy: AuthPolicy) -> Dict[str, Any]:
+    """Mismo formato que AuthPolicyService.resolve_auth"""
+    return {
+        "id": policy.id,
+        "mechanism": policy.mechanism,
+        "provider": policy.provider,
+        "service": policy.service,
+        "service_id": policy.service_id or f"{policy.provider}_{policy.service}" if policy.service else policy.provider,
+        "scopes": policy.max_scopes or [],
+        "auth_url": policy.base_auth_url,
+        "auth_config": policy.auth_config or {},
+        "display_name": policy.display_name,
+        "description": policy.description,
+        "icon_url": policy.icon_url,
+        "auth_string": policy.auth_string,
+        # Internos del snapshot (no se exponen)
+        "_raw_service_id": policy.service_id,
+        "_is_active": bool(policy.is_active),
+    }
+
+
+def _public(policy: Mapping[str, Any]) -> Dict[str, Any]:
+    return {k: v for k, v in policy.items() if not k.startswith("_")}
+
+
+@dataclass(frozen=True)
+class ActionAuth:
+    action_id: str
+    policy_id: int
+    custom_scopes: Tuple[str, ...]
+
+
+@dataclass(frozen=True)
+class AuthPolicySnapshot:
+    version: Optional[str]
+    loaded_at: float
+    policies: Mapping[int, Mapping[str, Any]]
+    by_auth_string: Mapping[str, int]
+    by_service_id: Mapping[str, int]
+    actions: Mapping[str, ActionAuth]
+    node_default_auth: Mapping[str, str]
+
+    # ------------------------------------------------------------------
+    # Lookups (mismas reglas que AuthPolicyRepository, sin ir a BD)
+    # ------------------------------------------------------------------
+
+    def _active(self) -> Iterable[Mapping[str, Any]]:
+        return (p for p in self.policies.values() if p["_is_active"])
+
+    def _unique(self, matches: List[Mapping[str, Any]]) -> Optional[Dict[str, Any]]:
+        # El repositorio usa scalar_one_or_none: con varias coincidencias no hay resultado
+        return _public(matches[0]) if len(matches) == 1 else None
+
+    def policy_for_auth_string(self, auth_string: str) -> Optional[Dict[str, Any]]:
+        policy_id = self.by_auth_string.get(auth_string)
+        if policy_id is not None:
+            return _public(self.policies[policy_id])
+
+        # Formato legacy mechanism_service → mechanism_provider_service
+        parts = auth_string.split("_")
+        if len(parts) == 2:
+            mechanism, service = parts
+            for policy in self._active():
+                if policy["service"] == service and policy["mechanism"] == mechanism:
+                    policy_id = self.by_auth_string.get(f"{mechanism}_{policy['provider']}_{service}")
+                    if policy_id is not None:
+                        return _public(self.policies[policy_id])
+        return None
+
+    def policy_for_service_id(self, service_id: str) -> Optional[Dict[str, Any]]:
+        policy_id = self.by_service_id.get(service_id)
+        if policy_id is not None:
+            return _public(self.policies[policy_id])
+
+        if "_" in service_id:
+            provider, service = service_id.split("_", 1)
+            found = self._unique([p for p in self._active() if p["provider"] == provider and p["service"] == service])
+        else:
+            found = self._unique([p for p in self._active() if p["service"] == service_id])
+        if found:
+            return found
+        return self._unique([p for p in self._active() if (p["auth_string"] or "").endswith(service_id)])
+
+    def policy_for_provider(self, provider: str, mechanism: str, service: Optional[str] = None) -> Optional[Dict[str, Any]]:
+        return self._unique([
+            p for p in self._active()
+            if p["provider"] == provider and p["service"] == service and p["mechanism"] == mechanism
+        ])
+
+    def action_requirements(self, action_id: Any) -> Optional[Dict[str, Any]]:
+        """Mismo formato que AuthPolicyService.get_action_auth_requirements"""
+        action = self.actions.get(str(action_id))
+        if action is None:
+            return None
+        policy = self.policies[action.policy_id]
+        return {
+            "action_id": action.action_id,
+            "policy_id": policy["id"],
+            "mechanism": policy["mechanism"],
+            "provider": policy["provider"],
+            "service": policy["service"],
+            "service_id": policy["service_id"],
+            "required_scopes": list(action.custom_scopes) or policy["scopes"],
+            "max_scopes": policy["scopes"],
+            "auth_url": policy["auth_url"],
+            "auth_config": policy["auth_config"],
+            "display_name": policy["display_name"],
+            "description": policy["description"],
+            "auth_string": policy["auth_string"],
+            "auth_required": True,
+        }
+
+    def default_auth_for_node(self, node_id: Any) -> Optional[str]:
+        return self.node_default_auth.get(str(node_id))
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "version": self.version,
+            "age_seconds": round(time.monotonic() - self.loaded_at, 1),
+            "policies": len(self.policies),
+            "actions": len(self.actions),
+            "nodes_with_default_auth": len(self.node_default_auth),
+        }
+
+
+# ----------------------------------------------------------------------
+# Carga y refresco
+# ----------------------------------------------------------------------
+
+_snapshot: Optional[AuthPolicySnapshot] = None
+_next_check = 0.0
+_stale = False
+_loading: Optional[asyncio.Task] = None
+
+
+async def _load_snapshot(version: Optional[str]) -> AuthPolicySnapshot:
+    async with async_session() as session:
+        # Políticas + acciones que las requieren en una sola query
+        rows = (await session.execute(
+            select(AuthPolicy, Action.action_id, Action.custom_scopes)
+            .outerjoin(Action, and_(Action.auth_policy_id == AuthPolicy.id, Action.auth_required.is_(True)))
+        )).all()
+        node_rows = (await session.execute(
+            select(Node.node_id, Node.default_auth).where(Node.default_auth.isnot(None))
+        )).all()
+
+    policies: Dict[int, Mapping[str, Any]] = {}
+    actions: Dict[str, ActionAuth] = {}
+    for policy, action_id, custom_scopes in rows:
+        if policy.id not in policies:
+            policies[policy.id] = MappingProxyType(_policy_dict(policy))
+        if action_id is not None:
+            actions[str(action_id)] = ActionAuth(str(action_id), policy.id, tuple(custom_scopes or ()))
+
+    by_auth_string: Dict[str, int] = {}
+    by_service_id: Dict[str, int] = {}
+    for policy in sorted(policies.values(), key=lambda p: p["id"]):
+        if not policy["_is_active"]:
+            continue
+        if policy["auth_string"]:
+            by_auth_string.setdefault(policy["auth_string"], policy["id"])
+        if policy["_raw_service_id"]:
+            by_service_id.setdefault(policy["_raw_service_id"], policy["id"])
+
+    snapshot = AuthPolicySnapshot(
+        version=version,
+        loaded_at=time.monotonic(),
+        policies=MappingProxyType(policies),
+        by_auth_string=MappingProxyType(by_auth_string),
+        by_service_id=MappingProxyType(by_service_id),
+        actions=MappingProxyType(actions),
+        node_default_auth=MappingProxyType({str(node_id): default_auth for node_id, default_auth in node_rows}),
+    )
+    logger.info(f"Auth policy snapshot loaded: {len(policies)} policies, {len(actions)} actions (version={version})")
+    return snapshot
+
+
+async def _remote_version() -> Optional[str]:
+    try:
+        return await get_shared_redis().get(VERSION_KEY)
+    except Exception as e:
+        logger.debug(f"Auth policy snapshot version unavailable: {e}")
+        return _snapshot.version if _snapshot else None
+
+
+async def _refresh() -> AuthPolicySnapshot:
+    global _snapshot, _next_check, _stale
+    # Versión leída ANTES de cargar: un cambio durante la carga fuerza otra recarga
+    version = await _remote_version()
+    current = _snapshot
+    max_age = settings.AUTH_POLICY_SNAPSHOT_MAX_AGE_SECONDS
+    if (
+        current is None
+        or _stale
+        or version != current.version
+        or time.monotonic() - current.loaded_at > max_age
+    ):
+        _stale = False
+        try:
+            current = _snapshot = await _load_snapshot(version)
+        except Exception:
+            _stale = True
+            raise
+    _next_check = time.monotonic() + settings.AUTH_POLICY_SNAPSHOT_CHECK_SECONDS
+    return current
+
+
+def current_auth_policy_snapshot() -> Optional[AuthPolicySnapshot]:
+    """Snapshot ya cargado (sin refrescar); None si aún no se cargó"""
+    return _snapshot
+
+
+async def get_auth_policy_snapshot() -> AuthPolicySnapshot:
+    """Snapshot vigente; como mucho una comprobación de versión cada N segundos"""
+    global _loading
+    snapshot = _snapshot
+    if snapshot is not None and not _stale and time.monotonic() < _next_check:
+        return snapshot
+
+    # Una sola recarga en vuelo por proceso (y por event loop)
+    task = _loading
+    if task is None or task.done() or task.get_loop() is not asyncio.get_running_loop():
+        task = _loading = asyncio.ensure_future(_refresh())
+    return await asyncio.shield(task)
+
+
+async def invalidate_auth_policy_snapshot() -> None:
+    """Llamar tras confirmar cambios en auth_policies o en actions.auth_*"""
+    global _stale
+    _stale = True
+    try:
+        await get_shared_redis().incr(VERSION_KEY)
+    except Exception as e:
+        logger.warning(f"Could not broadcast auth policy snapshot invalidation: {e}")
@@ -9,6 +9,7 @@ from fastapi import Depends
 
 from app.db.database import get_db
 from app.services.auth_policy_service import AuthPolicyService, get_auth_policy_service
+from app.services.auth_policy_snapshot import AuthPolicySnapshot, current_auth_policy_snapshot, get_auth_policy_snapshot
 # ❌ ELIMINADO: parse_auth ya no existe
 
 logger = logging.getLogger(__name__)
@@ -89,11 +90,22 @@ class CentralAuthResolver:
     """
     ÚNICO punto de resolución de auth en todo el sistema
     Elimina duplicación de parse_auth() en múltiples lugares
+    
+    ✅ Sin cache por instancia: lee del snapshot de políticas del proceso
+    (app.services.auth_policy_snapshot), compartido por todas las requests
     """
     
     def __init__(self, auth_policy_service: AuthPolicyService):
         self.auth_policy_service = auth_policy_service
-        self._cache = {}  # In-memory cache para sesión
+    
+    async def _policy_from_snapshot(self, snapshot: AuthPolicySnapshot, auth_string: str) -> AuthPolicy:
+        policy_data = snapshot.policy_for_auth_string(auth_string)
+        if policy_data:
+            return AuthPolicy(policy_data)
+        
+        # Fallback a parsing manual (legacy compatibility)
+        logger.warning(f"Auth resolved via fallback for: {auth_string}")
+        return AuthPolicy(await self.auth_policy_service.fallback_parse_auth(auth_string))
         
     async def resolve_auth_once(self, auth_string: str) -> Optional[AuthPolicy]:
         """
@@ -107,30 +119,9 @@ class CentralAuthResolver:
         """
         if not auth_string or auth_string.strip() == "":
             return None
-            
-        # Check cache primero
-        if auth_string in self._cache:
-            logger.debug(f"Auth cache HIT for: {auth_string}")
-            return self._cache[auth_string]
         
         logger.debug(f"Resolving auth for: {auth_string}")
-        
-        # 1. Intentar obtener desde AuthPolicyService (BD)
-        policy_data = await self.auth_policy_service.resolve_auth(auth_string)
-        
-        if policy_data:
-            auth_policy = AuthPolicy(policy_data)
-            self._cache[auth_string] = auth_policy
-            logger.debug(f"Auth resolved from DB for: {auth_string}")
-            return auth_policy
-        
-        # 2. Fallback a parsing manual (legacy compatibility)
-        fallback_data = await self.auth_policy_service.fallback_parse_auth(auth_string)
-        auth_policy = AuthPolicy(fallback_data)
-        self._cache[auth_string] = auth_policy
-        
-        logger.warning(f"Auth resolved via fallback for: {auth_string}")
-        return auth_policy
+        return await self._policy_from_snapshot(await get_auth_policy_snapshot(), auth_string)
     
     async def resolve_action_auth(self, action_id: str) -> Optional[AuthPolicy]:
         """
@@ -143,31 +134,18 @@ class CentralAuthResolver:
         Returns:
             AuthPolicy específico para la acción o None
         """
-        cache_key = f"action:{action_id}"
-        
-        # Check cache primero
-        if cache_key in self._cache:
-            logger.debug(f"Action auth cache HIT for: {action_id}")
-            return self._cache[cache_key]
-        
-        logger.debug(f"Resolving action auth for: {action_id}")
-        
-        # Obtener auth requirements específicos para la acción
-        action_auth_data = await self.auth_policy_service.get_action_auth_requirements(action_id)
+        action_auth_data = (await get_auth_policy_snapshot()).action_requirements(action_id)
         
         if action_auth_data:
             # Crear AuthPolicy con datos específicos de la acción
-            auth_policy = AuthPolicy(action_auth_data)
-            self._cache[cache_key] = auth_policy
-            logger.debug(f"Action auth resolved from DB for: {action_id}")
-            return auth_policy
+            return AuthPolicy(action_auth_data)
         
         logger.debug(f"No specific action auth found for: {action_id}")
         return None
     
     async def resolve_multiple_auth(self, auth_strings: list) -> Dict[str, AuthPolicy]:
         """
-        Resuelve múltiples auth strings de forma eficiente
+        Resuelve múltiples auth strings en una sola pasada sobre el snapshot
         
         Args:
             auth_strings: Lista de auth strings
@@ -175,19 +153,18 @@ class CentralAuthResolver:
         Returns:
             Dict con auth_string -> AuthPolicy
         """
+        snapshot = await get_auth_policy_snapshot()
         results = {}
         
         for auth_string in auth_strings:
-            if auth_string:
-                policy = await self.resolve_auth_once(auth_string)
-                if policy:
-                    results[auth_string] = policy
+            if auth_string and auth_string.strip() and auth_string not in results:
+                results[auth_string] = await self._policy_from_snapshot(snapshot, auth_string)
         
         return results
     
     async def resolve_multiple_action_auth(self, action_ids: list) -> Dict[str, AuthPolicy]:
         """
-        Resuelve auth para múltiples acciones de forma eficiente
+        Resuelve auth para múltiples acciones en una sola pasada sobre el snapshot
         
         Args:
             action_ids: Lista de action UUIDs
@@ -195,27 +172,25 @@ class CentralAuthResolver:
         Returns:
             Dict con action_id -> AuthPolicy
         """
+        snapshot = await get_auth_policy_snapshot()
         results = {}
         
         for action_id in action_ids:
             if action_id:
-                policy = await self.resolve_action_auth(action_id)
-                if policy:
-                    results[action_id] = policy
+                action_auth_data = snapshot.action_requirements(action_id)
+                if action_auth_data:
+                    results[action_id] = AuthPolicy(action_auth_data)
         
         return results
     
     def clear_cache(self):
-        """Limpia cache (útil para testing)"""
-        self._cache.clear()
-        logger.debug("Auth cache cleared")
+        """Sin cache por instancia: el snapshot se invalida con invalidate_auth_policy_snapshot()"""
+        logger.debug("Auth resolver has no per-instance cache")
     
     def get_cache_stats(self) -> Dict[str, Any]:
-        """Stats del cache para debugging"""
-        return {
-            "cached_items": len(self._cache),
-            "cached_keys": list(self._cache.keys())
-        }
+        """Stats del snapshot para debugging"""
+        snapshot = current_auth_policy_snapshot()
+        return snapshot.stats() if snapshot else {"loaded": False}
 
 
 # Factory para FastAPI DI
@@ -12,6 +12,7 @@ from app.db.database import get_db
 from app.services.auth_policy_service import AuthPolicyService, get_auth_policy_service
 from app.services.credential_service import CredentialService, get_credential_service
 from app.services.auth_handler_registry import get_auth_handler_registry, AuthHandlerRegistry
+from app.services.auth_policy_snapshot import get_auth_policy_snapshot
 from app.dtos.auth_requirement_dto import (
     AuthRequirementDTO, 
     AuthStepDTO, 
@@ -75,13 +76,11 @@ class AutoAuthTrigger:
             
             # Extract all nodes from flow_spec
             nodes = flow_spec.get("nodes", [])
-            requirements = []
             
-            for node in nodes:
-                node_requirements = await self._analyze_node_auth_requirements(
-                    node, user_id, chat_id
-                )
-                requirements.extend(node_requirements)
+            # ✅ BATCH: una pasada sobre el snapshot + una query de credenciales para todo el workflow
+            requirements = await self._resolve_requirements_batch(
+                self._auth_entries_for_nodes(nodes), user_id, chat_id
+            )
             
             # Deduplicate by service_id
             unique_requirements = {}
@@ -123,43 +122,13 @@ class AutoAuthTrigger:
             AuthRequirementDTO o None si no requiere auth
         """
         try:
-            # Get action auth requirements from auth_policy_service
-            auth_data = await self.auth_policy_service.get_action_auth_requirements(action_id)
-            
-            if not auth_data or not auth_data.get("auth_required"):
+            requirements = await self._resolve_requirements_batch(
+                [("action", action_id)], user_id, chat_id
+            )
+            if not requirements:
                 logger.debug(f"Action {action_id} does not require auth")
                 return None
-            
-            service_id = auth_data.get("service_id")
-            if not service_id:
-                logger.warning(f"Action {action_id} requires auth but has no service_id")
-                return None
-            
-            # Check if user already has credentials for this service
-            existing_cred = await self.credential_service.get_credential(
-                user_id, service_id, chat_id
-            )
-            
-            # ✅ FIXED: Para OAuth, verificar que tenga access_token, no solo client_id/client_secret
-            is_satisfied = False
-            if existing_cred:
-                if auth_data.get("mechanism") == "oauth2":
-                    # Para OAuth, requiere access_token (autorización del usuario)
-                    is_satisfied = existing_cred.get("access_token") is not None
-                    logger.info(f"🔍 OAuth check for {service_id}: has_access_token={is_satisfied}, existing_cred_keys={list(existing_cred.keys()) if existing_cred else None}")
-                else:
-                    # Para otros mecanismos (api_key, etc.), basta con que exista
-                    is_satisfied = True
-                    logger.info(f"🔍 Non-OAuth check for {service_id}: is_satisfied={is_satisfied}")
-            else:
-                # ✅ CRITICAL FIX: Si no hay credenciales, marcar como NOT satisfied
-                is_satisfied = False
-                logger.info(f"🔍 No existing credentials for {service_id}: is_satisfied={is_satisfied}")
-                logger.info(f"🔍 Step {action_id}: service_id={service_id}, is_satisfied={is_satisfied}, mechanism={auth_data.get('mechanism')}")
-            
-            auth_data["is_satisfied"] = is_satisfied
-            
-            return dict_to_auth_requirement_dto(auth_data)
+            return requirements[0]
             
         except Exception as e:
             logger.error(f"Error analyzing action auth requirements for {action_id}: {e}")
@@ -312,31 +281,10 @@ class AutoAuthTrigger:
         Analiza auth requirements para un nodo específico
         ✅ AGNÓSTICO - funciona con cualquier tipo de nodo
         """
-        requirements = []
-        
         try:
-            # Get node actions
-            actions = node.get("actions", [])
-            
-            for action in actions:
-                action_id = action.get("id")
-                if action_id:
-                    requirement = await self.analyze_action_auth_requirements(
-                        action_id, user_id, chat_id
-                    )
-                    if requirement:
-                        requirements.append(requirement)
-            
-            # Also check if node itself has auth requirements via default_auth
-            node_id = node.get("id")
-            if node_id:
-                node_requirement = await self._analyze_node_default_auth(
-                    node_id, user_id, chat_id
-                )
-                if node_requirement:
-                    requirements.append(node_requirement)
-            
-            return requirements
+            return await self._resolve_requirements_batch(
+                self._auth_entries_for_nodes([node]), user_id, chat_id
+            )
             
         except Exception as e:
             logger.error(f"Error analyzing node auth requirements: {e}")
@@ -352,51 +300,85 @@ class AutoAuthTrigger:
         Analiza default_auth de un nodo
         """
         try:
-            from sqlalchemy import select
-            from app.db.models import Node
-            
-            stmt = select(Node).where(Node.node_id == node_id)
-            result = await self.db.execute(stmt)
-            node_obj = result.scalar_one_or_none()
-            
-            if not node_obj or not node_obj.default_auth:
-                return None
-            
-            # Map default_auth to service_id
-            service_id = await self._map_default_auth_to_service_id(node_obj.default_auth)
-            if not service_id:
-                return None
-            
-            # Get auth policy for this service_id
-            auth_policy = await self.auth_policy_service.get_auth_policy_by_service_id(service_id)
-            if not auth_policy:
-                return None
-            
-            # Check if satisfied
-            existing_cred = await self.credential_service.get_credential(
-                user_id, service_id, chat_id
+            requirements = await self._resolve_requirements_batch(
+                [("node", node_id)], user_id, chat_id
             )
-            
-            # ✅ FIXED: Para OAuth, verificar que tenga access_token, no solo client_id/client_secret
-            is_satisfied = False
-            if existing_cred:
-                if auth_policy.get("mechanism") == "oauth2":
-                    # Para OAuth, requiere access_token (autorización del usuario)
-                    is_satisfied = existing_cred.get("access_token") is not None
-                else:
-                    # Para otros mecanismos (api_key, etc.), basta con que exista
-                    is_satisfied = True
-            
-            auth_policy["service_id"] = service_id
-            auth_policy["is_satisfied"] = is_satisfied
-            auth_policy["required_scopes"] = auth_policy.get("scopes", [])
-            
-            return dict_to_auth_requirement_dto(auth_policy)
+            return requirements[0] if requirements else None
             
         except Exception as e:
             logger.error(f"Error analyzing node default auth: {e}")
             return None
     
+    @staticmethod
+    def _auth_entries_for_nodes(nodes: List[Dict[str, Any]]) -> List[Tuple[str, Any]]:
+        """(tipo, id) en el orden de análisis: acciones del nodo y luego su default_auth"""
+        entries = []
+        for node in nodes:
+            for action in node.get("actions", []):
+                if action.get("id"):
+                    entries.append(("action", action["id"]))
+            if node.get("id"):
+                entries.append(("node", node["id"]))
+        return entries
+
+    async def _resolve_requirements_batch(
+        self,
+        entries: List[Tuple[str, Any]],
+        user_id: int,
+        chat_id: str
+    ) -> List[AuthRequirementDTO]:
+        """
+        Resuelve auth requirements de varias acciones/nodos:
+        una pasada sobre el snapshot de políticas + UNA query de credenciales
+        para todos los service_id implicados.
+        """
+        snapshot = await get_auth_policy_snapshot()
+        
+        resolved: List[Dict[str, Any]] = []
+        for kind, item_id in entries:
+            if kind == "action":
+                auth_data = snapshot.action_requirements(item_id)
+                if not auth_data:
+                    continue
+                if not auth_data.get("service_id"):
+                    logger.warning(f"Action {item_id} requires auth but has no service_id")
+                    continue
+            else:
+                service_id = await self._map_default_auth_to_service_id(snapshot.default_auth_for_node(item_id))
+                if not service_id:
+                    continue
+                auth_data = snapshot.policy_for_service_id(service_id)
+                if not auth_data:
+                    continue
+                auth_data["service_id"] = service_id
+                auth_data["required_scopes"] = auth_data.get("scopes", [])
+            resolved.append(auth_data)
+        
+        if not resolved:
+            return []
+        
+        credential_status = await self.credential_service.get_credential_status(
+            user_id, [auth_data["service_id"] for auth_data in resolved], chat_id
+        )
+        
+        requirements = []
+        for auth_data in resolved:
+            has_access_token = credential_status.get(auth_data["service_id"])
+            if has_access_token is None:
+                # ✅ CRITICAL FIX: Si no hay credenciales, marcar como NOT satisfied
+                is_satisfied = False
+            elif auth_data.get("mechanism") == "oauth2":
+                # ✅ FIXED: Para OAuth, requiere access_token (autorización del usuario), no solo client_id/client_secret
+                is_satisfied = has_access_token
+            else:
+                # Para otros mecanismos (api_key, etc.), basta con que exista
+                is_satisfied = True
+            auth_data["is_satisfied"] = is_satisfied
+            logger.debug(f"🔍 Auth check for {auth_data['service_id']}: is_satisfied={is_satisfied}, mechanism={auth_data.get('mechanism')}")
+            requirements.append(dict_to_auth_requirement_dto(auth_data))
+        
+        return requirements
+
     async def _map_default_auth_to_service_id(self, default_auth: str) -> Optional[str]:
         """
         Maps old default_auth format to new service_id
@@ -453,26 +435,17 @@ class AutoAuthTrigger:
                 chat_id = str(uuid.uuid4())
                 logger.debug(f"Generated workflow execution chat_id: {chat_id}")
             
-            missing_requirements = []
+            # ✅ BATCH: todos los pasos en una pasada + una query de credenciales
+            step_requirements = await self._resolve_requirements_batch(
+                [("action", step.get('action_id')) for step in selected_steps if step.get('action_id')],
+                user_id,
+                chat_id
+            )
             
-            for step in selected_steps:
-                # Analizar requirements de autenticación para este paso
-                step_requirements = await self.analyze_action_auth_requirements(
-                    action_id=step.get('action_id'),
-                    user_id=user_id,
-                    chat_id=chat_id
-                )
-                
-                # DEBUG: Log detallado del análisis
-                if step_requirements:
-                    logger.info(f"🔍 Step {step.get('action_id')}: service_id={step_requirements.service_id}, is_satisfied={step_requirements.is_satisfied}, mechanism={step_requirements.mechanism}")
-                else:
-                    logger.info(f"🔍 Step {step.get('action_id')}: No auth requirements")
-                
-                # Agregar cualquier requirement que falte
-                if step_requirements and not step_requirements.is_satisfied:
-                    missing_requirements.append(step_requirements)
-                    logger.info(f"✅ Added missing requirement for {step_requirements.service_id}")
+            # Agregar cualquier requirement que falte
+            missing_requirements = [req for req in step_requirements if not req.is_satisfied]
+            for req in missing_requirements:
+                logger.info(f"✅ Added missing requirement for {req.service_id}")
             
             # Remover duplicados basados en service_id
             unique_requirements = []
@@ -8,6 +8,7 @@ from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.services.ICag_service import ICAGService
 from app.core.config import settings
+from app.core.telemetry import traced
 from app.db.database import get_db
 from app.repositories.node_repository import NodeRepository
 from app.repositories.action_repository import ActionRepository
@@ -153,6 +154,7 @@ class RedisNodeCacheService(ICAGService):
                 self.logger.error(f"❌ STARTUP: Error inicializando cache Redis: {e}", exc_info=True)
                 raise WorkflowProcessingException(f"Error inicializando cache: {e}")
 
+    @traced("cag.build_context")
     async def build_context(self) -> List[Dict[str, Any]]:
         """
         🔧 REDIS-FIRST: Acceso instantáneo desde Redis.
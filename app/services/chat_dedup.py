@@ -0,0 +1,210 @@
+# app/services/chat_dedup.py
+"""
+Chat Request Deduplication - deduplicación de mensajes a nivel de cluster
+
+- Claim en Redis con SET NX PX por (usuario, sesión, hash de la petición
+  completa: mensaje, conversación, workflow_type, flags OAuth...): solo un
+  worker/réplica ejecuta el planner para un doble envío
+- Sin session_id no hay dedup: cada petición crea su propia sesión
+- Los duplicados no recalculan: esperan el resultado del dueño por pub/sub
+  (y lo leen de la key de resultado si ya terminó)
+- El dict local es solo un atajo L1 para duplicados en el mismo proceso
+- Sin Redis se degrada a dedup por proceso, nunca bloquea el chat
+"""
+
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import socket
+import time
+import uuid
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+
+from app.core.cache import get_shared_redis
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+ComputeFn = Callable[[], Awaitable[Dict[str, Any]]]
+
+
+class ChatRequestDeduplicator:
+    KEY_PREFIX = "chatdedup"
+
+    def __init__(self):
+        self.redis = get_shared_redis()
+        self.enabled = settings.CHAT_DEDUP_ENABLED
+        self.claim_ttl_ms = settings.CHAT_DEDUP_CLAIM_TTL_MS
+        self.result_ttl_ms = settings.CHAT_DEDUP_RESULT_TTL_MS
+        self.wait_timeout = settings.CHAT_DEDUP_WAIT_SECONDS
+        self.owner_prefix = f"{socket.gethostname()}-{os.getpid()}"
+        # L1: hash → (expira_en, future con el resultado del dueño local)
+        self._local: Dict[str, Tuple[float, asyncio.Future]] = {}
+
+    @staticmethod
+    def request_hash(user_id: Any, session_id: Any, request: Dict[str, Any]) -> str:
+        # Todos los campos que cambian el resultado, en JSON canónico
+        canonical = json.dumps(request, sort_keys=True, separators=(",", ":"), default=str)
+        request_digest = hashlib.sha256(canonical.encode()).hexdigest()
+        return hashlib.sha256(f"{user_id}:{session_id}:{request_digest}".encode()).hexdigest()
+
+    def _keys(self, request_hash: str) -> Dict[str, str]:
+        return {
+            "claim": f"{self.KEY_PREFIX}:claim:{request_hash}",
+            "result": f"{self.KEY_PREFIX}:result:{request_hash}",
+            "channel": f"{self.KEY_PREFIX}:done:{request_hash}",
+        }
+
+    # ------------------------------------------------------------------
+    # L1 local
+    # ------------------------------------------------------------------
+
+    def _local_future(self, request_hash: str) -> Optional[asyncio.Future]:
+        now = time.monotonic()
+        for key in [k for k, (expires_at, _) in self._local.items() if expires_at <= now]:
+            del self._local[key]
+        entry = self._local.get(request_hash)
+        return entry[1] if entry else None
+
+    def _register_local(self, request_hash: str) -> asyncio.Future:
+        future = asyncio.get_running_loop().create_future()
+        # Vive mientras se calcula; al terminar se acota a la ventana de resultado
+        self._local[request_hash] = (time.monotonic() + self.claim_ttl_ms / 1000, future)
+        return future
+
+    def _settle_local(self, request_hash: str, future: asyncio.Future, result: Optional[Dict[str, Any]], error: Optional[BaseException]) -> None:
+        if error is not None:
+            self._local.pop(request_hash, None)
+            if not future.done():
+                if not isinstance(error, Exception):
+                    # Cancelación del dueño: los duplicados locales reintentan, no se cancelan
+                    error = RuntimeError("original chat request was cancelled")
+                future.set_exception(error)
+                future.exception()  # Evita "exception was never retrieved" si no hay duplicados
+            return
+        if not future.done():
+            future.set_result(result)
+        self._local[request_hash] = (time.monotonic() + self.result_ttl_ms / 1000, future)
+
+    # ------------------------------------------------------------------
+    # API
+    # ------------------------------------------------------------------
+
+    async def run(self, user_id: Any, session_id: Any, request: Dict[str, Any], compute: ComputeFn) -> Dict[str, Any]:
+        """
+        Ejecuta compute() una sola vez en todo el cluster para una misma
+        petición (usuario, sesión y `request`, el body completo serializado)
+        dentro de la ventana; los duplicados reciben el mismo resultado.
+        compute debe devolver un dict serializable a JSON.
+        """
+        if not self.enabled or session_id is None:
+            return await compute()
+
+        request_hash = self.request_hash(user_id, session_id, request)
+        local = self._local_future(request_hash)
+        if local is not None:
+            logger.info(f"🔁 CHAT DEDUP: local duplicate, awaiting first result - hash: {request_hash[:8]}...")
+            try:
+                return await asyncio.shield(local)
+            except Exception:
+                return await compute()  # El original falló: este intento va por su cuenta
+
+        future = self._register_local(request_hash)
+        keys = self._keys(request_hash)
+        owner = f"{self.owner_prefix}-{uuid.uuid4().hex[:8]}"
+
+        try:
+            claimed = await self.redis.set(keys["claim"], owner, nx=True, px=self.claim_ttl_ms)
+        except Exception as e:
+            logger.warning(f"Chat dedup unavailable, processing locally: {e}")
+            return await self._compute_as_owner(request_hash, future, keys, compute, publish=False)
+
+        if claimed:
+            logger.info(f"✅ CHAT DEDUP: processing new request - hash: {request_hash[:8]}...")
+            return await self._compute_as_owner(request_hash, future, keys, compute, publish=True)
+
+        logger.info(f"🔁 CHAT DEDUP: duplicate of in-flight request, awaiting result - hash: {request_hash[:8]}...")
+        result = await self._await_remote(keys)
+        if result is None:
+            # El dueño falló o no respondió a tiempo: calcular aquí
+            return await self._compute_as_owner(request_hash, future, keys, compute, publish=False)
+        self._settle_local(request_hash, future, result, None)
+        return result
+
+    async def _compute_as_owner(
+        self,
+        request_hash: str,
+        future: asyncio.Future,
+        keys: Dict[str, str],
+        compute: ComputeFn,
+        publish: bool,
+    ) -> Dict[str, Any]:
+        try:
+            result = await compute()
+        except BaseException as e:
+            self._settle_local(request_hash, future, None, e)
+            if publish:
+                await self._publish(keys, {"status": "error", "error": str(e)}, store=False)
+            raise
+
+        self._settle_local(request_hash, future, result, None)
+        if publish:
+            await self._publish(keys, {"status": "ok", "result": result}, store=True)
+        return result
+
+    async def _publish(self, keys: Dict[str, str], payload: Dict[str, Any], store: bool) -> None:
+        message = json.dumps(payload, default=str)
+        try:
+            async with self.redis.pipeline(transaction=False) as pipe:
+                if store:
+                    pipe.set(keys["result"], message, px=self.result_ttl_ms)
+                    # El claim dura lo mismo que el resultado: pasada la ventana, el mensaje vuelve a procesarse
+                    pipe.pexpire(keys["claim"], self.result_ttl_ms)
+                else:
+                    pipe.delete(keys["claim"])
+                pipe.publish(keys["channel"], message)
+                await pipe.execute()
+        except Exception as e:
+            logger.warning(f"Chat dedup could not publish result: {e}")
+
+    async def _await_remote(self, keys: Dict[str, str]) -> Optional[Dict[str, Any]]:
+        pubsub = self.redis.pubsub()
+        try:
+            # Suscribirse antes de leer la key: no se pierde un resultado publicado entre medias
+            await pubsub.subscribe(keys["channel"])
+            stored = await self.redis.get(keys["result"])
+            if stored is None:
+                stored = await asyncio.wait_for(self._next_message(pubsub), timeout=self.wait_timeout)
+            payload = json.loads(stored)
+            if payload.get("status") == "ok":
+                return payload["result"]
+            logger.info(f"Chat dedup: original request failed ({payload.get('error')}), retrying locally")
+        except asyncio.TimeoutError:
+            logger.warning(f"Chat dedup: no result after {self.wait_timeout}s, processing locally")
+        except Exception as e:
+            logger.warning(f"Chat dedup wait failed, processing locally: {e}")
+        finally:
+            try:
+                await pubsub.close()
+            except Exception:
+                pass
+        return None
+
+    @staticmethod
+    async def _next_message(pubsub) -> str:
+        async for message in pubsub.listen():
+            if message.get("type") == "message":
+                return message["data"]
+        raise ConnectionError("pubsub closed")
+
+
+_chat_deduplicator: Optional[ChatRequestDeduplicator] = None
+
+
+def get_chat_deduplicator() -> ChatRequestDeduplicator:
+    global _chat_deduplicator
+    if _chat_deduplicator is None:
+        _chat_deduplicator = ChatRequestDeduplicator()
+    return _chat_deduplicator
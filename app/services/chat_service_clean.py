@@ -13,6 +13,7 @@ from uuid import UUID
 from fastapi import Depends
 
 from app.core.config import settings
+from app.core.telemetry import traced
 from app.workflow_engine.constants.workflow_statuses import WorkflowStatus, WorkflowStatusGroups
 from app.models.chat_models import ChatResponseModel
 from app.models.form_payload import FormPayload
@@ -90,6 +91,7 @@ class ChatService(IChatService):
             status="oauth_completed_silent"
         )
 
+    @traced("chat.handle_message")
     async def handle_message(
         self, 
         chat_id: UUID, 
@@ -4,7 +4,11 @@ from uuid import UUID
 from typing import Any, Dict, List
 from fastapi import Depends
 
-from app.repositories.chat_session_repository import ChatSessionRepository, get_chat_session_repository
+from app.repositories.chat_session_repository import (
+    ChatSessionRepository,
+    get_chat_session_repository,
+    get_chat_session_read_repository,
+)
 
 class ChatSessionService:
     def __init__(self, repo: ChatSessionRepository):
@@ -63,3 +67,12 @@ def get_chat_session_service(
     ✅ LIMPIADO: Factory sin interface innecesaria
     """
     return ChatSessionService(repo)
+
+
+def get_chat_session_read_service(
+    repo: ChatSessionRepository = Depends(get_chat_session_read_repository),
+) -> ChatSessionService:
+    """
+    Factory para endpoints de solo lectura (historial): usa get_read_db
+    """
+    return ChatSessionService(repo)
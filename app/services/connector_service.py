@@ -5,13 +5,13 @@ from sqlalchemy.ext.asyncio import AsyncSession
 from app.repositories.node_repository import NodeRepository
 from app.repositories.action_repository import ActionRepository
 from app.dtos.node_dto import NodeDTO
-from app.db.database import get_db
+from app.db.database import get_read_db
 from app.dtos.action_dto import ActionDTO
 
 logger = logging.getLogger(__name__)
 
 def get_connector_service(
-    db: AsyncSession = Depends(get_db),
+    db: AsyncSession = Depends(get_read_db),  # Catálogo: solo lectura
 ) -> 'ConnectorService':
     """
     Factory para inyección de dependencias
@@ -6,6 +6,7 @@ from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.repositories.credential_repository import CredentialRepository, get_credential_repository
 from app.db.database import get_db
+from app.core.telemetry import traced
 
 
 class CredentialService:
@@ -17,6 +18,7 @@ class CredentialService:
     def __init__(self, repo: CredentialRepository):
         self.repo = repo
 
+    @traced("credentials.get_credential")
     async def get_credential(
         self,
         user_id: int,
@@ -38,6 +40,29 @@ class CredentialService:
             
         return None
 
+    async def get_credential_status(
+        self,
+        user_id: int,
+        service_ids: List[str],
+        chat_id: Optional[str] = None,
+    ) -> Dict[str, Optional[bool]]:
+        """
+        Versión batch de get_credential para chequeos de auth: una query para
+        todos los servicios. Misma precedencia (global primero, luego chat).
+        Devuelve service_id -> None (sin credencial) o si tiene access_token.
+        """
+        presence = await self.repo.get_credential_presence(user_id, list(set(service_ids)), chat_id)
+        status: Dict[str, Optional[bool]] = {}
+        for service_id in service_ids:
+            rows = presence.get(service_id, {})
+            if None in rows:
+                status[service_id] = rows[None]
+            elif chat_id and str(chat_id) in rows:
+                status[service_id] = rows[str(chat_id)]
+            else:
+                status[service_id] = None
+        return status
+
     async def get_service_config(
         self,
         user_id: int,
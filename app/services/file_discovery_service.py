@@ -4,18 +4,25 @@ SEPARACIÓN LIMPIA: No maneja auth, recibe credenciales ya verificadas
 RESPONSABILIDAD ÚNICA: Discovery de archivos/metadata de providers
 NO confundir con Auth Service Discovery
 """
+import asyncio
+import json
 import logging
-from typing import List, Dict, Any, Optional
-from dataclasses import dataclass
+from typing import List, Dict, Any, Optional, Tuple
+from dataclasses import dataclass, asdict
 
 # ✅ SEPARACIÓN LIMPIA: Solo necesita CredentialService para credenciales
 from app.services.credential_service import CredentialService, get_credential_service
 from app.services.auth_resolver import CentralAuthResolver, get_auth_resolver
 from app.dtos.file_discovery_dto import DiscoveredFileDTO, FileDiscoveryResponseDTO
+from app.core.cache import get_cache_manager
+from app.core.config import settings
 from fastapi import Depends
 
 logger = logging.getLogger(__name__)
 
+# Prefijo de cache para listados por usuario/provider
+DISCOVERY_CACHE_PREFIX = "file_discovery"
+
 
 @dataclass
 class DiscoveredFile:
@@ -81,36 +88,28 @@ class FileDiscoveryService:
                 self.logger.warning("planned_steps is None, returning empty discovery results")
                 return []
             
-            # ✅ SEPARACIÓN LIMPIA: Obtener credenciales usando CredentialService
-            discovered_files = []
+            # 1. Resolver auth + credenciales por provider (secuencial: comparten AsyncSession)
+            targets = await self._resolve_discovery_targets(user_id, planned_steps)
+            if not targets:
+                return []
             
-            # Procesar cada paso para obtener credenciales específicas
-            for step in planned_steps:
-                default_auth = step.get('default_auth')
-                if not default_auth:
-                    continue
-                    
-                # Resolver auth policy para extraer provider info
-                auth_policy = await self.auth_resolver.resolve_auth_once(default_auth)
-                if not auth_policy or not auth_policy.requires_oauth():
-                    continue
-                    
-                # Obtener credenciales usando CredentialService
-                credentials = await self.credential_service.get_credential(
-                    user_id=user_id,
-                    service_id=auth_policy.service
-                )
-                
-                if not credentials:
-                    self.logger.debug(f"No credentials found for {auth_policy.provider}")
+            # 2. Fan-out concurrente de discovery con timeout por provider
+            results = await asyncio.gather(
+                *[
+                    self._discover_with_timeout(user_id, provider, service, credentials, file_types)
+                    for provider, service, credentials in targets
+                ],
+                return_exceptions=True
+            )
+            
+            # 3. Resultados parciales: un provider lento o caído no tumba a los demás
+            discovered_files = []
+            for (provider, service, _), provider_files in zip(targets, results):
+                if isinstance(provider_files, BaseException):
+                    self.logger.error(f"Discovery failed for {provider}/{service}: {provider_files}")
                     continue
-                # Descubrir archivos usando credenciales del CredentialService
-                provider_files = await self._discover_files_for_provider(
-                    auth_policy.provider, auth_policy.service, credentials, file_types
-                )
-                
                 discovered_files.extend(provider_files)
-                self.logger.debug(f"Found {len(provider_files)} files from {auth_policy.provider}")
+                self.logger.debug(f"Found {len(provider_files)} files from {provider}")
             
             self.logger.info(f"Total discovered files: {len(discovered_files)}")
             return discovered_files
@@ -119,6 +118,72 @@ class FileDiscoveryService:
             self.logger.error(f"Error discovering user files: {e}", exc_info=True)
             return []
     
+    async def _resolve_discovery_targets(
+        self,
+        user_id: int,
+        planned_steps: List[Dict[str, Any]]
+    ) -> List[Tuple[str, Optional[str], Dict[str, Any]]]:
+        """
+        Resuelve (provider, service, credentials) únicos a partir de los pasos.
+        Varios pasos del mismo provider/service se descubren una sola vez.
+        """
+        targets = []
+        seen = set()
+        
+        for step in planned_steps:
+            default_auth = step.get('default_auth')
+            if not default_auth:
+                continue
+                
+            # Resolver auth policy para extraer provider info
+            auth_policy = await self.auth_resolver.resolve_auth_once(default_auth)
+            if not auth_policy or not auth_policy.requires_oauth():
+                continue
+            
+            target_key = (auth_policy.provider, auth_policy.service)
+            if target_key in seen:
+                continue
+            seen.add(target_key)
+                
+            # Obtener credenciales usando CredentialService
+            credentials = await self.credential_service.get_credential(
+                user_id=user_id,
+                service_id=auth_policy.service
+            )
+            
+            if not credentials:
+                self.logger.debug(f"No credentials found for {auth_policy.provider}")
+                continue
+            
+            targets.append((auth_policy.provider, auth_policy.service, credentials))
+        
+        return targets
+    
+    async def _discover_with_timeout(
+        self,
+        user_id: int,
+        provider: str,
+        service: Optional[str],
+        credentials: Dict[str, Any],
+        file_types: Optional[List[str]]
+    ) -> List[DiscoveredFile]:
+        """
+        Descubre archivos de un provider respetando DISCOVERY_PROVIDER_TIMEOUT_SECONDS
+        """
+        try:
+            return await asyncio.wait_for(
+                self._discover_files_for_provider(
+                    provider, service, credentials, file_types, user_id=user_id
+                ),
+                timeout=settings.DISCOVERY_PROVIDER_TIMEOUT_SECONDS
+            )
+        except asyncio.TimeoutError:
+            self.logger.warning(
+                f"⏱️ Discovery timeout for {provider}/{service} "
+                f"after {settings.DISCOVERY_PROVIDER_TIMEOUT_SECONDS}s"
+            )
+            return []
+    
     # ❌ ELIMINADO: _extract_providers_from_nodes() 
     # 🔥 MOTIVO: Movido a UnifiedOAuthManager.extract_providers_from_steps()
     # Esta función duplicó lógica que ya existía en otros lugares
@@ -128,11 +193,14 @@ class FileDiscoveryService:
         provider: str,
         service: Optional[str],
         credentials: Dict[str, Any],
-        file_types: Optional[List[str]]
+        file_types: Optional[List[str]],
+        user_id: Optional[int] = None
     ) -> List[DiscoveredFile]:
         """
         🔥 SIMPLIFICADO: Descubre archivos para un provider específico
-        Recibe credenciales ya verificadas, SOLO se enfoca en discovery
+        Recibe credenciales ya verificadas, SOLO se enfoca en discovery.
+        Si hay listado cacheado y el provider confirma (change token) que no hubo
+        cambios, se reutiliza sin volver a listar.
         """
         try:
             # Importar discovery handler dinámicamente CON credenciales
@@ -141,6 +209,17 @@ class FileDiscoveryService:
                 self.logger.debug(f"No discovery handler available for {provider}/{service}")
                 return []
             
+            cache_key = None
+            if user_id is not None and settings.DISCOVERY_CACHE_ENABLED:
+                cache_key = self._get_cache_key(user_id, provider, service, file_types)
+                cached_files = await self._get_cached_listing(cache_key, handler)
+                if cached_files is not None:
+                    self.logger.debug(f"♻️ Discovery cache HIT for {provider}/{service}")
+                    return cached_files
+            
+            # Token ANTES de listar: cambios concurrentes al listado se detectan en el próximo turno
+            change_token = await handler.get_change_token() if cache_key else None
+            
             # Usar handler para descubrir archivos (ya tiene credenciales)
             files = await handler.discover_files(file_types)
             
@@ -151,12 +230,74 @@ class FileDiscoveryService:
                 if discovered_file:
                     discovered_files.append(discovered_file)
             
+            # Los handlers devuelven [] también ante errores: un listado vacío no se cachea
+            if cache_key and discovered_files:
+                await self._store_listing(cache_key, change_token, discovered_files)
+            
             return discovered_files
             
         except Exception as e:
             self.logger.error(f"Error discovering files for {provider}: {e}")
             return []
     
+    def _get_cache_key(
+        self,
+        user_id: int,
+        provider: str,
+        service: Optional[str],
+        file_types: Optional[List[str]]
+    ) -> str:
+        """Clave de cache por usuario/provider/service/tipos"""
+        types_key = ",".join(sorted(file_types)) if file_types else "*"
+        return f"{DISCOVERY_CACHE_PREFIX}:{user_id}:{provider}:{service or '-'}:{types_key}"
+    
+    async def _get_cached_listing(self, cache_key: str, handler) -> Optional[List[DiscoveredFile]]:
+        """
+        Retorna listado cacheado si sigue vigente, None si hay que volver a listar
+        """
+        try:
+            cache = await get_cache_manager()
+            raw = await cache.get(cache_key)
+            if not raw:
+                return None
+            
+            entry = json.loads(raw)
+            change_token = entry.get("change_token")
+            
+            # Provider con change token: validar; sin token, el TTL decide
+            if change_token:
+                changed = await handler.has_changes_since(change_token)
+                if changed is not False:
+                    self.logger.debug(f"🔄 Discovery cache stale for {cache_key}")
+                    return None
+            
+            return [DiscoveredFile(**file_data) for file_data in entry.get("files", [])]
+            
+        except Exception as e:
+            self.logger.debug(f"Discovery cache read failed for {cache_key}: {e}")
+            return None
+    
+    async def _store_listing(
+        self,
+        cache_key: str,
+        change_token: Optional[str],
+        discovered_files: List[DiscoveredFile]
+    ) -> None:
+        """Guarda listado + change token en cache (best effort)"""
+        try:
+            cache = await get_cache_manager()
+            payload = json.dumps(
+                {
+                    "change_token": change_token,
+                    "files": [asdict(f) for f in discovered_files]
+                },
+                ensure_ascii=False,
+                default=str
+            )
+            await cache.set(cache_key, payload, ttl=settings.DISCOVERY_CACHE_TTL_SECONDS)
+        except Exception as e:
+            self.logger.debug(f"Discovery cache write failed for {cache_key}: {e}")
+    
     async def _get_connector_for_provider(
         self, 
         provider: str, 
@@ -4,7 +4,7 @@ from typing import List
 from uuid import UUID
 from fastapi import HTTPException, status, Depends
 
-from app.repositories.flow_repository import FlowRepository, get_flow_repository
+from app.repositories.flow_repository import FlowRepository, get_flow_repository, get_flow_read_repository
 from app.services.trigger_orchestrator_service import TriggerOrchestratorService, get_trigger_orchestrator_service
 from app.services.flow_definition_service import FlowDefinitionService, get_flow_definition_service
 from app.dtos.flow_dtos import FlowSummaryDTO, FlowDetailDTO
@@ -445,6 +445,17 @@ async def get_flow_service(
     """
     return FlowService(repo, orchestrator, definition_service, db)
 
+async def get_flow_read_service(
+    repo: FlowRepository = Depends(get_flow_read_repository),
+    orchestrator: TriggerOrchestratorService = Depends(get_trigger_orchestrator_service),
+    definition_service: FlowDefinitionService = Depends(get_flow_definition_service),
+    db: AsyncSession = Depends(get_db),
+) -> FlowService:
+    """
+    Factory para listados/detalle: las consultas del repo van a la réplica (get_read_db)
+    """
+    return FlowService(repo, orchestrator, definition_service, db)
+
 async def create_flow_service_manual(db_session: AsyncSession) -> FlowService:
     """
     🔧 MANUAL CREATION: Crear FlowService sin Depends para uso fuera de FastAPI
@@ -0,0 +1,381 @@
+# app/services/telegram_gateway.py
+"""
+Telegram Gateway - camino rápido del webhook de bots desplegados
+
+- Contexto del bot (secret + token) en cache TTL por agent_id; se invalida al
+  editar el agente o su credencial (local + pub/sub al resto de procesos). Los
+  agent_id inexistentes también se cachean (TTL corto, acotado en tamaño)
+- El webhook solo valida y encola en un Redis Stream (durable); un consumer
+  group procesa las updates y reclama las que quedaron colgadas de un
+  proceso caído (XAUTOCLAIM)
+- Las respuestas salen por el cliente httpx compartido (keep-alive) y pasan por
+  token buckets por bot y por (bot, chat) según los límites de envío de Telegram
+- Las updates que fallan no se confirman: se reintentan vía XAUTOCLAIM hasta
+  MAX_DELIVERIES y después se descartan con log de error
+"""
+
+import asyncio
+import json
+import logging
+import os
+import socket
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Dict, Optional
+from uuid import UUID
+
+from sqlalchemy import event, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.cache import get_shared_redis
+from app.core.config import settings
+from app.core.http_client import http_client
+from app.db.database import async_session
+from app.db.models import AIAgent, TelegramCredential
+
+logger = logging.getLogger(__name__)
+
+TELEGRAM_API = "https://api.telegram.org"
+
+
+@dataclass(frozen=True)
+class BotContext:
+    agent_id: UUID
+    webhook_secret: Optional[str]
+    bot_token: Optional[str]
+    expires_at: float
+
+
+class TokenBucket:
+    """
+    Bucket por reserva: cada llamada toma un token (el saldo puede quedar
+    negativo) y devuelve cuánto esperar. Sin locks: el event loop es
+    monohilo y las esperas quedan escalonadas entre llamadas concurrentes.
+    """
+
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+
+    def reserve(self) -> float:
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        self.tokens -= 1
+        return 0.0 if self.tokens >= 0 else -self.tokens / self.rate
+
+
+class TelegramGateway:
+    INVALIDATION_CHANNEL = "telegram:bot_context:invalidate"
+    CONSUMER_GROUP = "telegram-senders"
+    MAX_CHAT_BUCKETS = 10000
+    MAX_MISSING_CONTEXTS = 10000
+    MAX_SEND_ATTEMPTS = 3
+    MAX_DELIVERIES = 5
+
+    def __init__(self):
+        self.redis = get_shared_redis()
+        self.stream = settings.TELEGRAM_UPDATES_STREAM
+        self.consumer_name = f"{socket.gethostname()}-{os.getpid()}"
+        self._contexts: Dict[UUID, BotContext] = {}
+        self._loading: Dict[UUID, asyncio.Task] = {}
+        # agent_id sin agente → expiración (LRU acotado: los ids vienen de la URL)
+        self._missing: "OrderedDict[UUID, float]" = OrderedDict()
+        # Límites de Telegram por bot: bucket global por token y por (token, chat)
+        self._bot_buckets: "OrderedDict[str, TokenBucket]" = OrderedDict()
+        self._chat_buckets: "OrderedDict[Any, TokenBucket]" = OrderedDict()
+        self._tasks: list = []
+        self._inline: set = set()
+        self._running = False
+
+    # ------------------------------------------------------------------
+    # Contexto del bot (cache TTL)
+    # ------------------------------------------------------------------
+
+    async def get_bot_context(self, agent_id: UUID) -> Optional[BotContext]:
+        context = self._contexts.get(agent_id)
+        if context is not None and context.expires_at > time.monotonic():
+            return context
+        missing_until = self._missing.get(agent_id)
+        if missing_until is not None:
+            if missing_until > time.monotonic():
+                return None
+            self._missing.pop(agent_id, None)
+
+        # Un solo SELECT por agente aunque lleguen muchas updates a la vez
+        task = self._loading.get(agent_id)
+        if task is None:
+            task = asyncio.ensure_future(self._load_bot_context(agent_id))
+            self._loading[agent_id] = task
+            task.add_done_callback(lambda _: self._loading.pop(agent_id, None))
+        return await asyncio.shield(task)
+
+    async def _load_bot_context(self, agent_id: UUID) -> Optional[BotContext]:
+        async with async_session() as session:
+            row = (await session.execute(
+                select(AIAgent, TelegramCredential.bot_token)
+                .outerjoin(TelegramCredential, TelegramCredential.agent_id == AIAgent.agent_id)
+                .where(AIAgent.agent_id == agent_id)
+            )).first()
+        if row is None:
+            self._contexts.pop(agent_id, None)
+            self._missing[agent_id] = time.monotonic() + settings.TELEGRAM_BOT_CONTEXT_MISS_TTL_SECONDS
+            self._missing.move_to_end(agent_id)
+            while len(self._missing) > self.MAX_MISSING_CONTEXTS:
+                self._missing.popitem(last=False)
+            return None
+
+        agent, bot_token = row
+        context = BotContext(
+            agent_id=agent_id,
+            webhook_secret=getattr(agent, "webhook_secret", None),
+            bot_token=bot_token,
+            expires_at=time.monotonic() + settings.TELEGRAM_BOT_CONTEXT_TTL_SECONDS,
+        )
+        self._contexts[agent_id] = context
+        return context
+
+    def invalidate_bot_context(self, agent_id: UUID, broadcast: bool = True) -> None:
+        self._contexts.pop(agent_id, None)
+        self._missing.pop(agent_id, None)
+        if broadcast:
+            try:
+                task = asyncio.get_running_loop().create_task(
+                    self.redis.publish(self.INVALIDATION_CHANNEL, str(agent_id))
+                )
+                self._inline.add(task)
+                task.add_done_callback(self._inline.discard)
+            except RuntimeError:
+                pass  # Sin loop (scripts/tests): la invalidación local basta
+
+    async def _listen_invalidations(self) -> None:
+        while self._running:
+            pubsub = self.redis.pubsub()
+            try:
+                await pubsub.subscribe(self.INVALIDATION_CHANNEL)
+                # Lo publicado mientras no estábamos suscritos se pierde: empezar limpio
+                self._contexts.clear()
+                self._missing.clear()
+                async for message in pubsub.listen():
+                    if message.get("type") == "message":
+                        self.invalidate_bot_context(UUID(message["data"]), broadcast=False)
+            except asyncio.CancelledError:
+                break
+            except Exception as e:
+                logger.warning(f"Telegram invalidation listener error, resubscribing: {e}")
+                await asyncio.sleep(1)
+            finally:
+                try:
+                    await pubsub.close()
+                except Exception:
+                    pass
+
+    # ------------------------------------------------------------------
+    # Cola durable de updates (Redis Stream + consumer group)
+    # ------------------------------------------------------------------
+
+    async def enqueue_update(self, agent_id: UUID, update: Dict[str, Any]) -> None:
+        try:
+            await self.redis.xadd(
+                self.stream,
+                {"agent_id": str(agent_id), "update": json.dumps(update)},
+                maxlen=settings.TELEGRAM_UPDATES_STREAM_MAXLEN,
+                approximate=True,
+            )
+        except Exception as e:
+            # Sin Redis: procesar en este proceso antes que perder la update
+            logger.warning(f"Telegram stream unavailable, handling update inline: {e}")
+            task = asyncio.create_task(self._handle_update(agent_id, update))
+            self._inline.add(task)
+            task.add_done_callback(self._inline.discard)
+
+    async def _ensure_group(self) -> None:
+        try:
+            await self.redis.xgroup_create(self.stream, self.CONSUMER_GROUP, id="0", mkstream=True)
+        except Exception as e:
+            if "BUSYGROUP" not in str(e):
+                raise
+
+    async def _consume(self) -> None:
+        semaphore = asyncio.Semaphore(settings.TELEGRAM_SENDER_CONCURRENCY)
+
+        async def handle(entry_id: str, fields: Dict[str, str]) -> None:
+            async with semaphore:
+                try:
+                    await self._handle_update(UUID(fields["agent_id"]), json.loads(fields["update"]))
+                except Exception as e:
+                    # Sin ack: queda pendiente y XAUTOCLAIM la reintenta pasado min_idle_time
+                    logger.error(f"Telegram update {entry_id} failed, will retry: {e}")
+                    return
+                await self.redis.xack(self.stream, self.CONSUMER_GROUP, entry_id)
+
+        async def drop_exhausted() -> None:
+            # Updates que ya fallaron MAX_DELIVERIES veces (y no están en curso): descartar dejando rastro
+            pending = await self.redis.xpending_range(
+                self.stream, self.CONSUMER_GROUP, min="-", max="+", count=100, idle=60000
+            )
+            exhausted = [p["message_id"] for p in pending or [] if p["times_delivered"] >= self.MAX_DELIVERIES]
+            if exhausted:
+                logger.error(f"Dropping {len(exhausted)} Telegram updates after {self.MAX_DELIVERIES} attempts: {exhausted}")
+                await self.redis.xack(self.stream, self.CONSUMER_GROUP, *exhausted)
+
+        group_ready = False
+        while self._running:
+            try:
+                if not group_ready:
+                    await self._ensure_group()
+                    group_ready = True
+                await drop_exhausted()
+                # Updates de consumidores caídos o fallidas (sin ack tras 60s)
+                claimed = await self.redis.xautoclaim(
+                    self.stream, self.CONSUMER_GROUP, self.consumer_name, min_idle_time=60000, count=100
+                )
+                entries = list(claimed[1]) if claimed else []
+                response = await self.redis.xreadgroup(
+                    self.CONSUMER_GROUP, self.consumer_name, {self.stream: ">"}, count=100, block=5000
+                )
+                for _, stream_entries in response or []:
+                    entries.extend(stream_entries)
+                if entries:
+                    await asyncio.gather(*(handle(entry_id, fields) for entry_id, fields in entries if fields))
+            except asyncio.CancelledError:
+                break
+            except Exception as e:
+                logger.error(f"Telegram consumer error: {e}")
+                group_ready = False
+                await asyncio.sleep(2)
+
+    async def _handle_update(self, agent_id: UUID, update: Dict[str, Any]) -> None:
+        message = update.get("message", {})
+        chat_id = message.get("chat", {}).get("id")
+        text = message.get("text")
+        if not chat_id or not text:
+            return
+
+        context = await self.get_bot_context(agent_id)
+        if context is None or not context.bot_token:
+            logger.warning(f"Dropping Telegram update for agent {agent_id}: bot not deployed")
+            return
+        await self.send_message(context.bot_token, chat_id, text)
+
+    # ------------------------------------------------------------------
+    # Envío con rate limit
+    # ------------------------------------------------------------------
+
+    def _bot_bucket(self, bot_token: str) -> TokenBucket:
+        bucket = self._bot_buckets.get(bot_token)
+        if bucket is None:
+            rate = settings.TELEGRAM_GLOBAL_MSGS_PER_SECOND
+            bucket = self._bot_buckets[bot_token] = TokenBucket(rate, rate)
+            while len(self._bot_buckets) > self.MAX_CHAT_BUCKETS:
+                self._bot_buckets.popitem(last=False)
+        self._bot_buckets.move_to_end(bot_token)
+        return bucket
+
+    def _chat_bucket(self, bot_token: str, chat_id: Any) -> TokenBucket:
+        key = (bot_token, chat_id)
+        bucket = self._chat_buckets.get(key)
+        if bucket is None:
+            if str(chat_id).startswith("-"):
+                # Grupos/canales: límite por minuto
+                rate = settings.TELEGRAM_GROUP_MSGS_PER_MINUTE / 60.0
+            else:
+                rate = settings.TELEGRAM_CHAT_MSGS_PER_SECOND
+            bucket = self._chat_buckets[key] = TokenBucket(rate, 1)
+            while len(self._chat_buckets) > self.MAX_CHAT_BUCKETS:
+                self._chat_buckets.popitem(last=False)
+        self._chat_buckets.move_to_end(key)
+        return bucket
+
+    async def send_message(self, bot_token: str, chat_id: Any, text: str, **extra: Any) -> Dict[str, Any]:
+        """
+        sendMessage respetando los buckets del bot; en 429 espera retry_after y
+        reintenta. Lanza RuntimeError si sigue limitado tras MAX_SEND_ATTEMPTS.
+        """
+        payload = {"chat_id": chat_id, "text": text, **extra}
+        retry_after = 0
+        for attempt in range(self.MAX_SEND_ATTEMPTS):
+            wait = max(self._chat_bucket(bot_token, chat_id).reserve(), self._bot_bucket(bot_token).reserve())
+            if wait:
+                await asyncio.sleep(wait)
+
+            response = await http_client.post(f"{TELEGRAM_API}/bot{bot_token}/sendMessage", json=payload)
+            data = response.json()
+            if response.status_code != 429:
+                response.raise_for_status()
+                return data
+            retry_after = (data.get("parameters") or {}).get("retry_after", 1)
+            if attempt < self.MAX_SEND_ATTEMPTS - 1:
+                logger.warning(f"Telegram rate limited chat {chat_id}, retrying in {retry_after}s")
+                await asyncio.sleep(retry_after)
+        raise RuntimeError(
+            f"Telegram sendMessage to chat {chat_id} still rate limited after {self.MAX_SEND_ATTEMPTS} attempts "
+            f"(retry_after={retry_after}s)"
+        )
+
+    # ------------------------------------------------------------------
+    # Ciclo de vida
+    # ------------------------------------------------------------------
+
+    async def start(self) -> None:
+        if self._running:
+            return
+        self._running = True
+        self._tasks = [
+            asyncio.create_task(self._consume()),
+            asyncio.create_task(self._listen_invalidations()),
+        ]
+        logger.info(f"Telegram gateway started (consumer={self.consumer_name})")
+
+    async def stop(self) -> None:
+        self._running = False
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+
+_telegram_gateway: Optional[TelegramGateway] = None
+
+
+def get_telegram_gateway() -> TelegramGateway:
+    global _telegram_gateway
+    if _telegram_gateway is None:
+        _telegram_gateway = TelegramGateway()
+    return _telegram_gateway
+
+
+def invalidate_bot_context(agent_id: UUID) -> None:
+    """Invalida ya el contexto del bot en todos los procesos"""
+    get_telegram_gateway().invalidate_bot_context(agent_id)
+
+
+_PENDING_INVALIDATIONS = "telegram_bot_context_invalidations"
+
+
+def invalidate_bot_context_on_commit(session: AsyncSession, agent_id: UUID) -> None:
+    """
+    Llamar al editar/borrar un agente o su credencial de Telegram dentro de una
+    transacción: invalida cuando la sesión hace commit (antes, un webhook
+    concurrente podría recargar y cachear la fila vieja) y se descarta en rollback.
+    """
+    sync_session = session.sync_session
+    if _PENDING_INVALIDATIONS not in sync_session.info:
+        # Listeners una sola vez por sesión (viven lo que la sesión del request)
+        event.listen(sync_session, "after_commit", _invalidate_pending)
+        event.listen(sync_session, "after_rollback", _discard_pending)
+    sync_session.info.setdefault(_PENDING_INVALIDATIONS, set()).add(agent_id)
+
+
+def _invalidate_pending(sync_session) -> None:
+    pending = sync_session.info.get(_PENDING_INVALIDATIONS) or set()
+    sync_session.info[_PENDING_INVALIDATIONS] = set()
+    for agent_id in pending:
+        invalidate_bot_context(agent_id)
+
+
+def _discard_pending(sync_session) -> None:
+    sync_session.info[_PENDING_INVALIDATIONS] = set()
@@ -1,7 +1,8 @@
 # app/services/token_storage_service.py
 
-from typing import Optional, Dict, Any
-from datetime import datetime, date, timedelta
+from typing import Optional, Dict, Any, Callable
+from contextlib import asynccontextmanager
+from datetime import datetime, date, timedelta, timezone
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select, func, and_, text
 from sqlalchemy.dialects.postgresql import insert
@@ -18,10 +19,23 @@ class DatabaseTokenStorage(TokenStorage):
     Optimized database storage for tokens with batching and caching
     """
     
-    def __init__(self, db: AsyncSession):
+    def __init__(self, db: AsyncSession, session_factory: Optional[Callable[[], AsyncSession]] = None):
         self.db = db
+        self.session_factory = session_factory
         self.token_repo = TokenRepository(db)
     
+    @asynccontextmanager
+    async def _session(self):
+        """
+        Sesión propia por operación si hay session_factory: los flushes corren en
+        tareas de fondo y no deben compartir la sesión de startup
+        """
+        if self.session_factory is None:
+            yield self.db
+            return
+        async with self.session_factory() as session:
+            yield session
+    
     async def record_usage(self, usage: TokenUsage) -> bool:
         """
         Record token usage with optimized insert
@@ -68,8 +82,9 @@ class DatabaseTokenStorage(TokenStorage):
                 AND created_at >= DATE_TRUNC('month', CURRENT_DATE)
             """)
             
-            result = await self.db.execute(query, {"user_id": user_id})
-            return result.scalar() or 0
+            async with self._session() as db:
+                result = await db.execute(query, {"user_id": user_id})
+                return result.scalar() or 0
             
         except Exception as e:
             logger.error(f"Error getting monthly usage: {e}")
@@ -162,12 +177,17 @@ class DatabaseTokenStorage(TokenStorage):
     
     async def batch_record_usage(self, usages: list[TokenUsage]) -> bool:
         """
-        Batch record multiple usage records for performance
+        Batch record multiple usage records for performance:
+        one multi-row INSERT + one grouped subscription UPSERT
         """
-        try:
-            if not usages:
-                return True
-            
+        if not usages:
+            return True
+        
+        async with self._session() as db:
+            return await self._batch_record_usage(db, usages)
+    
+    async def _batch_record_usage(self, db: AsyncSession, usages: list[TokenUsage]) -> bool:
+        try:            
             # Prepare batch data
             batch_data = []
             user_updates = {}
@@ -199,16 +219,107 @@ class DatabaseTokenStorage(TokenStorage):
             # Batch insert usage records
             if batch_data:
                 stmt = insert(UserTokenUsage).values(batch_data)
-                await self.db.execute(stmt)
+                await db.execute(stmt)
             
-            # Batch update subscriptions
-            for user_id, total_tokens in user_updates.items():
-                await self.update_subscription(user_id, total_tokens)
+            # Single grouped UPSERT for all users in the batch
+            if user_updates:
+                stmt = insert(UserSubscription).values([
+                    {
+                        "user_id": user_id,
+                        "tokens_used_current_month": total_tokens,
+                        "monthly_token_limit": 100000,
+                        "plan_type": "basic",
+                    }
+                    for user_id, total_tokens in user_updates.items()
+                ])
+                stmt = stmt.on_conflict_do_update(
+                    index_elements=[UserSubscription.user_id],
+                    set_={
+                        "tokens_used_current_month": (
+                            UserSubscription.tokens_used_current_month
+                            + stmt.excluded.tokens_used_current_month
+                        ),
+                        "updated_at": func.now(),
+                    },
+                )
+                await db.execute(stmt)
             
-            await self.db.commit()
+            await db.commit()
             return True
             
         except Exception as e:
-            await self.db.rollback()
+            await db.rollback()
             logger.error(f"Error in batch record: {e}")
-            return False
\ No newline at end of file
+            return False
+
+
+# Incrementa solo si el contador ya existe (si no, el manager lo siembra desde la BD)
+_INCR_IF_EXISTS = """
+if redis.call('EXISTS', KEYS[1]) == 1 then
+    return redis.call('INCRBY', KEYS[1], ARGV[1])
+end
+return false
+"""
+
+
+class RedisUsageCounter:
+    """
+    Contadores mensuales de tokens en Redis, compartidos entre réplicas.
+    
+    - Clave: token_quota:{user_id}:{YYYYMM} con expiración al cambio de mes (+ margen)
+    - get_usage: un GET
+    - add_usage: un EVALSHA (INCRBY solo si existe)
+    """
+    
+    KEY_PREFIX = "token_quota"
+    EXPIRY_GRACE_SECONDS = 3 * 24 * 3600
+    
+    def __init__(self, redis_url: str):
+        self.redis_url = redis_url
+        self._redis = None
+        self._incr_script = None
+    
+    async def _get_redis(self):
+        if self._redis is None:
+            import redis.asyncio as redis
+            self._redis = redis.from_url(self.redis_url, decode_responses=True)
+            self._incr_script = self._redis.register_script(_INCR_IF_EXISTS)
+        return self._redis
+    
+    @staticmethod
+    def _month_bounds(now: Optional[datetime] = None):
+        now = now or datetime.now(timezone.utc)
+        month_start = now.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+        next_month = (month_start + timedelta(days=32)).replace(day=1)
+        return month_start, next_month
+    
+    def _key(self, user_id: int) -> str:
+        month_start, _ = self._month_bounds()
+        return f"{self.KEY_PREFIX}:{user_id}:{month_start:%Y%m}"
+    
+    async def get_usage(self, user_id: int) -> Optional[int]:
+        redis_client = await self._get_redis()
+        value = await redis_client.get(self._key(user_id))
+        return int(value) if value is not None else None
+    
+    async def add_usage(self, user_id: int, tokens: int) -> Optional[int]:
+        await self._get_redis()
+        value = await self._incr_script(keys=[self._key(user_id)], args=[int(tokens)])
+        return int(value) if value is not None else None
+    
+    async def seed_usage(self, user_id: int, baseline: int, delta: int = 0) -> int:
+        redis_client = await self._get_redis()
+        key = self._key(user_id)
+        _, next_month = self._month_bounds()
+        expire_at = int(next_month.timestamp()) + self.EXPIRY_GRACE_SECONDS
+        if await redis_client.set(key, int(baseline) + int(delta), nx=True, exat=expire_at):
+            return int(baseline) + int(delta)
+        # Otra réplica lo sembró primero: la base ya está contada, solo sumar el delta propio
+        if delta:
+            return int(await redis_client.incrby(key, int(delta)))
+        return int(await redis_client.get(key) or 0)
+    
+    async def close(self):
+        if self._redis is not None:
+            await self._redis.close()
+            self._redis = None
\ No newline at end of file
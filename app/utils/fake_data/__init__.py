@@ -4,6 +4,13 @@ Sistema modular para generar datos fake realistas para dryrun de workflows
 """
 
 from .registry import fake_data_registry, register_fake_generator
+from .latency import LatencyDistribution, LatencyProfile, get_latency_preset
 from .generators import *  # Importa todos los generadores
 
-__all__ = ['fake_data_registry', 'register_fake_generator']
\ No newline at end of file
+__all__ = [
+    'fake_data_registry',
+    'register_fake_generator',
+    'LatencyDistribution',
+    'LatencyProfile',
+    'get_latency_preset'
+]
\ No newline at end of file
@@ -0,0 +1,86 @@
+"""
+Perfiles de latencia para simulación de nodos
+Permite que el dryrun (simulate=True) espere tiempos realistas en vez de
+reportar duraciones ficticias, para benchmarks y pruebas de carga
+"""
+
+import math
+import random
+from dataclasses import dataclass, field
+from typing import Dict, Optional
+
+# z-score del percentil 95 de una normal estándar
+_Z_P95 = 1.6448536269514722
+
+
+@dataclass(frozen=True)
+class LatencyDistribution:
+    """
+    Distribución log-normal definida por mediana y p95 (en ms).
+    Las latencias de APIs externas tienen cola larga: la log-normal la modela bien.
+    """
+    median_ms: float
+    p95_ms: float
+    max_ms: Optional[float] = None
+
+    def sample(self, rng: random.Random) -> float:
+        mu = math.log(max(self.median_ms, 0.001))
+        sigma = max(math.log(max(self.p95_ms, self.median_ms) / max(self.median_ms, 0.001)) / _Z_P95, 0.0)
+        value = rng.lognormvariate(mu, sigma) if sigma > 0 else self.median_ms
+        if self.max_ms is not None:
+            value = min(value, self.max_ms)
+        return value
+
+
+@dataclass
+class LatencyProfile:
+    """
+    Perfil de latencias por nodo con distribución por defecto.
+
+    Ejemplo::
+
+        profile = LatencyProfile(
+            default=LatencyDistribution(median_ms=120, p95_ms=600),
+            per_node={"Gmail.send_messages": LatencyDistribution(300, 1500)},
+            seed=42,
+        )
+        fake_data_registry.set_latency_profile(profile)
+    """
+    default: LatencyDistribution = field(default_factory=lambda: LatencyDistribution(120.0, 600.0, 5000.0))
+    per_node: Dict[str, LatencyDistribution] = field(default_factory=dict)
+    seed: Optional[int] = None
+    scale: float = 1.0
+
+    def __post_init__(self):
+        self._rng = random.Random(self.seed)
+
+    def sample_ms(self, node_key: str) -> float:
+        distribution = self.per_node.get(node_key, self.default)
+        return distribution.sample(self._rng) * self.scale
+
+
+# Perfiles predefinidos (valores aproximados de APIs SaaS típicas)
+LATENCY_PRESETS: Dict[str, LatencyProfile] = {
+    "fast": LatencyProfile(default=LatencyDistribution(5.0, 20.0, 200.0)),
+    "saas": LatencyProfile(
+        default=LatencyDistribution(150.0, 700.0, 5000.0),
+        per_node={
+            "Postgres.run_query": LatencyDistribution(8.0, 60.0, 1000.0),
+            "HTTP_Request.request": LatencyDistribution(180.0, 900.0, 10000.0),
+            "Gmail.send_messages": LatencyDistribution(350.0, 1400.0, 8000.0),
+            "Outlook.send_mail": LatencyDistribution(400.0, 1600.0, 8000.0),
+            "Google_Drive.upload_file": LatencyDistribution(600.0, 2500.0, 15000.0),
+            "Dropbox.upload_file": LatencyDistribution(550.0, 2200.0, 15000.0),
+        },
+    ),
+}
+
+
+def get_latency_preset(name: str, seed: Optional[int] = None, scale: float = 1.0) -> LatencyProfile:
+    """
+    Obtiene una copia independiente (con su propio RNG) de un perfil predefinido
+    """
+    preset = LATENCY_PRESETS.get(name)
+    if preset is None:
+        raise ValueError(f"Perfil de latencia desconocido: {name}. Disponibles: {list(LATENCY_PRESETS)}")
+    return LatencyProfile(default=preset.default, per_node=dict(preset.per_node), seed=seed, scale=scale)
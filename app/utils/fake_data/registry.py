@@ -6,6 +6,8 @@ Sistema completamente declarativo sin lógica hardcodeada
 from typing import Any, Dict, Callable, Optional
 import logging
 
+from .latency import LatencyProfile
+
 logger = logging.getLogger(__name__)
 
 
@@ -18,6 +20,7 @@ class FakeDataRegistry:
     def __init__(self):
         self._node_generators: Dict[str, Callable] = {}
         self._scanned = False
+        self._latency_profile: Optional[LatencyProfile] = None
     
     def register_generator(self, node_key: str):
         """
@@ -61,6 +64,20 @@ class FakeDataRegistry:
         from app.utils.template_engine import template_engine
         return template_engine.generate_fake_output_structure()
     
+    def set_latency_profile(self, profile: Optional[LatencyProfile]) -> None:
+        """
+        Activa (o desactiva con None) la inyección de latencia en simulaciones
+        """
+        self._latency_profile = profile
+    
+    def sample_latency_ms(self, node_key: str) -> Optional[float]:
+        """
+        Latencia simulada para el nodo, o None si no hay perfil activo
+        """
+        if self._latency_profile is None:
+            return None
+        return self._latency_profile.sample_ms(node_key)
+    
     def has_generator(self, node_key: str) -> bool:
         """Verifica si existe un generador para el nodo"""
         self._ensure_scanned()
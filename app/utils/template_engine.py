@@ -229,6 +229,8 @@ class WorkflowTemplateEngine:
         context = {}
         
         for step_id, step_result in step_outputs.items():
+            # run_workflow indexa por UUID: normalizar a str para pystache y el alias
+            step_id = str(step_id)
             # Crear estructura compatible con pystache
             context[step_id] = {
                 'output': step_result.get('output', {}),
@@ -1,7 +1,14 @@
 import asyncio
+import concurrent.futures
+import logging
+import threading
+from typing import Any, Coroutine, Dict, Optional, Set
 from uuid import UUID
 import redis
-from rq import Worker, Queue, Connection
+from rq import SimpleWorker, Queue, Connection, get_current_job
+from rq.timeouts import BaseDeathPenalty, JobTimeoutException
+from rq.utils import utcnow
+from rq.worker import StopRequested, WorkerStatus
 
 from app.core.config import settings
 from app.db.database import async_session
@@ -11,6 +18,8 @@ from app.agent.run_manager import RunManager
 from app.ai.memories.manager import MemoryManager
 from app.services.kyra_agent_service import get_kyra_agent_service
 
+logger = logging.getLogger(__name__)
+
 
 async def _execute_run(run_id: UUID) -> None:
     """Load run info and execute it using KyraAgentService."""
@@ -65,14 +74,256 @@ async def _execute_run(run_id: UUID) -> None:
         )
 
 
+# ----------------------------------------------------------------------
+# Event loop persistente del worker
+# ----------------------------------------------------------------------
+
+# Loop del proceso (None fuera de AsyncJobWorker) y coroutines de jobs en curso
+_loop: Optional[asyncio.AbstractEventLoop] = None
+_pending: Set[concurrent.futures.Future] = set()
+_pending_lock = threading.Lock()
+
+
+async def _with_job_timeout(coro: Coroutine[Any, Any, Any], timeout: Optional[int]) -> Any:
+    if timeout is None:
+        return await coro
+    try:
+        return await asyncio.wait_for(coro, timeout)
+    except asyncio.TimeoutError:
+        raise JobTimeoutException(f"Task exceeded maximum timeout value ({timeout} seconds)")
+
+
+def run_job_coroutine(coro: Coroutine[Any, Any, Any]) -> Any:
+    """
+    Ejecuta la coroutine de un job en el loop persistente del worker y espera
+    su resultado (se llama desde el hilo del job). Sin AsyncJobWorker, por
+    ejemplo con `rq worker` estándar, cae a un asyncio.run por job.
+    """
+    loop = _loop
+    if loop is None:
+        return asyncio.run(coro)
+
+    job = get_current_job()
+    timeout = job.timeout if job is not None and job.timeout and job.timeout > 0 else None
+    future = asyncio.run_coroutine_threadsafe(_with_job_timeout(coro, timeout), loop)
+    with _pending_lock:
+        _pending.add(future)
+    try:
+        return future.result()
+    finally:
+        with _pending_lock:
+            _pending.discard(future)
+
+
 def run_agent(run_id: str) -> None:
-    asyncio.run(_execute_run(UUID(run_id)))
+    run_job_coroutine(_execute_run(UUID(run_id)))
+
+
+class _NoDeathPenalty(BaseDeathPenalty):
+    """SIGALRM solo funciona en el hilo principal; el timeout se aplica con asyncio.wait_for"""
+
+    def setup_death_penalty(self):
+        pass
+
+    def cancel_death_penalty(self):
+        pass
+
+
+async def _close_shared_resources() -> None:
+    """Cierra los pools del proceso dentro de su propio loop"""
+    from app.ai.llm_clients.client_pool import llm_client_pool
+    from app.core.cache import close_shared_redis
+    from app.core.http_client import http_client
+    from app.db.database import dispose_engines
+
+    await llm_client_pool.aclose_all()
+    await close_shared_redis()
+    await http_client.aclose()
+    await dispose_engines()
+
+
+class AsyncJobWorker(SimpleWorker):
+    """
+    Worker RQ con un único event loop por proceso.
+
+    - El loop corre en un hilo propio durante toda la vida del worker: engines
+      de SQLAlchemy, Redis compartido, http_client y clientes LLM se reutilizan
+      entre jobs en lugar de crearse y destruirse en cada asyncio.run
+    - Hasta `concurrency` jobs a la vez: cada uno hace el bookkeeping de RQ en
+      un hilo del pool y espera su coroutine en el loop compartido. No se saca
+      un job de la cola sin un slot libre, así el resto de workers puede tomarlo
+    - Warm shutdown (SIGINT/SIGTERM): deja de tomar jobs y drena los que están
+      en curso. Una segunda señal (cold shutdown) cancela sus coroutines
+    - Sin work horse que monitorizar, un hilo propio renueva cada
+      job_monitoring_interval el heartbeat de todos los jobs en curso (y su
+      entrada en StartedJobRegistry) para que no se den por abandonados
+    - current_job / current_job_id del worker es un único campo: con varios
+      jobs a la vez refleja el último que empezó, no todos los que están en curso
+    """
+
+    death_penalty_class = _NoDeathPenalty
+
+    def __init__(self, *args, concurrency: Optional[int] = None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.concurrency = max(1, concurrency or settings.AGENT_WORKER_CONCURRENCY)
+        self._slots = threading.BoundedSemaphore(self.concurrency)
+        self._executor = concurrent.futures.ThreadPoolExecutor(self.concurrency, thread_name_prefix="rq-job")
+        # future → job en curso (para renovar sus heartbeats)
+        self._in_flight: Dict[concurrent.futures.Future, Any] = {}
+        self._in_flight_lock = threading.RLock()  # RLock: _shutdown corre como signal handler en el hilo principal
+        self._loop_thread: Optional[threading.Thread] = None
+        self._heartbeat_thread: Optional[threading.Thread] = None
+        self._heartbeat_stop = threading.Event()
+
+    # ------------------------------------------------------------------
+    # Ciclo de vida del loop
+    # ------------------------------------------------------------------
+
+    def _start_loop(self) -> None:
+        global _loop
+        if _loop is not None:
+            return
+        loop = asyncio.new_event_loop()
+        self._loop_thread = threading.Thread(target=loop.run_forever, name="rq-async-loop", daemon=True)
+        self._loop_thread.start()
+        _loop = loop
+
+    def _stop_loop(self) -> None:
+        global _loop
+        loop = _loop
+        if loop is None:
+            return
+        try:
+            asyncio.run_coroutine_threadsafe(_close_shared_resources(), loop).result(timeout=30)
+        except Exception as e:
+            logger.warning(f"Error closing worker resources: {e}")
+        _loop = None
+        loop.call_soon_threadsafe(loop.stop)
+        if self._loop_thread is not None:
+            self._loop_thread.join(timeout=5)
+        loop.close()
+
+    def work(self, *args, **kwargs) -> bool:
+        self._start_loop()
+        self._start_heartbeats()
+        try:
+            return super().work(*args, **kwargs)
+        finally:
+            self._stop_heartbeats()
+            self._stop_loop()
+
+    # ------------------------------------------------------------------
+    # Heartbeats de los jobs en curso
+    # ------------------------------------------------------------------
+
+    def _start_heartbeats(self) -> None:
+        self._heartbeat_stop.clear()
+        self._heartbeat_thread = threading.Thread(target=self._heartbeat_loop, name="rq-job-heartbeat", daemon=True)
+        self._heartbeat_thread.start()
+
+    def _stop_heartbeats(self) -> None:
+        self._heartbeat_stop.set()
+        if self._heartbeat_thread is not None:
+            self._heartbeat_thread.join(timeout=5)
+            self._heartbeat_thread = None
+
+    def _heartbeat_loop(self) -> None:
+        while not self._heartbeat_stop.wait(self.job_monitoring_interval):
+            try:
+                self._heartbeat_in_flight()
+            except Exception as e:
+                logger.warning(f"Worker {self.name}: job heartbeat failed: {e}")
+
+    def _heartbeat_in_flight(self) -> None:
+        """Equivalente a Worker.maintain_heartbeats para cada job en curso"""
+        with self._in_flight_lock:
+            jobs = list(self._in_flight.values())
+        if not jobs:
+            return
+        now = utcnow()
+        with self.connection.pipeline() as pipeline:
+            for job in jobs:
+                # hset + zadd(xx) por job
+                job.heartbeat(now, self.job_monitoring_interval + 60, pipeline=pipeline, xx=True)
+            self.heartbeat(self.job_monitoring_interval + 60, pipeline=pipeline)
+            results = pipeline.execute()
+        for index, job in enumerate(jobs):
+            if results[index * 2] == 1:
+                # El hset creó la key: el job ya terminó y se borró (result_ttl=0), ver rq#1450
+                self.connection.delete(job.key)
+
+    # ------------------------------------------------------------------
+    # Jobs concurrentes
+    # ------------------------------------------------------------------
+
+    def dequeue_job_and_maintain_ttl(self, timeout: Optional[int], max_idle_time: Optional[int] = None):
+        # Reservar slot antes de sacar el job de Redis; mientras tanto, mantener vivo el worker
+        while not self._slots.acquire(timeout=self.job_monitoring_interval):
+            self.heartbeat()
+            if self._stop_requested:
+                return None
+        try:
+            result = super().dequeue_job_and_maintain_ttl(timeout, max_idle_time)
+        except BaseException:
+            self._slots.release()
+            raise
+        if result is None:
+            self._slots.release()
+        return result
+
+    def execute_job(self, job, queue):
+        self.set_state(WorkerStatus.BUSY)
+        with self._in_flight_lock:
+            future = self._executor.submit(self._perform_in_thread, job, queue)
+            self._in_flight[future] = job
+        future.add_done_callback(self._job_done)
+
+    def _perform_in_thread(self, job, queue) -> bool:
+        try:
+            return self.perform_job(job, queue)
+        finally:
+            self._slots.release()
+
+    def _job_done(self, future: concurrent.futures.Future) -> None:
+        with self._in_flight_lock:
+            self._in_flight.pop(future, None)
+            idle = not self._in_flight
+        if idle and not self._stop_requested:
+            self.set_state(WorkerStatus.IDLE)
+
+    # ------------------------------------------------------------------
+    # Shutdown
+    # ------------------------------------------------------------------
+
+    def _shutdown(self):
+        # El hilo principal solo espera slots o hace BLPOP: se corta siempre y el drenado ocurre en teardown
+        self._stop_requested = True
+        self.set_shutdown_requested_date()
+        with self._in_flight_lock:
+            in_flight = len(self._in_flight)
+        if in_flight:
+            logger.info(f"Worker {self.name}: draining {in_flight} in-flight jobs. Press Ctrl+C again for a cold shutdown.")
+        raise StopRequested()
+
+    def request_force_stop(self, signum, frame):
+        try:
+            super().request_force_stop(signum, frame)
+        except SystemExit:
+            with _pending_lock:
+                pending = list(_pending)
+            for future in pending:
+                future.cancel()
+            raise
+
+    def teardown(self):
+        self._executor.shutdown(wait=True)
+        super().teardown()
 
 
-def start_worker() -> None:
+def start_worker(concurrency: Optional[int] = None) -> None:
     redis_conn = redis.Redis.from_url(settings.REDIS_URL)
     with Connection(redis_conn):
-        worker = Worker([Queue("agent_runs", connection=redis_conn)])
+        worker = AsyncJobWorker([Queue("agent_runs", connection=redis_conn)], connection=redis_conn, concurrency=concurrency)
         worker.work()
 
 
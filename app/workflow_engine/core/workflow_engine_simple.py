@@ -9,6 +9,7 @@ from sqlalchemy.orm import Session
 from sqlalchemy import text
 
 from app.core.config import settings
+from app.core.telemetry import traced
 from app.workflow_engine.constants.workflow_statuses import WorkflowStatus, WorkflowStatusGroups
 from .interfaces import (
     WorkflowCreationResult, WorkflowType,
@@ -186,6 +187,7 @@ class SimpleWorkflowEngine:
                 context=context
             )
 
+    @traced("engine.process_user_request")
     async def process_user_request(
         self,
         user_id: int,
@@ -14,6 +14,7 @@ from uuid import UUID
 from redis.asyncio import Redis
 from ..utils.workflow_logger import WorkflowLogger
 from app.core.config import settings
+from app.core.telemetry import traced
 from app.db.models import UsageMode
 from app.exceptions.api_exceptions import WorkflowProcessingException
 from app.exceptions.llm_exceptions import JSONParsingException, LLMConnectionException
@@ -133,6 +134,7 @@ class LLMWorkflowPlanner:
     # MÉTODO PRINCIPAL UNIFICADO
     # ===============================
     
+    @traced("planner.unified_workflow_planning")
     async def unified_workflow_planning(
         self,
         user_message: str,
@@ -0,0 +1,5 @@
+"""
+Benchmarks de ejecución de workflows
+Generador de carga sobre simulate=True + fake_data para medir overhead del
+runner, templates, planner y persistencia sin tocar APIs externas ni LLMs reales
+"""
@@ -0,0 +1,104 @@
+"""
+Catálogo sintético de nodos y specs de flows para benchmarks
+Usa solo nodos con generador en fake_data_registry para que simulate=True
+produzca outputs realistas
+"""
+
+import random
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+from uuid import UUID, uuid5, NAMESPACE_URL
+
+GOALS_PATH = Path(__file__).with_name("goals.yaml")
+
+# Nodos con generador fake registrado + parámetros de ejemplo
+SYNTHETIC_NODES: List[Dict[str, Any]] = [
+    {"name": "Gmail", "action": "send_messages", "provider": "google", "default_auth": "oauth2_google_gmail",
+     "params": {"email": "team@example.com", "subject": "Status", "message": "Todo en orden"}},
+    {"name": "Outlook", "action": "send_mail", "provider": "microsoft", "default_auth": "oauth2_microsoft_outlook",
+     "params": {"to": "team@example.com", "subject": "Status", "body": "Todo en orden"}},
+    {"name": "HTTP_Request", "action": "request", "provider": "http", "default_auth": None,
+     "params": {"url": "https://api.example.com/items", "method": "GET"}},
+    {"name": "Postgres", "action": "run_query", "provider": "postgres", "default_auth": "db_credentials_postgres",
+     "params": {"query": "SELECT id, name FROM customers LIMIT 10"}},
+    {"name": "Airtable", "action": "read_write", "provider": "airtable", "default_auth": "api_key_airtable",
+     "params": {"operation": "read", "table": "Leads"}},
+    {"name": "Google_Drive", "action": "upload_file", "provider": "google", "default_auth": "oauth2_google_drive",
+     "params": {"file_name": "report.csv", "content": "a,b\n1,2"}},
+    {"name": "Dropbox", "action": "upload_file", "provider": "dropbox", "default_auth": "oauth2_dropbox",
+     "params": {"path": "/backups/db.sql", "content": "-- dump"}},
+]
+
+
+def _stable_uuid(*parts: str) -> UUID:
+    return uuid5(NAMESPACE_URL, "kyra-bench:" + ":".join(parts))
+
+
+def load_goals(path: Path = GOALS_PATH) -> List[str]:
+    """Carga los intents de benchmarks/goals.yaml (PyYAML opcional)."""
+    text = path.read_text(encoding="utf-8")
+    try:
+        import yaml
+        goals = yaml.safe_load(text) or []
+    except ImportError:
+        goals = [
+            line.strip()[1:].strip().strip('"').strip("'")
+            for line in text.splitlines()
+            if line.strip().startswith("-")
+        ]
+    return [str(goal) for goal in goals if goal]
+
+
+def build_cag_context() -> List[Dict[str, Any]]:
+    """Catálogo en el formato CAG que consume LLMWorkflowPlanner."""
+    context = []
+    for node in SYNTHETIC_NODES:
+        node_id = str(_stable_uuid("node", node["name"]))
+        context.append({
+            "node_id": node_id,
+            "id": node_id,
+            "name": node["name"],
+            "provider": node["provider"],
+            "type": "action",
+            "default_auth": node["default_auth"],
+            "description": f"{node['name']} ({node['action']})",
+            "actions": [{
+                "action_id": str(_stable_uuid("action", node["name"], node["action"])),
+                "name": node["action"],
+                "description": f"{node['name']}.{node['action']}",
+                "parameters": [{"name": key, "type": "string", "required": True} for key in node["params"]],
+                "sample_params": node["params"],
+            }],
+        })
+    return context
+
+
+def build_flow_spec(step_count: int, rng: Optional[random.Random] = None, templated: bool = True) -> Dict[str, Any]:
+    """
+    Genera un flow lineal de `step_count` pasos compatible con StepMetaDTO.
+    Con templated=True cada paso referencia el output del anterior para
+    ejercitar el template engine.
+    """
+    rng = rng or random.Random(0)
+    steps: List[Dict[str, Any]] = []
+    for index in range(step_count):
+        node = rng.choice(SYNTHETIC_NODES)
+        step_id = _stable_uuid("step", str(step_count), str(index), node["name"])
+        params = dict(node["params"])
+        if templated and steps:
+            params["context"] = "{{" + str(steps[-1]["id"]) + ".status}}"
+        steps.append({
+            "id": step_id,
+            "next": None,
+            "node_id": _stable_uuid("node", node["name"]),
+            "action_id": _stable_uuid("action", node["name"], node["action"]),
+            "node_name": node["name"],
+            "action_name": node["action"],
+            "default_auth": node["default_auth"],
+            "params": params,
+            "params_meta": [{"name": key, "type": "string", "required": True} for key in node["params"]],
+            "retries": 0,
+        })
+    for current, following in zip(steps, steps[1:]):
+        current["next"] = following["id"]
+    return {"start_id": steps[0]["id"] if steps else None, "steps": steps}
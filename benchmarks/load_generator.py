@@ -0,0 +1,244 @@
+"""
+Generador de carga para la ejecución de workflows
+
+Ejecuta flows sintéticos en simulate=True (fake_data) y reporta p50/p95/p99,
+throughput y asignaciones por etapa:
+  - runner:  WorkflowRunnerService.execute_workflow_steps (templates + execute_node)
+  - webhook: create_event + run_webhook_flow (StepMetaDTO + validación + run_workflow)
+  - planner: LLMWorkflowPlanner.unified_workflow_planning con LLM stub determinista
+
+Uso:
+    python -m benchmarks.load_generator --stages runner,webhook --steps 5 \
+        --iterations 200 --concurrency 20 --latency-profile fast
+"""
+
+import argparse
+import asyncio
+import contextlib
+import json
+import logging
+import random
+import time
+from typing import Any, Awaitable, Callable, Dict, Iterator, List, Optional
+from uuid import uuid4
+
+from benchmarks.flows import build_cag_context, build_flow_spec, load_goals
+from benchmarks.stats import AllocationTracker, StageStats, format_table
+from benchmarks.stubs import (
+    InMemoryFlowDefinitionService,
+    InMemoryFlowExecutionRepository,
+    InMemoryWebhookEventRepository,
+    NullCredentialService,
+    StubLLMService,
+)
+
+STAGES = ("runner", "webhook", "planner")
+BENCH_USER_ID = 1
+
+
+async def _run_stage(
+    stage: str,
+    operation: Callable[[int], Awaitable[bool]],
+    iterations: int,
+    concurrency: int,
+    trace_allocations: bool,
+) -> StageStats:
+    """Lanza `iterations` operaciones con un máximo de `concurrency` en vuelo."""
+    stats = StageStats(stage=stage)
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def _one(index: int):
+        async with semaphore:
+            start = time.perf_counter()
+            try:
+                ok = await operation(index)
+            except Exception as e:
+                logging.getLogger(__name__).debug(f"{stage}[{index}] falló: {e}")
+                ok = False
+            stats.record((time.perf_counter() - start) * 1000, ok)
+
+    tracker = AllocationTracker(trace_allocations)
+    with tracker:
+        wall_start = time.perf_counter()
+        await asyncio.gather(*(_one(i) for i in range(iterations)))
+        stats.wall_seconds = time.perf_counter() - wall_start
+    tracker.apply(stats)
+    return stats
+
+
+def _build_runner(persistence: str):
+    """Runner con persistencia en memoria (por defecto) o en la BD configurada."""
+    from app.services.flow_execution_service import FlowExecutionService
+    from app.services.flow_validator_service import FlowValidatorService
+    from app.services.workflow_runner_service import WorkflowRunnerService
+
+    if persistence == "db":
+        return None
+    return WorkflowRunnerService(
+        FlowExecutionService(InMemoryFlowExecutionRepository()),
+        NullCredentialService(),
+        FlowValidatorService(),
+    )
+
+
+async def _runner_operation_factory(args, rng: random.Random):
+    runner = _build_runner(args.persistence)
+    specs = [build_flow_spec(args.steps, random.Random(rng.random()), not args.no_templates) for _ in range(16)]
+    # execute_workflow_steps trabaja con dicts y ids en str (formato workflow engine)
+    step_lists = [
+        [{**step, "id": str(step["id"]), "next": str(step["next"]) if step["next"] else None} for step in spec["steps"]]
+        for spec in specs
+    ]
+
+    async def operation(index: int) -> bool:
+        steps = step_lists[index % len(step_lists)]
+        if runner is None:
+            from app.db.database import async_session
+            from app.services.workflow_runner_service import create_workflow_runner_manual
+            async with async_session() as session:
+                db_runner = await create_workflow_runner_manual(session)
+                _, result = await db_runner.execute_workflow_steps(steps, BENCH_USER_ID, {}, simulate=True)
+        else:
+            _, result = await runner.execute_workflow_steps(steps, BENCH_USER_ID, {}, simulate=True)
+        return result.overall_status == "success"
+
+    return operation
+
+
+async def _webhook_operation_factory(args, rng: random.Random):
+    from app.routers.webhook_router import run_webhook_flow
+
+    runner = _build_runner(args.persistence)
+    flow_ids = [uuid4() for _ in range(16)]
+    def_service = InMemoryFlowDefinitionService({
+        flow_id: build_flow_spec(args.steps, random.Random(rng.random()), not args.no_templates)
+        for flow_id in flow_ids
+    })
+    event_repo = InMemoryWebhookEventRepository()
+
+    async def operation(index: int) -> bool:
+        flow_id = flow_ids[index % len(flow_ids)]
+        payload = {"event": "bench", "sequence": index, "items": [{"id": i, "value": i * 3} for i in range(10)]}
+        await event_repo.create_event(flow_id, f"/webhooks/{flow_id}", "POST", payload, {"content-type": "application/json"})
+        if runner is None:
+            from app.db.database import async_session
+            from app.services.workflow_runner_service import create_workflow_runner_manual
+            async with async_session() as session:
+                db_runner = await create_workflow_runner_manual(session)
+                result = await run_webhook_flow(flow_id, BENCH_USER_ID, payload, db_runner, def_service, simulate=True)
+        else:
+            result = await run_webhook_flow(flow_id, BENCH_USER_ID, payload, runner, def_service, simulate=True)
+        _, workflow_result = result
+        return workflow_result.overall_status == "success"
+
+    return operation
+
+
+@contextlib.contextmanager
+def stub_llm_service(args) -> Iterator[None]:
+    """
+    Sustituye el singleton de LLMService (el planner lo obtiene vía
+    get_llm_service()) mientras dura la etapa y restaura el anterior al salir
+    """
+    import app.ai.llm_clients.llm_service as llm_service_module
+
+    previous = llm_service_module._llm_service_instance
+    llm_service_module._llm_service_instance = StubLLMService(build_cag_context(), args.llm_latency_ms, args.seed)
+    try:
+        yield
+    finally:
+        llm_service_module._llm_service_instance = previous
+
+
+def stage_context(stage: str, args) -> contextlib.AbstractContextManager:
+    """Estado global que una etapa necesita solo mientras se ejecuta"""
+    if stage == "planner":
+        return stub_llm_service(args)
+    return contextlib.nullcontext()
+
+
+async def _planner_operation_factory(args, rng: random.Random):
+    from app.workflow_engine.llm.llm_workflow_planner import LLMWorkflowPlanner
+
+    cag_context = build_cag_context()
+    planner = LLMWorkflowPlanner(connector_client=None, redis_client=None)
+    goals = load_goals()
+
+    async def operation(index: int) -> bool:
+        result = await planner.unified_workflow_planning(
+            user_message=goals[index % len(goals)],
+            cag_context=cag_context,
+            workflow_type="classic",
+        )
+        return bool(result) and result.get("status") != "error"
+
+    return operation
+
+
+_FACTORIES = {
+    "runner": _runner_operation_factory,
+    "webhook": _webhook_operation_factory,
+    "planner": _planner_operation_factory,
+}
+
+
+async def run_benchmark(args) -> List[Dict[str, Any]]:
+    from app.utils.fake_data import fake_data_registry, get_latency_preset
+
+    if args.latency_profile != "none":
+        fake_data_registry.set_latency_profile(
+            get_latency_preset(args.latency_profile, seed=args.seed, scale=args.latency_scale)
+        )
+
+    rng = random.Random(args.seed)
+    summaries = []
+    for stage in args.stages:
+        with stage_context(stage, args):
+            operation = await _FACTORIES[stage](args, rng)
+            # Calentamiento: imports perezosos, compilación de templates, caches
+            for index in range(min(args.warmup, args.iterations)):
+                await operation(index)
+            stats = await _run_stage(stage, operation, args.iterations, args.concurrency, args.trace_allocations)
+        summaries.append(stats.summary())
+    return summaries
+
+
+def _parse_stages(value: str) -> List[str]:
+    stages = [stage.strip() for stage in value.split(",") if stage.strip()]
+    unknown = [stage for stage in stages if stage not in STAGES]
+    if unknown:
+        raise argparse.ArgumentTypeError(f"Etapas desconocidas: {unknown}. Disponibles: {list(STAGES)}")
+    return stages
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description="Generador de carga de workflows (simulate=True)")
+    parser.add_argument("--stages", type=_parse_stages, default=list(STAGES))
+    parser.add_argument("--iterations", type=int, default=100)
+    parser.add_argument("--concurrency", type=int, default=10)
+    parser.add_argument("--warmup", type=int, default=5)
+    parser.add_argument("--steps", type=int, default=5, help="Pasos por flow sintético")
+    parser.add_argument("--no-templates", action="store_true", help="No encadenar {{...}} entre pasos")
+    parser.add_argument("--latency-profile", choices=["none", "fast", "saas"], default="none")
+    parser.add_argument("--latency-scale", type=float, default=1.0)
+    parser.add_argument("--llm-latency-ms", type=float, default=0.0, help="Latencia del LLM stub")
+    parser.add_argument("--persistence", choices=["memory", "db"], default="memory")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--trace-allocations", action="store_true")
+    parser.add_argument("--json", dest="json_output", action="store_true")
+    parser.add_argument("--log-level", default="WARNING")
+    return parser
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    args = build_parser().parse_args(argv)
+    logging.basicConfig(level=getattr(logging, args.log_level.upper(), logging.WARNING))
+    summaries = asyncio.run(run_benchmark(args))
+    if args.json_output:
+        print(json.dumps(summaries, indent=2))
+    else:
+        print(format_table(summaries))
+
+
+if __name__ == "__main__":
+    main()
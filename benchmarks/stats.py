@@ -0,0 +1,93 @@
+"""
+Agregación de métricas por etapa: percentiles, throughput y asignaciones
+"""
+
+import math
+import tracemalloc
+from dataclasses import dataclass, field
+from typing import Any, Dict, List
+
+
+def percentile(sorted_values: List[float], pct: float) -> float:
+    """Percentil con interpolación lineal sobre una lista ya ordenada."""
+    if not sorted_values:
+        return 0.0
+    rank = (len(sorted_values) - 1) * pct / 100.0
+    low, high = math.floor(rank), math.ceil(rank)
+    if low == high:
+        return sorted_values[int(rank)]
+    return sorted_values[low] + (sorted_values[high] - sorted_values[low]) * (rank - low)
+
+
+@dataclass
+class StageStats:
+    """Latencias (ms), errores y asignaciones de una etapa."""
+    stage: str
+    latencies_ms: List[float] = field(default_factory=list)
+    errors: int = 0
+    wall_seconds: float = 0.0
+    alloc_blocks: int = 0
+    alloc_bytes: int = 0
+
+    def record(self, latency_ms: float, ok: bool = True) -> None:
+        self.latencies_ms.append(latency_ms)
+        if not ok:
+            self.errors += 1
+
+    def summary(self) -> Dict[str, Any]:
+        values = sorted(self.latencies_ms)
+        count = len(values)
+        return {
+            "stage": self.stage,
+            "count": count,
+            "errors": self.errors,
+            "p50_ms": round(percentile(values, 50), 3),
+            "p95_ms": round(percentile(values, 95), 3),
+            "p99_ms": round(percentile(values, 99), 3),
+            "max_ms": round(values[-1], 3) if values else 0.0,
+            "throughput_per_s": round(count / self.wall_seconds, 2) if self.wall_seconds else 0.0,
+            "alloc_blocks_per_op": round(self.alloc_blocks / count, 1) if count else 0.0,
+            "alloc_kib_per_op": round(self.alloc_bytes / count / 1024, 2) if count else 0.0,
+        }
+
+
+class AllocationTracker:
+    """
+    Cuenta bloques/bytes asignados durante una etapa con tracemalloc.
+    Es caro: solo se activa con --trace-allocations.
+    """
+
+    def __init__(self, enabled: bool):
+        self.enabled = enabled
+        self._snapshot = None
+
+    def __enter__(self):
+        if self.enabled:
+            tracemalloc.start()
+            self._snapshot = tracemalloc.take_snapshot()
+        return self
+
+    def __exit__(self, *exc):
+        if self.enabled:
+            after = tracemalloc.take_snapshot()
+            tracemalloc.stop()
+            diff = after.compare_to(self._snapshot, "filename")
+            self.blocks = sum(max(stat.count_diff, 0) for stat in diff)
+            self.bytes = sum(max(stat.size_diff, 0) for stat in diff)
+        return False
+
+    def apply(self, stats: StageStats) -> None:
+        if self.enabled:
+            stats.alloc_blocks = self.blocks
+            stats.alloc_bytes = self.bytes
+
+
+def format_table(summaries: List[Dict[str, Any]]) -> str:
+    """Tabla de texto simple para la salida del CLI."""
+    columns = ["stage", "count", "errors", "p50_ms", "p95_ms", "p99_ms", "max_ms",
+               "throughput_per_s", "alloc_blocks_per_op", "alloc_kib_per_op"]
+    widths = {col: max(len(col), *(len(str(s[col])) for s in summaries)) for col in columns}
+    lines = ["  ".join(col.ljust(widths[col]) for col in columns)]
+    for summary in summaries:
+        lines.append("  ".join(str(summary[col]).ljust(widths[col]) for col in columns))
+    return "\n".join(lines)
@@ -0,0 +1,115 @@
+"""
+Dobles deterministas para benchmarks
+- StubLLMService: responde planes fijos derivados del prompt (sin red)
+- Repositorios/servicios en memoria para persistencia y webhooks
+"""
+
+import asyncio
+import hashlib
+import json
+import random
+from typing import Any, Dict, List, Optional
+from uuid import UUID
+
+
+class StubLLMService:
+    """
+    Reemplazo determinista de LLMService.run para el planner.
+
+    Elige 1-3 nodos del catálogo sintético a partir del hash del prompt y
+    devuelve un execution_plan con el mismo formato que produce Kyra.
+    """
+
+    def __init__(self, cag_context: List[Dict[str, Any]], latency_ms: float = 0.0, seed: int = 0):
+        self.cag_context = cag_context
+        self.latency_ms = latency_ms
+        self.seed = seed
+        self.calls = 0
+
+    async def run(self, system_prompt: str = "", user_prompt: str = "", **kwargs) -> Dict[str, Any]:
+        self.calls += 1
+        if self.latency_ms:
+            await asyncio.sleep(self.latency_ms / 1000)
+
+        digest = hashlib.sha256(f"{self.seed}:{system_prompt}{user_prompt}".encode()).digest()
+        rng = random.Random(digest)
+        step_count = rng.randint(1, min(3, len(self.cag_context)))
+        nodes = rng.sample(self.cag_context, step_count)
+
+        execution_plan = []
+        for index, node in enumerate(nodes, start=1):
+            action = node["actions"][0]
+            execution_plan.append({
+                "step": index,
+                "node_id": node["node_id"],
+                "action_id": action["action_id"],
+                "node_name": node["name"],
+                "action_name": action["name"],
+                "params": dict(action.get("sample_params", {})),
+                "description": f"Paso sintético {index}",
+            })
+
+        return {
+            "status": "workflow_ready_for_review",
+            "workflow_summary": "Workflow sintético de benchmark",
+            "execution_plan": execution_plan,
+            "confidence": 0.9,
+            "_llm_duration_ms": self.latency_ms,
+        }
+
+
+class InMemoryFlowExecutionRepository:
+    """Mismo contrato que FlowExecutionRepository, sin base de datos."""
+
+    def __init__(self):
+        self.executions: Dict[UUID, Any] = {}
+        self.updates = 0
+
+    async def save_execution(self, flow_exec):
+        self.executions[flow_exec.execution_id] = flow_exec
+        return flow_exec
+
+    async def update_execution(self, execution_id: UUID, status: str, outputs=None, error=None, **kwargs):
+        flow_exec = self.executions.get(execution_id)
+        if flow_exec is not None:
+            flow_exec.status = status
+            # Serializar como lo haría el JSONB para medir el costo real del payload
+            flow_exec.outputs = json.loads(json.dumps(outputs, default=str)) if outputs else outputs
+            flow_exec.error = error
+        self.updates += 1
+        return flow_exec
+
+
+class InMemoryWebhookEventRepository:
+    """Mismo contrato que WebhookEventRepository.create_event, en memoria."""
+
+    def __init__(self):
+        self.events: List[Dict[str, Any]] = []
+
+    async def create_event(self, flow_id: UUID, path: str, method: str, payload: Any, headers: Dict[str, Any]):
+        event = {
+            "flow_id": flow_id,
+            "path": path,
+            "method": method,
+            "payload": json.loads(json.dumps(payload, default=str)) if payload else payload,
+            "headers": headers,
+        }
+        self.events.append(event)
+        return event
+
+
+class InMemoryFlowDefinitionService:
+    """Devuelve specs sintéticos registrados por flow_id."""
+
+    def __init__(self, specs: Optional[Dict[UUID, Dict[str, Any]]] = None):
+        self.specs = specs or {}
+
+    async def get_flow_spec(self, flow_id: UUID) -> Dict[str, Any]:
+        return self.specs[flow_id]
+
+
+class NullCredentialService:
+    """En simulate=True el runner no pide credenciales; esto evita la BD igualmente."""
+
+    async def get_credential(self, user_id: int, service_id: str):
+        return {}
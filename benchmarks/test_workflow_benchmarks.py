@@ -0,0 +1,74 @@
+"""
+Suite pytest-benchmark sobre las mismas etapas que benchmarks.load_generator
+
+    pytest benchmarks/ --benchmark-only
+    pytest benchmarks/ --benchmark-autosave          # guarda baseline
+    pytest benchmarks/ --benchmark-compare --benchmark-compare-fail=median:15%
+
+Cada ronda ejecuta BENCH_ITERATIONS operaciones con la concurrencia del
+parámetro; p50/p95/p99, throughput y errores de la última ronda quedan en
+extra_info. Variables de entorno:
+  BENCH_ITERATIONS (50), BENCH_ROUNDS (5), BENCH_STEPS (5),
+  BENCH_LATENCY_PROFILE (none|fast|saas), BENCH_PERSISTENCE (memory|db)
+"""
+
+import asyncio
+import os
+import random
+
+import pytest
+
+pytest.importorskip("pytest_benchmark")
+
+from benchmarks.load_generator import _FACTORIES, _run_stage, build_parser, stage_context  # noqa: E402
+
+ITERATIONS = int(os.getenv("BENCH_ITERATIONS", 50))
+ROUNDS = int(os.getenv("BENCH_ROUNDS", 5))
+
+
+def _bench_args(stage: str, concurrency: int):
+    return build_parser().parse_args([
+        "--stages", stage,
+        "--iterations", str(ITERATIONS),
+        "--concurrency", str(concurrency),
+        "--steps", os.getenv("BENCH_STEPS", "5"),
+        "--latency-profile", os.getenv("BENCH_LATENCY_PROFILE", "none"),
+        "--persistence", os.getenv("BENCH_PERSISTENCE", "memory"),
+    ])
+
+
+@pytest.fixture(scope="module")
+def event_loop_runner():
+    loop = asyncio.new_event_loop()
+    yield loop
+    loop.close()
+
+
+@pytest.fixture(autouse=True)
+def latency_profile():
+    from app.utils.fake_data import fake_data_registry, get_latency_preset
+
+    profile = os.getenv("BENCH_LATENCY_PROFILE", "none")
+    if profile != "none":
+        fake_data_registry.set_latency_profile(get_latency_preset(profile, seed=0))
+    yield
+    fake_data_registry.set_latency_profile(None)
+
+
+@pytest.mark.parametrize("concurrency", [1, 10])
+@pytest.mark.parametrize("stage", ["runner", "webhook", "planner"])
+def test_stage(benchmark, event_loop_runner, stage, concurrency):
+    args = _bench_args(stage, concurrency)
+    with stage_context(stage, args):
+        operation = event_loop_runner.run_until_complete(_FACTORIES[stage](args, random.Random(args.seed)))
+        # Calentamiento fuera de la medición: imports perezosos, templates, caches
+        for index in range(min(args.warmup, ITERATIONS)):
+            event_loop_runner.run_until_complete(operation(index))
+
+        def run_round():
+            return event_loop_runner.run_until_complete(_run_stage(stage, operation, ITERATIONS, concurrency, False))
+
+        stats = benchmark.pedantic(run_round, rounds=ROUNDS, iterations=1)
+    summary = stats.summary()
+    benchmark.extra_info.update(summary)
+    assert summary["errors"] == 0, f"{summary['errors']}/{summary['count']} operaciones fallaron en {stage}"
@@ -15,9 +15,10 @@ from app.exceptions import RequiresUserInputError
 from app.core.constants import HTTP_UNPROCESSABLE_ENTITY
 from fastapi import FastAPI, Request, Depends
 from contextlib import asynccontextmanager
-from fastapi.responses import JSONResponse, FileResponse
+from fastapi.responses import JSONResponse, FileResponse, PlainTextResponse
 from fastapi.staticfiles import StaticFiles
 from app.core.config import settings
+from app.core.telemetry import configure_telemetry, shutdown_telemetry, render_metrics, is_enabled as telemetry_enabled
 from app.connectors.factory import scan_handlers
 from fastapi.middleware.cors import CORSMiddleware
 from app.core.scheduler import start_scheduler
@@ -70,8 +71,29 @@ async def lifespan(app: FastAPI):
     logging.info("ERICK ES EL PUTO CEO Y TIENE UNA STARTUP EXITOSA - STAY HARD!")
     
     # Startup
+    configure_telemetry()
     scan_handlers()
     start_scheduler()
+
+    # 📊 Rollups de llm_usage_logs (idempotente entre réplicas: lock sobre el watermark)
+    if settings.LLM_USAGE_ROLLUPS_ENABLED:
+        try:
+            from app.core.scheduler import get_scheduler, schedule_job
+            from app.repositories.llm_usage_repository import run_llm_usage_rollup
+
+            schedule_job(
+                get_scheduler(), "llm_usage_rollup", run_llm_usage_rollup,
+                "interval", {"minutes": settings.LLM_USAGE_ROLLUP_INTERVAL_MINUTES},
+            )
+        except Exception as e:
+            logging.error(f"Failed to schedule LLM usage rollup: {e}")
+
+    # 🤖 Consumer de updates de Telegram (stream durable + envío con rate limit)
+    try:
+        from app.services.telegram_gateway import get_telegram_gateway
+        await get_telegram_gateway().start()
+    except Exception as e:
+        logging.error(f"Failed to start Telegram gateway: {e}")
     
     # Inicializar LLM Provider Registry desde la base de datos
     try:
@@ -171,6 +193,21 @@ async def lifespan(app: FastAPI):
     yield
     
     # Shutdown (si necesitas limpieza)
+    from app.core.token_system import shutdown_token_system
+    await shutdown_token_system()
+    shutdown_telemetry()
+    from app.ai.llm_clients.client_pool import llm_client_pool
+    await llm_client_pool.aclose_all()
+    from app.core.code_sandbox import shutdown_code_sandbox_pool
+    shutdown_code_sandbox_pool()
+    from app.agent.handler_validator import shutdown_validation_pool
+    shutdown_validation_pool()
+    from app.services.telegram_gateway import get_telegram_gateway
+    await get_telegram_gateway().stop()
+    from app.core.cache import close_shared_redis
+    await close_shared_redis()
+    from app.db.database import dispose_engines
+    await dispose_engines()
 
 app = FastAPI(title="Kyra API", debug=settings.DEBUG, lifespan=lifespan)
 # Frontend files served by shared hosting, not VPS
@@ -199,6 +236,13 @@ app = FastAPI(title="Kyra API", debug=settings.DEBUG, lifespan=lifespan)
 async def health_check():
     return {"status": "ok"}
 
+# Métricas Prometheus por etapa (TELEMETRY_ENABLED=true)
+@app.get("/metrics", include_in_schema=False)
+async def metrics():
+    if not telemetry_enabled():
+        return PlainTextResponse("# telemetry disabled\n", status_code=404)
+    return PlainTextResponse(render_metrics(), media_type="text/plain; version=0.0.4")
+
 # Endpoint para verificar autenticación
 @app.get("/api/auth/verify")
 async def verify_auth(user_id: int = Depends(get_current_user_id)):